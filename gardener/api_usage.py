@@ -1,13 +1,15 @@
 """API usage tracking and rate limiting for Gardener.
 
 Tracks all AI backend API calls to prevent runaway usage and enforce quotas.
+Calls are recorded with the model and token counts reported by the provider,
+so quotas can be expressed as calls, tokens, or both.
 """
 
 import logging
 import os
 from contextlib import contextmanager
-from dataclasses import dataclass
-from datetime import datetime, timedelta
+from dataclasses import dataclass, field
+from datetime import timedelta
 from typing import Callable, TypeVar
 
 import config
@@ -15,10 +17,18 @@ from db import get_db_connection
 
 logger = logging.getLogger(__name__)
 
-# Rate limiting configuration
+# Rate limiting configuration (a limit of 0 disables that check)
 MAX_CALLS_PER_HOUR = int(os.environ.get("MAX_API_CALLS_PER_HOUR", "100"))
 MAX_CALLS_PER_DAY = int(os.environ.get("MAX_API_CALLS_PER_DAY", "500"))
+MAX_TOKENS_PER_HOUR = int(os.environ.get("MAX_API_TOKENS_PER_HOUR", "0"))
+MAX_TOKENS_PER_DAY = int(os.environ.get("MAX_API_TOKENS_PER_DAY", "0"))
 WARN_THRESHOLD_PERCENT = int(os.environ.get("API_WARN_THRESHOLD_PERCENT", "80"))
+
+# Optional pricing (USD per million tokens) for cost estimates
+COST_PER_MTOK_PROMPT = float(os.environ.get("AI_COST_PER_MTOK_PROMPT", "0"))
+COST_PER_MTOK_COMPLETION = float(os.environ.get("AI_COST_PER_MTOK_COMPLETION", "0"))
+COST_PER_MTOK_CACHED = float(os.environ.get("AI_COST_PER_MTOK_CACHED", "0"))
+
 _API_USAGE_DB_PATH: str | None = None
 
 # Database schema for API usage tracking
@@ -30,7 +40,13 @@ CREATE TABLE IF NOT EXISTS api_calls (
     operation TEXT NOT NULL,  -- 'classify', 'refine', 'ask'
     timestamp TEXT DEFAULT (datetime('now')),
     success INTEGER DEFAULT 1,  -- 1 for success, 0 for failure
-    error TEXT
+    error TEXT,
+    model TEXT,
+    prompt_tokens INTEGER DEFAULT 0,  -- Total input tokens, including cached
+    completion_tokens INTEGER DEFAULT 0,
+    cached_tokens INTEGER DEFAULT 0,  -- Input tokens served from provider cache
+    cache_write_tokens INTEGER DEFAULT 0,  -- Input tokens written to provider cache
+    parse_error INTEGER DEFAULT 0  -- 1 if the reply could not be parsed
 );
 
 -- Create indexes for efficient querying
@@ -39,6 +55,71 @@ CREATE INDEX IF NOT EXISTS idx_api_calls_backend ON api_calls(backend);
 CREATE INDEX IF NOT EXISTS idx_api_calls_operation ON api_calls(operation);
 """
 
+# Columns added after the initial api_calls schema: (name, SQL type/default)
+API_CALLS_MIGRATIONS = [
+    ("model", "TEXT"),
+    ("prompt_tokens", "INTEGER DEFAULT 0"),
+    ("completion_tokens", "INTEGER DEFAULT 0"),
+    ("cached_tokens", "INTEGER DEFAULT 0"),
+    ("cache_write_tokens", "INTEGER DEFAULT 0"),
+    ("parse_error", "INTEGER DEFAULT 0"),
+]
+
+
+@dataclass
+class ApiCallUsage:
+    """Token usage for a single API call, filled in by the backend."""
+
+    backend: str
+    operation: str
+    model: str | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+    cache_write_tokens: int = 0
+    parse_error: bool = False  # Set when the reply could not be parsed
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def add(
+        self,
+        model: str | None = None,
+        prompt_tokens: int = 0,
+        completion_tokens: int = 0,
+        cached_tokens: int = 0,
+        cache_write_tokens: int = 0,
+    ) -> None:
+        """Accumulate usage (a tracked operation may span several requests)."""
+        if model:
+            self.model = model
+        self.prompt_tokens += _as_int(prompt_tokens)
+        self.completion_tokens += _as_int(completion_tokens)
+        self.cached_tokens += _as_int(cached_tokens)
+        self.cache_write_tokens += _as_int(cache_write_tokens)
+
+
+def _as_int(value: object) -> int:
+    """Coerce a provider-reported token count to int, treating junk as 0."""
+    if isinstance(value, bool):
+        return 0
+    if isinstance(value, int):
+        return value
+    return 0
+
+
+def estimate_cost(
+    prompt_tokens: int, completion_tokens: int, cached_tokens: int
+) -> float:
+    """Estimate USD cost from token counts using the configured prices."""
+    uncached = max(prompt_tokens - cached_tokens, 0)
+    return (
+        uncached * COST_PER_MTOK_PROMPT
+        + cached_tokens * COST_PER_MTOK_CACHED
+        + completion_tokens * COST_PER_MTOK_COMPLETION
+    ) / 1_000_000
+
 
 @dataclass
 class UsageStats:
@@ -51,44 +132,78 @@ class UsageStats:
     daily_limit: int
     warn_threshold_hourly: int
     warn_threshold_daily: int
+    tokens_last_hour: int = 0
+    tokens_last_day: int = 0
+    hourly_token_limit: int = 0
+    daily_token_limit: int = 0
+
+    @staticmethod
+    def _percent(used: int, limit: int) -> float:
+        return (used / limit * 100) if limit > 0 else 0
 
     @property
     def hourly_usage_percent(self) -> float:
-        """Calculate percentage of hourly quota used."""
-        return (
-            (self.calls_last_hour / self.hourly_limit * 100)
-            if self.hourly_limit > 0
-            else 0
+        """Calculate percentage of hourly quota used (calls or tokens, whichever is higher)."""
+        return max(
+            self._percent(self.calls_last_hour, self.hourly_limit),
+            self._percent(self.tokens_last_hour, self.hourly_token_limit),
         )
 
     @property
     def daily_usage_percent(self) -> float:
-        """Calculate percentage of daily quota used."""
-        return (
-            (self.calls_last_day / self.daily_limit * 100)
-            if self.daily_limit > 0
-            else 0
+        """Calculate percentage of daily quota used (calls or tokens, whichever is higher)."""
+        return max(
+            self._percent(self.calls_last_day, self.daily_limit),
+            self._percent(self.tokens_last_day, self.daily_token_limit),
         )
 
     @property
     def is_near_hourly_limit(self) -> bool:
         """Check if approaching hourly limit."""
-        return self.calls_last_hour >= self.warn_threshold_hourly
+        return self.hourly_usage_percent >= WARN_THRESHOLD_PERCENT
 
     @property
     def is_near_daily_limit(self) -> bool:
         """Check if approaching daily limit."""
-        return self.calls_last_day >= self.warn_threshold_daily
+        return self.daily_usage_percent >= WARN_THRESHOLD_PERCENT
 
     @property
     def is_over_hourly_limit(self) -> bool:
         """Check if hourly limit exceeded."""
-        return self.calls_last_hour >= self.hourly_limit
+        return self.hourly_usage_percent >= 100
 
     @property
     def is_over_daily_limit(self) -> bool:
         """Check if daily limit exceeded."""
-        return self.calls_last_day >= self.daily_limit
+        return self.daily_usage_percent >= 100
+
+
+@dataclass
+class UsageBreakdown:
+    """Aggregated usage for one (operation, model) pair."""
+
+    operation: str
+    model: str | None
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    estimated_cost: float = field(default=0.0)
+    cache_write_tokens: int = 0
+    cache_hits: int = 0  # Calls that read at least one token from the cache
+    cache_misses: int = 0  # Calls that had to write the cache instead
+    parse_failures: int = 0  # Calls whose reply could not be parsed
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of cache-eligible calls that were served from the cache."""
+        eligible = self.cache_hits + self.cache_misses
+        return self.cache_hits / eligible if eligible else 0.0
+
+    @property
+    def parse_failure_rate(self) -> float:
+        """Share of calls whose reply had to be retried or was discarded."""
+        return self.parse_failures / self.calls if self.calls else 0.0
 
 
 def init_api_usage_db() -> None:
@@ -96,6 +211,11 @@ def init_api_usage_db() -> None:
     conn = get_db_connection()
     try:
         conn.executescript(API_USAGE_SCHEMA)
+        # Older databases predate token accounting; add any missing columns
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(api_calls)")}
+        for column, column_type in API_CALLS_MIGRATIONS:
+            if column not in existing:
+                conn.execute(f"ALTER TABLE api_calls ADD COLUMN {column} {column_type}")
         conn.commit()
         logger.debug("API usage tracking tables initialized")
     finally:
@@ -112,7 +232,11 @@ def _ensure_api_usage_db() -> None:
 
 
 def record_api_call(
-    backend: str, operation: str, success: bool = True, error: str | None = None
+    backend: str,
+    operation: str,
+    success: bool = True,
+    error: str | None = None,
+    usage: ApiCallUsage | None = None,
 ) -> None:
     """Record an API call to the database.
 
@@ -121,16 +245,37 @@ def record_api_call(
         operation: Operation type ('classify', 'refine', 'ask')
         success: Whether the call succeeded
         error: Error message if call failed
+        usage: Model and token counts reported by the provider, if known
     """
+    usage = usage or ApiCallUsage(backend, operation)
     _ensure_api_usage_db()
     conn = get_db_connection()
     try:
         conn.execute(
-            "INSERT INTO api_calls (backend, operation, success, error) VALUES (?, ?, ?, ?)",
-            (backend, operation, 1 if success else 0, error),
+            """INSERT INTO api_calls (
+                   backend, operation, success, error,
+                   model, prompt_tokens, completion_tokens, cached_tokens,
+                   cache_write_tokens, parse_error
+               ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+            (
+                backend,
+                operation,
+                1 if success else 0,
+                error,
+                usage.model,
+                usage.prompt_tokens,
+                usage.completion_tokens,
+                usage.cached_tokens,
+                usage.cache_write_tokens,
+                1 if usage.parse_error else 0,
+            ),
         )
         conn.commit()
-        logger.debug(f"Recorded API call: {backend}.{operation} (success={success})")
+        logger.debug(
+            f"Recorded API call: {backend}.{operation} (success={success}, "
+            f"tokens={usage.prompt_tokens}+{usage.completion_tokens}, "
+            f"cached={usage.cached_tokens})"
+        )
     finally:
         conn.close()
 
@@ -149,19 +294,17 @@ def get_usage_stats() -> UsageStats:
             "SELECT COUNT(*) FROM api_calls WHERE success = 1"
         ).fetchone()[0]
 
-        # Calls in last hour
-        hour_ago = (datetime.now() - timedelta(hours=1)).isoformat()
-        hourly = conn.execute(
-            "SELECT COUNT(*) FROM api_calls WHERE success = 1 AND timestamp > ?",
-            (hour_ago,),
-        ).fetchone()[0]
+        # Calls and tokens in last hour. Timestamps are stored by SQLite in
+        # UTC, so the window is computed in SQL rather than from local time.
+        # Failed calls still count toward the token budget when billed.
+        window_query = """SELECT
+                   COALESCE(SUM(success), 0),
+                   COALESCE(SUM(prompt_tokens + completion_tokens), 0)
+               FROM api_calls WHERE timestamp > datetime('now', ?)"""
+        hourly, hourly_tokens = conn.execute(window_query, ("-1 hour",)).fetchone()
 
-        # Calls in last 24 hours
-        day_ago = (datetime.now() - timedelta(days=1)).isoformat()
-        daily = conn.execute(
-            "SELECT COUNT(*) FROM api_calls WHERE success = 1 AND timestamp > ?",
-            (day_ago,),
-        ).fetchone()[0]
+        # Calls and tokens in last 24 hours
+        daily, daily_tokens = conn.execute(window_query, ("-1 day",)).fetchone()
 
         return UsageStats(
             total_calls=total,
@@ -173,11 +316,74 @@ def get_usage_stats() -> UsageStats:
                 MAX_CALLS_PER_HOUR * WARN_THRESHOLD_PERCENT / 100
             ),
             warn_threshold_daily=int(MAX_CALLS_PER_DAY * WARN_THRESHOLD_PERCENT / 100),
+            tokens_last_hour=hourly_tokens,
+            tokens_last_day=daily_tokens,
+            hourly_token_limit=MAX_TOKENS_PER_HOUR,
+            daily_token_limit=MAX_TOKENS_PER_DAY,
         )
     finally:
         conn.close()
 
 
+def get_usage_breakdown(since: timedelta | None = None) -> list[UsageBreakdown]:
+    """Aggregate calls and tokens per operation and model.
+
+    Args:
+        since: Only include calls within this window (default: all time)
+
+    Returns:
+        One UsageBreakdown per (operation, model), busiest first
+    """
+    window = ""
+    params: tuple = ()
+    if since is not None:
+        window = "WHERE timestamp > datetime('now', ?)"
+        params = (f"-{int(since.total_seconds())} seconds",)
+
+    _ensure_api_usage_db()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"""SELECT operation, model,
+                      COUNT(*) AS calls,
+                      COALESCE(SUM(prompt_tokens), 0) AS prompt_tokens,
+                      COALESCE(SUM(completion_tokens), 0) AS completion_tokens,
+                      COALESCE(SUM(cached_tokens), 0) AS cached_tokens,
+                      COALESCE(SUM(cache_write_tokens), 0) AS cache_write_tokens,
+                      COALESCE(SUM(cached_tokens > 0), 0) AS cache_hits,
+                      COALESCE(
+                          SUM(cached_tokens = 0 AND cache_write_tokens > 0), 0
+                      ) AS cache_misses,
+                      COALESCE(SUM(parse_error), 0) AS parse_failures
+               FROM api_calls
+               {window}
+               GROUP BY operation, model
+               ORDER BY prompt_tokens + completion_tokens DESC, calls DESC""",
+            params,
+        ).fetchall()
+
+        return [
+            UsageBreakdown(
+                operation=row["operation"],
+                model=row["model"],
+                calls=row["calls"],
+                prompt_tokens=row["prompt_tokens"],
+                completion_tokens=row["completion_tokens"],
+                cached_tokens=row["cached_tokens"],
+                estimated_cost=estimate_cost(
+                    row["prompt_tokens"], row["completion_tokens"], row["cached_tokens"]
+                ),
+                cache_write_tokens=row["cache_write_tokens"],
+                cache_hits=row["cache_hits"],
+                cache_misses=row["cache_misses"],
+                parse_failures=row["parse_failures"],
+            )
+            for row in rows
+        ]
+    finally:
+        conn.close()
+
+
 def check_rate_limit() -> tuple[bool, str | None]:
     """Check if we're within rate limits.
 
@@ -187,36 +393,73 @@ def check_rate_limit() -> tuple[bool, str | None]:
     _ensure_api_usage_db()
     stats = get_usage_stats()
 
-    # Check daily limit first (more restrictive)
-    if stats.is_over_daily_limit:
+    # Check daily limits first (more restrictive)
+    if stats.daily_limit > 0 and stats.calls_last_day >= stats.daily_limit:
         return (
             False,
             f"Daily API limit reached ({stats.calls_last_day}/{stats.daily_limit} calls)",
         )
+    if stats.daily_token_limit > 0 and stats.tokens_last_day >= stats.daily_token_limit:
+        return (
+            False,
+            f"Daily API token budget reached "
+            f"({stats.tokens_last_day}/{stats.daily_token_limit} tokens)",
+        )
 
-    # Check hourly limit
-    if stats.is_over_hourly_limit:
+    # Check hourly limits
+    if stats.hourly_limit > 0 and stats.calls_last_hour >= stats.hourly_limit:
         return (
             False,
             f"Hourly API limit reached ({stats.calls_last_hour}/{stats.hourly_limit} calls)",
         )
+    if (
+        stats.hourly_token_limit > 0
+        and stats.tokens_last_hour >= stats.hourly_token_limit
+    ):
+        return (
+            False,
+            f"Hourly API token budget reached "
+            f"({stats.tokens_last_hour}/{stats.hourly_token_limit} tokens)",
+        )
 
     # Log warnings if approaching limits
-    if stats.is_near_daily_limit and not stats.is_over_daily_limit:
+    if stats.is_near_daily_limit:
         logger.warning(
             f"API usage at {stats.daily_usage_percent:.1f}% of daily limit "
-            f"({stats.calls_last_day}/{stats.daily_limit} calls)"
+            f"({stats.calls_last_day} calls, {stats.tokens_last_day} tokens)"
         )
 
-    if stats.is_near_hourly_limit and not stats.is_over_hourly_limit:
+    if stats.is_near_hourly_limit:
         logger.warning(
             f"API usage at {stats.hourly_usage_percent:.1f}% of hourly limit "
-            f"({stats.calls_last_hour}/{stats.hourly_limit} calls)"
+            f"({stats.calls_last_hour} calls, {stats.tokens_last_hour} tokens)"
         )
 
     return True, None
 
 
+def get_call_headroom() -> int | None:
+    """Return how many more calls fit within the call limits right now.
+
+    Returns:
+        Remaining calls before the tighter of the hourly/daily limits, or None
+        if neither call limit is enabled. Token budgets are still enforced per
+        call by track_api_call.
+    """
+    stats = get_usage_stats()
+    remaining = [
+        limit - used
+        for limit, used in (
+            (stats.hourly_limit, stats.calls_last_hour),
+            (stats.daily_limit, stats.calls_last_day),
+        )
+        if limit > 0
+    ]
+    if not remaining:
+        return None
+    return max(min(remaining), 0)
+
+
 class RateLimitError(Exception):
     """Raised when API rate limit is exceeded."""
 
@@ -232,12 +475,16 @@ def track_api_call(backend: str, operation: str, enforce_limit: bool = True):
         operation: Operation type ('classify', 'refine', 'ask')
         enforce_limit: If True, raise RateLimitError when limit exceeded
 
+    Yields:
+        ApiCallUsage for the backend to fill in with the model and token
+        counts from the provider response; it is stored with the call record.
+
     Raises:
         RateLimitError: If enforce_limit=True and rate limit exceeded
 
     Example:
-        with track_api_call('openai', 'classify'):
-            result = client.classify(...)
+        with track_api_call('openai', 'classify') as usage:
+            result = client.classify(..., usage=usage)
     """
     # Check rate limit before making the call
     if enforce_limit:
@@ -246,17 +493,18 @@ def track_api_call(backend: str, operation: str, enforce_limit: bool = True):
             logger.error(f"Rate limit exceeded: {reason}")
             raise RateLimitError(reason)
 
+    usage = ApiCallUsage(backend, operation)
     success = False
     error = None
     try:
-        yield
+        yield usage
         success = True
     except Exception as e:
         error = str(e)
         raise
     finally:
         # Record the call attempt
-        record_api_call(backend, operation, success, error)
+        record_api_call(backend, operation, success, error, usage)
 
 
 T = TypeVar("T")
@@ -0,0 +1,300 @@
+"""Date-sharded layout of the inbox archive.
+
+Processed inbox notes are archived under ``archive/YYYY/MM/``, with the
+month taken from the timestamp the inbox filename starts with
+(``2026-03-05_1412-ab12cd34.md`` goes to ``archive/2026/03/``). Notes
+without one fall back to the time they are archived. Keeping each
+directory to a month of notes keeps listings, git status and the browse
+API cheap however long the archive grows.
+
+Archives from before sharding keep their notes directly in ``archive/``;
+``python -m archive --migrate`` moves them into shards in a single commit.
+Lookups (find_archived) check the flat location too, so nothing breaks
+before the migration has run.
+
+With GARDENER_ARCHIVE_COLD_MONTHS set, shards older than that many months
+form a cold tier: each is packed into one zip bundle (``archive/2024/11.zip``
+replaces ``archive/2024/11/``), so git, the file watcher and directory scans
+see one file per month. The zip central directory indexes every note's
+offset, so single notes are read straight from the bundle (read_bundled)
+without unpacking it. Packing runs with reconcile or via
+``python -m archive --pack``.
+"""
+
+import logging
+import os
+import re
+import tempfile
+import zipfile
+from collections.abc import Iterator
+from datetime import datetime
+from pathlib import Path
+
+import config
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_SUFFIX = ".zip"
+
+_TIMESTAMP = re.compile(r"^(\d{4})-(\d{2})-\d{2}")
+_YEAR = re.compile(r"^\d{4}$")
+_MONTH = re.compile(r"^\d{2}$")
+
+
+def _name_shard(name: str) -> Path | None:
+    """Shard given by the timestamp ``name`` starts with, if it has one."""
+    match = _TIMESTAMP.match(name)
+    if match and 1 <= int(match.group(2)) <= 12:
+        return Path(match.group(1), match.group(2))
+    return None
+
+
+def archive_shard(name: str, fallback: datetime | None = None) -> Path:
+    """Shard (``YYYY/MM``) an archived note named ``name`` belongs in."""
+    shard = _name_shard(name)
+    if shard is not None:
+        return shard
+    when = fallback or datetime.now()
+    return Path(f"{when.year:04d}", f"{when.month:02d}")
+
+
+def find_archived(name: str, root: Path | None = None) -> Path | None:
+    """Locate an archived note by its inbox filename, sharded or flat.
+
+    A name without a timestamp was sharded by the month it was archived,
+    which the name does not record, so every shard is checked, newest first.
+    """
+    root = root or config.ARCHIVE_DIR
+    shard = _name_shard(name)
+    if shard is not None:
+        candidates = [root / shard / name, root / name]
+    else:
+        candidates = [root / name]
+        candidates += [directory / name for directory in reversed(_shards(root))]
+    for candidate in candidates:
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def read_archived(name: str, root: Path | None = None) -> str | None:
+    """Content of an archived note by its inbox filename, wherever it is kept."""
+    root = root or config.ARCHIVE_DIR
+    archived = find_archived(name, root)
+    if archived is not None:
+        return archived.read_text()
+    shard = _name_shard(name)
+    if shard is not None:
+        return read_bundled(shard / name, root)
+    for bundle in reversed(_shards(root, bundles=True)):
+        content = read_bundled(bundle.relative_to(root).with_suffix("") / name, root)
+        if content is not None:
+            return content
+    return None
+
+
+def bundle_path(shard: Path) -> Path:
+    """Bundle a shard directory is packed into (``2024/11`` -> ``2024/11.zip``)."""
+    return shard.with_name(shard.name + BUNDLE_SUFFIX)
+
+
+def _bundle_location(rel: Path | str, root: Path) -> tuple[Path, str | None] | None:
+    """Bundle and member name for an archive-relative path inside a bundle."""
+    parts = Path(rel).parts
+    if len(parts) not in (2, 3):
+        return None
+    if not (_YEAR.match(parts[0]) and _MONTH.match(parts[1])):
+        return None
+    bundle = root / parts[0] / f"{parts[1]}{BUNDLE_SUFFIX}"
+    if not bundle.is_file():
+        return None
+    return bundle, parts[2] if len(parts) == 3 else None
+
+
+def bundle_names(rel: Path | str, root: Path | None = None) -> list[str] | None:
+    """Notes in the packed shard ``rel`` (``YYYY/MM``), or None if not packed."""
+    location = _bundle_location(rel, root or config.ARCHIVE_DIR)
+    if location is None or location[1] is not None:
+        return None
+    with zipfile.ZipFile(location[0]) as bundle:
+        return bundle.namelist()
+
+
+def read_bundled(rel: Path | str, root: Path | None = None) -> str | None:
+    """Content of the note ``rel`` (``YYYY/MM/name``) in a packed shard."""
+    location = _bundle_location(rel, root or config.ARCHIVE_DIR)
+    if location is None or location[1] is None:
+        return None
+    with zipfile.ZipFile(location[0]) as bundle:
+        try:
+            return bundle.read(location[1]).decode("utf-8")
+        except KeyError:
+            return None
+
+
+def _shards(root: Path, bundles: bool = False) -> list[Path]:
+    """Shard directories (or, with ``bundles``, packed shards), oldest first."""
+    found = []
+    if not root.is_dir():
+        return found
+    for year in sorted(root.iterdir()):
+        if not (_YEAR.match(year.name) and year.is_dir()):
+            continue
+        for entry in sorted(year.iterdir()):
+            if bundles:
+                if entry.suffix == BUNDLE_SUFFIX and _MONTH.match(entry.stem):
+                    found.append(entry)
+            elif _MONTH.match(entry.name) and entry.is_dir():
+                found.append(entry)
+    return found
+
+
+def iter_bundled(root: Path | None = None) -> Iterator[tuple[str, str]]:
+    """Yield ``(archive-relative path, content)`` for every bundled note."""
+    root = root or config.ARCHIVE_DIR
+    for bundle in _shards(root, bundles=True):
+        shard = bundle.relative_to(root).with_suffix("")
+        with zipfile.ZipFile(bundle) as notes:
+            for name in notes.namelist():
+                yield str(shard / name), notes.read(name).decode("utf-8")
+
+
+def pack_shard(shard: Path) -> Path:
+    """Pack a shard directory into its bundle and remove the loose notes.
+
+    Notes already in an existing bundle for the month (archived late, after
+    the shard was packed) are kept; a loose note with the same name wins.
+    """
+    bundle = bundle_path(shard)
+    notes = sorted(shard.glob("*.md"))
+    loose = {note.name for note in notes}
+    fd, tmp_name = tempfile.mkstemp(
+        prefix=f".{bundle.name}.", suffix=".tmp", dir=shard.parent
+    )
+    try:
+        with os.fdopen(fd, "wb") as fh:
+            with zipfile.ZipFile(fh, "w", zipfile.ZIP_DEFLATED, compresslevel=9) as out:
+                if bundle.exists():
+                    with zipfile.ZipFile(bundle) as old:
+                        for info in old.infolist():
+                            if info.filename not in loose:
+                                out.writestr(info, old.read(info))
+                for note in notes:
+                    out.write(note, note.name)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp_name, bundle)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+    for note in notes:
+        note.unlink()
+    try:
+        shard.rmdir()
+    except OSError:
+        logger.warning(f"Left {shard} in place: it holds files other than notes")
+    return bundle
+
+
+def pack_cold_shards(
+    months: int | None = None,
+    now: datetime | None = None,
+    root: Path | None = None,
+) -> int:
+    """Pack shards older than ``months`` months into bundles in one commit.
+
+    ``months`` defaults to GARDENER_ARCHIVE_COLD_MONTHS; 0 disables packing.
+    Returns the number of shards packed.
+    """
+    from file_state import cleanup_stale_files
+    from workers.gardener import git_commit
+
+    months = config.GARDENER_ARCHIVE_COLD_MONTHS if months is None else months
+    if months <= 0:
+        return 0
+    root = root or config.ARCHIVE_DIR
+    now = now or datetime.now()
+    cutoff = now.year * 12 + now.month - 1 - months
+
+    packed = 0
+    for shard in _shards(root):
+        if int(shard.parent.name) * 12 + int(shard.name) - 1 < cutoff:
+            pack_shard(shard)
+            packed += 1
+
+    if packed:
+        git_commit(root, f"Gardener: Pack {packed} cold archive shard(s)")
+        cleanup_stale_files()
+        logger.info(f"Packed {packed} archive shard(s) into bundles")
+    return packed
+
+
+def _flat_notes(root: Path) -> list[Path]:
+    try:
+        with os.scandir(root) as entries:
+            return [
+                Path(e.path)
+                for e in entries
+                if e.name.endswith(".md") and e.is_file() and not e.name.startswith(".")
+            ]
+    except FileNotFoundError:
+        return []
+
+
+def migrate_flat_archive(root: Path | None = None) -> int:
+    """Move notes from the archive root into their shards.
+
+    All moves land in one git commit. Returns the number of notes moved.
+    """
+    from file_state import cleanup_stale_files
+    from workers.gardener import git_commit
+
+    root = root or config.ARCHIVE_DIR
+    moved = 0
+    for note in _flat_notes(root):
+        shard = root / archive_shard(
+            note.name, datetime.fromtimestamp(note.stat().st_mtime)
+        )
+        shard.mkdir(parents=True, exist_ok=True)
+        target = shard / note.name
+        if target.exists():
+            logger.warning(f"Not migrating {note.name}: {target} already exists")
+            continue
+        note.replace(target)
+        moved += 1
+
+    if moved:
+        git_commit(root, f"Gardener: Shard {moved} archived note(s) by month")
+        cleanup_stale_files()
+    logger.info(f"Moved {moved} archived note(s) into monthly shards")
+    return moved
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--migrate",
+        action="store_true",
+        help="Move notes from a flat archive into monthly shards",
+    )
+    parser.add_argument(
+        "--pack",
+        type=int,
+        metavar="MONTHS",
+        nargs="?",
+        const=-1,
+        help="Pack shards older than MONTHS (default: "
+        "GARDENER_ARCHIVE_COLD_MONTHS) into bundles",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.migrate:
+        migrate_flat_archive()
+    if args.pack is not None:
+        pack_cold_shards(None if args.pack < 0 else args.pack)
+    if not args.migrate and args.pack is None:
+        parser.print_help()
@@ -2,12 +2,16 @@
 
 import asyncio
 import logging
+import time
+from collections.abc import Callable
+from pathlib import Path
 
 from watchfiles import Change, awatch
 
 from config import (
     GARDENER_AUTO,
     GARDENER_DEBOUNCE,
+    GARDENER_DEBOUNCE_MAX_WAIT,
     GARDENER_MODE,
     GARDENER_POLL_INTERVAL,
     INBOX_DIR,
@@ -15,76 +19,127 @@ from config import (
 
 logger = logging.getLogger(__name__)
 
-# Track if processing is currently running to avoid overlapping runs
-_processing_lock = asyncio.Lock()
-
 
 async def _run_gardener() -> None:
-    """Run the gardener processor (called from async context)."""
-    from workers.gardener import process_inbox
+    """Queue the inbox for background processing by the scheduler.
 
-    async with _processing_lock:
-        logger.info("Running gardener processor...")
-        try:
-            # Run sync function in thread pool
-            loop = asyncio.get_event_loop()
-            results = await loop.run_in_executor(None, process_inbox)
+    Notes already queued (or captured interactively) are not queued twice,
+    so overlapping triggers are cheap.
+    """
+    from scheduler import get_scheduler
 
-            success = sum(1 for r in results if r.get("success"))
-            failed = sum(1 for r in results if not r.get("success"))
+    try:
+        get_scheduler().request_sweep()
+    except Exception as e:
+        logger.error(f"Could not schedule gardener run: {e}")
+
+
+class InboxBatcher:
+    """Coalesce watcher events into batches of changed inbox notes.
+
+    Each note appears once per batch however many events it produced. A
+    batch is released once no event has arrived for ``debounce`` seconds,
+    or ``max_wait`` seconds after its first event, whichever comes first,
+    so a steady stream of captures cannot postpone processing forever.
+    """
+
+    def __init__(
+        self,
+        debounce: float = GARDENER_DEBOUNCE,
+        max_wait: float = GARDENER_DEBOUNCE_MAX_WAIT,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.debounce = debounce
+        self.max_wait = max(max_wait, debounce)
+        self._clock = clock
+        self._pending: dict[str, float] = {}  # filename -> first seen
+        self._first_event = 0.0
+        self._last_event = 0.0
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def add(self, filename: str) -> None:
+        """Record a change to ``filename``."""
+        now = self._clock()
+        if not self._pending:
+            self._first_event = now
+        self._pending.setdefault(filename, now)
+        self._last_event = now
+
+    def discard(self, filename: str) -> None:
+        """Forget a note that left the inbox before the batch was released."""
+        self._pending.pop(filename, None)
+
+    def deadline(self) -> float | None:
+        """Clock time at which the batch is due, or None if it is empty."""
+        if not self._pending:
+            return None
+        return min(self._last_event + self.debounce, self._first_event + self.max_wait)
+
+    def take(self) -> list[str]:
+        """Release the batch, oldest change first."""
+        batch = sorted(self._pending, key=self._pending.__getitem__)
+        self._pending.clear()
+        return batch
+
+
+def _enqueue_changed(filenames: list[str]) -> None:
+    """Queue exactly the notes the watcher saw change."""
+    from scheduler import get_scheduler
 
-            if results:
-                logger.info(f"Gardener completed: {success} processed, {failed} failed")
-            else:
-                logger.debug("Gardener: inbox empty")
-        except Exception as e:
-            logger.error(f"Gardener processing failed: {e}")
+    try:
+        get_scheduler().enqueue_notes(filenames)
+    except Exception as e:
+        logger.error(f"Could not schedule gardener run: {e}")
 
 
 async def watch_inbox() -> None:
-    """Watch inbox directory for changes and trigger processing."""
-    logger.info(f"Starting inbox watcher (debounce: {GARDENER_DEBOUNCE}s)")
+    """Watch inbox directory and queue the notes that changed."""
+    logger.info(
+        f"Starting inbox watcher (debounce: {GARDENER_DEBOUNCE}s, "
+        f"max wait: {GARDENER_DEBOUNCE_MAX_WAIT}s)"
+    )
 
     # Ensure inbox exists
     INBOX_DIR.mkdir(parents=True, exist_ok=True)
 
-    pending_process: asyncio.Task | None = None
-
-    async def debounced_process():
-        """Wait for debounce period then process."""
-        await asyncio.sleep(GARDENER_DEBOUNCE)
-        await _run_gardener()
+    batcher = InboxBatcher()
+    changed = asyncio.Event()
 
+    async def flush_batches():
+        """Release each batch when it falls due."""
+        while True:
+            await changed.wait()
+            changed.clear()
+            while (deadline := batcher.deadline()) is not None:
+                delay = deadline - time.monotonic()
+                if delay > 0:
+                    # New events may move the deadline; check again on wake
+                    await asyncio.sleep(delay)
+                    continue
+                batch = batcher.take()
+                logger.debug(f"Queueing {len(batch)} changed note(s): {batch}")
+                _enqueue_changed(batch)
+
+    flusher = asyncio.create_task(flush_batches())
     try:
         async for changes in awatch(INBOX_DIR, recursive=False):
-            # Filter for markdown file additions
-            md_changes = [
-                (change, path)
-                for change, path in changes
-                if path.endswith(".md") and change in (Change.added, Change.modified)
-            ]
-
-            if not md_changes:
-                continue
-
-            logger.debug(f"Detected changes: {md_changes}")
-
-            # Cancel pending process and restart debounce timer
-            if pending_process and not pending_process.done():
-                pending_process.cancel()
-                try:
-                    await pending_process
-                except asyncio.CancelledError:
-                    pass
-
-            # Start new debounced process
-            pending_process = asyncio.create_task(debounced_process())
-
+            for change, path in changes:
+                if not path.endswith(".md"):
+                    continue
+                filename = Path(path).name
+                if change == Change.deleted:
+                    batcher.discard(filename)
+                else:
+                    batcher.add(filename)
+            if batcher.deadline() is not None:
+                changed.set()
     except asyncio.CancelledError:
         logger.info("Inbox watcher stopped")
-        if pending_process and not pending_process.done():
-            pending_process.cancel()
         raise
+    finally:
+        flusher.cancel()
 
 
 async def poll_inbox() -> None:
@@ -127,4 +182,7 @@ def get_automation_status() -> dict:
         "mode": GARDENER_MODE if GARDENER_AUTO else None,
         "poll_interval": GARDENER_POLL_INTERVAL if GARDENER_MODE == "poll" else None,
         "debounce": GARDENER_DEBOUNCE if GARDENER_MODE == "watch" else None,
+        "debounce_max_wait": GARDENER_DEBOUNCE_MAX_WAIT
+        if GARDENER_MODE == "watch"
+        else None,
     }
@@ -2,11 +2,33 @@
 
 import logging
 import os
+from dataclasses import replace
 from typing import Literal
-
-from .anthropic import AnthropicBackend
-from .base import BackendConfig, GardenerAction, GardenerBackend
-from .openai import OpenAIBackend
+from urllib.parse import urlparse
+
+from .anthropic import AnthropicBackend, AsyncAnthropicBackend
+from .base import (
+    AsyncGardenerBackend,
+    BackendConfig,
+    GardenerAction,
+    GardenerBackend,
+)
+from .openai import AsyncOpenAIBackend, OpenAIBackend
+from .registry import (
+    BackendRegistry,
+    close_backend_registry,
+    get_backend_registry,
+    get_shared_async_backend,
+    get_shared_backend,
+    init_backend_registry,
+)
+from .router import (
+    AsyncRoutingBackend,
+    RoutingBackend,
+    RoutingPolicy,
+    get_routing_status,
+)
+from .transport import CircuitOpenError, get_transport_status
 
 logger = logging.getLogger(__name__)
 
@@ -30,6 +52,18 @@ def get_backend_config() -> tuple[BackendType, BackendConfig]:
         AI_MODEL: Legacy fallback for both models if *_THINKING is unset
         AI_BASE_URL: Base URL for API (OpenAI backend only)
         AI_TIMEOUT: Request timeout in seconds. Default: 120
+        AI_MAX_CONNECTIONS: Pooled connections per client. Default: 20
+        AI_KEEPALIVE_EXPIRY: Seconds an idle pooled connection is kept. Default: 60
+        AI_HTTP2: Use HTTP/2 when the h2 package is installed. Default: true
+        AI_RETRY_ATTEMPTS: Tries per request on transient errors. Default: 3
+        AI_RETRY_BASE_DELAY: First backoff delay in seconds. Default: 0.5
+        AI_RETRY_MAX_DELAY: Longest backoff / Retry-After honored. Default: 30
+        AI_CIRCUIT_FAILURES: Failures in a row that pause requests (0 = off). Default: 5
+        AI_CIRCUIT_RESET: Seconds before a paused provider is tried again. Default: 30
+        AI_HEDGE_DELAY: Seconds before ask/refine send a backup request (0 = off). Default: 0
+        AI_STRUCTURED_OUTPUT: Constrain classification output to the action
+            schema (JSON schema / tool use). Default: true, except for the
+            openai backend with an AI_BASE_URL other than api.openai.com
     """
     backend_type: BackendType = os.environ.get("GARDENER_BACKEND", "openai")  # type: ignore
 
@@ -52,6 +86,25 @@ def get_backend_config() -> tuple[BackendType, BackendConfig]:
     model_fast = os.environ.get("AI_MODEL_FAST", model_thinking)
     base_url = os.environ.get("AI_BASE_URL")
     timeout = float(os.environ.get("AI_TIMEOUT", "120"))
+    max_connections = int(os.environ.get("AI_MAX_CONNECTIONS", "20"))
+    keepalive_expiry = float(os.environ.get("AI_KEEPALIVE_EXPIRY", "60"))
+    http2 = os.environ.get("AI_HTTP2", "true").lower() in ("true", "1", "yes")
+    retry_attempts = int(os.environ.get("AI_RETRY_ATTEMPTS", "3"))
+    retry_base_delay = float(os.environ.get("AI_RETRY_BASE_DELAY", "0.5"))
+    retry_max_delay = float(os.environ.get("AI_RETRY_MAX_DELAY", "30"))
+    circuit_failure_threshold = int(os.environ.get("AI_CIRCUIT_FAILURES", "5"))
+    circuit_reset_timeout = float(os.environ.get("AI_CIRCUIT_RESET", "30"))
+    hedge_delay = float(os.environ.get("AI_HEDGE_DELAY", "0"))
+    # OpenAI-compatible servers (Ollama, LiteLLM, ...) often reject a
+    # json_schema response_format with a 400, so only opt them in explicitly
+    structured_default = (
+        backend_type != "openai"
+        or not base_url
+        or urlparse(base_url).hostname == "api.openai.com"
+    )
+    structured_output = os.environ.get(
+        "AI_STRUCTURED_OUTPUT", "true" if structured_default else "false"
+    ).lower() in ("true", "1", "yes")
 
     config = BackendConfig(
         api_key=api_key,
@@ -59,15 +112,83 @@ def get_backend_config() -> tuple[BackendType, BackendConfig]:
         model_fast=model_fast,
         base_url=base_url,
         timeout=timeout,
+        max_connections=max_connections,
+        keepalive_expiry=keepalive_expiry,
+        http2=http2,
+        retry_attempts=retry_attempts,
+        retry_base_delay=retry_base_delay,
+        retry_max_delay=retry_max_delay,
+        circuit_failure_threshold=circuit_failure_threshold,
+        circuit_reset_timeout=circuit_reset_timeout,
+        hedge_delay=hedge_delay,
+        structured_output=structured_output,
     )
 
     return backend_type, config
 
 
+def get_fallback_backend_config() -> tuple[BackendType, BackendConfig] | None:
+    """Load the optional fallback backend from environment variables.
+
+    Environment variables:
+        AI_FALLBACK_BACKEND: Backend type used when the primary is failing or
+            slow (openai, anthropic). Unset disables failover.
+        AI_FALLBACK_API_KEY: API key (falls back to OPENAI_API_KEY or
+            ANTHROPIC_API_KEY for the fallback's provider)
+        AI_FALLBACK_MODEL_THINKING / AI_FALLBACK_MODEL_FAST: Models (defaults
+            vary by backend)
+        AI_FALLBACK_BASE_URL: Base URL (OpenAI backend only)
+
+    Timeouts, pooling and retry settings are shared with the primary.
+    """
+    backend_type = os.environ.get("AI_FALLBACK_BACKEND", "").lower()
+    if not backend_type:
+        return None
+    if backend_type not in ("openai", "anthropic"):
+        logger.warning(f"Unknown fallback backend '{backend_type}', ignoring it")
+        return None
+
+    _, primary = get_backend_config()
+    api_key = os.environ.get("AI_FALLBACK_API_KEY") or os.environ.get(
+        "ANTHROPIC_API_KEY" if backend_type == "anthropic" else "OPENAI_API_KEY", ""
+    )
+    model_thinking = os.environ.get(
+        "AI_FALLBACK_MODEL_THINKING", DEFAULT_MODELS[backend_type]
+    )
+    config = replace(
+        primary,
+        api_key=api_key,
+        model_thinking=model_thinking,
+        model_fast=os.environ.get("AI_FALLBACK_MODEL_FAST", model_thinking),
+        base_url=os.environ.get("AI_FALLBACK_BASE_URL"),
+    )
+    return backend_type, config  # type: ignore[return-value]
+
+
+def get_routing_policy() -> RoutingPolicy:
+    """Load model routing thresholds from environment variables.
+
+    Environment variables:
+        AI_ROUTING: Send simple notes and questions to the fast model. Default: false
+        AI_ROUTE_FAST_MAX_CHARS: Longest text counted as simple. Default: 600
+        AI_LATENCY_SLO: EWMA seconds above which a model is failed over. Default: 20
+        AI_ROUTE_MAX_ERROR_RATE: EWMA error rate that triggers failover. Default: 0.5
+    """
+    return RoutingPolicy(
+        difficulty_routing=os.environ.get("AI_ROUTING", "false").lower()
+        in ("true", "1", "yes"),
+        fast_max_chars=int(os.environ.get("AI_ROUTE_FAST_MAX_CHARS", "600")),
+        latency_slo=float(os.environ.get("AI_LATENCY_SLO", "20")),
+        max_error_rate=float(os.environ.get("AI_ROUTE_MAX_ERROR_RATE", "0.5")),
+    )
+
+
 def get_backend() -> GardenerBackend:
     """Get a configured gardener backend instance.
 
-    Returns the appropriate backend based on GARDENER_BACKEND env var.
+    Returns the appropriate backend based on GARDENER_BACKEND env var. The
+    caller owns the instance and must close it; long-running code should use
+    get_shared_backend() instead so connections are pooled.
     """
     backend_type, config = get_backend_config()
 
@@ -79,12 +200,45 @@ def get_backend() -> GardenerBackend:
         return OpenAIBackend(config)
 
 
+def get_async_backend() -> AsyncGardenerBackend:
+    """Get a configured asyncio gardener backend instance.
+
+    Uses the same GARDENER_BACKEND/AI_* configuration as get_backend().
+    """
+    backend_type, config = get_backend_config()
+
+    if backend_type == "anthropic":
+        logger.info(f"Using async Anthropic backend with model {config.model_thinking}")
+        return AsyncAnthropicBackend(config)
+    else:
+        logger.info(f"Using async OpenAI backend with model {config.model_thinking}")
+        return AsyncOpenAIBackend(config)
+
+
 __all__ = [
+    "AsyncGardenerBackend",
     "BackendConfig",
     "GardenerBackend",
     "GardenerAction",
     "OpenAIBackend",
     "AnthropicBackend",
+    "AsyncOpenAIBackend",
+    "AsyncAnthropicBackend",
+    "AsyncRoutingBackend",
+    "BackendRegistry",
+    "CircuitOpenError",
+    "close_backend_registry",
+    "get_async_backend",
     "get_backend",
     "get_backend_config",
+    "get_backend_registry",
+    "get_fallback_backend_config",
+    "get_routing_policy",
+    "get_routing_status",
+    "get_shared_async_backend",
+    "get_shared_backend",
+    "get_transport_status",
+    "init_backend_registry",
+    "RoutingBackend",
+    "RoutingPolicy",
 ]
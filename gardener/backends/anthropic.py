@@ -2,23 +2,39 @@
 
 Uses the Anthropic SDK directly for:
 - Native Claude features
-- Prompt caching support
+- Prompt caching support (system prompt + context files are cached across notes)
 - Better error handling
 """
 
+import json
 import logging
+from collections.abc import AsyncIterator, Sequence
+from functools import lru_cache
 
 import anthropic
 
-from api_usage import track_api_call
+from api_usage import ApiCallUsage, record_api_call, track_api_call
 
 from .base import (
+    BATCH_JOB_ENDED,
+    BATCH_JOB_PENDING,
+    BATCH_MAX_OUTPUT_TOKENS,
+    GARDENER_ACTION_SCHEMA,
+    GARDENER_BATCH_SCHEMA,
+    AsyncGardenerBackend,
     BackendConfig,
+    BatchJobResult,
     GardenerAction,
     GardenerBackend,
     ParseError,
+    build_batch_classify_message,
+    build_classify_context,
+    build_classify_message,
+    format_related_context,
     parse_gardener_action,
+    parse_gardener_actions,
 )
+from .transport import Transport
 
 logger = logging.getLogger(__name__)
 
@@ -63,6 +79,95 @@ Provide a concise answer based on the related context. If the notes don't contai
 """
 
 
+@lru_cache(maxsize=8)
+def _classify_system(context: str) -> list[dict]:
+    """System blocks for classification with a cache breakpoint.
+
+    The breakpoint sits on the last static block, so the system prompt and
+    context files are written to the prompt cache on the first note and read
+    from it for every following note until the context changes. Memoized per
+    context; callers must not mutate the returned blocks.
+    """
+    blocks = [{"type": "text", "text": SYSTEM_PROMPT}]
+    if context:
+        blocks.append({"type": "text", "text": build_classify_context(context)})
+    blocks[-1]["cache_control"] = {"type": "ephemeral"}
+    return blocks
+
+
+def _message_params(
+    user_message: str,
+    system: str | list[dict] | None,
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    tool: dict | None = None,
+) -> dict:
+    """Build Messages API parameters.
+
+    With ``tool``, Claude is required to answer by calling it, so the reply
+    is the tool input (validated against its schema) rather than free text.
+    """
+    params = {
+        "model": model,
+        "max_tokens": max_tokens,
+        "system": system or "",
+        "messages": [{"role": "user", "content": user_message}],
+        "temperature": temperature,
+    }
+    if tool:
+        params["tools"] = [tool]
+        params["tool_choice"] = {"type": "tool", "name": tool["name"]}
+    return params
+
+
+def _action_tool(config: BackendConfig, name: str, schema: dict) -> dict | None:
+    """Tool whose input schema is the classification schema.
+
+    None when structured output is disabled (AI_STRUCTURED_OUTPUT=false).
+    """
+    if not config.structured_output:
+        return None
+    return {
+        "name": name,
+        "description": "Record where the note belongs and the content to write.",
+        "input_schema": schema,
+    }
+
+
+def _response_text(message) -> str:
+    """Text of a Messages API reply; a tool call is returned as its JSON input."""
+    for block in message.content:
+        if getattr(block, "type", None) == "tool_use":
+            return json.dumps(block.input)
+    return message.content[0].text
+
+
+def record_anthropic_usage(usage: ApiCallUsage, response, model: str) -> None:
+    """Copy token counts from a Messages API response into ``usage``.
+
+    Anthropic reports uncached input separately from cache reads and writes;
+    ``prompt_tokens`` is recorded as their sum so it matches OpenAI semantics.
+    """
+    counts = getattr(response, "usage", None)
+    input_tokens = getattr(counts, "input_tokens", 0)
+    cache_read = getattr(counts, "cache_read_input_tokens", 0)
+    cache_write = getattr(counts, "cache_creation_input_tokens", 0)
+    prompt_tokens = sum(
+        value
+        for value in (input_tokens, cache_read, cache_write)
+        if isinstance(value, int) and not isinstance(value, bool)
+    )
+    response_model = getattr(response, "model", None)
+    usage.add(
+        model=response_model if isinstance(response_model, str) else model,
+        prompt_tokens=prompt_tokens,
+        completion_tokens=getattr(counts, "output_tokens", 0),
+        cached_tokens=cache_read,
+        cache_write_tokens=cache_write,
+    )
+
+
 class AnthropicBackend(GardenerBackend):
     """Native Anthropic Claude backend."""
 
@@ -71,34 +176,51 @@ class AnthropicBackend(GardenerBackend):
         self._client = anthropic.Anthropic(
             api_key=config.api_key,
             timeout=config.timeout,
+            # Retries are handled by the transport (backoff + circuit breaker)
+            max_retries=0,
+            http_client=anthropic.DefaultHttpxClient(**config.httpx_options()),
         )
+        self._transport = Transport.from_config(self.name, config)
 
     @property
     def name(self) -> str:
         return "anthropic"
 
+    @property
+    def supports_batch_prompt(self) -> bool:
+        return True
+
+    @property
+    def has_batch_api(self) -> bool:
+        return True
+
     def _chat(
         self,
         user_message: str,
-        system: str | None = None,
+        system: str | list[dict] | None = None,
         model: str | None = None,
         max_tokens: int = 4096,
         temperature: float = 0.7,
+        usage: ApiCallUsage | None = None,
+        tool: dict | None = None,
     ) -> str:
-        """Send a message to Claude."""
+        """Send a message to Claude.
+
+        If ``usage`` is given, the model and token counts reported in the
+        response are added to it.
+        """
         if not self.config.api_key:
             raise ValueError("ANTHROPIC_API_KEY not configured")
 
         model_name = model or self.config.model_thinking
-        response = self._client.messages.create(
-            model=model_name,
-            max_tokens=max_tokens,
-            system=system or "",
-            messages=[{"role": "user", "content": user_message}],
-            temperature=temperature,
+        params = _message_params(
+            user_message, system, model_name, max_tokens, temperature, tool
         )
+        response = self._transport.call(lambda: self._client.messages.create(**params))
+        if usage is not None:
+            record_anthropic_usage(usage, response, model_name)
 
-        return response.content[0].text
+        return _response_text(response)
 
     def classify(
         self,
@@ -106,6 +228,8 @@ class AnthropicBackend(GardenerBackend):
         filename: str,
         context: str,
         max_retries: int = 2,
+        fast: bool = False,
+        suggestion: str | None = None,
     ) -> GardenerAction:
         """Classify a note using Claude.
 
@@ -114,6 +238,8 @@ class AnthropicBackend(GardenerBackend):
             filename: Original filename for context
             context: AGENTS.md + GARDENER.md content
             max_retries: Number of retries on parse errors (default 2)
+            fast: Use the fast model (for notes the pre-classifier placed)
+            suggestion: Destination predicted by the pre-classifier
 
         Returns:
             GardenerAction with classification result
@@ -121,95 +247,377 @@ class AnthropicBackend(GardenerBackend):
         Raises:
             ParseError: If classification fails after all retries
         """
-        user_message = f"""Please classify and process this note.
+        system = _classify_system(context)
+        user_message = build_classify_message(
+            note_content, filename, suggestion=suggestion
+        )
+        model = self.config.model_fast if fast else self.config.model_thinking
+        tool = _action_tool(self.config, "gardener_action", GARDENER_ACTION_SCHEMA)
 
-## Context Files
-{context}
+        last_error = None
+        for attempt in range(max_retries + 1):
+            with track_api_call(
+                self.name, "classify_fast" if fast else "classify"
+            ) as usage:
+                response_text = self._chat(
+                    user_message=user_message,
+                    system=system,
+                    model=model,
+                    temperature=0.3,
+                    usage=usage,
+                    tool=tool,
+                )
+                try:
+                    return parse_gardener_action(response_text)
+                except ParseError as e:
+                    usage.parse_error = True
+                    last_error = e
+            if attempt < max_retries:
+                logger.info(
+                    f"Parse error on attempt {attempt + 1}/{max_retries + 1} "
+                    f"for {filename}, retrying..."
+                )
+                # Add hint to the message for retry
+                user_message = build_classify_message(
+                    note_content,
+                    filename,
+                    previous_error=last_error,
+                    suggestion=suggestion,
+                )
 
-## Note to Process
-**Filename:** {filename}
-**Content:**
-{note_content}
+        # All retries exhausted
+        logger.error(
+            f"Classification failed for {filename} after {max_retries + 1} attempts"
+        )
+        raise last_error
 
-Respond with a JSON object specifying the action, path, and formatted content."""
+    def _classify_batch_request(
+        self, notes: Sequence[tuple[str, str]], context: str
+    ) -> list[GardenerAction | None]:
+        """Classify several notes in one request sharing the cached prefix."""
+        message = build_batch_classify_message(notes)
+        with track_api_call(self.name, "classify_batch") as usage:
+            response_text = self._chat(
+                user_message=message,
+                system=_classify_system(context),
+                model=self.config.model_thinking,
+                max_tokens=BATCH_MAX_OUTPUT_TOKENS,
+                temperature=0.3,
+                usage=usage,
+                tool=_action_tool(
+                    self.config, "gardener_actions", GARDENER_BATCH_SCHEMA
+                ),
+            )
+            actions = parse_gardener_actions(response_text, len(notes))
+            usage.parse_error = None in actions
+        return actions
 
-        last_error = None
-        for attempt in range(max_retries + 1):
-            try:
-                with track_api_call(self.name, "classify"):
-                    response_text = self._chat(
-                        user_message=user_message,
-                        system=SYSTEM_PROMPT,
-                        model=self.config.model_thinking,
-                        temperature=0.3,
-                    )
+    def submit_batch_job(
+        self, notes: Sequence[tuple[str, str, str]], context: str
+    ) -> str:
+        """Create a Message Batches job with one classify request per note."""
+        if not self.config.api_key:
+            raise ValueError("ANTHROPIC_API_KEY not configured")
 
-                return parse_gardener_action(response_text)
+        system = _classify_system(context)
+        tool = _action_tool(self.config, "gardener_action", GARDENER_ACTION_SCHEMA)
+        requests = [
+            {
+                "custom_id": custom_id,
+                "params": _message_params(
+                    build_classify_message(note_content, filename),
+                    system,
+                    self.config.model_thinking,
+                    4096,
+                    0.3,
+                    tool,
+                ),
+            }
+            for custom_id, note_content, filename in notes
+        ]
+        with track_api_call(self.name, "batch_submit"):
+            batch = self._client.messages.batches.create(requests=requests)
+        return batch.id
+
+    def get_batch_job_status(self, batch_id: str) -> str:
+        """Map the batch processing status onto pending/ended."""
+        batch = self._transport.call(
+            lambda: self._client.messages.batches.retrieve(batch_id)
+        )
+        if batch.processing_status == "ended":
+            return BATCH_JOB_ENDED
+        return BATCH_JOB_PENDING
+
+    def get_batch_job_results(self, batch_id: str) -> list[BatchJobResult]:
+        """Stream results of an ended batch; usage is recorded as one call."""
+        results: list[BatchJobResult] = []
+        with track_api_call(self.name, "batch_results", enforce_limit=False) as usage:
+            for entry in self._client.messages.batches.results(batch_id):
+                result = entry.result
+                if result.type != "succeeded":
+                    error = getattr(result, "error", None) or result.type
+                    results.append(BatchJobResult(entry.custom_id, error=str(error)))
+                    continue
+                record_anthropic_usage(
+                    usage, result.message, self.config.model_thinking
+                )
+                results.append(
+                    BatchJobResult(entry.custom_id, text=_response_text(result.message))
+                )
+        return results
 
-            except ParseError as e:
-                last_error = e
-                if attempt < max_retries:
-                    logger.info(
-                        f"Parse error on attempt {attempt + 1}/{max_retries + 1} "
-                        f"for {filename}, retrying..."
-                    )
-                    # Add hint to the message for retry
-                    user_message = f"""Your previous response could not be parsed as valid JSON.
-Error: {e}
+    def refine(self, content: str, related_context: str) -> str:
+        """Get refinement suggestions."""
+        prompt = REFINE_PROMPT.format(
+            content=content,
+            related_context=format_related_context(related_context),
+        )
 
-Please try again with a properly formatted JSON response.
+        with track_api_call(self.name, "refine") as usage:
+            return self._chat(
+                user_message=prompt,
+                model=self.config.model_fast,
+                max_tokens=1024,
+                temperature=0.7,
+                usage=usage,
+            )
 
-## Context Files
-{context}
+    def ask(self, question: str, related_context: str, fast: bool = False) -> str:
+        """Answer a question using the knowledge base."""
+        prompt = ASK_PROMPT.format(
+            question=question,
+            related_context=format_related_context(related_context),
+        )
 
-## Note to Process
-**Filename:** {filename}
-**Content:**
-{note_content}
+        with track_api_call(self.name, "ask") as usage:
+            return self._chat(
+                user_message=prompt,
+                model=self.config.model_fast if fast else self.config.model_thinking,
+                max_tokens=1024,
+                temperature=0.4,
+                usage=usage,
+            )
 
-Respond with ONLY a valid JSON object (no markdown, no explanation):
-{{"action": "create|append|task", "path": "...", "content": "...", "reasoning": "..."}}"""
+    def close(self):
+        """Close the Anthropic client."""
+        self._client.close()
+
+
+class AsyncAnthropicBackend(AsyncGardenerBackend):
+    """Native Anthropic Claude backend using anthropic.AsyncAnthropic."""
+
+    def __init__(self, config: BackendConfig):
+        super().__init__(config)
+        self._client = anthropic.AsyncAnthropic(
+            api_key=config.api_key,
+            timeout=config.timeout,
+            # Retries are handled by the transport (backoff + circuit breaker)
+            max_retries=0,
+            http_client=anthropic.DefaultAsyncHttpxClient(**config.httpx_options()),
+        )
+        self._transport = Transport.from_config(self.name, config)
+
+    @property
+    def name(self) -> str:
+        return "anthropic"
+
+    async def _chat(
+        self,
+        user_message: str,
+        system: str | list[dict] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        usage: ApiCallUsage | None = None,
+        hedge: bool = False,
+        tool: dict | None = None,
+    ) -> str:
+        """Send a message to Claude.
+
+        With ``hedge``, a slow request is raced against a second one (see
+        Transport.ahedged).
+        """
+        if not self.config.api_key:
+            raise ValueError("ANTHROPIC_API_KEY not configured")
+
+        model_name = model or self.config.model_thinking
+        params = _message_params(
+            user_message, system, model_name, max_tokens, temperature, tool
+        )
+
+        def send():
+            return self._client.messages.create(**params)
+
+        def record_loser(response) -> None:
+            # The losing hedge is a separate, billed request
+            extra = ApiCallUsage(usage.backend, usage.operation)
+            record_anthropic_usage(extra, response, model_name)
+            record_api_call(extra.backend, extra.operation, usage=extra)
+
+        if hedge:
+            response = await self._transport.ahedged(
+                send, record_loser if usage is not None else None
+            )
+        else:
+            response = await self._transport.acall(send)
+        if usage is not None:
+            record_anthropic_usage(usage, response, model_name)
+
+        return _response_text(response)
+
+    async def _chat_stream(
+        self,
+        user_message: str,
+        system: str | list[dict] | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        usage: ApiCallUsage | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream a message from Claude, yielding text as it arrives."""
+        if not self.config.api_key:
+            raise ValueError("ANTHROPIC_API_KEY not configured")
+
+        model_name = model or self.config.model_thinking
+        # A stream is not retried once started, but it still respects and
+        # feeds the circuit breaker.
+        breaker = self._transport.breaker
+        breaker.before_call()
+        try:
+            async with self._client.messages.stream(
+                **_message_params(
+                    user_message, system, model_name, max_tokens, temperature
+                )
+            ) as stream:
+                async for text in stream.text_stream:
+                    yield text
+                if usage is not None:
+                    record_anthropic_usage(
+                        usage, await stream.get_final_message(), model_name
+                    )
+        except Exception as e:
+            breaker.record_outcome(e)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+
+    async def classify(
+        self,
+        note_content: str,
+        filename: str,
+        context: str,
+        max_retries: int = 2,
+    ) -> GardenerAction:
+        """Classify a note using Claude."""
+        system = _classify_system(context)
+        user_message = build_classify_message(note_content, filename)
+
+        tool = _action_tool(self.config, "gardener_action", GARDENER_ACTION_SCHEMA)
+
+        last_error = None
+        for attempt in range(max_retries + 1):
+            with track_api_call(self.name, "classify") as usage:
+                response_text = await self._chat(
+                    user_message=user_message,
+                    system=system,
+                    model=self.config.model_thinking,
+                    temperature=0.3,
+                    usage=usage,
+                    tool=tool,
+                )
+                try:
+                    return parse_gardener_action(response_text)
+                except ParseError as e:
+                    usage.parse_error = True
+                    last_error = e
+            if attempt < max_retries:
+                logger.info(
+                    f"Parse error on attempt {attempt + 1}/{max_retries + 1} "
+                    f"for {filename}, retrying..."
+                )
+                user_message = build_classify_message(
+                    note_content, filename, previous_error=last_error
+                )
 
-        # All retries exhausted
         logger.error(
             f"Classification failed for {filename} after {max_retries + 1} attempts"
         )
         raise last_error
 
-    def refine(self, content: str, related_context: str) -> str:
+    async def refine(self, content: str, related_context: str) -> str:
         """Get refinement suggestions."""
         prompt = REFINE_PROMPT.format(
             content=content,
-            related_context=f"\n\nRelated files in knowledge base:\n{related_context}"
-            if related_context
-            else "",
+            related_context=format_related_context(related_context),
         )
 
-        with track_api_call(self.name, "refine"):
-            return self._chat(
+        with track_api_call(self.name, "refine") as usage:
+            return await self._chat(
                 user_message=prompt,
                 model=self.config.model_fast,
                 max_tokens=1024,
                 temperature=0.7,
+                usage=usage,
+                hedge=True,
             )
 
-    def ask(self, question: str, related_context: str) -> str:
+    async def ask(self, question: str, related_context: str, fast: bool = False) -> str:
         """Answer a question using the knowledge base."""
         prompt = ASK_PROMPT.format(
             question=question,
-            related_context=f"\n\nRelated files in knowledge base:\n{related_context}"
-            if related_context
-            else "",
+            related_context=format_related_context(related_context),
         )
 
-        with track_api_call(self.name, "ask"):
-            return self._chat(
+        with track_api_call(self.name, "ask") as usage:
+            return await self._chat(
                 user_message=prompt,
-                model=self.config.model_thinking,
+                model=self.config.model_fast if fast else self.config.model_thinking,
                 max_tokens=1024,
                 temperature=0.4,
+                usage=usage,
+                hedge=True,
             )
 
-    def close(self):
+    async def refine_stream(
+        self, content: str, related_context: str
+    ) -> AsyncIterator[str]:
+        """Stream refinement suggestions."""
+        prompt = REFINE_PROMPT.format(
+            content=content,
+            related_context=format_related_context(related_context),
+        )
+
+        with track_api_call(self.name, "refine") as usage:
+            async for text in self._chat_stream(
+                user_message=prompt,
+                model=self.config.model_fast,
+                max_tokens=1024,
+                temperature=0.7,
+                usage=usage,
+            ):
+                yield text
+
+    async def ask_stream(
+        self, question: str, related_context: str, fast: bool = False
+    ) -> AsyncIterator[str]:
+        """Stream an answer to a question."""
+        prompt = ASK_PROMPT.format(
+            question=question,
+            related_context=format_related_context(related_context),
+        )
+
+        with track_api_call(self.name, "ask") as usage:
+            async for text in self._chat_stream(
+                user_message=prompt,
+                model=self.config.model_fast if fast else self.config.model_thinking,
+                max_tokens=1024,
+                temperature=0.4,
+                usage=usage,
+            ):
+                yield text
+
+    async def aclose(self):
         """Close the Anthropic client."""
-        self._client.close()
+        await self._client.close()
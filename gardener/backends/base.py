@@ -1,16 +1,22 @@
 """Abstract base class for gardener AI backends."""
 
+import importlib.util
 import json
 import logging
 import re
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Sequence
 from dataclasses import dataclass
 from typing import Literal
 
+import httpx
 from pydantic import BaseModel, ValidationError
 
 logger = logging.getLogger(__name__)
 
+# Output budget for a batch classification (every note's content comes back)
+BATCH_MAX_OUTPUT_TOKENS = 8192
+
 
 class GardenerAction(BaseModel):
     """Response model for gardener classification."""
@@ -21,6 +27,50 @@ class GardenerAction(BaseModel):
     reasoning: str
 
 
+# GardenerAction as a JSON schema, for providers that can constrain output
+# to a schema (OpenAI response_format, Anthropic tool input)
+GARDENER_ACTION_SCHEMA: dict = {
+    "type": "object",
+    "properties": {
+        "action": {"type": "string", "enum": ["create", "append", "task"]},
+        "path": {
+            "type": "string",
+            "description": "Relative path from /atlas, e.g. 'projects/my-project.md'",
+        },
+        "content": {
+            "type": "string",
+            "description": "The formatted markdown content to write",
+        },
+        "reasoning": {
+            "type": "string",
+            "description": "Brief explanation of the decision",
+        },
+    },
+    "required": ["action", "path", "content", "reasoning"],
+    "additionalProperties": False,
+}
+
+# Several notes classified in one request: {"results": [{"index": 1, ...}]}
+GARDENER_BATCH_SCHEMA: dict = {
+    "type": "object",
+    "properties": {
+        "results": {
+            "type": "array",
+            "items": {
+                **GARDENER_ACTION_SCHEMA,
+                "properties": {
+                    "index": {"type": "integer"},
+                    **GARDENER_ACTION_SCHEMA["properties"],
+                },
+                "required": ["index", *GARDENER_ACTION_SCHEMA["required"]],
+            },
+        }
+    },
+    "required": ["results"],
+    "additionalProperties": False,
+}
+
+
 class ParseError(Exception):
     """Raised when LLM response cannot be parsed into GardenerAction."""
 
@@ -103,6 +153,200 @@ def parse_gardener_action(response_text: str) -> GardenerAction:
         )
 
 
+def parse_gardener_actions(
+    response_text: str, count: int
+) -> list[GardenerAction | None]:
+    """Parse a batch classification response into per-note actions.
+
+    The response should be a JSON array (or an object with a "results" array)
+    of action objects carrying a 1-based "index". Each item is validated on
+    its own, so one malformed entry does not discard the rest.
+
+    Args:
+        response_text: Raw response from the LLM
+        count: Number of notes in the batch
+
+    Returns:
+        A list of length ``count`` with a GardenerAction for every note that
+        parsed and validated, and None for every note that did not
+    """
+    results: list[GardenerAction | None] = [None] * count
+    text = response_text.strip()
+    match = re.search(r"```(?:json)?\s*(.*?)\s*```", text, re.DOTALL)
+    if match:
+        text = match.group(1)
+    else:
+        match = re.search(r"\[.*\]", text, re.DOTALL)
+        if match:
+            text = match.group(0)
+
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        logger.warning(f"Batch JSON parse error: {e}. Preview: {text[:500]}")
+        return results
+    if isinstance(data, dict):
+        data = data.get("results")
+    if not isinstance(data, list):
+        logger.warning("Batch response is not a JSON array")
+        return results
+
+    for position, item in enumerate(data):
+        if not isinstance(item, dict):
+            continue
+        index = item.get("index", position + 1)
+        if not isinstance(index, int) or not 1 <= index <= count:
+            continue
+        try:
+            results[index - 1] = GardenerAction(**item)
+        except ValidationError as e:
+            logger.warning(f"Batch item {index} failed validation: {e}")
+    return results
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting (about four characters per token).
+
+    Providers report exact counts after the fact; this is only used to size
+    requests before they are sent.
+    """
+    return (len(text) + 3) // 4
+
+
+def excerpt_note(note_content: str, token_budget: int) -> str:
+    """Cut an oversized note down to its beginning and end for classification.
+
+    The beginning (title, frontmatter, first paragraphs) usually decides where
+    a note belongs; the end is kept so trailing tags or links are still seen.
+    Returns the note unchanged when it fits ``token_budget`` (0 means no
+    limit).
+    """
+    if not token_budget or estimate_tokens(note_content) <= token_budget:
+        return note_content
+    chars = token_budget * 4
+    head = note_content[: chars * 3 // 4]
+    tail = note_content[len(note_content) - chars // 4 :]
+    omitted = len(note_content) - len(head) - len(tail)
+    return (
+        f"{head}\n\n[... {omitted} characters omitted; the full note is kept "
+        f"when it is written ...]\n\n{tail}"
+    )
+
+
+def build_classify_context(context: str) -> str:
+    """Build the static part of a classification prompt.
+
+    The context files change rarely, so backends send this block ahead of the
+    note (as part of the system prompt) where the provider can cache it across
+    notes.
+    """
+    return f"""## Context Files
+{context}"""
+
+
+def build_classify_message(
+    note_content: str,
+    filename: str,
+    previous_error: Exception | None = None,
+    suggestion: str | None = None,
+) -> str:
+    """Build the per-note user message for a classification request.
+
+    Args:
+        note_content: The raw note content
+        filename: Original filename for context
+        previous_error: Parse error from the previous attempt, if retrying
+        suggestion: Likely destination predicted locally (e.g.
+            "append people/alice.md"), offered as a hint
+
+    Returns:
+        The prompt text to send as the user message
+    """
+    hint = (
+        f"**Likely destination:** {suggestion} (similar past notes went there; "
+        "use it unless the note clearly belongs elsewhere)\n"
+        if suggestion
+        else ""
+    )
+    if previous_error is None:
+        return f"""Please classify and process this note.
+
+## Note to Process
+**Filename:** {filename}
+{hint}**Content:**
+{note_content}
+
+Respond with a JSON object specifying the action, path, and formatted content."""
+
+    return f"""Your previous response could not be parsed as valid JSON.
+Error: {previous_error}
+
+Please try again with a properly formatted JSON response.
+
+## Note to Process
+**Filename:** {filename}
+{hint}**Content:**
+{note_content}
+
+Respond with ONLY a valid JSON object (no markdown, no explanation):
+{{"action": "create|append|task", "path": "...", "content": "...", "reasoning": "..."}}"""
+
+
+def build_batch_classify_message(notes: Sequence[tuple[str, str]]) -> str:
+    """Build the user message for classifying several notes in one request.
+
+    Args:
+        notes: (note_content, filename) pairs, numbered from 1 in the prompt
+
+    Returns:
+        The prompt text to send as the user message
+    """
+    sections = "\n\n".join(
+        f"""### Note {index}
+**Filename:** {filename}
+**Content:**
+{note_content}"""
+        for index, (note_content, filename) in enumerate(notes, start=1)
+    )
+    return f"""Please classify and process each of the following {len(notes)} notes independently.
+
+## Notes to Process
+{sections}
+
+Respond with ONLY a JSON array of {len(notes)} objects, one per note in order:
+[{{"index": 1, "action": "create|append|task", "path": "...", "content": "...", "reasoning": "..."}}]"""
+
+
+def pack_note_batches(
+    notes: Sequence[tuple[str, str]], token_budget: int, max_batch_size: int
+) -> list[list[int]]:
+    """Group note indexes into batches that fit a prompt token budget.
+
+    Notes are packed greedily in order. A note that alone exceeds the budget
+    gets a batch of its own (it is then classified with a single request).
+    """
+    batches: list[list[int]] = []
+    current: list[int] = []
+    used = 0
+    for index, (note_content, filename) in enumerate(notes):
+        tokens = estimate_tokens(note_content) + estimate_tokens(filename)
+        if current and (used + tokens > token_budget or len(current) >= max_batch_size):
+            batches.append(current)
+            current, used = [], 0
+        current.append(index)
+        used += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def format_related_context(related_context: str) -> str:
+    """Format related atlas files for inclusion in refine/ask prompts."""
+    if not related_context:
+        return ""
+    return f"\n\nRelated files in knowledge base:\n{related_context}"
+
+
 @dataclass
 class BackendConfig:
     """Base configuration for all backends."""
@@ -112,6 +356,47 @@ class BackendConfig:
     model_fast: str
     base_url: str | None = None
     timeout: float = 120.0
+    max_connections: int = 20
+    keepalive_expiry: float = 60.0
+    http2: bool = False
+    retry_attempts: int = 3  # Total tries per request, including the first
+    retry_base_delay: float = 0.5
+    retry_max_delay: float = 30.0
+    circuit_failure_threshold: int = 5  # 0 disables the circuit breaker
+    circuit_reset_timeout: float = 30.0
+    hedge_delay: float = 0.0  # Seconds before hedging ask/refine; 0 disables
+    structured_output: bool = True  # Schema-constrained classification output
+
+    def httpx_options(self) -> dict:
+        """Connection pool settings shared by every HTTP client we build."""
+        return {
+            "timeout": self.timeout,
+            "limits": httpx.Limits(
+                max_connections=self.max_connections,
+                max_keepalive_connections=self.max_connections,
+                keepalive_expiry=self.keepalive_expiry,
+            ),
+            "http2": self.http2 and http2_available(),
+        }
+
+
+# Normalized provider batch job states
+BATCH_JOB_PENDING = "pending"
+BATCH_JOB_ENDED = "ended"
+
+
+@dataclass
+class BatchJobResult:
+    """Outcome of one request in a provider batch job."""
+
+    custom_id: str
+    text: str | None = None  # Model response text if the request succeeded
+    error: str | None = None
+
+
+def http2_available() -> bool:
+    """HTTP/2 needs the optional ``h2`` package (``httpx[http2]``)."""
+    return importlib.util.find_spec("h2") is not None
 
 
 class GardenerBackend(ABC):
@@ -138,6 +423,8 @@ class GardenerBackend(ABC):
         note_content: str,
         filename: str,
         context: str,
+        fast: bool = False,
+        suggestion: str | None = None,
     ) -> GardenerAction:
         """Classify a note and return the action to take.
 
@@ -145,6 +432,8 @@ class GardenerBackend(ABC):
             note_content: The raw note content from inbox
             filename: Original filename (for context)
             context: Concatenated AGENTS.md + GARDENER.md content
+            fast: Use the fast model (for notes the pre-classifier placed)
+            suggestion: Destination predicted by the pre-classifier
 
         Returns:
             GardenerAction with action type, path, content, and reasoning
@@ -165,18 +454,112 @@ class GardenerBackend(ABC):
         ...
 
     @abstractmethod
-    def ask(self, question: str, related_context: str) -> str:
+    def ask(self, question: str, related_context: str, fast: bool = False) -> str:
         """Answer a question using related knowledge base context.
 
         Args:
             question: The user's question
             related_context: Related files found in atlas
+            fast: Use the fast model instead of the thinking model
 
         Returns:
             A concise answer
         """
         ...
 
+    @property
+    def supports_batch_prompt(self) -> bool:
+        """Whether several notes can be classified in one request."""
+        return False
+
+    def _classify_batch_request(
+        self, notes: Sequence[tuple[str, str]], context: str
+    ) -> list[GardenerAction | None]:
+        """Classify several notes with one request.
+
+        Backends with supports_batch_prompt override this. None marks a note
+        to classify on its own, which is every note by default.
+        """
+        return [None] * len(notes)
+
+    def classify_batch(
+        self,
+        notes: Sequence[tuple[str, str]],
+        context: str,
+        token_budget: int = 2000,
+        max_batch_size: int = 10,
+    ) -> list[GardenerAction | Exception]:
+        """Classify several notes, packing short ones into shared requests.
+
+        Notes are grouped under ``token_budget`` (estimated note tokens per
+        request, excluding the shared context) and ``max_batch_size``. Each
+        item in a batch response is validated on its own; only notes whose
+        item is missing or invalid are retried with an individual classify().
+
+        Args:
+            notes: (note_content, filename) pairs
+            context: Concatenated AGENTS.md + GARDENER.md content
+            token_budget: Estimated note tokens allowed per batch request
+            max_batch_size: Maximum notes per batch request
+
+        Returns:
+            One entry per note, in order: the GardenerAction, or the exception
+            raised while classifying that note individually
+
+        Raises:
+            Exception: Errors from a batch request itself (e.g. RateLimitError)
+        """
+        results: list[GardenerAction | Exception | None] = [None] * len(notes)
+        for batch in pack_note_batches(notes, token_budget, max_batch_size):
+            if len(batch) > 1 and self.supports_batch_prompt:
+                actions = self._classify_batch_request(
+                    [notes[i] for i in batch], context
+                )
+                for i, action in zip(batch, actions):
+                    results[i] = action
+
+            for i in batch:
+                if results[i] is not None:
+                    continue
+                note_content, filename = notes[i]
+                if len(batch) > 1:
+                    logger.info(f"Retrying {filename} outside its batch")
+                try:
+                    results[i] = self.classify(note_content, filename, context)
+                except Exception as e:
+                    results[i] = e
+        return results
+
+    @property
+    def has_batch_api(self) -> bool:
+        """Whether the provider has an asynchronous batch API (backlog mode).
+
+        The batch job methods below are only called when this is True.
+        """
+        return False
+
+    def submit_batch_job(
+        self, notes: Sequence[tuple[str, str, str]], context: str
+    ) -> str:
+        """Submit notes to the provider's asynchronous batch API.
+
+        Args:
+            notes: (custom_id, note_content, filename) triples
+            context: Concatenated AGENTS.md + GARDENER.md content
+
+        Returns:
+            The provider's batch job id
+        """
+        raise NotImplementedError(f"{self.name} backend has no batch API")
+
+    def get_batch_job_status(self, batch_id: str) -> str:
+        """Return BATCH_JOB_PENDING or BATCH_JOB_ENDED for a batch job."""
+        raise NotImplementedError(f"{self.name} backend has no batch API")
+
+    def get_batch_job_results(self, batch_id: str) -> list[BatchJobResult]:
+        """Fetch per-request results of an ended batch job."""
+        raise NotImplementedError(f"{self.name} backend has no batch API")
+
     def close(self):
         """Clean up resources. Override if needed."""
         pass
@@ -186,3 +569,69 @@ class GardenerBackend(ABC):
 
     def __exit__(self, *args):
         self.close()
+
+
+class AsyncGardenerBackend(ABC):
+    """Asyncio counterpart of GardenerBackend.
+
+    Same operations and prompts as the sync backends, but ``classify``,
+    ``refine`` and ``ask`` are coroutines backed by async HTTP clients, so a
+    single event loop can keep many AI calls in flight without threads.
+    """
+
+    def __init__(self, config: BackendConfig):
+        self.config = config
+
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        """Return the backend name for logging/status."""
+        ...
+
+    @abstractmethod
+    async def classify(
+        self,
+        note_content: str,
+        filename: str,
+        context: str,
+    ) -> GardenerAction:
+        """Classify a note and return the action to take."""
+        ...
+
+    @abstractmethod
+    async def refine(self, content: str, related_context: str) -> str:
+        """Get refinement suggestions for content."""
+        ...
+
+    @abstractmethod
+    async def ask(self, question: str, related_context: str, fast: bool = False) -> str:
+        """Answer a question using related knowledge base context."""
+        ...
+
+    async def refine_stream(
+        self, content: str, related_context: str
+    ) -> AsyncIterator[str]:
+        """Yield refinement suggestions as they are generated.
+
+        Backends without provider streaming yield the whole result at once.
+        """
+        yield await self.refine(content, related_context)
+
+    async def ask_stream(
+        self, question: str, related_context: str, fast: bool = False
+    ) -> AsyncIterator[str]:
+        """Yield the answer as it is generated.
+
+        Backends without provider streaming yield the whole answer at once.
+        """
+        yield await self.ask(question, related_context, fast=fast)
+
+    async def aclose(self):
+        """Clean up resources. Override if needed."""
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
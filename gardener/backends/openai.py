@@ -7,19 +7,35 @@ Works with:
 - Ollama and other OpenAI-compatible APIs
 """
 
+import json
 import logging
+from collections.abc import AsyncIterator, Sequence
+from functools import lru_cache
 
 import httpx
 
-from api_usage import track_api_call
+from api_usage import ApiCallUsage, record_api_call, track_api_call
 
 from .base import (
+    BATCH_JOB_ENDED,
+    BATCH_JOB_PENDING,
+    BATCH_MAX_OUTPUT_TOKENS,
+    GARDENER_ACTION_SCHEMA,
+    GARDENER_BATCH_SCHEMA,
+    AsyncGardenerBackend,
     BackendConfig,
+    BatchJobResult,
     GardenerAction,
     GardenerBackend,
     ParseError,
+    build_batch_classify_message,
+    build_classify_context,
+    build_classify_message,
+    format_related_context,
     parse_gardener_action,
+    parse_gardener_actions,
 )
+from .transport import Transport
 
 logger = logging.getLogger(__name__)
 
@@ -64,25 +80,120 @@ Provide a concise answer based on the related context. If the notes don't contai
 """
 
 
+def _client_options(config: BackendConfig) -> dict:
+    """Shared httpx client settings for the sync and async backends."""
+    return {
+        "base_url": config.base_url or "https://api.openai.com/v1",
+        # httpx sets Content-Type per request (JSON bodies, batch file uploads)
+        "headers": {"Authorization": f"Bearer {config.api_key}"},
+        **config.httpx_options(),
+    }
+
+
+def _chat_payload(
+    messages: list[dict[str, str]],
+    system: str | None,
+    model: str,
+    max_tokens: int,
+    temperature: float,
+    response_format: dict | None = None,
+) -> dict:
+    """Build a chat completions request body."""
+    if system:
+        messages = [{"role": "system", "content": system}] + messages
+    payload = {
+        "model": model,
+        "messages": messages,
+        "max_tokens": max_tokens,
+        "temperature": temperature,
+    }
+    if response_format:
+        payload["response_format"] = response_format
+    return payload
+
+
+def _json_schema_format(config: BackendConfig, name: str, schema: dict) -> dict | None:
+    """response_format constraining the reply to ``schema``.
+
+    None when structured output is disabled (AI_STRUCTURED_OUTPUT=false),
+    e.g. for OpenAI-compatible servers that reject ``json_schema``.
+    """
+    if not config.structured_output:
+        return None
+    return {
+        "type": "json_schema",
+        "json_schema": {"name": name, "strict": True, "schema": schema},
+    }
+
+
+@lru_cache(maxsize=8)
+def _classify_system(context: str) -> str:
+    """System prompt followed by the context files.
+
+    OpenAI caches the longest previously seen request prefix automatically,
+    so everything that is identical across notes goes first and the note
+    itself last. Memoized per context, so a batch builds the prefix once.
+    """
+    return f"{SYSTEM_PROMPT}\n\n{build_classify_context(context)}"
+
+
+# Batch states that may still change; anything else is final
+_BATCH_ACTIVE_STATES = {"validating", "in_progress", "finalizing", "cancelling"}
+
+
+def record_openai_usage(usage: ApiCallUsage, data: dict, model: str) -> None:
+    """Copy token counts from a chat completion response into ``usage``."""
+    counts = data.get("usage") if isinstance(data, dict) else None
+    if not isinstance(counts, dict):
+        usage.add(model=model)
+        return
+    details = counts.get("prompt_tokens_details") or {}
+    usage.add(
+        model=data.get("model") or model,
+        prompt_tokens=counts.get("prompt_tokens", 0),
+        completion_tokens=counts.get("completion_tokens", 0),
+        cached_tokens=details.get("cached_tokens", 0)
+        if isinstance(details, dict)
+        else 0,
+    )
+
+
+def _batch_line_result(line: dict, usage: ApiCallUsage) -> BatchJobResult:
+    """Convert one line of a Batch API output/error file."""
+    custom_id = line.get("custom_id", "")
+    response = line.get("response") or {}
+    body = response.get("body") or {}
+    if line.get("error") or response.get("status_code") != 200:
+        error = line.get("error") or body.get("error") or "request failed"
+        return BatchJobResult(custom_id, error=str(error))
+    record_openai_usage(usage, body, body.get("model") or "")
+    try:
+        text = body["choices"][0]["message"]["content"]
+    except (KeyError, IndexError, TypeError):
+        return BatchJobResult(custom_id, error="malformed response body")
+    return BatchJobResult(custom_id, text=text)
+
+
 class OpenAIBackend(GardenerBackend):
     """OpenAI-compatible backend using httpx."""
 
     def __init__(self, config: BackendConfig):
         super().__init__(config)
-        base_url = config.base_url or "https://api.openai.com/v1"
-        self._client = httpx.Client(
-            base_url=base_url,
-            headers={
-                "Authorization": f"Bearer {config.api_key}",
-                "Content-Type": "application/json",
-            },
-            timeout=config.timeout,
-        )
+        self._client = httpx.Client(**_client_options(config))
+        self._transport = Transport.from_config(self.name, config)
 
     @property
     def name(self) -> str:
         return "openai"
 
+    @property
+    def supports_batch_prompt(self) -> bool:
+        return True
+
+    @property
+    def has_batch_api(self) -> bool:
+        return True
+
     def _chat(
         self,
         messages: list[dict[str, str]],
@@ -90,26 +201,30 @@ class OpenAIBackend(GardenerBackend):
         model: str | None = None,
         max_tokens: int = 4096,
         temperature: float = 0.7,
+        usage: ApiCallUsage | None = None,
+        response_format: dict | None = None,
     ) -> str:
-        """Send a chat completion request."""
+        """Send a chat completion request.
+
+        If ``usage`` is given, the model and token counts reported in the
+        response are added to it.
+        """
         if not self.config.api_key:
             raise ValueError("API key not configured")
 
-        if system:
-            messages = [{"role": "system", "content": system}] + messages
-
         model_name = model or self.config.model_thinking
-        response = self._client.post(
-            "/chat/completions",
-            json={
-                "model": model_name,
-                "messages": messages,
-                "max_tokens": max_tokens,
-                "temperature": temperature,
-            },
+        payload = _chat_payload(
+            messages, system, model_name, max_tokens, temperature, response_format
         )
-        response.raise_for_status()
-        data = response.json()
+
+        def send() -> dict:
+            response = self._client.post("/chat/completions", json=payload)
+            response.raise_for_status()
+            return response.json()
+
+        data = self._transport.call(send)
+        if usage is not None:
+            record_openai_usage(usage, data, model_name)
         return data["choices"][0]["message"]["content"]
 
     def classify(
@@ -118,6 +233,8 @@ class OpenAIBackend(GardenerBackend):
         filename: str,
         context: str,
         max_retries: int = 2,
+        fast: bool = False,
+        suggestion: str | None = None,
     ) -> GardenerAction:
         """Classify a note using OpenAI chat completions.
 
@@ -126,6 +243,8 @@ class OpenAIBackend(GardenerBackend):
             filename: Original filename for context
             context: AGENTS.md + GARDENER.md content
             max_retries: Number of retries on parse errors (default 2)
+            fast: Use the fast model (for notes the pre-classifier placed)
+            suggestion: Destination predicted by the pre-classifier
 
         Returns:
             GardenerAction with classification result
@@ -133,95 +252,431 @@ class OpenAIBackend(GardenerBackend):
         Raises:
             ParseError: If classification fails after all retries
         """
-        user_message = f"""Please classify and process this note.
-
-## Context Files
-{context}
-
-## Note to Process
-**Filename:** {filename}
-**Content:**
-{note_content}
-
-Respond with a JSON object specifying the action, path, and formatted content."""
+        system = _classify_system(context)
+        user_message = build_classify_message(
+            note_content, filename, suggestion=suggestion
+        )
+        model = self.config.model_fast if fast else self.config.model_thinking
+        response_format = _json_schema_format(
+            self.config, "gardener_action", GARDENER_ACTION_SCHEMA
+        )
 
         last_error = None
         for attempt in range(max_retries + 1):
-            try:
-                with track_api_call(self.name, "classify"):
-                    response_text = self._chat(
-                        messages=[{"role": "user", "content": user_message}],
-                        system=SYSTEM_PROMPT,
-                        model=self.config.model_thinking,
-                        temperature=0.3,
-                    )
+            with track_api_call(
+                self.name, "classify_fast" if fast else "classify"
+            ) as usage:
+                response_text = self._chat(
+                    messages=[{"role": "user", "content": user_message}],
+                    system=system,
+                    model=model,
+                    temperature=0.3,
+                    usage=usage,
+                    response_format=response_format,
+                )
+                try:
+                    return parse_gardener_action(response_text)
+                except ParseError as e:
+                    usage.parse_error = True
+                    last_error = e
+            if attempt < max_retries:
+                logger.info(
+                    f"Parse error on attempt {attempt + 1}/{max_retries + 1} "
+                    f"for {filename}, retrying..."
+                )
+                # Add hint to the message for retry
+                user_message = build_classify_message(
+                    note_content,
+                    filename,
+                    previous_error=last_error,
+                    suggestion=suggestion,
+                )
 
-                return parse_gardener_action(response_text)
+        # All retries exhausted
+        logger.error(
+            f"Classification failed for {filename} after {max_retries + 1} attempts"
+        )
+        raise last_error
 
-            except ParseError as e:
-                last_error = e
-                if attempt < max_retries:
-                    logger.info(
-                        f"Parse error on attempt {attempt + 1}/{max_retries + 1} "
-                        f"for {filename}, retrying..."
-                    )
-                    # Add hint to the message for retry
-                    user_message = f"""Your previous response could not be parsed as valid JSON.
-Error: {e}
+    def _classify_batch_request(
+        self, notes: Sequence[tuple[str, str]], context: str
+    ) -> list[GardenerAction | None]:
+        """Classify several notes in one request sharing the cached prefix."""
+        message = build_batch_classify_message(notes)
+        with track_api_call(self.name, "classify_batch") as usage:
+            response_text = self._chat(
+                messages=[{"role": "user", "content": message}],
+                system=_classify_system(context),
+                model=self.config.model_thinking,
+                max_tokens=BATCH_MAX_OUTPUT_TOKENS,
+                temperature=0.3,
+                usage=usage,
+                response_format=_json_schema_format(
+                    self.config, "gardener_actions", GARDENER_BATCH_SCHEMA
+                ),
+            )
+            actions = parse_gardener_actions(response_text, len(notes))
+            usage.parse_error = None in actions
+        return actions
 
-Please try again with a properly formatted JSON response.
+    def _get(self, path: str) -> httpx.Response:
+        """GET with retries; safe to repeat, unlike the batch-creating POSTs."""
 
-## Context Files
-{context}
+        def send() -> httpx.Response:
+            response = self._client.get(path)
+            response.raise_for_status()
+            return response
 
-## Note to Process
-**Filename:** {filename}
-**Content:**
-{note_content}
+        return self._transport.call(send)
 
-Respond with ONLY a valid JSON object (no markdown, no explanation):
-{{"action": "create|append|task", "path": "...", "content": "...", "reasoning": "..."}}"""
+    def submit_batch_job(
+        self, notes: Sequence[tuple[str, str, str]], context: str
+    ) -> str:
+        """Upload classify requests as JSONL and create a Batch API job."""
+        if not self.config.api_key:
+            raise ValueError("API key not configured")
 
-        # All retries exhausted
-        logger.error(
-            f"Classification failed for {filename} after {max_retries + 1} attempts"
+        system = _classify_system(context)
+        response_format = _json_schema_format(
+            self.config, "gardener_action", GARDENER_ACTION_SCHEMA
         )
-        raise last_error
+        lines = [
+            json.dumps(
+                {
+                    "custom_id": custom_id,
+                    "method": "POST",
+                    "url": "/v1/chat/completions",
+                    "body": _chat_payload(
+                        [
+                            {
+                                "role": "user",
+                                "content": build_classify_message(
+                                    note_content, filename
+                                ),
+                            }
+                        ],
+                        system,
+                        self.config.model_thinking,
+                        4096,
+                        0.3,
+                        response_format,
+                    ),
+                }
+            )
+            for custom_id, note_content, filename in notes
+        ]
+
+        with track_api_call(self.name, "batch_submit"):
+            upload = self._client.post(
+                "/files",
+                data={"purpose": "batch"},
+                files={
+                    "file": (
+                        "gardener-backlog.jsonl",
+                        "\n".join(lines).encode(),
+                        "application/jsonl",
+                    )
+                },
+            )
+            upload.raise_for_status()
+            response = self._client.post(
+                "/batches",
+                json={
+                    "input_file_id": upload.json()["id"],
+                    "endpoint": "/v1/chat/completions",
+                    "completion_window": "24h",
+                },
+            )
+            response.raise_for_status()
+        return response.json()["id"]
+
+    def get_batch_job_status(self, batch_id: str) -> str:
+        """Map the Batch API status onto pending/ended."""
+        status = self._get(f"/batches/{batch_id}").json().get("status")
+        return BATCH_JOB_PENDING if status in _BATCH_ACTIVE_STATES else BATCH_JOB_ENDED
+
+    def get_batch_job_results(self, batch_id: str) -> list[BatchJobResult]:
+        """Download the output and error files of an ended batch job.
+
+        Expired or cancelled jobs still return the requests that completed;
+        the rest come back as errors. Token usage for the whole job is
+        recorded as a single call.
+        """
+        batch = self._get(f"/batches/{batch_id}").json()
+
+        results: list[BatchJobResult] = []
+        with track_api_call(self.name, "batch_results", enforce_limit=False) as usage:
+            for file_key in ("output_file_id", "error_file_id"):
+                file_id = batch.get(file_key)
+                if not file_id:
+                    continue
+                content = self._get(f"/files/{file_id}/content")
+                for line in content.text.splitlines():
+                    if line.strip():
+                        results.append(_batch_line_result(json.loads(line), usage))
+        if not results:
+            logger.warning(
+                f"Batch {batch_id} ended as {batch.get('status')!r} with no results"
+            )
+        return results
 
     def refine(self, content: str, related_context: str) -> str:
         """Get refinement suggestions."""
         prompt = REFINE_PROMPT.format(
             content=content,
-            related_context=f"\n\nRelated files in knowledge base:\n{related_context}"
-            if related_context
-            else "",
+            related_context=format_related_context(related_context),
         )
 
-        with track_api_call(self.name, "refine"):
+        with track_api_call(self.name, "refine") as usage:
             return self._chat(
                 messages=[{"role": "user", "content": prompt}],
                 model=self.config.model_fast,
                 max_tokens=1024,
                 temperature=0.7,
+                usage=usage,
             )
 
-    def ask(self, question: str, related_context: str) -> str:
+    def ask(self, question: str, related_context: str, fast: bool = False) -> str:
         """Answer a question using the knowledge base."""
         prompt = ASK_PROMPT.format(
             question=question,
-            related_context=f"\n\nRelated files in knowledge base:\n{related_context}"
-            if related_context
-            else "",
+            related_context=format_related_context(related_context),
         )
 
-        with track_api_call(self.name, "ask"):
+        with track_api_call(self.name, "ask") as usage:
             return self._chat(
                 messages=[{"role": "user", "content": prompt}],
-                model=self.config.model_thinking,
+                model=self.config.model_fast if fast else self.config.model_thinking,
                 max_tokens=1024,
                 temperature=0.4,
+                usage=usage,
             )
 
     def close(self):
         """Close the HTTP client."""
         self._client.close()
+
+
+class AsyncOpenAIBackend(AsyncGardenerBackend):
+    """OpenAI-compatible backend using httpx.AsyncClient."""
+
+    def __init__(self, config: BackendConfig):
+        super().__init__(config)
+        self._client = httpx.AsyncClient(**_client_options(config))
+        self._transport = Transport.from_config(self.name, config)
+
+    @property
+    def name(self) -> str:
+        return "openai"
+
+    async def _chat(
+        self,
+        messages: list[dict[str, str]],
+        system: str | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        usage: ApiCallUsage | None = None,
+        hedge: bool = False,
+        response_format: dict | None = None,
+    ) -> str:
+        """Send a chat completion request.
+
+        With ``hedge``, a slow request is raced against a second one (see
+        Transport.ahedged).
+        """
+        if not self.config.api_key:
+            raise ValueError("API key not configured")
+
+        model_name = model or self.config.model_thinking
+        payload = _chat_payload(
+            messages, system, model_name, max_tokens, temperature, response_format
+        )
+
+        async def send() -> dict:
+            response = await self._client.post("/chat/completions", json=payload)
+            response.raise_for_status()
+            return response.json()
+
+        def record_loser(data: dict) -> None:
+            # The losing hedge is a separate, billed request
+            extra = ApiCallUsage(usage.backend, usage.operation)
+            record_openai_usage(extra, data, model_name)
+            record_api_call(extra.backend, extra.operation, usage=extra)
+
+        if hedge:
+            data = await self._transport.ahedged(
+                send, record_loser if usage is not None else None
+            )
+        else:
+            data = await self._transport.acall(send)
+        if usage is not None:
+            record_openai_usage(usage, data, model_name)
+        return data["choices"][0]["message"]["content"]
+
+    async def _chat_stream(
+        self,
+        messages: list[dict[str, str]],
+        system: str | None = None,
+        model: str | None = None,
+        max_tokens: int = 4096,
+        temperature: float = 0.7,
+        usage: ApiCallUsage | None = None,
+    ) -> AsyncIterator[str]:
+        """Stream a chat completion, yielding content deltas as they arrive."""
+        if not self.config.api_key:
+            raise ValueError("API key not configured")
+
+        model_name = model or self.config.model_thinking
+        payload = _chat_payload(messages, system, model_name, max_tokens, temperature)
+        payload["stream"] = True
+        payload["stream_options"] = {"include_usage": True}
+        # A stream is not retried once started, but it still respects and
+        # feeds the circuit breaker.
+        breaker = self._transport.breaker
+        breaker.before_call()
+        try:
+            async with self._client.stream(
+                "POST", "/chat/completions", json=payload
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:") :].strip()
+                    if data == "[DONE]":
+                        break
+                    chunk = json.loads(data)
+                    if usage is not None and chunk.get("usage"):
+                        record_openai_usage(usage, chunk, model_name)
+                    for choice in chunk.get("choices") or []:
+                        delta = (choice.get("delta") or {}).get("content")
+                        if delta:
+                            yield delta
+        except Exception as e:
+            breaker.record_outcome(e)
+            raise
+        except BaseException:
+            breaker.release()
+            raise
+        breaker.record_success()
+
+    async def classify(
+        self,
+        note_content: str,
+        filename: str,
+        context: str,
+        max_retries: int = 2,
+    ) -> GardenerAction:
+        """Classify a note using OpenAI chat completions."""
+        system = _classify_system(context)
+        user_message = build_classify_message(note_content, filename)
+        response_format = _json_schema_format(
+            self.config, "gardener_action", GARDENER_ACTION_SCHEMA
+        )
+
+        last_error = None
+        for attempt in range(max_retries + 1):
+            with track_api_call(self.name, "classify") as usage:
+                response_text = await self._chat(
+                    messages=[{"role": "user", "content": user_message}],
+                    system=system,
+                    model=self.config.model_thinking,
+                    temperature=0.3,
+                    usage=usage,
+                    response_format=response_format,
+                )
+                try:
+                    return parse_gardener_action(response_text)
+                except ParseError as e:
+                    usage.parse_error = True
+                    last_error = e
+            if attempt < max_retries:
+                logger.info(
+                    f"Parse error on attempt {attempt + 1}/{max_retries + 1} "
+                    f"for {filename}, retrying..."
+                )
+                user_message = build_classify_message(
+                    note_content, filename, previous_error=last_error
+                )
+
+        logger.error(
+            f"Classification failed for {filename} after {max_retries + 1} attempts"
+        )
+        raise last_error
+
+    async def refine(self, content: str, related_context: str) -> str:
+        """Get refinement suggestions."""
+        prompt = REFINE_PROMPT.format(
+            content=content,
+            related_context=format_related_context(related_context),
+        )
+
+        with track_api_call(self.name, "refine") as usage:
+            return await self._chat(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.config.model_fast,
+                max_tokens=1024,
+                temperature=0.7,
+                usage=usage,
+                hedge=True,
+            )
+
+    async def ask(self, question: str, related_context: str, fast: bool = False) -> str:
+        """Answer a question using the knowledge base."""
+        prompt = ASK_PROMPT.format(
+            question=question,
+            related_context=format_related_context(related_context),
+        )
+
+        with track_api_call(self.name, "ask") as usage:
+            return await self._chat(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.config.model_fast if fast else self.config.model_thinking,
+                max_tokens=1024,
+                temperature=0.4,
+                usage=usage,
+                hedge=True,
+            )
+
+    async def refine_stream(
+        self, content: str, related_context: str
+    ) -> AsyncIterator[str]:
+        """Stream refinement suggestions."""
+        prompt = REFINE_PROMPT.format(
+            content=content,
+            related_context=format_related_context(related_context),
+        )
+
+        with track_api_call(self.name, "refine") as usage:
+            async for text in self._chat_stream(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.config.model_fast,
+                max_tokens=1024,
+                temperature=0.7,
+                usage=usage,
+            ):
+                yield text
+
+    async def ask_stream(
+        self, question: str, related_context: str, fast: bool = False
+    ) -> AsyncIterator[str]:
+        """Stream an answer to a question."""
+        prompt = ASK_PROMPT.format(
+            question=question,
+            related_context=format_related_context(related_context),
+        )
+
+        with track_api_call(self.name, "ask") as usage:
+            async for text in self._chat_stream(
+                messages=[{"role": "user", "content": prompt}],
+                model=self.config.model_fast if fast else self.config.model_thinking,
+                max_tokens=1024,
+                temperature=0.4,
+                usage=usage,
+            ):
+                yield text
+
+    async def aclose(self):
+        """Close the HTTP client."""
+        await self._client.aclose()
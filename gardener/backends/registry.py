@@ -0,0 +1,216 @@
+"""Process-wide pool of long-lived backend clients.
+
+Building a backend creates a fresh HTTP client, so creating one per request
+pays a new TCP/TLS handshake every time. The registry builds each backend
+once (sync and async variants), keeps their connection pools warm across
+requests and threads, and closes them on shutdown.
+"""
+
+import asyncio
+import logging
+import threading
+
+from .anthropic import AnthropicBackend, AsyncAnthropicBackend
+from .base import AsyncGardenerBackend, BackendConfig, GardenerBackend
+from .openai import AsyncOpenAIBackend, OpenAIBackend
+from .router import AsyncRoutingBackend, RoutingBackend, RoutingPolicy
+
+logger = logging.getLogger(__name__)
+
+_SYNC_BACKENDS: dict[str, type[GardenerBackend]] = {
+    "openai": OpenAIBackend,
+    "anthropic": AnthropicBackend,
+}
+_ASYNC_BACKENDS: dict[str, type[AsyncGardenerBackend]] = {
+    "openai": AsyncOpenAIBackend,
+    "anthropic": AsyncAnthropicBackend,
+}
+
+
+class BackendRegistry:
+    """Thread-safe holder for shared sync and async backend instances."""
+
+    def __init__(
+        self,
+        backend_type: str,
+        config: BackendConfig,
+        fallback: tuple[str, BackendConfig] | None = None,
+        policy: RoutingPolicy | None = None,
+    ):
+        self.backend_type = backend_type
+        self.config = config
+        self.fallback = fallback
+        self.policy = policy or RoutingPolicy()
+        self._lock = threading.Lock()
+        self._sync: GardenerBackend | None = None
+        self._async: AsyncGardenerBackend | None = None
+        self._async_loop: asyncio.AbstractEventLoop | None = None
+        self._closing: set[asyncio.Task] = set()
+
+    @property
+    def routed(self) -> bool:
+        """Whether calls go through a RoutingBackend."""
+        return self.fallback is not None or self.policy.difficulty_routing
+
+    def _build(self, classes: dict, router: type):
+        backend = classes[self.backend_type](self.config)
+        if not self.routed:
+            return backend
+        fallback = None
+        if self.fallback is not None:
+            fallback_type, fallback_config = self.fallback
+            fallback = classes[fallback_type](fallback_config)
+        return router(backend, fallback, self.policy)
+
+    def get(self) -> GardenerBackend:
+        """Return the shared sync backend, creating it on first use."""
+        with self._lock:
+            if self._sync is None:
+                self._sync = self._build(_SYNC_BACKENDS, RoutingBackend)
+                logger.info(
+                    f"Created pooled {self.backend_type} backend "
+                    f"(max_connections={self.config.max_connections}, "
+                    f"http2={self.config.httpx_options()['http2']})"
+                )
+            return self._sync
+
+    def get_async(self) -> AsyncGardenerBackend:
+        """Return the shared async backend for the running event loop.
+
+        Async connection pools are bound to the loop that created them, so a
+        new instance is built if called from a different loop.
+        """
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._async is None or self._async_loop is not loop:
+                stale, stale_loop = self._async, self._async_loop
+                self._async = self._build(_ASYNC_BACKENDS, AsyncRoutingBackend)
+                self._async_loop = loop
+                if stale is not None:
+                    logger.debug("Event loop changed; rebuilt async backend")
+                    self._close_stale(stale, stale_loop, loop)
+            return self._async
+
+    def _close_stale(
+        self,
+        backend: AsyncGardenerBackend,
+        backend_loop: asyncio.AbstractEventLoop | None,
+        loop: asyncio.AbstractEventLoop | None,
+    ) -> None:
+        """Close a replaced async backend without blocking the caller.
+
+        The pool is closed on the loop that created it while that loop still
+        runs; otherwise closing is attempted on the current loop, or on a
+        short-lived one outside of any loop.
+        """
+
+        def log_failure(done) -> None:
+            if not done.cancelled() and done.exception() is not None:
+                logger.warning(
+                    f"Failed to close stale async backend: {done.exception()}"
+                )
+
+        if (
+            backend_loop is not None
+            and backend_loop is not loop
+            and backend_loop.is_running()
+        ):
+            future = asyncio.run_coroutine_threadsafe(backend.aclose(), backend_loop)
+            future.add_done_callback(log_failure)
+            return
+        if loop is None:
+            try:
+                asyncio.run(backend.aclose())
+            except Exception as e:
+                logger.warning(f"Failed to close stale async backend: {e}")
+            return
+        task = loop.create_task(backend.aclose())
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+        task.add_done_callback(log_failure)
+
+    def close(self) -> None:
+        """Close the sync backend's connection pool."""
+        with self._lock:
+            backend, self._sync = self._sync, None
+        if backend is not None:
+            backend.close()
+
+    def discard(self) -> None:
+        """Close both pools without waiting on the async one (on replacement)."""
+        self.close()
+        with self._lock:
+            backend, backend_loop = self._async, self._async_loop
+            self._async = self._async_loop = None
+        if backend is None:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        self._close_stale(backend, backend_loop, loop)
+
+    async def aclose(self) -> None:
+        """Close both backends' connection pools."""
+        self.close()
+        with self._lock:
+            backend, self._async = self._async, None
+            self._async_loop = None
+        if backend is not None:
+            await backend.aclose()
+
+
+_registry: BackendRegistry | None = None
+_registry_lock = threading.Lock()
+
+
+def _load_registry() -> BackendRegistry:
+    from . import get_backend_config, get_fallback_backend_config, get_routing_policy
+
+    backend_type, config = get_backend_config()
+    return BackendRegistry(
+        backend_type, config, get_fallback_backend_config(), get_routing_policy()
+    )
+
+
+def init_backend_registry() -> BackendRegistry:
+    """Create the process-wide registry from environment configuration.
+
+    Called once from the API lifespan so configuration is read at startup
+    rather than on every request. A registry created earlier is closed.
+    """
+    global _registry
+    registry = _load_registry()
+    with _registry_lock:
+        previous, _registry = _registry, registry
+    if previous is not None:
+        previous.discard()
+    return registry
+
+
+def get_backend_registry() -> BackendRegistry:
+    """Return the process-wide registry, creating it if needed."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = _load_registry()
+        return _registry
+
+
+async def close_backend_registry() -> None:
+    """Close pooled clients and drop the registry (called on shutdown)."""
+    global _registry
+    with _registry_lock:
+        registry, _registry = _registry, None
+    if registry is not None:
+        await registry.aclose()
+
+
+def get_shared_backend() -> GardenerBackend:
+    """Shortcut for the pooled sync backend. Do not close it."""
+    return get_backend_registry().get()
+
+
+def get_shared_async_backend() -> AsyncGardenerBackend:
+    """Shortcut for the pooled async backend. Do not close it."""
+    return get_backend_registry().get_async()
@@ -0,0 +1,402 @@
+"""Per-request model routing with latency-aware failover.
+
+A RoutingBackend wraps the primary backend and, optionally, a fallback
+backend from another provider (e.g. OpenAI primary, Anthropic fallback).
+For each request it:
+
+1. picks a model tier: simple notes and questions (short, few lines, no
+   code) go to ``model_fast`` when difficulty routing is on; everything
+   else to ``model_thinking``;
+2. orders the backends by health: a backend whose model has an EWMA
+   latency above the SLO, an EWMA error rate above the limit, or an open
+   circuit breaker is tried after the healthy ones;
+3. falls over to the next backend when a call fails with a transient
+   error (see transport.is_retryable) or an open circuit.
+
+Health only counts recent evidence: once a model has had no calls for
+``recovery`` seconds it is considered healthy again, so a provider that
+was slow is probed again rather than skipped forever.
+"""
+
+import logging
+import threading
+import time
+from collections.abc import (
+    AsyncGenerator,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Sequence,
+)
+from dataclasses import dataclass
+from typing import TypeVar
+
+from .base import (
+    AsyncGardenerBackend,
+    BatchJobResult,
+    GardenerAction,
+    GardenerBackend,
+)
+from .transport import CIRCUIT_OPEN, CircuitOpenError, get_circuit_breaker, is_retryable
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+TIER_FAST = "fast"
+TIER_THINKING = "thinking"
+
+
+@dataclass
+class RoutingPolicy:
+    """Routing thresholds (see get_routing_policy() for the env vars)."""
+
+    difficulty_routing: bool = False
+    fast_max_chars: int = 600  # Longer notes/questions always use thinking
+    fast_max_lines: int = 12
+    latency_slo: float = 20.0  # Seconds of EWMA latency before failing over
+    max_error_rate: float = 0.5  # EWMA share of failed calls
+    recovery: float = 120.0  # Seconds without calls before health resets
+    alpha: float = 0.3  # EWMA weight of the newest sample
+
+    def tier(self, text: str) -> str:
+        """Model tier for a note or question."""
+        if not self.difficulty_routing:
+            return TIER_THINKING
+        if len(text) > self.fast_max_chars or "```" in text:
+            return TIER_THINKING
+        if len([line for line in text.splitlines() if line.strip()]) > (
+            self.fast_max_lines
+        ):
+            return TIER_THINKING
+        return TIER_FAST
+
+
+@dataclass
+class ModelHealth:
+    """Recent latency and error rate of one provider model."""
+
+    latency: float = 0.0  # EWMA seconds
+    error_rate: float = 0.0  # EWMA of failures (0-1)
+    calls: int = 0
+    failures: int = 0
+    last_call: float = 0.0
+
+
+_health: dict[str, ModelHealth] = {}
+_health_lock = threading.Lock()
+
+
+def _record(key: str, seconds: float, ok: bool, alpha: float) -> None:
+    with _health_lock:
+        health = _health.setdefault(key, ModelHealth())
+        if health.calls == 0:
+            health.latency = seconds
+            health.error_rate = 0.0 if ok else 1.0
+        else:
+            health.latency += alpha * (seconds - health.latency)
+            health.error_rate += alpha * ((0.0 if ok else 1.0) - health.error_rate)
+        health.calls += 1
+        health.failures += 0 if ok else 1
+        health.last_call = time.monotonic()
+
+
+def get_routing_status() -> dict[str, dict]:
+    """Latency and error rate per ``provider:model`` for /api/status."""
+    with _health_lock:
+        return {
+            key: {
+                "latency_ewma": round(h.latency, 3),
+                "error_rate": round(h.error_rate, 3),
+                "calls": h.calls,
+                "failures": h.failures,
+            }
+            for key, h in _health.items()
+        }
+
+
+def reset_routing_state() -> None:
+    """Forget latency history (used by tests)."""
+    with _health_lock:
+        _health.clear()
+
+
+def _failover_error(exc: BaseException) -> bool:
+    return isinstance(exc, CircuitOpenError) or is_retryable(exc)
+
+
+class _Router:
+    """Routing logic shared by the sync and async wrappers."""
+
+    def __init__(self, backends: list, policy: RoutingPolicy):
+        self.backends = backends
+        self.policy = policy
+
+    @staticmethod
+    def _model(backend, tier: str) -> str:
+        config = backend.config
+        return config.model_fast if tier == TIER_FAST else config.model_thinking
+
+    def key(self, backend, tier: str) -> str:
+        return f"{backend.name}:{self._model(backend, tier)}"
+
+    def healthy(self, backend, tier: str) -> bool:
+        if get_circuit_breaker(backend.name).state == CIRCUIT_OPEN:
+            return False
+        with _health_lock:
+            health = _health.get(self.key(backend, tier))
+            if health is None or not health.calls:
+                return True
+            if time.monotonic() - health.last_call > self.policy.recovery:
+                return True
+            return (
+                health.latency <= self.policy.latency_slo
+                and health.error_rate <= self.policy.max_error_rate
+            )
+
+    def order(self, tier: str) -> list:
+        """Healthy backends first, in configured order."""
+        healthy = [b for b in self.backends if self.healthy(b, tier)]
+        return healthy + [b for b in self.backends if b not in healthy]
+
+    def record(self, backend, tier: str, started: float, ok: bool) -> None:
+        _record(
+            self.key(backend, tier),
+            time.monotonic() - started,
+            ok,
+            self.policy.alpha,
+        )
+
+    def fail_over(self, backend, tier: str, exc: Exception, last: bool) -> bool:
+        """Whether to try the next backend after ``exc``."""
+        if last or not _failover_error(exc):
+            return False
+        logger.warning(
+            f"{self.key(backend, tier)} failed ({exc}); trying the fallback backend"
+        )
+        return True
+
+
+class RoutingBackend(GardenerBackend):
+    """Sync backend that routes each call across model tiers and providers."""
+
+    def __init__(
+        self,
+        primary: GardenerBackend,
+        fallback: GardenerBackend | None = None,
+        policy: RoutingPolicy | None = None,
+    ):
+        super().__init__(primary.config)
+        self.primary = primary
+        self.fallback = fallback
+        self._router = _Router(
+            [b for b in (primary, fallback) if b is not None],
+            policy or RoutingPolicy(),
+        )
+
+    @property
+    def name(self) -> str:
+        return self.primary.name
+
+    @property
+    def supports_batch_prompt(self) -> bool:
+        return self.primary.supports_batch_prompt
+
+    @property
+    def has_batch_api(self) -> bool:
+        return self.primary.has_batch_api
+
+    def _route(self, tier: str, call: Callable[[GardenerBackend, bool], T]) -> T:
+        ordered = self._router.order(tier)
+        for i, backend in enumerate(ordered):
+            started = time.monotonic()
+            try:
+                result = call(backend, tier == TIER_FAST)
+            except Exception as e:
+                self._router.record(backend, tier, started, ok=False)
+                if self._router.fail_over(backend, tier, e, i == len(ordered) - 1):
+                    continue
+                raise
+            self._router.record(backend, tier, started, ok=True)
+            return result
+        raise RuntimeError("No backend configured")
+
+    def classify(
+        self,
+        note_content: str,
+        filename: str,
+        context: str,
+        fast: bool = False,
+        suggestion: str | None = None,
+    ) -> GardenerAction:
+        tier = TIER_FAST if fast else self._router.policy.tier(note_content)
+
+        def call(backend: GardenerBackend, use_fast: bool) -> GardenerAction:
+            if not use_fast and suggestion is None:
+                return backend.classify(note_content, filename, context)
+            return backend.classify(
+                note_content, filename, context, fast=use_fast, suggestion=suggestion
+            )
+
+        return self._route(tier, call)
+
+    def _classify_batch_request(
+        self, notes: Sequence[tuple[str, str]], context: str
+    ) -> list[GardenerAction | None]:
+        return self._route(
+            TIER_THINKING,
+            lambda backend, _: backend._classify_batch_request(notes, context),
+        )
+
+    def refine(self, content: str, related_context: str) -> str:
+        return self._route(
+            TIER_FAST, lambda backend, _: backend.refine(content, related_context)
+        )
+
+    def ask(self, question: str, related_context: str, fast: bool = False) -> str:
+        tier = TIER_FAST if fast else self._router.policy.tier(question)
+        return self._route(
+            tier,
+            lambda backend, use_fast: backend.ask(
+                question, related_context, fast=use_fast
+            ),
+        )
+
+    # Batch jobs are tied to the provider that accepted them
+    def submit_batch_job(
+        self, notes: Sequence[tuple[str, str, str]], context: str
+    ) -> str:
+        return self.primary.submit_batch_job(notes, context)
+
+    def get_batch_job_status(self, batch_id: str) -> str:
+        return self.primary.get_batch_job_status(batch_id)
+
+    def get_batch_job_results(self, batch_id: str) -> list[BatchJobResult]:
+        return self.primary.get_batch_job_results(batch_id)
+
+    def close(self):
+        self.primary.close()
+        if self.fallback is not None:
+            self.fallback.close()
+
+
+class AsyncRoutingBackend(AsyncGardenerBackend):
+    """Asyncio counterpart of RoutingBackend (ask/refine in the API)."""
+
+    def __init__(
+        self,
+        primary: AsyncGardenerBackend,
+        fallback: AsyncGardenerBackend | None = None,
+        policy: RoutingPolicy | None = None,
+    ):
+        super().__init__(primary.config)
+        self.primary = primary
+        self.fallback = fallback
+        self._router = _Router(
+            [b for b in (primary, fallback) if b is not None],
+            policy or RoutingPolicy(),
+        )
+
+    @property
+    def name(self) -> str:
+        return self.primary.name
+
+    async def _route(
+        self, tier: str, call: Callable[[AsyncGardenerBackend, bool], Awaitable[T]]
+    ) -> T:
+        ordered = self._router.order(tier)
+        for i, backend in enumerate(ordered):
+            started = time.monotonic()
+            try:
+                result = await call(backend, tier == TIER_FAST)
+            except Exception as e:
+                self._router.record(backend, tier, started, ok=False)
+                if self._router.fail_over(backend, tier, e, i == len(ordered) - 1):
+                    continue
+                raise
+            self._router.record(backend, tier, started, ok=True)
+            return result
+        raise RuntimeError("No backend configured")
+
+    async def _route_stream(
+        self,
+        tier: str,
+        start: Callable[[AsyncGardenerBackend, bool], AsyncGenerator[str, None]],
+    ) -> AsyncIterator[str]:
+        """Stream from the first backend that produces output.
+
+        Failover is only possible before the first chunk reaches the client.
+        """
+        ordered = self._router.order(tier)
+        for i, backend in enumerate(ordered):
+            started = time.monotonic()
+            stream = start(backend, tier == TIER_FAST)
+            try:
+                try:
+                    first = await anext(stream)
+                except StopAsyncIteration:
+                    self._router.record(backend, tier, started, ok=True)
+                    return
+                except Exception as e:
+                    self._router.record(backend, tier, started, ok=False)
+                    if self._router.fail_over(backend, tier, e, i == len(ordered) - 1):
+                        continue
+                    raise
+                try:
+                    yield first
+                    async for text in stream:
+                        yield text
+                except Exception:
+                    self._router.record(backend, tier, started, ok=False)
+                    raise
+                self._router.record(backend, tier, started, ok=True)
+                return
+            finally:
+                # Release the HTTP stream of an abandoned or finished attempt
+                await stream.aclose()
+
+    async def classify(
+        self, note_content: str, filename: str, context: str
+    ) -> GardenerAction:
+        return await self._route(
+            TIER_THINKING,
+            lambda backend, _: backend.classify(note_content, filename, context),
+        )
+
+    async def refine(self, content: str, related_context: str) -> str:
+        return await self._route(
+            TIER_FAST, lambda backend, _: backend.refine(content, related_context)
+        )
+
+    async def ask(self, question: str, related_context: str, fast: bool = False) -> str:
+        tier = TIER_FAST if fast else self._router.policy.tier(question)
+        return await self._route(
+            tier,
+            lambda backend, use_fast: backend.ask(
+                question, related_context, fast=use_fast
+            ),
+        )
+
+    # The streams return the routing generator itself, so a client that stops
+    # reading closes the backend stream underneath it
+    def refine_stream(self, content: str, related_context: str) -> AsyncIterator[str]:
+        return self._route_stream(
+            TIER_FAST,
+            lambda backend, _: backend.refine_stream(content, related_context),
+        )
+
+    def ask_stream(
+        self, question: str, related_context: str, fast: bool = False
+    ) -> AsyncIterator[str]:
+        tier = TIER_FAST if fast else self._router.policy.tier(question)
+        return self._route_stream(
+            tier,
+            lambda backend, use_fast: backend.ask_stream(
+                question, related_context, fast=use_fast
+            ),
+        )
+
+    async def aclose(self):
+        await self.primary.aclose()
+        if self.fallback is not None:
+            await self.fallback.aclose()
@@ -0,0 +1,425 @@
+"""Resilient request transport shared by every backend.
+
+Provider calls go through a Transport, which:
+
+- retries transient failures (connection errors, timeouts, 408/409/429/5xx)
+  with jittered exponential backoff, honoring ``Retry-After``;
+- trips a per-provider circuit breaker after repeated failures, so a
+  provider that is down is not hammered by every queued note and request;
+- optionally hedges latency-sensitive async calls (ask/refine): if the
+  first attempt has not answered within ``hedge_delay`` seconds, a second
+  identical request is raised and whichever finishes first wins. The
+  slower request is left to finish so its token usage can be recorded.
+
+Breakers and counters are process-wide per provider, so the sync and async
+variants of a backend share one view of provider health, and the state is
+reported on /api/status.
+"""
+
+import asyncio
+import logging
+import random
+import threading
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import TypeVar
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+RETRYABLE_STATUS = frozenset({408, 409, 429, 500, 502, 503, 504, 529})
+
+CIRCUIT_CLOSED = "closed"
+CIRCUIT_OPEN = "open"
+CIRCUIT_HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a provider whose circuit breaker is open."""
+
+    def __init__(self, provider: str, retry_in: float):
+        super().__init__(f"{provider} is failing; requests paused for {retry_in:.0f}s")
+        self.provider = provider
+        self.retry_in = retry_in
+
+
+def _status_code(exc: BaseException) -> int | None:
+    """HTTP status of an httpx or provider SDK error, if it has one."""
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return status
+    response = getattr(exc, "response", None)
+    status = getattr(response, "status_code", None)
+    return status if isinstance(status, int) else None
+
+
+def is_retryable(exc: BaseException) -> bool:
+    """Whether a failed call may succeed if sent again."""
+    if isinstance(exc, httpx.TransportError):
+        return True
+    status = _status_code(exc)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    # Provider SDK connection/timeout errors carry no response
+    return type(exc).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After header (delta-seconds or HTTP date)."""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max((when - datetime.now(timezone.utc)).total_seconds(), 0.0)
+
+
+def retry_after(exc: BaseException) -> float | None:
+    """Retry-After advertised by the error's response, if any."""
+    headers = getattr(getattr(exc, "response", None), "headers", None)
+    if headers is None:
+        return None
+    return parse_retry_after(headers.get("retry-after"))
+
+
+@dataclass
+class RetryPolicy:
+    """Jittered exponential backoff settings."""
+
+    max_attempts: int = 3
+    base_delay: float = 0.5
+    max_delay: float = 30.0
+
+    def delay(self, attempt: int, exc: BaseException) -> float | None:
+        """Seconds to sleep before retry ``attempt`` (1-based), or None to stop.
+
+        Uses "full jitter" backoff, but never less than the server's
+        Retry-After. A Retry-After beyond ``max_delay`` gives up instead of
+        blocking the caller for minutes.
+        """
+        if attempt >= self.max_attempts or not is_retryable(exc):
+            return None
+        backoff = random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+        advertised = retry_after(exc)
+        if advertised is None:
+            return backoff
+        if advertised > self.max_delay:
+            return None
+        return max(advertised, backoff)
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker for one provider.
+
+    After ``failure_threshold`` attempts in a row fail with a transient
+    error the circuit opens and calls fail fast with CircuitOpenError. Once
+    ``reset_timeout`` seconds pass, a single trial call is let through
+    (half-open): success closes the circuit, failure opens it again.
+    """
+
+    def __init__(self, provider: str, failure_threshold: int, reset_timeout: float):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._state = CIRCUIT_CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self.retries = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._refresh()
+            return self._state
+
+    def _refresh(self) -> None:
+        if (
+            self._state == CIRCUIT_OPEN
+            and time.monotonic() - self._opened_at >= self.reset_timeout
+        ):
+            self._state = CIRCUIT_HALF_OPEN
+            self._trial_in_flight = False
+
+    def before_call(self) -> None:
+        """Raise CircuitOpenError unless a call may be made now."""
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._refresh()
+            if self._state == CIRCUIT_CLOSED:
+                return
+            if self._state == CIRCUIT_HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            retry_in = max(
+                self.reset_timeout - (time.monotonic() - self._opened_at), 0.0
+            )
+        raise CircuitOpenError(self.provider, retry_in)
+
+    def record_success(self) -> None:
+        with self._lock:
+            if self._state != CIRCUIT_CLOSED:
+                logger.info(f"{self.provider} recovered; circuit closed")
+            self._state = CIRCUIT_CLOSED
+            self._failures = 0
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        if self.failure_threshold <= 0:
+            return
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == CIRCUIT_HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                if self._state != CIRCUIT_OPEN:
+                    logger.warning(
+                        f"{self.provider} failed {self._failures} time(s); "
+                        f"pausing requests for {self.reset_timeout:.0f}s"
+                    )
+                self._state = CIRCUIT_OPEN
+                self._opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Forget an abandoned (cancelled) call without judging the provider."""
+        with self._lock:
+            self._trial_in_flight = False
+
+    def record_outcome(self, exc: BaseException) -> None:
+        """Count a failed call; errors that are not transient are neutral.
+
+        A 400/401 says nothing about the provider's health either way, so it
+        neither resets the failure streak nor closes a half-open circuit.
+        """
+        if is_retryable(exc):
+            self.record_failure()
+        else:
+            self.release()
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def record_hedge(self, won: bool = False) -> None:
+        """Count a hedged request, or (``won``) a hedge that answered first."""
+        with self._lock:
+            if won:
+                self.hedge_wins += 1
+            else:
+                self.hedges += 1
+
+    def snapshot(self) -> dict:
+        """Breaker state and counters for /api/status."""
+        with self._lock:
+            self._refresh()
+            return {
+                "state": self._state,
+                "consecutive_failures": self._failures,
+                "retries": self.retries,
+                "hedged_requests": self.hedges,
+                "hedge_wins": self.hedge_wins,
+            }
+
+
+_breakers: dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_circuit_breaker(
+    provider: str, failure_threshold: int = 5, reset_timeout: float = 30.0
+) -> CircuitBreaker:
+    """Return the process-wide breaker for ``provider``, creating it once."""
+    with _breakers_lock:
+        breaker = _breakers.get(provider)
+        if breaker is None:
+            breaker = CircuitBreaker(provider, failure_threshold, reset_timeout)
+            _breakers[provider] = breaker
+        return breaker
+
+
+def get_transport_status() -> dict[str, dict]:
+    """Breaker state and retry/hedge counters for every provider used."""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {b.provider: b.snapshot() for b in breakers}
+
+
+def reset_transport_state() -> None:
+    """Forget all breakers (used by tests)."""
+    with _breakers_lock:
+        _breakers.clear()
+
+
+class Transport:
+    """Retry, circuit-breaker and hedging wrapper around provider calls."""
+
+    def __init__(
+        self,
+        provider: str,
+        policy: RetryPolicy,
+        breaker: CircuitBreaker,
+        hedge_delay: float = 0.0,
+    ):
+        self.provider = provider
+        self.policy = policy
+        self.breaker = breaker
+        self.hedge_delay = hedge_delay
+        self._losers: set[asyncio.Task] = set()
+
+    @classmethod
+    def from_config(cls, provider: str, config) -> "Transport":
+        """Build a transport from a BackendConfig's retry settings."""
+        return cls(
+            provider,
+            RetryPolicy(
+                max_attempts=max(config.retry_attempts, 1),
+                base_delay=config.retry_base_delay,
+                max_delay=config.retry_max_delay,
+            ),
+            get_circuit_breaker(
+                provider, config.circuit_failure_threshold, config.circuit_reset_timeout
+            ),
+            hedge_delay=config.hedge_delay,
+        )
+
+    def _next_delay(self, attempt: int, exc: BaseException) -> float | None:
+        delay = self.policy.delay(attempt, exc)
+        if delay is not None:
+            self.breaker.record_retry()
+            logger.warning(
+                f"{self.provider} request failed ({exc}); "
+                f"retry {attempt}/{self.policy.max_attempts - 1} in {delay:.2f}s"
+            )
+        return delay
+
+    def call(self, fn: Callable[[], T]) -> T:
+        """Run a blocking provider call with retries."""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            try:
+                result = fn()
+            except Exception as e:
+                self.breaker.record_outcome(e)
+                delay = self._next_delay(attempt, e)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def acall(self, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run an async provider call with retries."""
+        attempt = 0
+        while True:
+            attempt += 1
+            self.breaker.before_call()
+            try:
+                result = await fn()
+            except Exception as e:
+                self.breaker.record_outcome(e)
+                delay = self._next_delay(attempt, e)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                continue
+            except BaseException:
+                self.breaker.release()
+                raise
+            self.breaker.record_success()
+            return result
+
+    async def ahedged(
+        self,
+        fn: Callable[[], Awaitable[T]],
+        on_loser: Callable[[T], None] | None = None,
+    ) -> T:
+        """Like acall(), but race a second request if the first is slow.
+
+        Hedging trades extra provider spend for tail latency, so it only
+        applies when ``hedge_delay`` is set. With ``on_loser``, the slower
+        request is left to finish in the background and its result passed
+        to ``on_loser`` (to record the tokens it used); otherwise it is
+        cancelled.
+        """
+        if self.hedge_delay <= 0:
+            return await self.acall(fn)
+
+        primary = asyncio.ensure_future(self.acall(fn))
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=self.hedge_delay)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+        if done:
+            return primary.result()
+
+        self.breaker.record_hedge()
+        hedge = asyncio.ensure_future(self.acall(fn))
+        pending = {primary, hedge}
+        winner: asyncio.Future | None = None
+        error: BaseException | None = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                    elif winner is None:
+                        winner = task
+                    elif on_loser is not None:
+                        self._finish_loser(task, on_loser)
+                if winner is not None:
+                    if winner is hedge:
+                        self.breaker.record_hedge(won=True)
+                    return winner.result()
+            raise error
+        finally:
+            for task in pending:
+                if winner is None or on_loser is None:
+                    task.cancel()
+                else:
+                    self._finish_loser(task, on_loser)
+
+    def _finish_loser(self, task: asyncio.Task, on_loser: Callable[[T], None]) -> None:
+        """Hand a losing hedge's result to ``on_loser`` once it completes."""
+
+        def done(task: asyncio.Task) -> None:
+            self._losers.discard(task)
+            if task.cancelled() or task.exception() is not None:
+                return
+            try:
+                on_loser(task.result())
+            except Exception as e:
+                logger.warning(f"Failed to record losing hedge usage: {e}")
+
+        self._losers.add(task)
+        task.add_done_callback(done)
@@ -0,0 +1,233 @@
+"""Content-hash cache of classification decisions.
+
+Duplicate captures (retried MCP calls, double submits, repeated imports)
+would otherwise each cost a full classify call and write the same content
+twice. Decisions are cached by normalized note content, context version
+and model, so a repeat reuses the earlier GardenerAction without an AI call.
+In "skip" mode, a note whose content was already applied within the dedup
+window is archived as a duplicate instead of being written again.
+"""
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass
+
+import config
+from backends.base import GardenerAction
+from config import GARDENER_DEDUP_MODE, GARDENER_DEDUP_WINDOW
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+_CACHE_DB_PATH: str | None = None
+
+CLASSIFICATION_CACHE_SCHEMA = """
+-- Classification decisions keyed by normalized note content
+CREATE TABLE IF NOT EXISTS classification_cache (
+    content_hash TEXT NOT NULL,
+    context_version TEXT NOT NULL,
+    model TEXT NOT NULL,
+    action_json TEXT NOT NULL,
+    hits INTEGER DEFAULT 0,
+    created_at TEXT DEFAULT (datetime('now')),
+    last_hit_at TEXT,
+    PRIMARY KEY (content_hash, context_version, model)
+);
+
+-- When each note content was last written to the atlas
+CREATE TABLE IF NOT EXISTS applied_notes (
+    content_hash TEXT PRIMARY KEY,
+    filename TEXT NOT NULL,
+    applied_at TEXT DEFAULT (datetime('now'))
+);
+
+-- Lookup outcome counters: 'hit', 'miss', 'duplicate'
+CREATE TABLE IF NOT EXISTS classification_cache_stats (
+    event TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class ClassificationCacheStats:
+    """Cache size and lookup counters."""
+
+    mode: str
+    entries: int
+    hits: int
+    misses: int
+    duplicates_skipped: int
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered without an AI call."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+def init_classification_cache_db() -> None:
+    """Initialize classification cache tables."""
+    conn = get_db_connection()
+    try:
+        conn.executescript(CLASSIFICATION_CACHE_SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_cache_db() -> None:
+    global _CACHE_DB_PATH
+    current_path = str(config.STATE_DB)
+    if _CACHE_DB_PATH == current_path:
+        return
+    init_classification_cache_db()
+    _CACHE_DB_PATH = current_path
+
+
+def cache_enabled() -> bool:
+    """Whether classification decisions are cached and reused."""
+    return GARDENER_DEDUP_MODE != "off"
+
+
+def note_content_hash(note_content: str) -> str:
+    """Hash note content, ignoring line endings and whitespace differences."""
+    normalized = re.sub(r"\s+", " ", note_content.replace("\r\n", "\n")).strip()
+    return hashlib.sha256(normalized.encode()).hexdigest()
+
+
+def _count(conn, event: str) -> None:
+    conn.execute(
+        """INSERT INTO classification_cache_stats (event, count) VALUES (?, 1)
+           ON CONFLICT(event) DO UPDATE SET count = count + 1""",
+        (event,),
+    )
+
+
+def lookup_classification(
+    note_content: str, context_version: str, model: str
+) -> GardenerAction | None:
+    """Return the cached decision for this note, or None on a miss."""
+    if not cache_enabled():
+        return None
+    _ensure_cache_db()
+    key = (note_content_hash(note_content), context_version, model)
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            """SELECT action_json FROM classification_cache
+               WHERE content_hash = ? AND context_version = ? AND model = ?""",
+            key,
+        ).fetchone()
+        if row is None:
+            _count(conn, "miss")
+            conn.commit()
+            return None
+        conn.execute(
+            """UPDATE classification_cache
+               SET hits = hits + 1, last_hit_at = datetime('now')
+               WHERE content_hash = ? AND context_version = ? AND model = ?""",
+            key,
+        )
+        _count(conn, "hit")
+        conn.commit()
+    finally:
+        conn.close()
+    try:
+        return GardenerAction.model_validate_json(row["action_json"])
+    except ValueError as e:
+        logger.warning(f"Ignoring unreadable cached classification: {e}")
+        return None
+
+
+def store_classification(
+    note_content: str, context_version: str, model: str, action: GardenerAction
+) -> None:
+    """Remember the decision made for this note."""
+    if not cache_enabled():
+        return
+    _ensure_cache_db()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """INSERT OR REPLACE INTO classification_cache
+               (content_hash, context_version, model, action_json)
+               VALUES (?, ?, ?, ?)""",
+            (
+                note_content_hash(note_content),
+                context_version,
+                model,
+                action.model_dump_json(),
+            ),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def is_recent_duplicate(note_content: str) -> bool:
+    """Whether the same content was applied within the dedup window.
+
+    Only meaningful in "skip" mode; counts the duplicate when it returns True.
+    """
+    if GARDENER_DEDUP_MODE != "skip":
+        return False
+    _ensure_cache_db()
+    conn = get_db_connection()
+    try:
+        row = conn.execute(
+            """SELECT filename FROM applied_notes
+               WHERE content_hash = ? AND applied_at > datetime('now', ?)""",
+            (note_content_hash(note_content), f"-{GARDENER_DEDUP_WINDOW} seconds"),
+        ).fetchone()
+        if row is None:
+            return False
+        _count(conn, "duplicate")
+        conn.commit()
+        logger.info(f"Duplicate of {row['filename']}; skipping")
+        return True
+    finally:
+        conn.close()
+
+
+def record_applied_note(note_content: str, filename: str) -> None:
+    """Mark this content as written to the atlas now."""
+    if GARDENER_DEDUP_MODE != "skip":
+        return
+    _ensure_cache_db()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """INSERT OR REPLACE INTO applied_notes (content_hash, filename)
+               VALUES (?, ?)""",
+            (note_content_hash(note_content), filename),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_classification_cache_stats() -> ClassificationCacheStats:
+    """Return cache size and lookup counters."""
+    _ensure_cache_db()
+    conn = get_db_connection()
+    try:
+        (entries,) = conn.execute(
+            "SELECT COUNT(*) FROM classification_cache"
+        ).fetchone()
+        counts = {
+            row["event"]: row["count"]
+            for row in conn.execute(
+                "SELECT event, count FROM classification_cache_stats"
+            )
+        }
+    finally:
+        conn.close()
+    return ClassificationCacheStats(
+        mode=GARDENER_DEDUP_MODE,
+        entries=entries,
+        hits=counts.get("hit", 0),
+        misses=counts.get("miss", 0),
+        duplicates_skipped=counts.get("duplicate", 0),
+    )
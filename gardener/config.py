@@ -58,6 +58,78 @@ GARDENER_AUTO = os.environ.get("GARDENER_AUTO", "false").lower() in ("true", "1"
 GARDENER_MODE = os.environ.get("GARDENER_MODE", "watch")  # "watch" or "poll"
 GARDENER_POLL_INTERVAL = int(os.environ.get("GARDENER_POLL_INTERVAL", "300"))  # seconds
 GARDENER_DEBOUNCE = float(os.environ.get("GARDENER_DEBOUNCE", "5.0"))  # seconds
+# Upper bound on how long the watcher holds changed notes while events keep arriving
+GARDENER_DEBOUNCE_MAX_WAIT = float(
+    os.environ.get("GARDENER_DEBOUNCE_MAX_WAIT", "30.0")
+)  # seconds
+# Notes classified in parallel; file writes, git and archiving stay serialized
+GARDENER_CONCURRENCY = max(1, int(os.environ.get("GARDENER_CONCURRENCY", "4")))
+# Short notes packed into one classification request (1 disables batching)
+GARDENER_BATCH_SIZE = max(1, int(os.environ.get("GARDENER_BATCH_SIZE", "1")))
+# Estimated note tokens per batch request (the shared context is not counted)
+GARDENER_BATCH_TOKENS = int(os.environ.get("GARDENER_BATCH_TOKENS", "2000"))
+# Estimated tokens of AGENTS.md + GARDENER.md per classification (0 = off)
+GARDENER_CONTEXT_TOKENS = int(os.environ.get("GARDENER_CONTEXT_TOKENS", "0"))
+# Estimated tokens of a note per classification; longer notes are excerpted (0 = off)
+GARDENER_NOTE_TOKENS = int(os.environ.get("GARDENER_NOTE_TOKENS", "6000"))
+# Append targets reaching this size roll over into a new segment (0 = off)
+GARDENER_SEGMENT_KB = int(os.environ.get("GARDENER_SEGMENT_KB", "0"))
+# 'month' also starts a new segment each calendar month; 'none' = size only
+GARDENER_SEGMENT_PERIOD = os.environ.get("GARDENER_SEGMENT_PERIOD", "none").lower()
+# Archive shards older than this many months are packed into zip bundles (0 = off)
+GARDENER_ARCHIVE_COLD_MONTHS = int(os.environ.get("GARDENER_ARCHIVE_COLD_MONTHS", "0"))
+# Failed classifications per note before it is left alone until edited
+GARDENER_JOB_MAX_ATTEMPTS = max(
+    1, int(os.environ.get("GARDENER_JOB_MAX_ATTEMPTS", "3"))
+)
+# Notes per scheduler unit; new captures are picked up between units
+GARDENER_SCHEDULER_SLICE = max(1, int(os.environ.get("GARDENER_SCHEDULER_SLICE", "10")))
+# Duplicate notes: "reuse" reuses cached decisions (repeats are still written),
+# "skip" also archives repeats seen within GARDENER_DEDUP_WINDOW seconds,
+# "off" disables the classification cache
+GARDENER_DEDUP_MODE = os.environ.get("GARDENER_DEDUP", "reuse").lower()
+if GARDENER_DEDUP_MODE not in ("skip", "reuse", "off"):
+    GARDENER_DEDUP_MODE = "reuse"
+GARDENER_DEDUP_WINDOW = int(os.environ.get("GARDENER_DEDUP_WINDOW", "3600"))
+# Near-duplicate notes: "flag" reports them on capture and in the logs,
+# "reuse" also reuses the earlier note's classification instead of an AI call,
+# "skip" also archives near-duplicates of written notes without writing them
+GARDENER_NEAR_DUP_MODE = os.environ.get("GARDENER_NEAR_DUP", "flag").lower()
+if GARDENER_NEAR_DUP_MODE not in ("skip", "reuse", "flag", "off"):
+    GARDENER_NEAR_DUP_MODE = "flag"
+# Estimated word-shingle similarity (0-1) at which notes count as near-duplicates
+GARDENER_NEAR_DUP_THRESHOLD = float(
+    os.environ.get("GARDENER_NEAR_DUP_THRESHOLD", "0.8")
+)
+# Days a note stays in the near-duplicate index
+GARDENER_NEAR_DUP_DAYS = int(os.environ.get("GARDENER_NEAR_DUP_DAYS", "30"))
+# Backlog mode (provider batch APIs): notes per batch job and poll interval
+GARDENER_BACKLOG_BATCH_SIZE = max(
+    1, int(os.environ.get("GARDENER_BACKLOG_BATCH_SIZE", "1000"))
+)
+GARDENER_BACKLOG_POLL_INTERVAL = float(
+    os.environ.get("GARDENER_BACKLOG_POLL_INTERVAL", "60")
+)
+# Local pre-classifier: "off", "fast" (fast model formats confident notes)
+# or "template" (confident notes are filed as-is, no AI call)
+GARDENER_PRECLASSIFY_MODE = os.environ.get("GARDENER_PRECLASSIFY", "off").lower()
+if GARDENER_PRECLASSIFY_MODE not in ("off", "fast", "template"):
+    GARDENER_PRECLASSIFY_MODE = "off"
+# Minimum posterior probability for a pre-classified destination
+GARDENER_PRECLASSIFY_THRESHOLD = float(
+    os.environ.get("GARDENER_PRECLASSIFY_THRESHOLD", "0.95")
+)
+# Past decisions needed before the pre-classifier is trusted at all
+GARDENER_PRECLASSIFY_MIN_EXAMPLES = int(
+    os.environ.get("GARDENER_PRECLASSIFY_MIN_EXAMPLES", "50")
+)
+# "embedded": an API process gardens when no standalone worker is running;
+# "external": API processes only queue work for `python -m workers.gardener --serve`
+GARDENER_WORKER_MODE = os.environ.get("GARDENER_WORKER_MODE", "embedded")
+# Seconds between worker checks of the request queue
+GARDENER_WORKER_POLL = float(os.environ.get("GARDENER_WORKER_POLL", "1.0"))
+# Seconds an API request waits for the worker (e.g. reconcile) before failing
+GARDENER_WORKER_TIMEOUT = float(os.environ.get("GARDENER_WORKER_TIMEOUT", "300"))
 
 # Authentication (opt-in, disabled by default)
 # Set ATHENA_AUTH_TOKEN to enable token authentication for API and MCP endpoints
@@ -66,3 +138,5 @@ AUTH_ENABLED = bool(AUTH_TOKEN)
 
 # Input validation
 MAX_CONTENT_SIZE = int(os.environ.get("MAX_CONTENT_SIZE", "102400"))  # 100KB default
+# Notes accepted by one POST /api/inbox/bulk request
+MAX_BULK_NOTES = int(os.environ.get("MAX_BULK_NOTES", "1000"))
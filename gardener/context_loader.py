@@ -0,0 +1,165 @@
+"""Cached classification context for the gardener.
+
+AGENTS.md and GARDENER.md are read for every note the gardener classifies,
+but change rarely. The loader keeps the assembled context (plus its token
+estimate and version hash) in memory and only re-reads the files when their
+mtime or size changes, so a batch of notes shares one context string (and
+the backends' memoized prompt prefix built from it).
+
+The assembled context is held to a token budget (GARDENER_CONTEXT_TOKENS) so
+the prompt does not grow without bound as the rules are extended. Over
+budget, whole markdown sections are collapsed to their heading and first
+line, least important first: the first source before the second (AGENTS.md
+before the GARDENER.md rules), and within a file the last section before
+the first. Only if that is still not enough is the text cut off.
+"""
+
+import hashlib
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+
+from backends.base import estimate_tokens
+from config import GARDENER_CONTEXT_TOKENS
+
+logger = logging.getLogger(__name__)
+
+# (title, path) pairs in the order they appear in the assembled context;
+# later sources are kept longer when the context is over budget
+ContextSources = tuple[tuple[str, Path], ...]
+
+_HEADING = re.compile(r"^#{1,6}\s")
+_FENCE = re.compile(r"^\s*(```|~~~)")
+
+SECTION_TRIMMED = "[Section trimmed to fit the context budget]"
+CONTEXT_TRUNCATED = "\n\n[Context truncated to fit the context budget]"
+
+
+@dataclass(frozen=True)
+class ClassificationContext:
+    """Assembled context files shared across classification calls."""
+
+    text: str
+    version: str  # Short content hash; changes whenever the text changes
+    token_estimate: int
+    full_token_estimate: int = 0  # Before trimming to the budget
+    trimmed_sections: int = 0
+
+
+def _file_signature(path: Path) -> tuple[int, int] | None:
+    """Return (mtime_ns, size) for a file, or None if it does not exist."""
+    if not path.exists():
+        return None
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+
+def split_sections(markdown: str) -> list[str]:
+    """Split markdown at headings (outside code fences), keeping the text."""
+    sections: list[list[str]] = [[]]
+    in_fence = False
+    for line in markdown.splitlines(keepends=True):
+        if _FENCE.match(line):
+            in_fence = not in_fence
+        elif not in_fence and _HEADING.match(line) and sections[-1]:
+            sections.append([])
+        sections[-1].append(line)
+    return ["".join(lines) for lines in sections if lines]
+
+
+def _summarize_section(section: str) -> str:
+    """Collapse a section to its first non-empty line (usually the heading)."""
+    first = next((line for line in section.splitlines() if line.strip()), "")
+    return f"{first}\n{SECTION_TRIMMED}\n\n"
+
+
+def _join(documents: list[tuple[str, list[str]]]) -> str:
+    return "\n\n---\n\n".join(
+        f"# {title}\n{''.join(sections)}" for title, sections in documents
+    )
+
+
+def _build_context(sources: ContextSources, budget: int = 0) -> ClassificationContext:
+    documents = [
+        (title, split_sections(path.read_text()))
+        for title, path in sources
+        if path.exists()
+    ]
+    text = _join(documents)
+    full_tokens = estimate_tokens(text)
+    trimmed = 0
+    if budget and full_tokens > budget:
+        for _, sections in documents:
+            for i in reversed(range(len(sections))):
+                if estimate_tokens(text) <= budget:
+                    break
+                summary = _summarize_section(sections[i])
+                if len(summary) < len(sections[i]):
+                    sections[i] = summary
+                    trimmed += 1
+                    text = _join(documents)
+        if estimate_tokens(text) > budget:
+            text = text[: budget * 4 - len(CONTEXT_TRUNCATED)] + CONTEXT_TRUNCATED
+        logger.warning(
+            f"Classification context is ~{full_tokens} tokens, over the "
+            f"{budget} token budget; trimmed {trimmed} section(s)"
+        )
+    return ClassificationContext(
+        text=text,
+        version=hashlib.sha256(text.encode()).hexdigest()[:16],
+        token_estimate=estimate_tokens(text),
+        full_token_estimate=full_tokens,
+        trimmed_sections=trimmed,
+    )
+
+
+class ContextLoader:
+    """Thread-safe, mtime-keyed cache of the classification context."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._key: tuple | None = None
+        self._context: ClassificationContext | None = None
+
+    def get(self, sources: ContextSources, budget: int = 0) -> ClassificationContext:
+        """Return the context for ``sources``, re-reading only on change.
+
+        ``budget`` caps the estimated tokens of the assembled text (0 means
+        no limit).
+        """
+        key = (budget, *((path, _file_signature(path)) for _, path in sources))
+        with self._lock:
+            if self._context is None or key != self._key:
+                self._context = _build_context(sources, budget)
+                self._key = key
+                logger.debug(
+                    f"Loaded classification context {self._context.version} "
+                    f"(~{self._context.token_estimate} tokens)"
+                )
+            return self._context
+
+    def invalidate(self) -> None:
+        """Drop the cached context so the next call re-reads the files."""
+        with self._lock:
+            self._key = None
+            self._context = None
+
+
+_loader = ContextLoader()
+
+
+def load_classification_context(
+    agents_file: Path, gardener_file: Path, budget: int = GARDENER_CONTEXT_TOKENS
+) -> ClassificationContext:
+    """Return the cached context built from AGENTS.md and GARDENER.md."""
+    return _loader.get(
+        (("System Context", agents_file), ("Classification Rules", gardener_file)),
+        budget,
+    )
+
+
+def invalidate_classification_context() -> None:
+    """Force the next classification to re-read the context files."""
+    _loader.invalidate()
@@ -5,7 +5,7 @@ import sqlite3
 import config
 
 # Schema version for migrations
-SCHEMA_VERSION = 1
+SCHEMA_VERSION = 3
 
 SCHEMA = """
 -- Track processed commits
@@ -68,7 +68,12 @@ CREATE TABLE IF NOT EXISTS api_calls (
     operation TEXT NOT NULL,  -- 'classify', 'refine', 'ask'
     timestamp TEXT DEFAULT (datetime('now')),
     success INTEGER DEFAULT 1,  -- 1 for success, 0 for failure
-    error TEXT
+    error TEXT,
+    model TEXT,
+    prompt_tokens INTEGER DEFAULT 0,  -- Total input tokens, including cached
+    completion_tokens INTEGER DEFAULT 0,
+    cached_tokens INTEGER DEFAULT 0,  -- Input tokens served from provider cache
+    cache_write_tokens INTEGER DEFAULT 0  -- Input tokens written to provider cache
 );
 
 -- Schema version tracking
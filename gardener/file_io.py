@@ -0,0 +1,100 @@
+"""Crash-safe writes for atlas and inbox files.
+
+- append_text opens the file with O_APPEND, so an append costs the size of
+  the new text rather than a read and rewrite of the whole note, and an
+  interrupted append can only leave a partial tail, never lose what was
+  already there.
+- write_text_atomic writes a temporary file next to the target, fsyncs it
+  and renames it over the target. Readers (the inbox watcher, git, the UI)
+  see either the old or the new content, never a half-written file.
+
+Both hold a per-path lock while writing: threads writing different files
+proceed in parallel, while writes to the same file are serialized.
+"""
+
+import os
+import tempfile
+import threading
+from pathlib import Path
+
+# Read once at import: changing the umask to read it is not thread-safe
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+_path_locks: dict[str, threading.RLock] = {}
+_path_locks_guard = threading.Lock()
+
+
+def path_lock(path: Path) -> threading.RLock:
+    """Return the lock serializing writes to ``path`` within this process.
+
+    The lock is reentrant, so a caller can hold it across several writes to
+    the same file (e.g. a rollover followed by an append).
+    """
+    key = os.path.realpath(path)
+    with _path_locks_guard:
+        lock = _path_locks.get(key)
+        if lock is None:
+            lock = _path_locks[key] = threading.RLock()
+        return lock
+
+
+def _write_all(fd: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(fd, view) :]
+
+
+def fsync_dir(directory: Path) -> None:
+    """Persist a rename by syncing its directory entry (POSIX only)."""
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def append_text(path: Path, text: str) -> None:
+    """Append ``text`` to ``path`` (created if missing) in a single write."""
+    with path_lock(path):
+        fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            _write_all(fd, text.encode("utf-8"))
+            os.fsync(fd)
+        finally:
+            os.close(fd)
+
+
+def write_text_atomic(path: Path, text: str, sync_dir: bool = True) -> None:
+    """Replace the content of ``path`` with ``text`` in one rename.
+
+    A new file gets mode 0644 (subject to the umask); an existing file keeps
+    its mode. Callers writing many files to one directory can pass
+    ``sync_dir=False`` and call fsync_dir once at the end.
+    """
+    with path_lock(path):
+        try:
+            mode = path.stat().st_mode & 0o777
+        except FileNotFoundError:
+            mode = 0o644 & ~_UMASK
+        fd, tmp_name = tempfile.mkstemp(
+            prefix=f".{path.name}.", suffix=".tmp", dir=path.parent
+        )
+        try:
+            try:
+                _write_all(fd, text.encode("utf-8"))
+                os.fchmod(fd, mode)
+                os.fsync(fd)
+            finally:
+                os.close(fd)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+        if sync_dir:
+            fsync_dir(path.parent)
@@ -0,0 +1,232 @@
+"""Writing notes into the inbox, one at a time or in bulk.
+
+Bulk imports (POST /api/inbox/bulk, the add_notes MCP tool) validate each
+note on its own, so one bad item does not fail the rest, and skip notes
+whose content is already in the inbox or earlier in the same import. Notes
+are written with atomic renames and the inbox directory is synced once per
+import rather than once per note.
+
+Imported notes may carry their original creation time, which becomes the
+timestamp in their filename (and so decides their archive shard).
+"""
+
+import hashlib
+import io
+import json
+import logging
+import tarfile
+import zipfile
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from datetime import datetime
+from pathlib import Path, PurePosixPath
+from uuid import uuid4
+
+import config
+from file_io import fsync_dir, write_text_atomic
+
+logger = logging.getLogger(__name__)
+
+STATUS_SAVED = "saved"
+STATUS_DUPLICATE = "duplicate"
+STATUS_INVALID = "invalid"
+STATUS_ERROR = "error"
+
+# Files taken from an uploaded tar/zip archive
+NOTE_SUFFIXES = (".md", ".markdown", ".txt")
+
+
+@dataclass
+class InboxItem:
+    """One note to import; ``error`` is set when it could not be parsed."""
+
+    content: str = ""
+    created: datetime | None = None
+    source: str | None = None  # Archive member name, echoed in results
+    error: str | None = None
+
+
+@dataclass
+class InboxItemResult:
+    """Outcome of importing one note, in request order."""
+
+    index: int
+    status: str
+    filename: str | None = None  # Saved note, or the one it duplicates
+    source: str | None = None
+    error: str | None = None
+
+
+def inbox_filename(created: datetime | None = None) -> str:
+    """Timestamped inbox filename, e.g. ``2026-03-05_1412-ab12cd34.md``."""
+    stamp = (created or datetime.now()).strftime("%Y-%m-%d_%H%M")
+    return f"{stamp}-{uuid4().hex[:8]}.md"
+
+
+def validate_content(content: str, max_size: int | None = None) -> str:
+    """Stripped note content; raises ValueError if empty or too large."""
+    max_size = config.MAX_CONTENT_SIZE if max_size is None else max_size
+    content = content.strip()
+    if not content:
+        raise ValueError("Content cannot be empty")
+    if len(content) > max_size:
+        raise ValueError(f"Content too large (max {max_size // 1024}KB)")
+    return content
+
+
+def parse_ndjson_line(line: bytes | str) -> InboxItem:
+    """Parse one NDJSON line: a string, or ``{"content": ..., "created": ...}``."""
+    try:
+        value = json.loads(line)
+    except ValueError as e:
+        return InboxItem(error=f"Invalid JSON: {e}")
+    if isinstance(value, str):
+        return InboxItem(content=value)
+    if not isinstance(value, dict) or not isinstance(value.get("content"), str):
+        return InboxItem(error="Expected a string or an object with 'content'")
+
+    created = None
+    if value.get("created") is not None:
+        try:
+            created = datetime.fromisoformat(str(value["created"]))
+        except ValueError:
+            return InboxItem(error=f"Invalid 'created' time: {value['created']}")
+    return InboxItem(content=value["content"], created=created)
+
+
+def _is_note(name: str) -> bool:
+    path = PurePosixPath(name)
+    if any(part.startswith(".") or part == "__MACOSX" for part in path.parts):
+        return False
+    return path.suffix.lower() in NOTE_SUFFIXES
+
+
+def _member_item(name: str, size: int, created: datetime, read) -> InboxItem:
+    max_size = config.MAX_CONTENT_SIZE
+    # Checked before reading, so an oversized member is never decompressed
+    # (``size`` is in bytes; a character takes up to 4)
+    if size > max_size * 4:
+        return InboxItem(source=name, error=f"Too large (max {max_size // 1024}KB)")
+    try:
+        content = read().decode("utf-8")
+    except UnicodeDecodeError:
+        return InboxItem(source=name, error="Not UTF-8 text")
+    return InboxItem(content=content, created=created, source=name)
+
+
+def read_note_bundle(data: bytes) -> Iterator[InboxItem]:
+    """Notes in an uploaded zip or (optionally compressed) tar archive.
+
+    Members are read straight from the archive without extracting anything
+    to disk; their modification time becomes the note's creation time.
+
+    Raises:
+        ValueError: If ``data`` is not a zip or tar archive
+    """
+    if zipfile.is_zipfile(io.BytesIO(data)):
+        with zipfile.ZipFile(io.BytesIO(data)) as bundle:
+            for info in sorted(bundle.infolist(), key=lambda i: i.filename):
+                if info.is_dir() or not _is_note(info.filename):
+                    continue
+                yield _member_item(
+                    info.filename,
+                    info.file_size,
+                    datetime(*info.date_time),
+                    lambda info=info: bundle.read(info),
+                )
+        return
+
+    try:
+        bundle = tarfile.open(fileobj=io.BytesIO(data), mode="r:*")
+    except tarfile.TarError as e:
+        raise ValueError("Upload is not a zip or tar archive") from e
+    with bundle:
+        for member in sorted(bundle.getmembers(), key=lambda m: m.name):
+            if not member.isfile() or not _is_note(member.name):
+                continue
+            yield _member_item(
+                member.name,
+                member.size,
+                datetime.fromtimestamp(member.mtime),
+                lambda member=member: bundle.extractfile(member).read(),
+            )
+
+
+def _content_hash(content: str) -> str:
+    return hashlib.sha256(content.encode("utf-8")).hexdigest()
+
+
+class _InboxHashes:
+    """Content hashes of notes already in the inbox, read on demand.
+
+    Only inbox notes with the same byte size as a new note are read, so an
+    import into a large inbox costs a directory listing plus a few reads.
+    """
+
+    def __init__(self, inbox_dir: Path):
+        self._by_size: dict[int, list[Path]] = {}
+        self._hashes: dict[str, str] = {}
+        for path in inbox_dir.glob("*.md"):
+            try:
+                size = path.stat().st_size
+            except OSError:
+                continue
+            self._by_size.setdefault(size, []).append(path)
+
+    def find(self, content: str, digest: str) -> str | None:
+        """Filename of an inbox note with this content, if any."""
+        for path in self._by_size.pop(len(content.encode("utf-8")), []):
+            try:
+                self._hashes.setdefault(_content_hash(path.read_text()), path.name)
+            except (OSError, ValueError):
+                continue
+        return self._hashes.get(digest)
+
+    def add(self, digest: str, filename: str) -> None:
+        self._hashes.setdefault(digest, filename)
+
+
+def write_inbox_notes(
+    items: Iterable[InboxItem], inbox_dir: Path | None = None
+) -> list[InboxItemResult]:
+    """Validate, deduplicate and write notes to the inbox.
+
+    Returns one result per item, in order. The caller schedules the saved
+    notes (see worker.schedule_notes).
+    """
+    inbox_dir = inbox_dir or config.INBOX_DIR
+    inbox_dir.mkdir(parents=True, exist_ok=True)
+    existing = _InboxHashes(inbox_dir)
+
+    results = []
+    for index, item in enumerate(items):
+        result = InboxItemResult(index=index, status=STATUS_SAVED, source=item.source)
+        results.append(result)
+        try:
+            if item.error:
+                raise ValueError(item.error)
+            content = validate_content(item.content)
+        except ValueError as e:
+            result.status, result.error = STATUS_INVALID, str(e)
+            continue
+
+        digest = _content_hash(content)
+        duplicate = existing.find(content, digest)
+        if duplicate is not None:
+            result.status, result.filename = STATUS_DUPLICATE, duplicate
+            continue
+
+        filename = inbox_filename(item.created)
+        try:
+            write_text_atomic(inbox_dir / filename, content, sync_dir=False)
+        except OSError as e:
+            logger.error(f"Failed to write inbox file {filename}: {e}")
+            result.status, result.error = STATUS_ERROR, str(e)
+            continue
+        result.filename = filename
+        existing.add(digest, filename)
+
+    fsync_dir(inbox_dir)
+    saved = sum(1 for r in results if r.status == STATUS_SAVED)
+    logger.info(f"Imported {saved} of {len(results)} note(s) into the inbox")
+    return results
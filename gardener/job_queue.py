@@ -0,0 +1,323 @@
+"""Durable per-note job state for inbox processing.
+
+Every inbox note the gardener picks up gets a row in ``gardener_jobs`` that
+moves through:
+
+    queued -> classifying -> classified -> applied -> archived
+                         \\-> failed (after GARDENER_JOB_MAX_ATTEMPTS)
+
+Failed classifications and failed writes of a classified note both count
+as attempts, so a note whose action can never be written ends up failed
+instead of being retried on every run.
+
+The classified GardenerAction is stored with the job, so a worker that
+crashes after paying for a classification applies the stored action on
+restart instead of classifying again. A job caught in ``classifying`` by a
+crash goes back to ``queued``; one caught in ``applied`` is only archived.
+"""
+
+import logging
+from dataclasses import dataclass
+from pathlib import Path
+
+import config
+from backends.base import GardenerAction
+from classification_cache import note_content_hash
+from config import GARDENER_JOB_MAX_ATTEMPTS
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+_JOBS_DB_PATH: str | None = None
+
+JOB_QUEUED = "queued"
+JOB_CLASSIFYING = "classifying"
+JOB_CLASSIFIED = "classified"
+JOB_APPLIED = "applied"
+JOB_ARCHIVED = "archived"
+JOB_FAILED = "failed"
+
+JOB_QUEUE_SCHEMA = """
+-- One row per inbox note the gardener has picked up
+CREATE TABLE IF NOT EXISTS gardener_jobs (
+    id INTEGER PRIMARY KEY,
+    filename TEXT NOT NULL,
+    content_hash TEXT NOT NULL,
+    state TEXT NOT NULL DEFAULT 'queued',  -- see job_queue.JOB_* constants
+    attempts INTEGER NOT NULL DEFAULT 0,  -- Failed classify/apply attempts
+    action_json TEXT,  -- GardenerAction once classified
+    target_path TEXT,  -- File written when applied
+    error TEXT,
+    created_at TEXT DEFAULT (datetime('now')),
+    updated_at TEXT DEFAULT (datetime('now'))
+);
+
+-- At most one unfinished job per inbox filename
+CREATE UNIQUE INDEX IF NOT EXISTS idx_gardener_jobs_active
+    ON gardener_jobs(filename) WHERE state NOT IN ('archived', 'failed');
+CREATE INDEX IF NOT EXISTS idx_gardener_jobs_state ON gardener_jobs(state);
+"""
+
+
+@dataclass
+class Job:
+    """Persistent state of one inbox note."""
+
+    id: int
+    filename: str
+    content_hash: str
+    state: str
+    attempts: int
+    action: GardenerAction | None = None
+    target_path: str | None = None
+    error: str | None = None
+
+
+def init_job_queue_db() -> None:
+    """Initialize job queue tables."""
+    conn = get_db_connection()
+    try:
+        conn.executescript(JOB_QUEUE_SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_jobs_db() -> None:
+    global _JOBS_DB_PATH
+    current_path = str(config.STATE_DB)
+    if _JOBS_DB_PATH == current_path:
+        return
+    init_job_queue_db()
+    _JOBS_DB_PATH = current_path
+
+
+def _row_to_job(row) -> Job:
+    action = None
+    if row["action_json"]:
+        try:
+            action = GardenerAction.model_validate_json(row["action_json"])
+        except ValueError as e:
+            logger.warning(
+                f"Ignoring unreadable stored action for job {row['id']}: {e}"
+            )
+    return Job(
+        id=row["id"],
+        filename=row["filename"],
+        content_hash=row["content_hash"],
+        state=row["state"],
+        attempts=row["attempts"],
+        action=action,
+        target_path=row["target_path"],
+        error=row["error"],
+    )
+
+
+def _update(job_id: int, **fields) -> None:
+    _ensure_jobs_db()
+    assignments = ", ".join(f"{name} = ?" for name in fields)
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            f"UPDATE gardener_jobs SET {assignments}, updated_at = datetime('now') "
+            "WHERE id = ?",
+            (*fields.values(), job_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def sync_inbox_jobs(inbox_dir: Path, inbox_files: list[Path]) -> list[Job]:
+    """Return one job per inbox file, creating or recovering as needed.
+
+    - New files get a ``queued`` job.
+    - Jobs interrupted mid-classification go back to ``queued``.
+    - If a note was edited since it was queued or classified, its stored
+      action is dropped and it is classified again. An edit also gives a
+      note that ran out of attempts a fresh job.
+    - Unfinished jobs whose file has left the inbox are closed: ``applied``
+      ones were archived just before a crash, the rest are marked failed.
+
+    Jobs are returned in the order of ``inbox_files``.
+    """
+    _ensure_jobs_db()
+    hashes = {f.name: note_content_hash(f.read_text()) for f in inbox_files}
+    conn = get_db_connection()
+    try:
+        active = {
+            row["filename"]: row
+            for row in conn.execute(
+                "SELECT * FROM gardener_jobs "
+                "WHERE state NOT IN ('archived', 'failed') ORDER BY id"
+            )
+        }
+        exhausted = {
+            row["filename"]: row
+            for row in conn.execute(
+                "SELECT * FROM gardener_jobs WHERE state = 'failed' AND attempts >= ? "
+                "ORDER BY id",
+                (GARDENER_JOB_MAX_ATTEMPTS,),
+            )
+        }
+
+        for filename, row in active.items():
+            if filename in hashes or (inbox_dir / filename).exists():
+                continue
+            state, error = (
+                (JOB_ARCHIVED, None)
+                if row["state"] == JOB_APPLIED
+                else (JOB_FAILED, "no longer in inbox")
+            )
+            conn.execute(
+                """UPDATE gardener_jobs SET state = ?, error = ?,
+                   updated_at = datetime('now') WHERE id = ?""",
+                (state, error, row["id"]),
+            )
+
+        job_ids = {}
+        for filename, content_hash in hashes.items():
+            row = active.get(filename)
+            if row is None:
+                dead = exhausted.get(filename)
+                if dead is not None and dead["content_hash"] == content_hash:
+                    job_ids[filename] = dead["id"]
+                    continue
+                job_ids[filename] = conn.execute(
+                    "INSERT INTO gardener_jobs (filename, content_hash) VALUES (?, ?)",
+                    (filename, content_hash),
+                ).lastrowid
+                continue
+            job_ids[filename] = row["id"]
+            if row["state"] == JOB_CLASSIFYING or (
+                row["content_hash"] != content_hash and row["state"] != JOB_APPLIED
+            ):
+                if row["state"] == JOB_CLASSIFYING:
+                    logger.info(f"Resuming interrupted classification of {filename}")
+                conn.execute(
+                    """UPDATE gardener_jobs
+                       SET state = 'queued', content_hash = ?, action_json = NULL,
+                           updated_at = datetime('now')
+                       WHERE id = ?""",
+                    (content_hash, row["id"]),
+                )
+        conn.commit()
+
+        jobs = []
+        for inbox_file in inbox_files:
+            row = conn.execute(
+                "SELECT * FROM gardener_jobs WHERE id = ?",
+                (job_ids[inbox_file.name],),
+            ).fetchone()
+            jobs.append(_row_to_job(row))
+    finally:
+        conn.close()
+    return jobs
+
+
+def mark_classifying(job_id: int) -> None:
+    """The job's note has been handed to the backend."""
+    _update(job_id, state=JOB_CLASSIFYING)
+
+
+def mark_classified(job_id: int, action: GardenerAction) -> None:
+    """Store the classification so it is never paid for twice."""
+    _update(
+        job_id, state=JOB_CLASSIFIED, action_json=action.model_dump_json(), error=None
+    )
+
+
+def mark_applied(job_id: int, target_path: Path | None) -> None:
+    """The action has been written to the atlas; only archiving remains."""
+    _update(
+        job_id,
+        state=JOB_APPLIED,
+        target_path=str(target_path) if target_path else None,
+    )
+
+
+def mark_archived(job_id: int) -> None:
+    """The note has been archived; the job is done."""
+    _update(job_id, state=JOB_ARCHIVED)
+
+
+def requeue_job(job_id: int, error: str) -> None:
+    """Put a job back without counting an attempt (e.g. rate limited)."""
+    _update(job_id, state=JOB_QUEUED, error=error)
+
+
+def record_job_failure(job_id: int, error: str) -> str:
+    """Count a failed classification attempt.
+
+    The job is requeued for the next run until it has failed
+    GARDENER_JOB_MAX_ATTEMPTS times; then it is marked failed and skipped
+    until the note is edited.
+
+    Returns:
+        The job's new state
+    """
+    _ensure_jobs_db()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """UPDATE gardener_jobs
+               SET attempts = attempts + 1, error = ?,
+                   state = CASE WHEN attempts + 1 >= ? THEN 'failed' ELSE 'queued' END,
+                   updated_at = datetime('now')
+               WHERE id = ?""",
+            (error, GARDENER_JOB_MAX_ATTEMPTS, job_id),
+        )
+        conn.commit()
+        (state,) = conn.execute(
+            "SELECT state FROM gardener_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    return state
+
+
+def record_apply_failure(job_id: int, error: str) -> str:
+    """Count a failed attempt to write a classified note.
+
+    The stored action is kept, so the next run retries the write without
+    classifying again. After GARDENER_JOB_MAX_ATTEMPTS failures (classify
+    and apply together) the job is marked failed like any other. A job that
+    was already written stays ``applied``: only archiving remains for it.
+
+    Returns:
+        The job's new state
+    """
+    _ensure_jobs_db()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """UPDATE gardener_jobs
+               SET attempts = attempts + 1, error = ?,
+                   state = CASE WHEN state = 'classified' AND attempts + 1 >= ?
+                                THEN 'failed' ELSE state END,
+                   updated_at = datetime('now')
+               WHERE id = ?""",
+            (error, GARDENER_JOB_MAX_ATTEMPTS, job_id),
+        )
+        conn.commit()
+        (state,) = conn.execute(
+            "SELECT state FROM gardener_jobs WHERE id = ?", (job_id,)
+        ).fetchone()
+    finally:
+        conn.close()
+    if state == JOB_FAILED:
+        logger.warning(f"Giving up on job {job_id} after repeated write failures")
+    return state
+
+
+def get_job_counts() -> dict[str, int]:
+    """Number of jobs in each state."""
+    _ensure_jobs_db()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT state, COUNT(*) AS count FROM gardener_jobs GROUP BY state"
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row["state"]: row["count"] for row in rows}
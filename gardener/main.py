@@ -2,12 +2,16 @@
 
 import asyncio
 import contextlib
+import json
 import logging
+import os
 import subprocess
 import time
-from datetime import date, datetime
+from collections.abc import AsyncIterator, Callable
+from dataclasses import asdict
+from datetime import date, datetime, timedelta
+from itertools import islice
 from pathlib import Path
-from uuid import uuid4
 
 import frontmatter
 from fastapi import (
@@ -17,14 +21,25 @@ from fastapi import (
     File,
     Header,
     HTTPException,
+    Query,
+    Request,
     UploadFile,
 )
-from fastapi.responses import FileResponse, HTMLResponse
+from fastapi.responses import FileResponse, HTMLResponse, StreamingResponse
 from pydantic import BaseModel
 
-from api_usage import get_usage_stats
-from automation import get_automation_status, start_automation
-from backends import get_backend, get_backend_config
+from api_usage import get_usage_breakdown, get_usage_stats
+from archive import BUNDLE_SUFFIX, bundle_names, iter_bundled, read_bundled
+from automation import get_automation_status
+from backends import (
+    AsyncGardenerBackend,
+    close_backend_registry,
+    get_backend_config,
+    get_routing_status,
+    get_shared_async_backend,
+    get_transport_status,
+    init_backend_registry,
+)
 from branding import (
     ICON_NAMES,
     MAX_ICON_BYTES,
@@ -35,17 +50,50 @@ from branding import (
     save_uploaded_icon,
     update_settings,
 )
+from classification_cache import get_classification_cache_stats
 from config import (
     ARCHIVE_DIR,
     ATLAS_DIR,
     AUTH_ENABLED,
     AUTH_TOKEN,
     DATA_DIR,
+    GARDENER_CONTEXT_TOKENS,
+    GARDENER_NOTE_TOKENS,
+    GARDENER_WORKER_MODE,
     INBOX_DIR,
+    MAX_BULK_NOTES,
     MAX_CONTENT_SIZE,
     setup_logging,
 )
+from context_loader import load_classification_context
+from file_io import write_text_atomic
+from inbox import (
+    STATUS_DUPLICATE,
+    STATUS_ERROR,
+    STATUS_INVALID,
+    STATUS_SAVED,
+    InboxItem,
+    inbox_filename,
+    parse_ndjson_line,
+    read_note_bundle,
+    write_inbox_notes,
+)
+from job_queue import get_job_counts
 from mcp_tools import mcp
+from near_duplicates import check_capture, get_near_duplicate_stats
+from preclassifier import get_preclassifier_stats
+from scheduler import get_scheduler, shutdown_scheduler
+from segments import is_segment, list_segments, logical_note_path
+from worker import (
+    GardenerWorker,
+    is_worker_leader,
+    reconcile,
+    request_backlog,
+    request_sweep,
+    schedule_capture,
+    schedule_notes,
+)
+from worker_queue import get_worker_request_counts, leader_pid
 
 # Configure logging before anything else
 setup_logging()
@@ -148,23 +196,31 @@ async def verify_auth_token(
 
 @contextlib.asynccontextmanager
 async def lifespan(app: FastAPI):
-    """Manage MCP session and automation lifecycle."""
+    """Manage MCP session, pooled AI clients and automation lifecycle."""
     logger.info("Gardener starting up...")
 
-    # Start automation task
-    automation_task = asyncio.create_task(start_automation())
+    # Long-lived AI clients with keep-alive connection pools
+    init_backend_registry()
+
+    # Garden in this process unless a standalone worker does it
+    worker_task = None
+    if GARDENER_WORKER_MODE != "external":
+        worker_task = asyncio.create_task(GardenerWorker().run())
 
     async with mcp.session_manager.run():
         logger.info("Gardener ready to accept requests")
         yield
 
-    # Cleanup automation on shutdown
+    # Cleanup worker on shutdown
     logger.info("Gardener shutting down...")
-    automation_task.cancel()
-    try:
-        await automation_task
-    except asyncio.CancelledError:
-        pass
+    if worker_task is not None:
+        worker_task.cancel()
+        try:
+            await worker_task
+        except asyncio.CancelledError:
+            pass
+    await asyncio.to_thread(shutdown_scheduler)
+    await close_backend_registry()
     logger.info("Gardener shutdown complete")
 
 
@@ -235,6 +291,27 @@ class InboxResponse(BaseModel):
 
     filename: str
     message: str
+    near_duplicate_of: str | None = None  # Recent note with nearly the same text
+    similarity: float | None = None
+
+
+class BulkInboxItem(BaseModel):
+    """Outcome of one note in a bulk import, in request order."""
+
+    index: int
+    status: str  # 'saved', 'duplicate', 'invalid' or 'error'
+    filename: str | None = None  # Saved note, or the inbox note it duplicates
+    source: str | None = None  # Archive member the note came from
+    error: str | None = None
+
+
+class BulkInboxResponse(BaseModel):
+    """Response model for bulk inbox submission."""
+
+    saved: int
+    duplicates: int
+    failed: int
+    items: list[BulkInboxItem]
 
 
 class AutomationStatus(BaseModel):
@@ -244,6 +321,7 @@ class AutomationStatus(BaseModel):
     mode: str | None
     poll_interval: int | None
     debounce: float | None
+    debounce_max_wait: float | None
 
 
 class GitState(BaseModel):
@@ -260,6 +338,24 @@ class GitState(BaseModel):
     repo_identity_valid: bool = True
 
 
+class ApiUsageBreakdown(BaseModel):
+    """Calls and tokens for one operation/model pair."""
+
+    operation: str
+    model: str | None
+    calls: int
+    prompt_tokens: int
+    completion_tokens: int
+    cached_tokens: int
+    estimated_cost: float
+    cache_write_tokens: int = 0
+    cache_hits: int = 0
+    cache_misses: int = 0
+    cache_hit_rate: float = 0.0
+    parse_failures: int = 0  # Replies that could not be parsed (then retried)
+    parse_failure_rate: float = 0.0
+
+
 class ApiUsageStats(BaseModel):
     """API usage statistics."""
 
@@ -268,10 +364,75 @@ class ApiUsageStats(BaseModel):
     calls_last_day: int
     hourly_limit: int
     daily_limit: int
+    tokens_last_hour: int = 0
+    tokens_last_day: int = 0
+    hourly_token_limit: int = 0
+    daily_token_limit: int = 0
     hourly_usage_percent: float
     daily_usage_percent: float
     is_near_hourly_limit: bool
     is_near_daily_limit: bool
+    last_day_by_operation: list[ApiUsageBreakdown] = []
+
+
+class ClassificationCacheStatus(BaseModel):
+    """Duplicate-note cache counters."""
+
+    mode: str
+    entries: int
+    hits: int
+    misses: int
+    hit_rate: float
+    duplicates_skipped: int
+
+
+class NearDuplicateStatus(BaseModel):
+    """Near-duplicate index size and outcome counters."""
+
+    mode: str
+    threshold: float
+    indexed: int
+    flagged: int
+    reused: int
+    skipped: int
+
+
+class ClassificationContextStatus(BaseModel):
+    """Size of the context sent with each classification."""
+
+    tokens: int  # Estimated tokens sent (after trimming)
+    full_tokens: int  # Estimated tokens of AGENTS.md + GARDENER.md
+    budget: int  # GARDENER_CONTEXT_TOKENS (0 = no limit)
+    trimmed_sections: int  # Sections collapsed to fit the budget
+    note_budget: int  # GARDENER_NOTE_TOKENS; longer notes are excerpted
+
+
+class PreclassifierStatus(BaseModel):
+    """Local pre-classifier training state."""
+
+    mode: str  # 'off', 'fast' or 'template'
+    examples: int  # Past decisions learned from
+    labels: int  # Distinct destinations seen
+    ready: bool  # Enough examples to pre-classify
+
+
+class ProviderHealth(BaseModel):
+    """Circuit breaker state and retry counters for one AI provider."""
+
+    state: str  # 'closed', 'open' (requests paused) or 'half_open'
+    consecutive_failures: int
+    retries: int
+    hedged_requests: int
+    hedge_wins: int
+
+
+class ModelRouteHealth(BaseModel):
+    """Recent latency and error rate of one provider model (routing)."""
+
+    latency_ewma: float  # Seconds
+    error_rate: float  # 0-1, recent calls weighted most
+    calls: int
+    failures: int
 
 
 class StatusResponse(BaseModel):
@@ -288,6 +449,16 @@ class StatusResponse(BaseModel):
     automation: AutomationStatus
     git: GitState | None = None
     api_usage: ApiUsageStats
+    classification_cache: ClassificationCacheStatus | None = None
+    near_duplicates: NearDuplicateStatus | None = None
+    preclassifier: PreclassifierStatus | None = None
+    classification_context: ClassificationContextStatus | None = None
+    # Keyed by provider name; only providers used since startup appear
+    ai_transport: dict[str, ProviderHealth] = {}
+    # Keyed by 'provider:model'; only models used since startup appear
+    ai_routing: dict[str, ModelRouteHealth] = {}
+    # Inbox notes per job state ('queued', 'classified', 'failed', ...)
+    inbox_jobs: dict[str, int] = {}
 
 
 class GardenerTriggerResponse(BaseModel):
@@ -297,6 +468,28 @@ class GardenerTriggerResponse(BaseModel):
     status: str
 
 
+class SchedulerQueueStatus(BaseModel):
+    """Depth and wait times of one gardener scheduler queue."""
+
+    name: str  # 'interactive', 'automated' or 'maintenance'
+    weight: int
+    depth: int
+    oldest_wait_seconds: float
+    served: int
+    avg_wait_seconds: float
+    max_wait_seconds: float
+
+
+class SchedulerStatusResponse(BaseModel):
+    """Response model for the scheduler queue endpoint."""
+
+    queues: list[SchedulerQueueStatus]  # Empty unless this process gardens
+    worker_mode: str
+    worker_is_local: bool  # Whether this process holds the leader lock
+    worker_pid: int | None  # PID of the gardening process, if one is running
+    worker_requests: dict[str, int]  # Queued API -> worker requests by state
+
+
 class BootstrapResponse(BaseModel):
     """Response model for bootstrap endpoint."""
 
@@ -374,12 +567,14 @@ class RefineRequest(BaseModel):
     """Request model for content refinement."""
 
     content: str
+    stream: bool = False  # Send tokens as Server-Sent Events
 
 
 class AskRequest(BaseModel):
     """Request model for knowledge retrieval."""
 
     question: str
+    stream: bool = False  # Send tokens as Server-Sent Events
 
 
 class BrowseItem(BaseModel):
@@ -422,6 +617,9 @@ class BrowseResponse(BaseModel):
     content: str | None = None
     is_file: bool = False
     metadata: NoteMetadata | None = None  # Parsed frontmatter if file has it
+    segments: list[str] = []  # Earlier segments of a rolled-over note, newest first
+    total: int = 0  # Directory entries before paging
+    next_offset: int | None = None  # Offset of the next page, if any
 
 
 # --- Endpoints ---
@@ -502,6 +700,9 @@ async def get_status() -> StatusResponse:
     auto_status = get_automation_status()
     git_state = get_git_state()
     usage_stats = get_usage_stats()
+    usage_breakdown = get_usage_breakdown(since=timedelta(days=1))
+    cache_stats = get_classification_cache_stats()
+    context = load_classification_context(agents_file, DATA_DIR / "GARDENER.md")
 
     return StatusResponse(
         status="ok",
@@ -520,11 +721,44 @@ async def get_status() -> StatusResponse:
             calls_last_day=usage_stats.calls_last_day,
             hourly_limit=usage_stats.hourly_limit,
             daily_limit=usage_stats.daily_limit,
+            tokens_last_hour=usage_stats.tokens_last_hour,
+            tokens_last_day=usage_stats.tokens_last_day,
+            hourly_token_limit=usage_stats.hourly_token_limit,
+            daily_token_limit=usage_stats.daily_token_limit,
             hourly_usage_percent=usage_stats.hourly_usage_percent,
             daily_usage_percent=usage_stats.daily_usage_percent,
             is_near_hourly_limit=usage_stats.is_near_hourly_limit,
             is_near_daily_limit=usage_stats.is_near_daily_limit,
+            last_day_by_operation=[
+                ApiUsageBreakdown(
+                    **vars(item),
+                    cache_hit_rate=item.cache_hit_rate,
+                    parse_failure_rate=item.parse_failure_rate,
+                )
+                for item in usage_breakdown
+            ],
         ),
+        classification_cache=ClassificationCacheStatus(
+            **vars(cache_stats), hit_rate=cache_stats.hit_rate
+        ),
+        near_duplicates=NearDuplicateStatus(**vars(get_near_duplicate_stats())),
+        preclassifier=PreclassifierStatus(**get_preclassifier_stats()),
+        classification_context=ClassificationContextStatus(
+            tokens=context.token_estimate,
+            full_tokens=context.full_token_estimate,
+            budget=GARDENER_CONTEXT_TOKENS,
+            trimmed_sections=context.trimmed_sections,
+            note_budget=GARDENER_NOTE_TOKENS,
+        ),
+        ai_transport={
+            provider: ProviderHealth(**health)
+            for provider, health in get_transport_status().items()
+        },
+        ai_routing={
+            key: ModelRouteHealth(**health)
+            for key, health in get_routing_status().items()
+        },
+        inbox_jobs=get_job_counts(),
     )
 
 
@@ -851,7 +1085,7 @@ async def reconcile_changes(include_details: bool = False) -> ReconcileResponse:
     """
     try:
         from db import init_db
-        from file_state import get_changes_since_sha, get_dirty_summary, run_reconcile
+        from file_state import get_changes_since_sha, get_dirty_summary
         from git_state import check_repo_identity, get_dirty_files
 
         init_db()
@@ -869,8 +1103,8 @@ async def reconcile_changes(include_details: bool = False) -> ReconcileResponse:
                 "Run /api/snapshot first to include them."
             )
 
-        # Run reconciliation (on committed changes)
-        result = run_reconcile()
+        # Run reconciliation (on committed changes) at maintenance priority
+        result = await reconcile()
 
         # Get detailed changes if requested (use result's from_sha to match the actual scan)
         changes_detail = None
@@ -928,26 +1162,116 @@ async def submit_to_inbox(request: InboxRequest) -> InboxResponse:
 
     INBOX_DIR.mkdir(parents=True, exist_ok=True)
 
-    now = datetime.now()
-    short_uuid = uuid4().hex[:8]
-    filename = f"{now.strftime('%Y-%m-%d_%H%M')}-{short_uuid}.md"
+    filename = inbox_filename()
     filepath = INBOX_DIR / filename
 
     try:
-        filepath.write_text(content)
+        write_text_atomic(filepath, content)
         logger.info(f"Saved note to inbox: {filename}")
     except OSError as e:
         logger.error(f"Failed to write inbox file {filename}: {e}")
         raise HTTPException(status_code=500, detail=f"Failed to write file: {e}")
 
-    return InboxResponse(filename=filename, message="Note saved to inbox")
+    near = check_capture(filename, content)
+    schedule_capture(filename)
+    return InboxResponse(
+        filename=filename,
+        message="Note saved to inbox"
+        + (f" (near-duplicate of {near.key})" if near else ""),
+        near_duplicate_of=near.key if near else None,
+        similarity=round(near.similarity, 3) if near else None,
+    )
 
 
-def run_gardener() -> None:
-    """Run the gardener worker in the background."""
-    from workers.gardener import process_inbox
+def _bulk_too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=413, detail=detail)
+
+
+def _max_bulk_bytes() -> int:
+    """Largest bulk request body or upload accepted."""
+    return MAX_BULK_NOTES * MAX_CONTENT_SIZE
+
+
+async def _read_ndjson(request: Request) -> list[InboxItem]:
+    """Parse a streamed NDJSON body line by line.
+
+    Stops reading once there are more notes than MAX_BULK_NOTES, and rejects
+    bodies or single lines too large to hold valid notes.
+    """
+    # JSON escapes take up to 6 bytes per character
+    max_line = MAX_CONTENT_SIZE * 6 + 1024
+    max_body = _max_bulk_bytes()
+    items: list[InboxItem] = []
+    buffer = b""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > max_body:
+            raise _bulk_too_large(f"Request too large (max {max_body // 1024}KB)")
+        *lines, buffer = (buffer + chunk).split(b"\n")
+        if len(buffer) > max_line or any(len(line) > max_line for line in lines):
+            raise _bulk_too_large(f"Line too large (max {max_line // 1024}KB)")
+        items.extend(parse_ndjson_line(line) for line in lines if line.strip())
+        if len(items) > MAX_BULK_NOTES:
+            return items
+    if buffer.strip():
+        items.append(parse_ndjson_line(buffer))
+    return items
+
+
+@app.post(
+    "/api/inbox/bulk",
+    response_model=BulkInboxResponse,
+    dependencies=[Depends(verify_auth_token)],
+)
+async def submit_bulk_to_inbox(request: Request) -> BulkInboxResponse:
+    """Import many notes into the inbox at once.
+
+    Accepts NDJSON (one JSON string or ``{"content", "created"}`` object per
+    line) or a multipart upload whose ``file`` is a zip or tar archive of
+    markdown/text files. Each note is validated on its own and notes already
+    in the inbox are skipped; the saved notes are queued as one gardener run.
+    """
+    max_bytes = _max_bulk_bytes()
+    too_large = f"Upload too large (max {max_bytes // 1024}KB)"
+    if int(request.headers.get("content-length") or 0) > max_bytes:
+        raise _bulk_too_large(too_large)
+    if request.headers.get("content-type", "").startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Missing 'file' upload")
+        if upload.size is not None and upload.size > max_bytes:
+            raise _bulk_too_large(too_large)
+        try:
+            # Members past the limit are never read from the archive
+            items = list(
+                islice(read_note_bundle(await upload.read()), MAX_BULK_NOTES + 1)
+            )
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    else:
+        items = await _read_ndjson(request)
+
+    if not items:
+        raise HTTPException(status_code=400, detail="No notes in request")
+    if len(items) > MAX_BULK_NOTES:
+        raise _bulk_too_large(f"Too many notes (max {MAX_BULK_NOTES} per request)")
+
+    results = await asyncio.to_thread(write_inbox_notes, items, INBOX_DIR)
+    saved = [r.filename for r in results if r.status == STATUS_SAVED]
+    schedule_notes(saved)
+    return BulkInboxResponse(
+        saved=len(saved),
+        duplicates=sum(1 for r in results if r.status == STATUS_DUPLICATE),
+        failed=sum(1 for r in results if r.status in (STATUS_INVALID, STATUS_ERROR)),
+        items=[BulkInboxItem(**asdict(r)) for r in results],
+    )
+
 
-    process_inbox()
+def run_gardener() -> None:
+    """Process the inbox here, or hand it to the gardener worker."""
+    request_sweep()
 
 
 @app.post(
@@ -966,6 +1290,50 @@ async def trigger_gardener(
     )
 
 
+def run_backlog_once() -> None:
+    """Run the backlog here, or hand it to the gardener worker."""
+    request_backlog()
+
+
+@app.post(
+    "/api/trigger-backlog",
+    response_model=GardenerTriggerResponse,
+    dependencies=[Depends(verify_auth_token)],
+)
+async def trigger_backlog(
+    background_tasks: BackgroundTasks,
+) -> GardenerTriggerResponse:
+    """Queue the inbox for offline batch classification.
+
+    Each call submits notes not yet in a batch job and applies any batch
+    that has finished since the last call.
+    """
+    background_tasks.add_task(run_backlog_once)
+    return GardenerTriggerResponse(
+        message="Backlog submission started in background",
+        status="started",
+    )
+
+
+@app.get(
+    "/api/scheduler",
+    response_model=SchedulerStatusResponse,
+    dependencies=[Depends(verify_auth_token)],
+)
+async def get_scheduler_status() -> SchedulerStatusResponse:
+    """Per-priority queue depth and wait times of the gardener scheduler."""
+    local = is_worker_leader()
+    return SchedulerStatusResponse(
+        queues=[SchedulerQueueStatus(**vars(q)) for q in get_scheduler().stats()]
+        if local
+        else [],
+        worker_mode=GARDENER_WORKER_MODE,
+        worker_is_local=local,
+        worker_pid=leader_pid(),
+        worker_requests=get_worker_request_counts(),
+    )
+
+
 # --- Refine Endpoint ---
 
 
@@ -977,7 +1345,7 @@ def search_atlas(keywords: list[str], max_files: int = 5) -> list[dict]:
     if not ATLAS_DIR.exists():
         return []
 
-    matches = []
+    matches: dict[str, dict] = {}
     keywords_lower = [kw.lower() for kw in keywords if kw]
     for md_file in ATLAS_DIR.rglob("*.md"):
         try:
@@ -990,24 +1358,25 @@ def search_atlas(keywords: list[str], max_files: int = 5) -> list[dict]:
             content_lower = content.lower()
             content_score = sum(1 for kw in keywords_lower if kw in content_lower)
             if content_score > 0:
-                rel_path = str(md_file.relative_to(ATLAS_DIR))
+                # Segments of a rolled-over note count as the note itself
+                rel_path = str(logical_note_path(md_file.relative_to(ATLAS_DIR)))
                 path_lower = rel_path.lower()
                 filename_score = sum(1 for kw in keywords_lower if kw in path_lower)
                 score = content_score * 10 + filename_score
+                if rel_path in matches and matches[rel_path]["score"] >= score:
+                    continue
                 preview = content[:200].replace("\n", " ")
-                matches.append(
-                    {
-                        "path": rel_path,
-                        "score": score,
-                        "preview": preview,
-                    }
-                )
+                matches[rel_path] = {
+                    "path": rel_path,
+                    "score": score,
+                    "preview": preview,
+                }
         except (OSError, UnicodeDecodeError) as e:
             logger.debug(f"Could not read {md_file}: {e}")
             continue
 
-    matches.sort(key=lambda x: (-x["score"], x["path"]))
-    return matches[:max_files]
+    ranked = sorted(matches.values(), key=lambda x: (-x["score"], x["path"]))
+    return ranked[:max_files]
 
 
 def extract_keywords(content: str) -> list[str]:
@@ -1102,6 +1471,57 @@ def format_ask_html(answer: str, related: list[dict]) -> str:
     return "\n".join(html_parts)
 
 
+def _sse_event(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def sse_response(
+    start_stream: Callable[[AsyncGardenerBackend], AsyncIterator[str]],
+    format_html: Callable[[str], str],
+    failure_label: str,
+    **done_extra,
+) -> StreamingResponse:
+    """Stream AI output as ``token`` events, then one ``done`` or ``error``.
+
+    ``done`` carries the same HTML the non-streaming endpoint returns (plus
+    ``done_extra``), so the client can swap it in once the answer is complete.
+    """
+    import html
+
+    async def events():
+        parts = []
+        try:
+            async for text in start_stream(get_shared_async_backend()):
+                parts.append(text)
+                yield _sse_event("token", {"text": text})
+        except ValueError as e:
+            yield _sse_event(
+                "error",
+                {
+                    "html": '<p class="text-yellow-500">AI not configured: '
+                    f"{html.escape(str(e))}</p>"
+                },
+            )
+            return
+        except Exception as e:
+            yield _sse_event(
+                "error",
+                {
+                    "html": f'<p class="text-red-500">{failure_label}: '
+                    f"{html.escape(str(e))}</p>"
+                },
+            )
+            return
+        yield _sse_event("done", {"html": format_html("".join(parts)), **done_extra})
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/api/refine", dependencies=[Depends(verify_auth_token)])
 async def refine_content(request: RefineRequest):
     """Analyze content and suggest context, tags, and related notes."""
@@ -1120,10 +1540,17 @@ async def refine_content(request: RefineRequest):
         for r in related:
             related_context += f"- {r['path']}: {r['preview']}...\n"
 
+    if request.stream:
+        return sse_response(
+            lambda backend: backend.refine_stream(content, related_context),
+            format_refine_html,
+            "Refinement failed",
+        )
+
     try:
-        with get_backend() as backend:
-            result = backend.refine(content, related_context)
-            return HTMLResponse(format_refine_html(result))
+        backend = get_shared_async_backend()
+        result = await backend.refine(content, related_context)
+        return HTMLResponse(format_refine_html(result))
     except ValueError as e:
         import html
 
@@ -1155,10 +1582,18 @@ async def ask_question(request: AskRequest):
         for r in related:
             related_context += f"- {r['path']}: {r['preview']}...\n"
 
+    if request.stream:
+        return sse_response(
+            lambda backend: backend.ask_stream(question, related_context),
+            lambda answer: format_ask_html(answer, related),
+            "Ask failed",
+            related=[r["path"] for r in related],
+        )
+
     try:
-        with get_backend() as backend:
-            result = backend.ask(question, related_context)
-            return HTMLResponse(format_ask_html(result, related))
+        backend = get_shared_async_backend()
+        result = await backend.ask(question, related_context)
+        return HTMLResponse(format_ask_html(result, related))
     except ValueError as e:
         import html
 
@@ -1216,8 +1651,21 @@ def parse_note_metadata(content: str) -> NoteMetadata | None:
         return None
 
 
-def browse_directory(root: Path, path: str) -> BrowseResponse:
-    """Browse a directory tree rooted at the provided path."""
+def browse_directory(
+    root: Path,
+    path: str,
+    offset: int = 0,
+    limit: int | None = None,
+    newest_first: bool = False,
+    bundles: bool = False,
+) -> BrowseResponse:
+    """Browse a directory tree rooted at the provided path.
+
+    With a ``limit``, a directory listing returns one page of items starting
+    at ``offset``; ``newest_first`` lists names in descending order, which
+    for date-named archive shards and notes means most recent first. With
+    ``bundles``, packed archive shards are listed as directories.
+    """
     target = root / path if path else root
 
     if not target.exists():
@@ -1238,26 +1686,68 @@ def browse_directory(root: Path, path: str) -> BrowseResponse:
             content=content,
             is_file=True,
             metadata=metadata,
+            segments=[
+                str(segment.relative_to(root)) for segment in list_segments(target)
+            ],
         )
 
-    # List directory contents
-    items = []
-    for item in sorted(target.iterdir()):
-        if item.name.startswith("."):
-            continue
-        item_path = str(item.relative_to(root))
-        items.append(
-            BrowseItem(
-                name=item.name,
-                type="directory" if item.is_dir() else "file",
-                path=item_path,
+    # List directory contents in one scandir pass (entry types are cached)
+    with os.scandir(target) as entries:
+        items = {}
+        for entry in entries:
+            if entry.name.startswith("."):
+                continue
+            item_path = Path(entry.path).relative_to(root)
+            if bundles and entry.name.endswith(BUNDLE_SUFFIX):
+                # A packed archive shard reads like the directory it replaced
+                item_path = item_path.with_suffix("")
+            name = item_path.name
+            is_dir = entry.is_dir() or name != entry.name
+            items[name] = BrowseItem(
+                name=name,
+                type="directory" if is_dir else "file",
+                path=str(item_path),
             )
-        )
+
+    return _listing_response(path, list(items.values()), offset, limit, newest_first)
+
+
+def _listing_response(
+    path: str,
+    items: list[BrowseItem],
+    offset: int,
+    limit: int | None,
+    newest_first: bool,
+) -> BrowseResponse:
+    """Sort a directory listing and cut out the requested page."""
 
     # Sort: directories first, then files
-    items.sort(key=lambda x: (0 if x.type == "directory" else 1, x.name.lower()))
+    def sort_key(item: BrowseItem) -> str:
+        return item.name if newest_first else item.name.lower()
+
+    items = [
+        *sorted(
+            (i for i in items if i.type == "directory"),
+            key=sort_key,
+            reverse=newest_first,
+        ),
+        *sorted(
+            (i for i in items if i.type != "directory"),
+            key=sort_key,
+            reverse=newest_first,
+        ),
+    ]
 
-    return BrowseResponse(path=path, items=items, is_file=False)
+    total = len(items)
+    if limit is not None:
+        items = items[offset : offset + limit]
+        next_offset = offset + limit if offset + limit < total else None
+    else:
+        next_offset = None
+
+    return BrowseResponse(
+        path=path, items=items, is_file=False, total=total, next_offset=next_offset
+    )
 
 
 @app.get(
@@ -1285,10 +1775,36 @@ async def browse_atlas(path: str = "") -> BrowseResponse:
     response_model=BrowseResponse,
     dependencies=[Depends(verify_auth_token)],
 )
-async def browse_archive(path: str = "") -> BrowseResponse:
-    """Browse archived inbox notes."""
+async def browse_archive(
+    path: str = "",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(200, ge=1, le=1000),
+) -> BrowseResponse:
+    """Browse archived inbox notes, newest shard first, one page at a time.
+
+    Notes in packed (cold) shards are listed and read from their bundle.
+    """
     ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
-    return browse_directory(ARCHIVE_DIR, path)
+    if path and not (ARCHIVE_DIR / path).exists():
+        names = bundle_names(path)
+        if names is not None:
+            items = [
+                BrowseItem(name=name, type="file", path=f"{path}/{name}")
+                for name in names
+            ]
+            return _listing_response(path, items, offset, limit, newest_first=True)
+        content = read_bundled(path)
+        if content is not None:
+            return BrowseResponse(
+                path=path,
+                items=[],
+                content=content,
+                is_file=True,
+                metadata=parse_note_metadata(content),
+            )
+    return browse_directory(
+        ARCHIVE_DIR, path, offset=offset, limit=limit, newest_first=True, bundles=True
+    )
 
 
 class SearchIndexItem(BaseModel):
@@ -1332,43 +1848,48 @@ async def get_search_index() -> SearchIndexResponse:
         content = " ".join(content.split())
         return content[:max_len].strip()
 
+    def index_note(rel_path: str, content: str, source: str):
+        """Add one note to the index."""
+        metadata = parse_note_metadata(content)
+
+        # Determine category (top-level directory)
+        parts = rel_path.split("/")
+        category = parts[0] if len(parts) > 1 else "root"
+
+        # Get title from metadata or filename
+        if metadata and metadata.title:
+            title = metadata.title
+        elif metadata and metadata.name:  # Contact name
+            title = metadata.name
+        else:
+            title = Path(rel_path).stem.replace("-", " ").title()
+
+        # Get tags
+        tags = metadata.tags if metadata and metadata.tags else []
+
+        notes.append(
+            SearchIndexItem(
+                path=rel_path,
+                title=title,
+                category=category,
+                preview=extract_preview(content),
+                tags=tags,
+                source=source,
+            )
+        )
+
     def process_directory(base_dir: Path, source: str):
         """Process all markdown files in a directory."""
         if not base_dir.exists():
             return
 
         for md_file in base_dir.rglob("*.md"):
+            if is_segment(md_file.relative_to(base_dir)):
+                # Indexed as part of the note they were rolled over from
+                continue
             try:
-                content = md_file.read_text()
-                metadata = parse_note_metadata(content)
-
-                # Get relative path from base
-                rel_path = str(md_file.relative_to(base_dir))
-
-                # Determine category (top-level directory)
-                parts = rel_path.split("/")
-                category = parts[0] if len(parts) > 1 else "root"
-
-                # Get title from metadata or filename
-                if metadata and metadata.title:
-                    title = metadata.title
-                elif metadata and metadata.name:  # Contact name
-                    title = metadata.name
-                else:
-                    title = md_file.stem.replace("-", " ").title()
-
-                # Get tags
-                tags = metadata.tags if metadata and metadata.tags else []
-
-                notes.append(
-                    SearchIndexItem(
-                        path=rel_path,
-                        title=title,
-                        category=category,
-                        preview=extract_preview(content),
-                        tags=tags,
-                        source=source,
-                    )
+                index_note(
+                    str(md_file.relative_to(base_dir)), md_file.read_text(), source
                 )
             except Exception as e:
                 logger.warning(f"Error indexing {md_file}: {e}")
@@ -1377,6 +1898,12 @@ async def get_search_index() -> SearchIndexResponse:
     # Process atlas and archive
     process_directory(ATLAS_DIR, "atlas")
     process_directory(ARCHIVE_DIR, "archive")
+    # Notes in packed archive shards are read from their bundles in place
+    try:
+        for rel_path, content in iter_bundled(ARCHIVE_DIR):
+            index_note(rel_path, content, "archive")
+    except Exception as e:
+        logger.warning(f"Error indexing archive bundles: {e}")
 
     return SearchIndexResponse(notes=notes, total=len(notes))
 
@@ -1500,7 +2027,7 @@ async def create_contact(request: CreateContactRequest) -> CreateContactResponse
 """
 
     try:
-        filepath.write_text(content)
+        write_text_atomic(filepath, content)
         logger.info(f"Created contact: {filename}")
     except OSError as e:
         logger.error(f"Failed to create contact {filename}: {e}")
@@ -1557,7 +2084,7 @@ async def update_last_contact(request: UpdateLastContactRequest):
         post.metadata["last_contact"] = today
 
         # Write back
-        filepath.write_text(frontmatter.dumps(post))
+        write_text_atomic(filepath, frontmatter.dumps(post))
 
         logger.info(f"Updated last_contact for {request.path} to {today}")
 
@@ -1594,7 +2121,6 @@ class UpcomingBirthdaysResponse(BaseModel):
 )
 async def get_upcoming_birthdays(days: int = 30):
     """Get contacts with birthdays in the next N days."""
-    from datetime import datetime
 
     people_dir = ATLAS_DIR / "people"
     if not people_dir.exists():
@@ -1684,7 +2210,6 @@ class StaleContactsResponse(BaseModel):
 )
 async def get_stale_contacts(days: int = 90, limit: int = 10):
     """Get contacts that haven't been contacted in the last N days."""
-    from datetime import datetime
 
     people_dir = ATLAS_DIR / "people"
     if not people_dir.exists():
@@ -1750,7 +2275,8 @@ async def get_random_note():
         for md_file in ATLAS_DIR.rglob("*.md"):
             try:
                 rel_path = str(md_file.relative_to(ATLAS_DIR))
-                atlas_files.append(rel_path)
+                if not is_segment(rel_path):
+                    atlas_files.append(rel_path)
             except (OSError, ValueError):
                 continue
 
@@ -1771,7 +2297,7 @@ async def get_stats():
     """Get dashboard statistics about the atlas."""
     import subprocess
     from collections import Counter
-    from datetime import datetime, timedelta
+    from datetime import timedelta
 
     if not ATLAS_DIR.exists():
         return {
@@ -1783,12 +2309,17 @@ async def get_stats():
         }
 
     try:
-        # Count total markdown files
-        total_notes = sum(1 for _ in ATLAS_DIR.rglob("*.md"))
+        # Count total markdown files (a rolled-over note counts once)
+        atlas_notes = [
+            md_file
+            for md_file in ATLAS_DIR.rglob("*.md")
+            if not is_segment(md_file.relative_to(ATLAS_DIR))
+        ]
+        total_notes = len(atlas_notes)
 
         # Get category breakdown (top-level directories)
         categories = Counter()
-        for md_file in ATLAS_DIR.rglob("*.md"):
+        for md_file in atlas_notes:
             try:
                 rel_path = md_file.relative_to(ATLAS_DIR)
                 parts = rel_path.parts
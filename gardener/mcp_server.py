@@ -1,5 +1,6 @@
 """MCP Server for Athena - External AI access to notes."""
 
+import asyncio
 import os
 from datetime import datetime
 from pathlib import Path
@@ -9,9 +10,13 @@ from mcp.server import Server
 from mcp.server.stdio import stdio_server
 from mcp.types import TextContent, Tool
 
+from file_io import write_text_atomic
+from inbox import STATUS_SAVED, InboxItem, write_inbox_notes
+
 DATA_DIR = Path(os.environ.get("DATA_DIR", "/data"))
 INBOX_DIR = DATA_DIR / "inbox"
 ATLAS_DIR = DATA_DIR / "atlas"
+MAX_BULK_NOTES = int(os.environ.get("MAX_BULK_NOTES", "1000"))
 
 server = Server("athena")
 
@@ -51,6 +56,21 @@ async def list_tools() -> list[Tool]:
                 "required": ["content"],
             },
         ),
+        Tool(
+            name="add_notes",
+            description="Add several notes to the Athena inbox in one call. Notes already in the inbox are skipped.",
+            inputSchema={
+                "type": "object",
+                "properties": {
+                    "notes": {
+                        "type": "array",
+                        "items": {"type": "string"},
+                        "description": "The note contents (markdown supported), one per note.",
+                    },
+                },
+                "required": ["notes"],
+            },
+        ),
     ]
 
 
@@ -61,6 +81,8 @@ async def call_tool(name: str, arguments: dict) -> list[TextContent]:
         return await read_notes(arguments.get("path", ""), arguments.get("query"))
     elif name == "add_note":
         return await add_note(arguments.get("content", ""))
+    elif name == "add_notes":
+        return await add_notes(arguments.get("notes", []))
     else:
         return [TextContent(type="text", text=f"Unknown tool: {name}")]
 
@@ -132,12 +154,40 @@ async def add_note(content: str) -> list[TextContent]:
     filepath = INBOX_DIR / filename
 
     try:
-        filepath.write_text(content)
+        write_text_atomic(filepath, content)
         return [TextContent(type="text", text=f"Note saved to inbox: {filename}")]
     except Exception as e:
         return [TextContent(type="text", text=f"Error saving note: {e}")]
 
 
+async def add_notes(notes: list[str]) -> list[TextContent]:
+    """Add several notes to the inbox."""
+    if not notes:
+        return [TextContent(type="text", text="Error: No notes given")]
+    if len(notes) > MAX_BULK_NOTES:
+        return [
+            TextContent(
+                type="text",
+                text=f"Error: Too many notes (max {MAX_BULK_NOTES} per call)",
+            )
+        ]
+
+    results = await asyncio.to_thread(
+        write_inbox_notes,
+        [InboxItem(content=content) for content in notes],
+        INBOX_DIR,
+    )
+    lines = [f"{r.index}: {r.status} {r.filename or r.error}".rstrip() for r in results]
+    saved = sum(1 for r in results if r.status == STATUS_SAVED)
+    return [
+        TextContent(
+            type="text",
+            text=f"Saved {saved} of {len(results)} note(s) to inbox:\n"
+            + "\n".join(lines),
+        )
+    ]
+
+
 async def main():
     """Run the MCP server."""
     async with stdio_server() as (read_stream, write_stream):
@@ -147,6 +197,4 @@ async def main():
 
 
 if __name__ == "__main__":
-    import asyncio
-
     asyncio.run(main())
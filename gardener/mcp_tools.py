@@ -1,12 +1,21 @@
 """MCP Tools for Athena - FastMCP integration."""
 
 import logging
-from datetime import datetime
-from uuid import uuid4
 
 from mcp.server.fastmcp import FastMCP
 
-from config import ATLAS_DIR, INBOX_DIR
+from config import ATLAS_DIR, INBOX_DIR, MAX_BULK_NOTES
+from file_io import write_text_atomic
+from inbox import (
+    STATUS_DUPLICATE,
+    STATUS_SAVED,
+    InboxItem,
+    InboxItemResult,
+    inbox_filename,
+    write_inbox_notes,
+)
+from near_duplicates import check_capture
+from worker import schedule_capture, schedule_notes
 
 logger = logging.getLogger(__name__)
 
@@ -95,14 +104,55 @@ def add_note(content: str) -> str:
 
     INBOX_DIR.mkdir(parents=True, exist_ok=True)
 
-    now = datetime.now()
-    short_uuid = uuid4().hex[:8]
-    filename = f"{now.strftime('%Y-%m-%d_%H%M')}-{short_uuid}.md"
+    filename = inbox_filename()
     filepath = INBOX_DIR / filename
 
     try:
-        filepath.write_text(content)
-        return f"Note saved to inbox: {filename}"
+        write_text_atomic(filepath, content)
     except OSError as e:
         logger.warning(f"Failed to save note to {filepath}: {e}")
         return f"Error saving note: {e}"
+    near = check_capture(filename, content)
+    schedule_capture(filename)
+    if near is not None:
+        return (
+            f"Note saved to inbox: {filename} (near-duplicate of {near.key}, "
+            f"similarity {near.similarity:.2f})"
+        )
+    return f"Note saved to inbox: {filename}"
+
+
+def _summarize_import(results: list[InboxItemResult]) -> str:
+    """One line per note of a bulk import."""
+    lines = []
+    for result in results:
+        if result.status == STATUS_SAVED:
+            lines.append(f"{result.index}: saved as {result.filename}")
+        elif result.status == STATUS_DUPLICATE:
+            lines.append(f"{result.index}: duplicate of {result.filename}")
+        else:
+            lines.append(f"{result.index}: error: {result.error}")
+    saved = sum(1 for r in results if r.status == STATUS_SAVED)
+    return f"Saved {saved} of {len(results)} note(s) to inbox:\n" + "\n".join(lines)
+
+
+@mcp.tool()
+def add_notes(notes: list[str]) -> str:
+    """Add several notes to the Athena inbox in one call.
+
+    Notes already in the inbox are skipped. All saved notes are processed
+    by the Gardener as one batch.
+
+    Args:
+        notes: The note contents (markdown supported), one per note.
+    """
+    if not notes:
+        return "Error: No notes given"
+    if len(notes) > MAX_BULK_NOTES:
+        return f"Error: Too many notes (max {MAX_BULK_NOTES} per call)"
+
+    results = write_inbox_notes(
+        [InboxItem(content=content) for content in notes], INBOX_DIR
+    )
+    schedule_notes([r.filename for r in results if r.status == STATUS_SAVED])
+    return _summarize_import(results)
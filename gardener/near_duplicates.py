@@ -0,0 +1,354 @@
+"""Near-duplicate detection with MinHash signatures and LSH.
+
+The classification cache only catches byte-for-byte repeats (up to
+whitespace). Captures of the same thought from two devices, or an agent
+re-sending a note with a fixed typo, differ slightly and would each be
+classified and appended. This module keeps a MinHash signature of every
+recent inbox capture and written note, and finds notes whose word
+shingles overlap by at least GARDENER_NEAR_DUP_THRESHOLD (estimated
+Jaccard similarity) without comparing against every note:
+
+- The signature uses one-permutation hashing: each 3-word shingle is hashed
+  once and kept if it is the smallest in its bin (SIGNATURE_BINS bins), so
+  a signature costs one hash per shingle.
+- Locality-sensitive hashing splits the signature into LSH_BANDS bands.
+  Notes sharing any band are candidates; only their signatures are
+  compared. With 16 bands of 4 bins, notes at 0.8 similarity are found
+  with probability > 0.99, while fewer than 1 in 8 pairs at 0.3 become
+  candidates.
+
+What happens to a near-duplicate depends on GARDENER_NEAR_DUP: "flag"
+reports it, "reuse" also reuses the earlier decision instead of an AI call
+and "skip" archives it without writing. Entries older than
+GARDENER_NEAR_DUP_DAYS are dropped.
+"""
+
+import hashlib
+import logging
+import re
+import struct
+from dataclasses import dataclass
+
+import config
+from backends.base import GardenerAction
+from config import (
+    GARDENER_NEAR_DUP_DAYS,
+    GARDENER_NEAR_DUP_MODE,
+    GARDENER_NEAR_DUP_THRESHOLD,
+)
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+SIGNATURE_BINS = 64
+LSH_BANDS = 16
+_ROWS = SIGNATURE_BINS // LSH_BANDS
+_BIN_BITS = 6  # Low hash bits that pick the bin (2**6 == SIGNATURE_BINS)
+_SHINGLE_WORDS = 3
+_EMPTY = (1 << 64) - 1
+
+SOURCE_INBOX = "inbox"  # Captured, not yet written
+SOURCE_APPLIED = "applied"  # Written to the atlas by the gardener
+
+_NEAR_DUP_DB_PATH: str | None = None
+
+NEAR_DUP_SCHEMA = """
+-- MinHash signatures of recent notes, keyed by inbox filename
+CREATE TABLE IF NOT EXISTS near_dup_signatures (
+    key TEXT PRIMARY KEY,
+    source TEXT NOT NULL,
+    signature BLOB NOT NULL,
+    action_json TEXT,
+    updated_at TEXT DEFAULT (datetime('now'))
+);
+CREATE INDEX IF NOT EXISTS idx_near_dup_updated
+ON near_dup_signatures(updated_at);
+
+-- LSH buckets: one row per band of each signature
+CREATE TABLE IF NOT EXISTS near_dup_bands (
+    bucket INTEGER NOT NULL,
+    key TEXT NOT NULL,
+    PRIMARY KEY (bucket, key)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_near_dup_bands_key ON near_dup_bands(key);
+
+-- Outcome counters: 'flagged', 'reused', 'skipped'
+CREATE TABLE IF NOT EXISTS near_dup_stats (
+    event TEXT PRIMARY KEY,
+    count INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+@dataclass
+class NearDuplicate:
+    """An indexed note similar to the one looked up."""
+
+    key: str
+    source: str
+    similarity: float
+    action: GardenerAction | None = None
+
+
+@dataclass
+class NearDuplicateStats:
+    """Index size and outcome counters."""
+
+    mode: str
+    threshold: float
+    indexed: int
+    flagged: int
+    reused: int
+    skipped: int
+
+
+def init_near_dup_db() -> None:
+    """Initialize near-duplicate index tables."""
+    conn = get_db_connection()
+    try:
+        conn.executescript(NEAR_DUP_SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_near_dup_db() -> None:
+    global _NEAR_DUP_DB_PATH
+    current_path = str(config.STATE_DB)
+    if _NEAR_DUP_DB_PATH == current_path:
+        return
+    init_near_dup_db()
+    _NEAR_DUP_DB_PATH = current_path
+
+
+def near_dup_enabled() -> bool:
+    """Whether notes are indexed and checked for near-duplicates."""
+    return GARDENER_NEAR_DUP_MODE != "off"
+
+
+def _shingles(text: str) -> set[str]:
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < _SHINGLE_WORDS:
+        return {" ".join(words)} if words else set()
+    return {
+        " ".join(words[i : i + _SHINGLE_WORDS])
+        for i in range(len(words) - _SHINGLE_WORDS + 1)
+    }
+
+
+def minhash_signature(text: str) -> tuple[int, ...] | None:
+    """One-permutation MinHash signature of ``text``, or None if it has no words."""
+    shingles = _shingles(text)
+    if not shingles:
+        return None
+    bins = [_EMPTY] * SIGNATURE_BINS
+    for shingle in shingles:
+        digest = hashlib.blake2b(shingle.encode(), digest_size=8).digest()
+        value = int.from_bytes(digest, "big")
+        index = value & (SIGNATURE_BINS - 1)
+        bins[index] = min(bins[index], value >> _BIN_BITS)
+
+    # Fill each empty bin from the next filled bin to the right (wrapping
+    # around); the distance goes in the top bits, so a borrowed value never
+    # equals a real one
+    signature = list(bins)
+    borrowed, distance = _EMPTY, 0
+    for i in reversed(range(2 * SIGNATURE_BINS)):
+        index = i % SIGNATURE_BINS
+        if bins[index] != _EMPTY:
+            borrowed, distance = bins[index], 0
+            continue
+        distance += 1
+        if i < SIGNATURE_BINS:
+            signature[index] = borrowed | distance << (64 - _BIN_BITS)
+    return tuple(signature)
+
+
+def similarity(a: tuple[int, ...], b: tuple[int, ...]) -> float:
+    """Estimated Jaccard similarity of the notes behind two signatures."""
+    return sum(x == y for x, y in zip(a, b)) / SIGNATURE_BINS
+
+
+def _buckets(signature: tuple[int, ...]) -> list[int]:
+    """One LSH bucket id per band (band index is part of the hash)."""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * _ROWS : (band + 1) * _ROWS]
+        digest = hashlib.blake2b(
+            struct.pack(f">B{_ROWS}Q", band, *rows), digest_size=8
+        ).digest()
+        buckets.append(int.from_bytes(digest, "big", signed=True))
+    return buckets
+
+
+def _pack(signature: tuple[int, ...]) -> bytes:
+    return struct.pack(f">{SIGNATURE_BINS}Q", *signature)
+
+
+def _unpack(blob: bytes) -> tuple[int, ...]:
+    return struct.unpack(f">{SIGNATURE_BINS}Q", blob)
+
+
+def _count(conn, event: str) -> None:
+    conn.execute(
+        """INSERT INTO near_dup_stats (event, count) VALUES (?, 1)
+           ON CONFLICT(event) DO UPDATE SET count = count + 1""",
+        (event,),
+    )
+
+
+def count_near_duplicate(event: str) -> None:
+    """Count a near-duplicate outcome ('flagged', 'reused' or 'skipped')."""
+    _ensure_near_dup_db()
+    conn = get_db_connection()
+    try:
+        _count(conn, event)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def find_near_duplicate(
+    note_content: str,
+    sources: tuple[str, ...] = (SOURCE_INBOX, SOURCE_APPLIED),
+    exclude: str | None = None,
+) -> NearDuplicate | None:
+    """Most similar recent note at or above the threshold, if any.
+
+    Args:
+        note_content: The note to look up
+        sources: Which indexed notes to consider (captures, written notes)
+        exclude: Key of the note itself, if it is already indexed
+    """
+    if not near_dup_enabled():
+        return None
+    signature = minhash_signature(note_content)
+    if signature is None:
+        return None
+    _ensure_near_dup_db()
+    buckets = _buckets(signature)
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            f"""SELECT DISTINCT s.key, s.source, s.signature, s.action_json
+                FROM near_dup_bands b
+                JOIN near_dup_signatures s ON s.key = b.key
+                WHERE b.bucket IN ({", ".join("?" * len(buckets))})
+                  AND s.source IN ({", ".join("?" * len(sources))})
+                  AND s.updated_at > datetime('now', ?)""",
+            (*buckets, *sources, f"-{GARDENER_NEAR_DUP_DAYS} days"),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    best: NearDuplicate | None = None
+    for row in rows:
+        if row["key"] == exclude:
+            continue
+        score = similarity(signature, _unpack(row["signature"]))
+        if score < GARDENER_NEAR_DUP_THRESHOLD:
+            continue
+        if best is None or score > best.similarity:
+            action = None
+            if row["action_json"]:
+                try:
+                    action = GardenerAction.model_validate_json(row["action_json"])
+                except ValueError:
+                    pass
+            best = NearDuplicate(row["key"], row["source"], score, action)
+    return best
+
+
+def index_note(
+    key: str,
+    note_content: str,
+    source: str,
+    action: GardenerAction | None = None,
+) -> None:
+    """Add (or replace) a note in the index and drop expired entries."""
+    if not near_dup_enabled():
+        return
+    signature = minhash_signature(note_content)
+    if signature is None:
+        return
+    _ensure_near_dup_db()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """INSERT OR REPLACE INTO near_dup_signatures
+               (key, source, signature, action_json) VALUES (?, ?, ?, ?)""",
+            (
+                key,
+                source,
+                _pack(signature),
+                action.model_dump_json() if action else None,
+            ),
+        )
+        conn.execute("DELETE FROM near_dup_bands WHERE key = ?", (key,))
+        conn.executemany(
+            "INSERT OR IGNORE INTO near_dup_bands (bucket, key) VALUES (?, ?)",
+            [(bucket, key) for bucket in _buckets(signature)],
+        )
+        expired = f"-{GARDENER_NEAR_DUP_DAYS} days"
+        conn.execute(
+            """DELETE FROM near_dup_bands WHERE key IN (
+                   SELECT key FROM near_dup_signatures
+                   WHERE updated_at <= datetime('now', ?))""",
+            (expired,),
+        )
+        conn.execute(
+            "DELETE FROM near_dup_signatures WHERE updated_at <= datetime('now', ?)",
+            (expired,),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def check_capture(filename: str, note_content: str) -> NearDuplicate | None:
+    """Index a new inbox capture and return the note it nearly duplicates."""
+    match = find_near_duplicate(note_content)
+    index_note(filename, note_content, SOURCE_INBOX)
+    if match is not None:
+        count_near_duplicate("flagged")
+        logger.info(
+            f"{filename} is a near-duplicate of {match.key} "
+            f"(similarity {match.similarity:.2f})"
+        )
+    return match
+
+
+def forget_note(key: str) -> None:
+    """Remove a note from the index (e.g. one archived as a duplicate)."""
+    if not near_dup_enabled():
+        return
+    _ensure_near_dup_db()
+    conn = get_db_connection()
+    try:
+        conn.execute("DELETE FROM near_dup_bands WHERE key = ?", (key,))
+        conn.execute("DELETE FROM near_dup_signatures WHERE key = ?", (key,))
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def get_near_duplicate_stats() -> NearDuplicateStats:
+    """Return index size and outcome counters."""
+    _ensure_near_dup_db()
+    conn = get_db_connection()
+    try:
+        (indexed,) = conn.execute("SELECT COUNT(*) FROM near_dup_signatures").fetchone()
+        counts = {
+            row["event"]: row["count"]
+            for row in conn.execute("SELECT event, count FROM near_dup_stats")
+        }
+    finally:
+        conn.close()
+    return NearDuplicateStats(
+        mode=GARDENER_NEAR_DUP_MODE,
+        threshold=GARDENER_NEAR_DUP_THRESHOLD,
+        indexed=indexed,
+        flagged=counts.get("flagged", 0),
+        reused=counts.get("reused", 0),
+        skipped=counts.get("skipped", 0),
+    )
@@ -0,0 +1,420 @@
+"""Local naive Bayes pre-classifier for inbox notes.
+
+Many notes are easy to place: an update about someone who already has a
+``people/`` page, another journal entry, another reading note. The
+pre-classifier learns from past decisions which destination a note's words
+point to, so confident notes can skip the thinking model:
+
+- ``fast``: the fast model formats the note, with the predicted destination
+  as a suggestion
+- ``template``: the note is filed as-is at the predicted destination, with
+  no AI call at all
+
+Everything else goes to the full model as before.
+
+Labels are ``append:<path>`` for existing atlas files, ``create:<dir>`` for
+new files (the file name comes from the note's first line) and ``task``.
+Token counts live in the state DB and are updated after every full-model
+decision; ``python -m preclassifier --train`` rebuilds them from history
+(finished gardener jobs and git-backed gardener provenance).
+"""
+
+import logging
+import math
+import re
+import sqlite3
+import threading
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+import config
+from archive import read_archived
+from backends.base import GardenerAction
+from config import (
+    GARDENER_PRECLASSIFY_MIN_EXAMPLES,
+    GARDENER_PRECLASSIFY_MODE,
+    GARDENER_PRECLASSIFY_THRESHOLD,
+)
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+_PRECLASSIFIER_DB_PATH: str | None = None
+
+PRECLASSIFIER_SCHEMA = """
+-- Training notes seen per label
+CREATE TABLE IF NOT EXISTS preclassifier_labels (
+    label TEXT PRIMARY KEY,
+    docs INTEGER NOT NULL DEFAULT 0,
+    tokens INTEGER NOT NULL DEFAULT 0
+);
+
+-- Token counts per label
+CREATE TABLE IF NOT EXISTS preclassifier_tokens (
+    label TEXT NOT NULL,
+    token TEXT NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (label, token)
+);
+"""
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9'_-]+")
+_MAX_TOKENS = 2000  # Per note; long notes are decided by their start
+_MIN_LABEL_DOCS = 3  # A destination seen fewer times is never predicted
+
+
+@dataclass
+class Prediction:
+    """Destination the pre-classifier expects for a note."""
+
+    label: str
+    action: str  # "create", "append" or "task"
+    category: str  # Top-level atlas directory ("" for tasks)
+    path: str
+    confidence: float
+
+    def suggestion(self) -> str:
+        """Short description for the fast model's prompt."""
+        if self.action == "task":
+            return "task list"
+        return f"{self.action} {self.path}"
+
+
+def init_preclassifier_db() -> None:
+    """Initialize pre-classifier tables."""
+    conn = get_db_connection()
+    try:
+        conn.executescript(PRECLASSIFIER_SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_preclassifier_db() -> None:
+    global _PRECLASSIFIER_DB_PATH
+    current_path = str(config.STATE_DB)
+    if _PRECLASSIFIER_DB_PATH == current_path:
+        return
+    init_preclassifier_db()
+    _PRECLASSIFIER_DB_PATH = current_path
+
+
+def preclassify_enabled() -> bool:
+    """Whether confident notes skip the thinking model."""
+    return GARDENER_PRECLASSIFY_MODE in ("fast", "template")
+
+
+def tokenize(text: str) -> list[str]:
+    """Lowercased word tokens used as features."""
+    return _TOKEN_RE.findall(text.lower())[:_MAX_TOKENS]
+
+
+def action_label(action: GardenerAction) -> str | None:
+    """Training label for a decision, or None if it teaches nothing."""
+    if action.action == "task":
+        return "task"
+    path = action.path.strip().strip("/")
+    if not path or ".." in Path(path).parts:
+        return None
+    if action.action == "append":
+        return f"append:{path}"
+    parent = Path(path).parent.as_posix()
+    return f"create:{parent}" if parent != "." else None
+
+
+def _slug(note_content: str) -> str:
+    first_line = next(
+        (line for line in note_content.splitlines() if line.strip()), "note"
+    )
+    slug = re.sub(r"[^a-z0-9]+", "-", first_line.lower().lstrip("# ")).strip("-")
+    return slug[:60].rstrip("-") or "note"
+
+
+class NaiveBayesModel:
+    """Multinomial naive Bayes with Laplace smoothing over word counts."""
+
+    def __init__(
+        self,
+        label_docs: dict[str, int],
+        label_tokens: dict[str, int],
+        token_counts: dict[str, dict[str, int]],
+    ):
+        self.label_docs = label_docs
+        self.label_tokens = label_tokens
+        self.token_counts = token_counts  # token -> {label: count}
+        self.total_docs = sum(label_docs.values())
+
+    @classmethod
+    def load(cls) -> "NaiveBayesModel":
+        _ensure_preclassifier_db()
+        conn = get_db_connection()
+        try:
+            labels = conn.execute(
+                "SELECT label, docs, tokens FROM preclassifier_labels"
+            ).fetchall()
+            token_counts: dict[str, dict[str, int]] = {}
+            for row in conn.execute(
+                "SELECT label, token, count FROM preclassifier_tokens"
+            ):
+                token_counts.setdefault(row["token"], {})[row["label"]] = row["count"]
+        finally:
+            conn.close()
+        return cls(
+            {row["label"]: row["docs"] for row in labels},
+            {row["label"]: row["tokens"] for row in labels},
+            token_counts,
+        )
+
+    def add(self, label: str, tokens: Counter) -> None:
+        """Count one more training note, matching what learn() stores."""
+        self.label_docs[label] = self.label_docs.get(label, 0) + 1
+        self.label_tokens[label] = self.label_tokens.get(label, 0) + sum(
+            tokens.values()
+        )
+        for token, count in tokens.items():
+            counts = self.token_counts.setdefault(token, {})
+            counts[label] = counts.get(label, 0) + count
+        self.total_docs += 1
+
+    def scores(self, tokens: list[str]) -> dict[str, float]:
+        """Posterior probability of each label given the tokens."""
+        if not self.total_docs:
+            return {}
+        vocabulary = max(len(self.token_counts), 1)
+        counts = Counter(t for t in tokens if t in self.token_counts)
+        log_posts = {}
+        for label, docs in self.label_docs.items():
+            denominator = math.log(self.label_tokens[label] + vocabulary)
+            log_post = math.log(docs / self.total_docs)
+            for token, n in counts.items():
+                count = self.token_counts[token].get(label, 0)
+                log_post += n * (math.log(count + 1) - denominator)
+            log_posts[label] = log_post
+        top = max(log_posts.values())
+        weights = {label: math.exp(lp - top) for label, lp in log_posts.items()}
+        total = sum(weights.values())
+        return {label: w / total for label, w in weights.items()}
+
+
+_model: NaiveBayesModel | None = None
+_model_db: str | None = None
+_model_lock = threading.Lock()
+
+
+def _get_model() -> NaiveBayesModel:
+    global _model, _model_db
+    with _model_lock:
+        if _model is None or _model_db != str(config.STATE_DB):
+            _model = NaiveBayesModel.load()
+            _model_db = str(config.STATE_DB)
+        return _model
+
+
+def _invalidate_model() -> None:
+    global _model
+    with _model_lock:
+        _model = None
+
+
+def learn(note_content: str, action: GardenerAction) -> None:
+    """Add one full-model decision to the training counts.
+
+    The loaded model is updated in place rather than reloaded, so learning
+    costs the same however much training data there is. The lock keeps a
+    concurrent load from seeing the new counts in both places.
+    """
+    label = action_label(action)
+    if label is None:
+        return
+    tokens = Counter(tokenize(note_content))
+    _ensure_preclassifier_db()
+    with _model_lock:
+        _store_counts(label, tokens)
+        if _model is not None and _model_db == str(config.STATE_DB):
+            _model.add(label, tokens)
+
+
+def _store_counts(label: str, tokens: Counter) -> None:
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """INSERT INTO preclassifier_labels (label, docs, tokens) VALUES (?, 1, ?)
+               ON CONFLICT(label) DO UPDATE
+               SET docs = docs + 1, tokens = tokens + excluded.tokens""",
+            (label, sum(tokens.values())),
+        )
+        conn.executemany(
+            """INSERT INTO preclassifier_tokens (label, token, count) VALUES (?, ?, ?)
+               ON CONFLICT(label, token) DO UPDATE
+               SET count = count + excluded.count""",
+            [(label, token, count) for token, count in tokens.items()],
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def predict(note_content: str) -> Prediction | None:
+    """Most likely destination for a note, or None without enough training."""
+    model = _get_model()
+    if model.total_docs < GARDENER_PRECLASSIFY_MIN_EXAMPLES:
+        return None
+    scores = model.scores(tokenize(note_content))
+    if not scores:
+        return None
+    label, confidence = max(scores.items(), key=lambda item: item[1])
+    if model.label_docs[label] < _MIN_LABEL_DOCS:
+        return None
+
+    if label == "task":
+        return Prediction(label, "task", "", "tasks.md", confidence)
+    action, target = label.split(":", 1)
+    path = target if action == "append" else f"{target}/{_slug(note_content)}.md"
+    return Prediction(label, action, target.split("/", 1)[0], path, confidence)
+
+
+def confident_prediction(note_content: str) -> Prediction | None:
+    """Prediction good enough to skip the thinking model, if any.
+
+    Appends are only trusted while the target file still exists, and a new
+    file is only created where none exists yet.
+    """
+    if not preclassify_enabled():
+        return None
+    try:
+        prediction = predict(note_content)
+    except Exception as e:
+        logger.warning(f"Pre-classifier unavailable: {e}")
+        return None
+    if prediction is None or prediction.confidence < GARDENER_PRECLASSIFY_THRESHOLD:
+        return None
+    exists = (config.ATLAS_DIR / prediction.path).exists()
+    if prediction.action == "append" and not exists:
+        return None
+    if prediction.action == "create" and exists:
+        return None
+    return prediction
+
+
+def template_action(note_content: str, prediction: Prediction) -> GardenerAction:
+    """File the note unchanged at the predicted destination."""
+    return GardenerAction(
+        action=prediction.action,
+        path=prediction.path,
+        content=note_content.strip(),
+        reasoning=(
+            f"Pre-classified locally as {prediction.label} "
+            f"(confidence {prediction.confidence:.2f})"
+        ),
+    )
+
+
+def _history() -> list[tuple[str, GardenerAction]]:
+    """(note content, decision) pairs from finished jobs and provenance.
+
+    Provenance covers notes processed before jobs were tracked: each
+    "Gardener: Processed <note>" commit names the atlas file it wrote, and
+    the file's first gardener edit was its creation.
+    """
+    from job_queue import _ensure_jobs_db
+
+    _ensure_jobs_db()
+    decisions: dict[str, GardenerAction] = {}
+    conn = get_db_connection()
+    try:
+        try:
+            processed = conn.execute(
+                """SELECT p.file_path, c.note,
+                          p.id = (SELECT MIN(id) FROM edit_provenance
+                                  WHERE file_path = p.file_path) AS first_edit
+                   FROM edit_provenance p
+                   JOIN processed_commits c ON c.sha = p.commit_sha
+                   WHERE p.source = 'gardener'
+                     AND c.note LIKE 'Gardener: Processed %'
+                   ORDER BY p.id"""
+            ).fetchall()
+        except sqlite3.OperationalError:
+            processed = []  # State DB not initialized (no commits recorded)
+        jobs = conn.execute(
+            """SELECT filename, action_json FROM gardener_jobs
+               WHERE state = 'archived' AND action_json IS NOT NULL
+               ORDER BY id"""
+        ).fetchall()
+    finally:
+        conn.close()
+
+    for row in processed:
+        filename = row["note"].removeprefix("Gardener: Processed ").strip()
+        file_path = Path(row["file_path"])
+        if file_path.name == config.TASKS_FILE.name and len(file_path.parts) == 1:
+            action, path = "task", ""
+        elif file_path.parts[:1] == ("atlas",) and len(file_path.parts) > 1:
+            action = "create" if row["first_edit"] else "append"
+            path = Path(*file_path.parts[1:]).as_posix()
+        else:
+            continue
+        decisions[filename] = GardenerAction(
+            action=action, path=path, content="", reasoning="provenance"
+        )
+    for row in jobs:
+        try:
+            decisions[row["filename"]] = GardenerAction.model_validate_json(
+                row["action_json"]
+            )
+        except ValueError:
+            continue
+
+    history = []
+    for filename, action in decisions.items():
+        content = read_archived(filename)
+        if content is not None:
+            history.append((content, action))
+    return history
+
+
+def train_from_history() -> int:
+    """Rebuild the counts from past decisions; returns notes learned."""
+    _ensure_preclassifier_db()
+    conn = get_db_connection()
+    try:
+        conn.execute("DELETE FROM preclassifier_labels")
+        conn.execute("DELETE FROM preclassifier_tokens")
+        conn.commit()
+    finally:
+        conn.close()
+    _invalidate_model()
+
+    history = _history()
+    for note_content, action in history:
+        learn(note_content, action)
+    _invalidate_model()
+    logger.info(f"Pre-classifier trained on {len(history)} past note(s)")
+    return len(history)
+
+
+def get_preclassifier_stats() -> dict:
+    """Training size and mode for /api/status."""
+    model = _get_model()
+    return {
+        "mode": GARDENER_PRECLASSIFY_MODE,
+        "examples": model.total_docs,
+        "labels": len(model.label_docs),
+        "ready": model.total_docs >= GARDENER_PRECLASSIFY_MIN_EXAMPLES,
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--train", action="store_true", help="Rebuild the model from history"
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.train:
+        train_from_history()
+    print(json.dumps(get_preclassifier_stats(), indent=2))
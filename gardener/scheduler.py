@@ -0,0 +1,344 @@
+"""Priority scheduler for gardener work.
+
+All inbox processing and maintenance runs on one scheduler thread, drawn
+from three queues:
+
+- interactive: notes just captured through the API or MCP
+- automated: notes changed under the watcher, and inbox sweeps requested
+  by the poller or /api/trigger-gardener
+- maintenance: reconcile runs (generate_maintenance_tasks)
+
+Work is handed out in units: up to GARDENER_SCHEDULER_SLICE notes, or one
+maintenance task. Between units the next queue is chosen by stride
+scheduling over the queue weights, so a fresh capture is picked up as soon
+as the current slice finishes (preemption between batches), while a busy
+interactive queue still leaves the backlog and maintenance a fair share.
+A single AI call or slice is never interrupted.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from concurrent.futures import Future
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+import config
+from config import GARDENER_SCHEDULER_SLICE
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = "interactive"
+PRIORITY_AUTOMATED = "automated"
+PRIORITY_MAINTENANCE = "maintenance"
+
+# Relative share of scheduler units each queue gets while all are busy
+QUEUE_WEIGHTS = {
+    PRIORITY_INTERACTIVE: 8,
+    PRIORITY_AUTOMATED: 2,
+    PRIORITY_MAINTENANCE: 1,
+}
+
+
+@dataclass
+class _Item:
+    seq: int
+    enqueued_at: float
+    filename: str | None = None  # Inbox note (interactive/automated)
+    task: Callable[[], Any] | None = None  # Maintenance callable
+    future: Future | None = None
+
+
+@dataclass
+class _Queue:
+    name: str
+    weight: int
+    items: deque = field(default_factory=deque)
+    pass_value: float = 0.0  # Stride scheduling position
+    served: int = 0
+    total_wait: float = 0.0
+    max_wait: float = 0.0
+
+    def record_wait(self, wait: float) -> None:
+        self.served += 1
+        self.total_wait += wait
+        self.max_wait = max(self.max_wait, wait)
+
+
+@dataclass
+class QueueStats:
+    """Depth and wait times of one scheduler queue."""
+
+    name: str
+    weight: int
+    depth: int
+    oldest_wait_seconds: float  # How long the head of the queue has waited
+    served: int
+    avg_wait_seconds: float
+    max_wait_seconds: float
+
+
+def _process_notes(files: list[Path]) -> Any:
+    from workers.gardener import process_inbox
+
+    return process_inbox(files=files)
+
+
+def _list_inbox() -> list[str]:
+    if not config.INBOX_DIR.exists():
+        return []
+    return [f.name for f in sorted(config.INBOX_DIR.glob("*.md"))]
+
+
+class GardenerScheduler:
+    """Weighted fair-share scheduler with one worker thread.
+
+    ``process`` receives a list of inbox paths and ``list_inbox`` returns
+    the inbox filenames; both are injectable for tests.
+    """
+
+    def __init__(
+        self,
+        process: Callable[[list[Path]], Any] = _process_notes,
+        list_inbox: Callable[[], list[str]] = _list_inbox,
+        slice_size: int = GARDENER_SCHEDULER_SLICE,
+        weights: dict[str, int] | None = None,
+    ):
+        self._process = process
+        self._list_inbox = list_inbox
+        self.slice_size = max(1, slice_size)
+        self._queues = {
+            name: _Queue(name, weight)
+            for name, weight in (weights or QUEUE_WEIGHTS).items()
+        }
+        self._cond = threading.Condition()
+        self._seq = 0
+        self._virtual_time = 0.0
+        # Notes queued or being processed, so a sweep does not queue them twice
+        self._claimed: set[str] = set()
+        self._sweep_waiters: list[tuple[int, Future]] = []
+        self._thread: threading.Thread | None = None
+        self._stopping = False
+
+    # --- Submission ---
+
+    def _push(self, queue: _Queue, item: _Item) -> None:
+        if not queue.items:
+            # A queue that was idle does not bank credit while idle
+            queue.pass_value = max(queue.pass_value, self._virtual_time)
+        queue.items.append(item)
+
+    def _next_item(self, **kwargs) -> _Item:
+        self._seq += 1
+        return _Item(seq=self._seq, enqueued_at=time.monotonic(), **kwargs)
+
+    def enqueue_capture(self, filename: str) -> None:
+        """Process a just-captured inbox note ahead of the backlog."""
+        with self._cond:
+            if filename in self._claimed:
+                # Already in the backlog: move it to the interactive queue
+                automated = self._queues[PRIORITY_AUTOMATED].items
+                for item in list(automated):
+                    if item.filename == filename:
+                        automated.remove(item)
+                        break
+                else:
+                    return
+            self._claimed.add(filename)
+            self._push(
+                self._queues[PRIORITY_INTERACTIVE], self._next_item(filename=filename)
+            )
+            self._ensure_started()
+            self._cond.notify()
+
+    def request_sweep(self) -> Future:
+        """Queue every unclaimed inbox note as background work.
+
+        Returns a future that completes once the notes queued so far have
+        been processed.
+        """
+        return self.enqueue_notes(self._list_inbox())
+
+    def enqueue_notes(self, filenames: list[str]) -> Future:
+        """Queue specific inbox notes as background work.
+
+        Notes already queued or in progress are left where they are. Returns
+        a future that completes once the notes queued so far have been
+        processed.
+        """
+        future: Future = Future()
+        with self._cond:
+            queue = self._queues[PRIORITY_AUTOMATED]
+            for filename in filenames:
+                if filename not in self._claimed:
+                    self._claimed.add(filename)
+                    self._push(queue, self._next_item(filename=filename))
+            if not queue.items:
+                future.set_result(None)
+                return future
+            self._sweep_waiters.append((queue.items[-1].seq, future))
+            self._ensure_started()
+            self._cond.notify()
+        return future
+
+    def submit_maintenance(self, task: Callable[[], Any]) -> Future:
+        """Run ``task`` on the scheduler thread at maintenance priority."""
+        future: Future = Future()
+        with self._cond:
+            self._push(
+                self._queues[PRIORITY_MAINTENANCE],
+                self._next_item(task=task, future=future),
+            )
+            self._ensure_started()
+            self._cond.notify()
+        return future
+
+    # --- Worker ---
+
+    def _ensure_started(self) -> None:
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(
+                target=self._run, name="gardener-scheduler", daemon=True
+            )
+            self._thread.start()
+
+    def _pick(self) -> tuple[_Queue, list[_Item]]:
+        """Take the next unit from the queue with the lowest pass value."""
+        ready = [q for q in self._queues.values() if q.items]
+        queue = min(ready, key=lambda q: (q.pass_value, -q.weight))
+        self._virtual_time = queue.pass_value
+        queue.pass_value += 1 / queue.weight
+
+        now = time.monotonic()
+        count = 1 if queue.name == PRIORITY_MAINTENANCE else self.slice_size
+        unit = []
+        while queue.items and len(unit) < count:
+            item = queue.items.popleft()
+            queue.record_wait(now - item.enqueued_at)
+            unit.append(item)
+        return queue, unit
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._stopping and not any(
+                    q.items for q in self._queues.values()
+                ):
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                queue, unit = self._pick()
+            self._execute(queue, unit)
+
+    def _execute(self, queue: _Queue, unit: list[_Item]) -> None:
+        if queue.name == PRIORITY_MAINTENANCE:
+            item = unit[0]
+            try:
+                item.future.set_result(item.task())
+            except Exception as e:
+                logger.error(f"Maintenance task failed: {e}")
+                item.future.set_exception(e)
+            with self._cond:
+                self._resolve_sweeps()
+            return
+
+        files = [config.INBOX_DIR / item.filename for item in unit]
+        logger.info(f"Scheduler: processing {len(files)} {queue.name} note(s)")
+        try:
+            self._process(files)
+        except Exception as e:
+            logger.error(f"Gardener processing failed: {e}")
+        finally:
+            with self._cond:
+                for item in unit:
+                    self._claimed.discard(item.filename)
+                self._resolve_sweeps()
+
+    def _resolve_sweeps(self) -> None:
+        """Complete sweeps with no notes left in the automated queue.
+
+        Notes moved to the interactive queue no longer hold a sweep back.
+        """
+        pending = [item.seq for item in self._queues[PRIORITY_AUTOMATED].items]
+        waiters = []
+        for target, future in self._sweep_waiters:
+            if any(seq <= target for seq in pending):
+                waiters.append((target, future))
+            else:
+                future.set_result(None)
+        self._sweep_waiters = waiters
+
+    def stop(self) -> None:
+        """Stop the worker after the current unit.
+
+        Queued work is dropped and everyone waiting on it (sweeps and
+        maintenance tasks) gets a RuntimeError instead of waiting forever.
+        """
+        with self._cond:
+            self._stopping = True
+            self._drain(RuntimeError("scheduler stopped"))
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+
+    def _drain(self, error: Exception) -> None:
+        """Empty every queue and fail the futures waiting on queued work."""
+        futures = [future for _, future in self._sweep_waiters]
+        self._sweep_waiters = []
+        for queue in self._queues.values():
+            for item in queue.items:
+                if item.filename is not None:
+                    self._claimed.discard(item.filename)
+                if item.future is not None:
+                    futures.append(item.future)
+            queue.items.clear()
+        for future in futures:
+            if not future.done():
+                future.set_exception(error)
+
+    # --- Introspection ---
+
+    def stats(self) -> list[QueueStats]:
+        """Per-queue depth and wait times, highest weight first."""
+        now = time.monotonic()
+        with self._cond:
+            return [
+                QueueStats(
+                    name=q.name,
+                    weight=q.weight,
+                    depth=len(q.items),
+                    oldest_wait_seconds=now - q.items[0].enqueued_at
+                    if q.items
+                    else 0.0,
+                    served=q.served,
+                    avg_wait_seconds=q.total_wait / q.served if q.served else 0.0,
+                    max_wait_seconds=q.max_wait,
+                )
+                for q in sorted(self._queues.values(), key=lambda q: -q.weight)
+            ]
+
+
+_scheduler: GardenerScheduler | None = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler() -> GardenerScheduler:
+    """Return the process-wide scheduler (its thread starts on first work)."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            _scheduler = GardenerScheduler()
+        return _scheduler
+
+
+def shutdown_scheduler() -> None:
+    """Stop the scheduler thread (called on shutdown)."""
+    global _scheduler
+    with _scheduler_lock:
+        scheduler, _scheduler = _scheduler, None
+    if scheduler is not None:
+        scheduler.stop()
@@ -0,0 +1,144 @@
+"""Rollover of long-lived append targets into segments.
+
+Notes the gardener keeps appending to (a daily journal, a busy project
+page) are split once they reach GARDENER_SEGMENT_KB or, with
+GARDENER_SEGMENT_PERIOD=month, when a new calendar month starts. The note
+keeps its path and stays the active segment, so appends and the paths the
+classifier knows are unchanged. Its earlier content moves to
+``<dir>/.segments/<stem>/<label>.md``, and the fresh note starts with the
+original frontmatter and title plus links to the earlier segments, newest
+first.
+
+Browse, search and listings treat a note and its segments as one logical
+note (see is_segment and logical_note_path).
+"""
+
+import logging
+import os
+import re
+import shutil
+from datetime import datetime
+from pathlib import Path
+
+from config import GARDENER_SEGMENT_KB, GARDENER_SEGMENT_PERIOD
+from file_io import path_lock, write_text_atomic
+
+logger = logging.getLogger(__name__)
+
+SEGMENTS_DIR = ".segments"
+
+_FRONTMATTER = re.compile(r"^---\s*\n.*?\n---\s*\n", re.DOTALL)
+
+
+def segments_dir(note: Path) -> Path:
+    """Directory holding the earlier segments of ``note``."""
+    return note.parent / SEGMENTS_DIR / note.stem
+
+
+def is_segment(path: Path | str) -> bool:
+    """Whether ``path`` is an earlier segment rather than a note."""
+    return SEGMENTS_DIR in Path(path).parts
+
+
+def logical_note_path(path: Path) -> Path:
+    """Map a segment to the note it belongs to; other paths are unchanged."""
+    parts = path.parts
+    if SEGMENTS_DIR not in parts:
+        return path
+    index = len(parts) - 1 - parts[::-1].index(SEGMENTS_DIR)
+    if index + 2 >= len(parts):
+        return path
+    return Path(*parts[:index], f"{parts[index + 1]}.md")
+
+
+def list_segments(note: Path) -> list[Path]:
+    """Earlier segments of ``note``, newest first."""
+    directory = segments_dir(note)
+    if not directory.is_dir():
+        return []
+    return sorted(directory.glob("*.md"), key=_segment_order, reverse=True)
+
+
+def _segment_order(segment: Path) -> tuple[str, int]:
+    # "2026-03-05_2" is the second segment started on 2026-03-05
+    label, _, number = segment.stem.partition("_")
+    return label, int(number) if number.isdigit() else 1
+
+
+def _rollover_label(note: Path, now: datetime, max_kb: int, period: str) -> str | None:
+    """Segment label if ``note`` is due for rollover, else None."""
+    try:
+        stat = note.stat()
+    except FileNotFoundError:
+        return None
+    if period == "month":
+        written = datetime.fromtimestamp(stat.st_mtime)
+        if (written.year, written.month) != (now.year, now.month):
+            return written.strftime("%Y-%m")
+    if max_kb and stat.st_size >= max_kb * 1024:
+        return now.strftime("%Y-%m-%d")
+    return None
+
+
+def _preamble(content: str) -> str:
+    """Frontmatter and first top-level heading, carried into the new segment."""
+    frontmatter = _FRONTMATTER.match(content)
+    head = frontmatter.group(0) if frontmatter else ""
+    body = content[len(head) :]
+    title = next((line for line in body.splitlines() if line.startswith("# ")), None)
+    return head + (f"{title}\n\n" if title else "")
+
+
+def _index_line(note: Path) -> str:
+    links = " · ".join(
+        f"[{segment.stem}]({SEGMENTS_DIR}/{note.stem}/{segment.name})"
+        for segment in list_segments(note)
+    )
+    return f"> Earlier entries: {links}\n"
+
+
+def roll_over(
+    note: Path,
+    now: datetime | None = None,
+    max_kb: int | None = None,
+    period: str | None = None,
+) -> Path | None:
+    """Start a new segment of ``note`` if the rollover policy says so.
+
+    ``max_kb`` and ``period`` default to GARDENER_SEGMENT_KB and
+    GARDENER_SEGMENT_PERIOD.
+
+    The current content is hard-linked into the segments directory before
+    the note is atomically replaced, so a crash at any point leaves the
+    content in at least one place.
+
+    Returns:
+        The new segment's path, or None if no rollover was needed
+    """
+    with path_lock(note):
+        label = _rollover_label(
+            note,
+            now or datetime.now(),
+            GARDENER_SEGMENT_KB if max_kb is None else max_kb,
+            period or GARDENER_SEGMENT_PERIOD,
+        )
+        if label is None:
+            return None
+
+        directory = segments_dir(note)
+        directory.mkdir(parents=True, exist_ok=True)
+        segment = directory / f"{label}.md"
+        suffix = 2
+        while segment.exists():
+            segment = directory / f"{label}_{suffix}.md"
+            suffix += 1
+
+        content = note.read_text()
+        try:
+            os.link(note, segment)
+        except OSError:
+            shutil.copy2(note, segment)
+        write_text_atomic(note, _preamble(content) + _index_line(note))
+
+    logger.info(f"Rolled {note.name} over into segment {segment.name}")
+    return segment
@@ -16,6 +16,19 @@ if "DATA_DIR" not in os.environ:
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
 
+@pytest.fixture(autouse=True)
+def _reset_transport_state():
+    """Start every test with closed circuit breakers and zeroed counters."""
+    from backends.router import reset_routing_state
+    from backends.transport import reset_transport_state
+
+    reset_transport_state()
+    reset_routing_state()
+    yield
+    reset_transport_state()
+    reset_routing_state()
+
+
 @pytest.fixture
 def stress_data_dir(tmp_path_factory: pytest.TempPathFactory) -> Path:
     base = tmp_path_factory.mktemp("stress-data")
@@ -0,0 +1,202 @@
+"""Local stand-in for an OpenAI-compatible HTTP API.
+
+Serves canned responses over real sockets so tests can observe transport
+behaviour (connection reuse, retries, status codes) and multi-step
+protocols such as the Batch API without reaching a provider.
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+@dataclass
+class FakeResponse:
+    """A scripted reply: status, JSON (dict) or text body and extra headers."""
+
+    status: int = 200
+    body: dict | str | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+
+
+def chat_completion(content: str, model: str = "fake-model") -> dict:
+    """Build a minimal chat completion body."""
+    return {
+        "model": model,
+        "choices": [{"message": {"role": "assistant", "content": content}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5},
+    }
+
+
+def _parse_body(content_type: str, raw: bytes) -> dict | bytes:
+    """Decode JSON bodies and multipart uploads (field name -> bytes)."""
+    if content_type.startswith("multipart/form-data"):
+        message = BytesParser(policy=HTTP).parsebytes(
+            f"Content-Type: {content_type}\r\n\r\n".encode() + raw
+        )
+        return {
+            part.get_param("name", header="content-disposition"): part.get_payload(
+                decode=True
+            )
+            for part in message.iter_parts()
+        }
+    try:
+        return json.loads(raw) if raw else {}
+    except ValueError:
+        return raw
+
+
+class FakeAIServer:
+    """Threaded HTTP/1.1 server recording each request and its client port.
+
+    ``handler`` receives ``(method, path, body)`` and returns a FakeResponse;
+    by default every request gets a short chat completion.
+    """
+
+    def __init__(
+        self, handler: Callable[[str, str, dict | bytes], FakeResponse] | None = None
+    ) -> None:
+        self.handler = handler or (
+            lambda method, path, body: FakeResponse(body=chat_completion("ok"))
+        )
+        self.requests: list[dict] = []
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length) if length else b""
+                body = _parse_body(self.headers.get("Content-Type", ""), raw)
+                with server._lock:
+                    server.requests.append(
+                        {
+                            "method": self.command,
+                            "path": self.path,
+                            "body": body,
+                            "client_port": self.client_address[1],
+                            "headers": dict(self.headers),
+                        }
+                    )
+                reply = server.handler(self.command, self.path, body)
+                if isinstance(reply.body, str):
+                    payload = reply.body.encode()
+                    content_type = "text/plain"
+                else:
+                    payload = json.dumps(reply.body or {}).encode()
+                    content_type = "application/json"
+                self.send_response(reply.status)
+                self.send_header("Content-Type", content_type)
+                self.send_header("Content-Length", str(len(payload)))
+                for key, value in reply.headers.items():
+                    self.send_header(key, value)
+                try:
+                    self.end_headers()
+                    self.wfile.write(payload)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # Client gave up (e.g. a cancelled hedge request)
+
+            do_GET = _handle
+            do_POST = _handle
+
+            def log_message(self, format, *args):
+                pass
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._server.daemon_threads = True
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def client_ports(self) -> set[int]:
+        """Distinct client ports seen, i.e. the number of TCP connections."""
+        with self._lock:
+            return {r["client_port"] for r in self.requests}
+
+    def __enter__(self) -> FakeAIServer:
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+
+class FakeBatchAPI:
+    """Minimal OpenAI Batch API: file upload, batch create/retrieve, output.
+
+    Each batch reports ``in_progress`` for ``polls_until_done`` retrievals and
+    then ``completed``. ``reply`` maps one uploaded request line to the
+    assistant text for that note (or None to report a per-request error).
+    """
+
+    def __init__(
+        self, reply: Callable[[dict], str | None], polls_until_done: int = 1
+    ) -> None:
+        self.reply = reply
+        self.polls_until_done = polls_until_done
+        self.files: dict[str, str] = {}
+        self.batches: dict[str, dict] = {}
+        self._polls: dict[str, int] = {}
+
+    def __call__(self, method: str, path: str, body: dict | bytes) -> FakeResponse:
+        if method == "POST" and path == "/files":
+            file_id = f"file-{len(self.files) + 1}"
+            self.files[file_id] = body["file"].decode()
+            return FakeResponse(body={"id": file_id, "purpose": "batch"})
+
+        if method == "POST" and path == "/batches":
+            batch_id = f"batch_{len(self.batches) + 1}"
+            self.batches[batch_id] = {
+                "id": batch_id,
+                "input_file_id": body["input_file_id"],
+                "status": "validating",
+            }
+            self._polls[batch_id] = 0
+            return FakeResponse(body=self.batches[batch_id])
+
+        if method == "GET" and path.startswith("/batches/"):
+            batch = self.batches.get(path.rsplit("/", 1)[1])
+            if batch is None:
+                return FakeResponse(status=404, body={"error": "not found"})
+            self._polls[batch["id"]] += 1
+            if self._polls[batch["id"]] > self.polls_until_done:
+                self._complete(batch)
+            else:
+                batch["status"] = "in_progress"
+            return FakeResponse(body=batch)
+
+        if method == "GET" and path.startswith("/files/") and path.endswith("/content"):
+            return FakeResponse(body=self.files[path.split("/")[2]])
+
+        return FakeResponse(status=404, body={"error": f"no route {method} {path}"})
+
+    def _complete(self, batch: dict) -> None:
+        if batch["status"] == "completed":
+            return
+        lines = []
+        for line in self.files[batch["input_file_id"]].splitlines():
+            request = json.loads(line)
+            text = self.reply(request)
+            if text is None:
+                response = {"status_code": 500, "body": {"error": "server error"}}
+            else:
+                response = {"status_code": 200, "body": chat_completion(text)}
+            lines.append(
+                json.dumps({"custom_id": request["custom_id"], "response": response})
+            )
+        output_id = f"file-{len(self.files) + 1}"
+        self.files[output_id] = "\n".join(lines)
+        batch.update(status="completed", output_file_id=output_id)
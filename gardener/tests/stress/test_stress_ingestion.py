@@ -104,6 +104,7 @@ def test_high_volume_ingestion(
     summary["throughput_per_s"] = total_notes / elapsed_s if elapsed_s > 0 else None
 
     if expect_classification:
+        from archive import find_archived
         from workers.gardener import process_inbox
 
         data_dir = os.environ.get("STRESS_DATA_DIR")
@@ -117,8 +118,10 @@ def test_high_volume_ingestion(
         for result in results:
             if not result.get("success"):
                 continue
-            archive_path = archive_dir / result["file"] if archive_dir else None
-            if not archive_path or not archive_path.exists():
+            archive_path = (
+                find_archived(result["file"], archive_dir) if archive_dir else None
+            )
+            if not archive_path:
                 continue
             expected = _extract_expected_category(
                 archive_path.read_text(encoding="utf-8", errors="ignore")
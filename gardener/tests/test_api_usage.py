@@ -0,0 +1,163 @@
+"""Tests for API usage tracking, token accounting and budgets."""
+
+import sqlite3
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def temp_state(tmp_path):
+    """Point the state database at a temporary directory."""
+    state_dir = tmp_path / ".gardener"
+    state_db = state_dir / "state.db"
+    with (
+        patch("config.STATE_DIR", state_dir),
+        patch("config.STATE_DB", state_db),
+    ):
+        yield state_db
+
+
+class TestTokenAccounting:
+    """Token counts are stored per call and aggregated."""
+
+    def test_track_api_call_records_usage(self, temp_state):
+        """Usage filled in by the backend should be stored with the call."""
+        from api_usage import get_usage_stats, track_api_call
+
+        with track_api_call("openai", "classify") as usage:
+            usage.add(
+                model="gpt-4o",
+                prompt_tokens=1200,
+                completion_tokens=80,
+                cached_tokens=1000,
+            )
+
+        stats = get_usage_stats()
+        assert stats.calls_last_day == 1
+        assert stats.tokens_last_day == 1280
+
+    def test_breakdown_groups_by_operation_and_model(self, temp_state):
+        """Breakdown should aggregate per (operation, model)."""
+        from api_usage import ApiCallUsage, get_usage_breakdown, record_api_call
+
+        for _ in range(2):
+            usage = ApiCallUsage("openai", "classify", "gpt-4o", 1000, 50, 900)
+            record_api_call("openai", "classify", usage=usage)
+        usage = ApiCallUsage("openai", "refine", "gpt-4o-mini", 100, 20, 0)
+        record_api_call("openai", "refine", usage=usage)
+
+        breakdown = {(b.operation, b.model): b for b in get_usage_breakdown()}
+        classify = breakdown[("classify", "gpt-4o")]
+        assert classify.calls == 2
+        assert classify.prompt_tokens == 2000
+        assert classify.cached_tokens == 1800
+        assert breakdown[("refine", "gpt-4o-mini")].completion_tokens == 20
+
+    def test_breakdown_reports_cache_hits(self, temp_state):
+        """Cache reads count as hits, cache-only writes as misses."""
+        from api_usage import ApiCallUsage, get_usage_breakdown, record_api_call
+
+        miss = ApiCallUsage("anthropic", "classify", "claude", 3000, 50)
+        miss.cache_write_tokens = 2900
+        record_api_call("anthropic", "classify", usage=miss)
+        for _ in range(3):
+            hit = ApiCallUsage("anthropic", "classify", "claude", 3000, 50, 2900)
+            record_api_call("anthropic", "classify", usage=hit)
+
+        (breakdown,) = get_usage_breakdown()
+        assert breakdown.cache_hits == 3
+        assert breakdown.cache_misses == 1
+        assert breakdown.cache_write_tokens == 2900
+        assert breakdown.cache_hit_rate == 0.75
+
+    def test_breakdown_reports_parse_failures(self, temp_state):
+        """Replies that could not be parsed are counted per operation."""
+        from api_usage import get_usage_breakdown, track_api_call
+
+        for parse_error in (True, False, False, False):
+            with track_api_call("openai", "classify") as usage:
+                usage.add(model="gpt-4o", prompt_tokens=100, completion_tokens=10)
+                usage.parse_error = parse_error
+
+        (row,) = get_usage_breakdown()
+        assert row.calls == 4
+        assert row.parse_failures == 1
+        assert row.parse_failure_rate == 0.25
+
+    def test_ignores_non_integer_token_counts(self):
+        """Junk values from mocked or partial responses count as zero."""
+        from api_usage import ApiCallUsage
+
+        usage = ApiCallUsage("anthropic", "ask")
+        usage.add(model="claude", prompt_tokens=object(), completion_tokens=None)
+        assert usage.total_tokens == 0
+        assert usage.model == "claude"
+
+    def test_migrates_legacy_api_calls_table(self, temp_state):
+        """Databases created before token accounting gain the new columns."""
+        temp_state.parent.mkdir(parents=True)
+        conn = sqlite3.connect(temp_state)
+        conn.execute(
+            """CREATE TABLE api_calls (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                backend TEXT NOT NULL,
+                operation TEXT NOT NULL,
+                timestamp TEXT DEFAULT (datetime('now')),
+                success INTEGER DEFAULT 1,
+                error TEXT
+            )"""
+        )
+        conn.commit()
+        conn.close()
+
+        from api_usage import init_api_usage_db
+
+        init_api_usage_db()
+
+        conn = sqlite3.connect(temp_state)
+        columns = {row[1] for row in conn.execute("PRAGMA table_info(api_calls)")}
+        conn.close()
+        assert {
+            "model",
+            "prompt_tokens",
+            "completion_tokens",
+            "cached_tokens",
+            "cache_write_tokens",
+        } <= columns
+
+
+class TestTokenBudgets:
+    """Token budgets are enforced alongside call limits."""
+
+    def test_hourly_token_budget_blocks_calls(self, temp_state):
+        """Exceeding the hourly token budget should block further calls."""
+        from api_usage import (
+            ApiCallUsage,
+            RateLimitError,
+            record_api_call,
+            track_api_call,
+        )
+
+        record_api_call(
+            "openai",
+            "classify",
+            usage=ApiCallUsage("openai", "classify", "m", 900, 200),
+        )
+        with patch("api_usage.MAX_TOKENS_PER_HOUR", 1000):
+            with pytest.raises(RateLimitError, match="token budget"):
+                with track_api_call("openai", "classify"):
+                    pass
+
+    def test_zero_call_limit_disables_call_check(self, temp_state):
+        """A call limit of 0 means tokens alone govern the quota."""
+        from api_usage import check_rate_limit, record_api_call
+
+        record_api_call("openai", "ask")
+        with (
+            patch("api_usage.MAX_CALLS_PER_HOUR", 0),
+            patch("api_usage.MAX_CALLS_PER_DAY", 0),
+        ):
+            allowed, reason = check_rate_limit()
+        assert allowed
+        assert reason is None
@@ -0,0 +1,182 @@
+"""Tests for the date-sharded inbox archive."""
+
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+class TestArchiveShard:
+    """Shards come from the inbox filename's timestamp."""
+
+    def test_shard_from_timestamped_name(self):
+        """An inbox filename maps to its year and month."""
+        from archive import archive_shard
+
+        assert archive_shard("2026-03-05_1412-ab12cd34.md") == Path("2026", "03")
+
+    def test_untimestamped_name_uses_fallback(self):
+        """Other names go to the month of the fallback time."""
+        from archive import archive_shard
+
+        assert archive_shard("old-note.md", datetime(2024, 11, 2)) == Path("2024", "11")
+        assert archive_shard("2026-13-01_note.md", datetime(2025, 1, 9)) == Path(
+            "2025", "01"
+        )
+
+
+def test_archive_inbox_file_moves_into_shard(tmp_path):
+    """Processed notes land in their month's shard."""
+    from workers.gardener import archive_inbox_file
+
+    inbox, archive = tmp_path / "inbox", tmp_path / "inbox" / "archive"
+    inbox.mkdir()
+    note = inbox / "2026-03-05_1412-ab12cd34.md"
+    note.write_text("# Note")
+
+    with patch("workers.gardener.ARCHIVE_DIR", archive):
+        first = archive_inbox_file(note)
+        note.write_text("# Again")
+        second = archive_inbox_file(note)
+
+    assert first == archive / "2026" / "03" / note.name
+    assert second.parent == first.parent
+    assert second.name.startswith("2026-03-05_1412-ab12cd34--archived-")
+
+
+def test_find_archived_checks_shard_then_root(tmp_path):
+    """Notes are found before and after migration."""
+    from archive import find_archived
+
+    (tmp_path / "2026" / "03").mkdir(parents=True)
+    sharded = tmp_path / "2026" / "03" / "2026-03-05_1412-ab12cd34.md"
+    sharded.write_text("a")
+    flat = tmp_path / "old-note.md"
+    flat.write_text("b")
+
+    assert find_archived(sharded.name, tmp_path) == sharded
+    assert find_archived("old-note.md", tmp_path) == flat
+    assert find_archived("missing.md", tmp_path) is None
+
+
+def test_untimestamped_notes_are_found_in_any_shard(tmp_path):
+    """A note named without a date is found after the month it was archived."""
+    from archive import find_archived, pack_shard, read_archived
+
+    (tmp_path / "2024" / "11").mkdir(parents=True)
+    note = tmp_path / "2024" / "11" / "old-note.md"
+    note.write_text("loose")
+    (tmp_path / "2024" / "10").mkdir()
+    (tmp_path / "2024" / "10" / "packed-note.md").write_text("packed")
+    pack_shard(tmp_path / "2024" / "10")
+
+    assert find_archived("old-note.md", tmp_path) == note
+    assert read_archived("packed-note.md", tmp_path) == "packed"
+    assert read_archived("missing.md", tmp_path) is None
+
+
+def test_migrate_moves_flat_notes_in_one_commit(tmp_path):
+    """A flat archive is sharded with a single git commit."""
+    import os
+
+    from archive import migrate_flat_archive
+
+    (tmp_path / "2026-03-05_1412-ab12cd34.md").write_text("a")
+    (tmp_path / "2026-04-01_0900-deadbeef.md").write_text("b")
+    legacy = tmp_path / "old-note.md"
+    legacy.write_text("c")
+    os.utime(legacy, (datetime(2024, 11, 2).timestamp(),) * 2)
+
+    with (
+        patch("workers.gardener.git_commit", return_value=True) as commit,
+        patch("file_state.cleanup_stale_files", return_value=0),
+    ):
+        moved = migrate_flat_archive(tmp_path)
+        assert migrate_flat_archive(tmp_path) == 0
+
+    assert moved == 3
+    assert commit.call_count == 1
+    assert (tmp_path / "2026" / "03" / "2026-03-05_1412-ab12cd34.md").exists()
+    assert (tmp_path / "2026" / "04" / "2026-04-01_0900-deadbeef.md").exists()
+    assert (tmp_path / "2024" / "11" / "old-note.md").read_text() == "c"
+    assert not list(tmp_path.glob("*.md"))
+
+
+class TestColdBundles:
+    """Old shards are packed into bundles and read in place."""
+
+    @pytest.fixture
+    def archive(self, tmp_path):
+        for shard, names in {
+            ("2024", "11"): [
+                "2024-11-02_0900-aaaa1111.md",
+                "2024-11-20_1800-bbbb2222.md",
+            ],
+            ("2026", "09"): ["2026-09-30_0700-cccc3333.md"],
+        }.items():
+            directory = tmp_path.joinpath(*shard)
+            directory.mkdir(parents=True)
+            for name in names:
+                (directory / name).write_text(f"# {name}\n")
+        return tmp_path
+
+    def _pack(self, archive, months=3):
+        from archive import pack_cold_shards
+
+        with (
+            patch("workers.gardener.git_commit", return_value=True) as commit,
+            patch("file_state.cleanup_stale_files", return_value=0),
+        ):
+            packed = pack_cold_shards(months, datetime(2026, 10, 19), archive)
+        return packed, commit
+
+    def test_packs_only_old_shards(self, archive):
+        """Shards past the age limit become bundles in a single commit."""
+        packed, commit = self._pack(archive)
+
+        assert packed == 1
+        assert commit.call_count == 1
+        assert (archive / "2024" / "11.zip").is_file()
+        assert not (archive / "2024" / "11").exists()
+        assert (archive / "2026" / "09" / "2026-09-30_0700-cccc3333.md").exists()
+
+    def test_disabled_by_default(self, archive):
+        """Without a cold age nothing is packed."""
+        from archive import pack_cold_shards
+
+        with patch("config.GARDENER_ARCHIVE_COLD_MONTHS", 0):
+            assert pack_cold_shards(root=archive) == 0
+        assert (archive / "2024" / "11").is_dir()
+
+    def test_reads_notes_from_bundle(self, archive):
+        """Listings and single notes come straight from the bundle."""
+        from archive import bundle_names, iter_bundled, read_archived, read_bundled
+
+        self._pack(archive)
+
+        assert sorted(bundle_names("2024/11", archive)) == [
+            "2024-11-02_0900-aaaa1111.md",
+            "2024-11-20_1800-bbbb2222.md",
+        ]
+        assert (
+            read_bundled("2024/11/2024-11-02_0900-aaaa1111.md", archive)
+            == "# 2024-11-02_0900-aaaa1111.md\n"
+        )
+        assert read_bundled("2024/11/missing.md", archive) is None
+        assert read_bundled("../2024/11.zip", archive) is None
+        assert read_archived("2024-11-20_1800-bbbb2222.md", archive) is not None
+        assert len(list(iter_bundled(archive))) == 2
+
+    def test_late_notes_are_merged_into_the_bundle(self, archive):
+        """A note archived into a packed month joins the existing bundle."""
+        from archive import bundle_names
+
+        self._pack(archive)
+        late = archive / "2024" / "11" / "2024-11-25_1200-dddd4444.md"
+        late.parent.mkdir()
+        late.write_text("late")
+        packed, _ = self._pack(archive)
+
+        assert packed == 1
+        assert len(bundle_names("2024/11", archive)) == 3
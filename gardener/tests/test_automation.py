@@ -0,0 +1,44 @@
+"""Tests for watcher event batching."""
+
+from automation import InboxBatcher
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+class TestInboxBatcher:
+    """Coalescing and the max-wait bound."""
+
+    def test_coalesces_events_per_file(self):
+        """Repeated events for a note yield it once, oldest change first."""
+        clock = FakeClock()
+        batcher = InboxBatcher(debounce=5, max_wait=30, clock=clock)
+
+        batcher.add("b.md")
+        clock.now += 1
+        batcher.add("a.md")
+        batcher.add("b.md")
+        batcher.add("gone.md")
+        batcher.discard("gone.md")
+
+        assert batcher.deadline() == clock.now + 5
+        assert batcher.take() == ["b.md", "a.md"]
+        assert batcher.deadline() is None
+
+    def test_steady_events_do_not_postpone_past_max_wait(self):
+        """Each event pushes the debounce back, but never past max_wait."""
+        clock = FakeClock()
+        batcher = InboxBatcher(debounce=5, max_wait=30, clock=clock)
+        start = clock.now
+
+        for i in range(20):
+            batcher.add(f"note-{i}.md")
+            clock.now += 2
+
+        assert batcher.deadline() == start + 30
+        assert len(batcher) == 20
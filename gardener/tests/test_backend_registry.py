@@ -0,0 +1,120 @@
+"""Tests for the pooled, process-wide backend registry."""
+
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from backends.base import BackendConfig
+from tests.fixtures.fake_ai_server import FakeAIServer
+
+
+@pytest.fixture
+def fake_server():
+    """Run a local OpenAI-compatible stand-in."""
+    with FakeAIServer() as server:
+        yield server
+
+
+@pytest.fixture
+def no_tracking():
+    """Skip API usage bookkeeping for transport-level tests."""
+    with patch("backends.openai.track_api_call") as track:
+        track.return_value.__enter__.return_value = None
+        yield
+
+
+def _config(url: str) -> BackendConfig:
+    return BackendConfig(
+        api_key="test-key",
+        base_url=url,
+        model_thinking="fake-thinking",
+        model_fast="fake-fast",
+        http2=False,
+    )
+
+
+class TestBackendRegistry:
+    """Shared backends keep their connections alive between calls."""
+
+    def test_sync_backend_reuses_connection(self, fake_server, no_tracking):
+        """Two sequential calls through the registry use one TCP connection."""
+        from backends.registry import BackendRegistry
+
+        registry = BackendRegistry("openai", _config(fake_server.url))
+        try:
+            assert registry.get().ask("q1", "") == "ok"
+            assert registry.get().refine("note", "") == "ok"
+            assert registry.get() is registry.get()
+        finally:
+            registry.close()
+
+        assert len(fake_server.requests) == 2
+        assert len(fake_server.client_ports) == 1
+
+    async def test_async_backend_reuses_connection(self, fake_server, no_tracking):
+        """The async backend is shared too and keeps its pool warm."""
+        from backends.registry import BackendRegistry
+
+        registry = BackendRegistry("openai", _config(fake_server.url))
+        try:
+            first = registry.get_async()
+            assert await first.ask("q1", "") == "ok"
+            assert registry.get_async() is first
+            assert await registry.get_async().ask("q2", "") == "ok"
+        finally:
+            await registry.aclose()
+
+        assert len(fake_server.requests) == 2
+        assert len(fake_server.client_ports) == 1
+
+    async def test_close_drops_shared_registry(self):
+        """Shutdown closes the pooled clients and forgets the registry."""
+        import backends.registry as registry_module
+
+        registry = registry_module.init_backend_registry()
+        assert registry_module.get_backend_registry() is registry
+        await registry_module.close_backend_registry()
+        assert registry_module._registry is None
+
+    async def test_reinit_closes_previous_registry(self):
+        """Reloading the configuration closes the old pooled clients."""
+        from unittest.mock import AsyncMock, MagicMock
+
+        import backends.registry as registry_module
+
+        old = registry_module.init_backend_registry()
+        old._sync, old._async = MagicMock(), AsyncMock()
+        old._async_loop = asyncio.get_running_loop()
+        sync, async_ = old._sync, old._async
+        try:
+            registry_module.init_backend_registry()
+            await asyncio.sleep(0)
+        finally:
+            await registry_module.close_backend_registry()
+
+        sync.close.assert_called_once()
+        async_.aclose.assert_awaited_once()
+
+    def test_stale_async_backend_is_closed(self):
+        """A backend left behind by a finished event loop is closed."""
+        import asyncio
+        from unittest.mock import AsyncMock
+
+        from backends.registry import BackendRegistry
+
+        registry = BackendRegistry("openai", _config("http://unused"))
+        backends = [AsyncMock(), AsyncMock()]
+
+        async def get_and_yield():
+            backend = registry.get_async()
+            await asyncio.sleep(0)
+            return backend
+
+        with patch.object(registry, "_build", side_effect=backends):
+            first = asyncio.run(get_and_yield())
+            second = asyncio.run(get_and_yield())
+
+        assert (first, second) == tuple(backends)
+        first.aclose.assert_awaited_once()
+        second.aclose.assert_not_awaited()
@@ -1,6 +1,9 @@
 """Tests for LLM backend implementations."""
 
-from unittest.mock import MagicMock, patch
+import json
+import os
+from dataclasses import replace
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
@@ -63,6 +66,142 @@ class TestOpenAIBackend:
             assert result.action == "create"
             assert result.path == "projects/new.md"
 
+    def test_classify_sends_context_as_stable_prefix(self, backend_config):
+        """System prompt and context come first; the note is the last message."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "choices": [
+                {
+                    "message": {
+                        "content": '{"action": "task", "path": "tasks.md", "content": "x", "reasoning": "y"}'
+                    }
+                }
+            ]
+        }
+
+        with patch("httpx.Client") as mock_client_class:
+            mock_client = MagicMock()
+            mock_client.post.return_value = mock_response
+            mock_client_class.return_value = mock_client
+
+            from backends.openai import OpenAIBackend
+
+            backend = OpenAIBackend(backend_config)
+            backend.classify("Note one", "a.md", "AGENTS rules")
+            backend.classify("Note two", "b.md", "AGENTS rules")
+
+            first, second = (
+                call.kwargs["json"]["messages"]
+                for call in mock_client.post.call_args_list
+            )
+            assert first[0]["role"] == "system"
+            assert "AGENTS rules" in first[0]["content"]
+            assert first[0] == second[0]
+            assert "AGENTS rules" not in first[-1]["content"]
+            assert "Note one" in first[-1]["content"]
+
+    def test_classify_requests_json_schema(self, backend_config):
+        """Classification asks for output constrained to the action schema."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "choices": [
+                {
+                    "message": {
+                        "content": '{"action": "task", "path": "tasks.md", "content": "x", "reasoning": "y"}'
+                    }
+                }
+            ]
+        }
+
+        with patch("httpx.Client") as mock_client_class:
+            mock_client = MagicMock()
+            mock_client.post.return_value = mock_response
+            mock_client_class.return_value = mock_client
+
+            from backends.base import GARDENER_ACTION_SCHEMA
+            from backends.openai import OpenAIBackend
+
+            OpenAIBackend(backend_config).classify("Note", "n.md", "Context")
+            plain = OpenAIBackend(replace(backend_config, structured_output=False))
+            plain.classify("Note", "n.md", "Context")
+
+            structured, unstructured = (
+                call.kwargs["json"] for call in mock_client.post.call_args_list
+            )
+            response_format = structured["response_format"]
+            assert response_format["type"] == "json_schema"
+            assert response_format["json_schema"]["strict"] is True
+            assert response_format["json_schema"]["schema"] == GARDENER_ACTION_SCHEMA
+            assert "response_format" not in unstructured
+
+    def test_classify_batch_retries_only_failed_items(self, backend_config):
+        """A batch is one request; only invalid items are re-classified."""
+        batch_reply = MagicMock()
+        batch_reply.json.return_value = {
+            "choices": [
+                {
+                    "message": {
+                        "content": '[{"index": 1, "action": "create", "path": "a.md", "content": "A", "reasoning": "r"}, {"index": 2, "action": "bogus"}, {"index": 3, "action": "task", "path": "t", "content": "C", "reasoning": "r"}]'
+                    }
+                }
+            ]
+        }
+        single_reply = MagicMock()
+        single_reply.json.return_value = {
+            "choices": [
+                {
+                    "message": {
+                        "content": '{"action": "create", "path": "b.md", "content": "B", "reasoning": "r"}'
+                    }
+                }
+            ]
+        }
+
+        with patch("httpx.Client") as mock_client_class:
+            mock_client = MagicMock()
+            mock_client.post.side_effect = [batch_reply, single_reply]
+            mock_client_class.return_value = mock_client
+
+            from backends.openai import OpenAIBackend
+
+            backend = OpenAIBackend(backend_config)
+            results = backend.classify_batch(
+                [("Note A", "a.md"), ("Note B", "b.md"), ("Note C", "c.md")],
+                context="AGENTS rules",
+            )
+
+            assert [r.content for r in results] == ["A", "B", "C"]
+            assert mock_client.post.call_count == 2
+            retry = mock_client.post.call_args_list[1].kwargs["json"]["messages"]
+            assert "Note B" in retry[-1]["content"]
+            assert "Note A" not in retry[-1]["content"]
+
+    def test_classify_batch_without_batch_prompt(self, backend_config):
+        """Backends without batch prompts classify each note on its own."""
+        from backends.base import GardenerBackend
+
+        class SingleBackend(GardenerBackend):
+            name = "single"
+
+            def classify(self, note_content, filename, context, **kwargs):
+                return GardenerAction(
+                    action="create", path=filename, content=note_content, reasoning="r"
+                )
+
+            def refine(self, content, related_context):
+                return ""
+
+            def ask(self, question, related_context, fast=False):
+                return ""
+
+        backend = SingleBackend(backend_config)
+        results = backend.classify_batch(
+            [("Note A", "a.md"), ("Note B", "b.md")], context=""
+        )
+
+        assert not backend.supports_batch_prompt
+        assert [r.content for r in results] == ["Note A", "Note B"]
+
     def test_classify_with_markdown_json(self, backend_config):
         """Should extract JSON from markdown code blocks."""
         mock_response = MagicMock()
@@ -188,6 +327,36 @@ Let me know if you need anything else."""
             assert "3" in result
             assert "projects" in result.lower()
 
+    def test_chat_records_token_usage(self, backend_config):
+        """Should copy prompt, completion and cached tokens into usage."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "model": "gpt-4o-2024-08-06",
+            "choices": [{"message": {"content": "Answer"}}],
+            "usage": {
+                "prompt_tokens": 1500,
+                "completion_tokens": 40,
+                "prompt_tokens_details": {"cached_tokens": 1280},
+            },
+        }
+
+        with patch("httpx.Client") as mock_client_class:
+            mock_client = MagicMock()
+            mock_client.post.return_value = mock_response
+            mock_client_class.return_value = mock_client
+
+            from api_usage import ApiCallUsage
+            from backends.openai import OpenAIBackend
+
+            backend = OpenAIBackend(backend_config)
+            usage = ApiCallUsage("openai", "ask")
+            backend._chat([{"role": "user", "content": "Q"}], usage=usage)
+
+            assert usage.model == "gpt-4o-2024-08-06"
+            assert usage.prompt_tokens == 1500
+            assert usage.completion_tokens == 40
+            assert usage.cached_tokens == 1280
+
 
 class TestAnthropicBackend:
     """Tests for Anthropic Claude backend."""
@@ -227,6 +396,68 @@ class TestAnthropicBackend:
             assert result.action == "create"
             assert result.path == "tech/servers.md"
 
+    def test_classify_caches_context_in_system_blocks(self, backend_config):
+        """Context files go in a cacheable system block, not the user turn."""
+        mock_message = MagicMock()
+        mock_message.content = [
+            MagicMock(
+                text='{"action": "task", "path": "tasks.md", "content": "x", "reasoning": "y"}'
+            )
+        ]
+
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            mock_client = MagicMock()
+            mock_client.messages.create.return_value = mock_message
+            mock_anthropic.return_value = mock_client
+
+            from backends.anthropic import AnthropicBackend
+
+            backend = AnthropicBackend(backend_config)
+            backend.classify("Note body", "n.md", "AGENTS rules")
+            backend.classify("Other body", "o.md", "AGENTS rules")
+
+            first, second = mock_client.messages.create.call_args_list
+            system = first.kwargs["system"]
+            assert system[-1]["cache_control"] == {"type": "ephemeral"}
+            assert "AGENTS rules" in system[-1]["text"]
+            assert "AGENTS rules" not in first.kwargs["messages"][0]["content"]
+            assert second.kwargs["system"] == system
+
+    def test_classify_uses_forced_tool_call(self, backend_config):
+        """The action comes back as tool input, not free text."""
+        tool_call = MagicMock(
+            type="tool_use",
+            input={
+                "action": "append",
+                "path": "people/alice.md",
+                "content": "Met Alice",
+                "reasoning": "Person note",
+            },
+        )
+        mock_message = MagicMock()
+        mock_message.content = [tool_call]
+
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            mock_client = MagicMock()
+            mock_client.messages.create.return_value = mock_message
+            mock_anthropic.return_value = mock_client
+
+            from backends.anthropic import AnthropicBackend
+
+            backend = AnthropicBackend(backend_config)
+            result = backend.classify("Met Alice", "n.md", "Context")
+
+            params = mock_client.messages.create.call_args.kwargs
+            assert params["tool_choice"] == {"type": "tool", "name": "gardener_action"}
+            assert params["tools"][0]["input_schema"]["required"] == [
+                "action",
+                "path",
+                "content",
+                "reasoning",
+            ]
+            assert result.path == "people/alice.md"
+            assert mock_client.messages.create.call_count == 1
+
     def test_classify_retries_on_parse_error(self, backend_config):
         """Should retry on ParseError up to max_retries."""
         # First call returns invalid, second returns valid
@@ -327,6 +558,150 @@ class TestAnthropicBackend:
 
             assert "Docker" in result
 
+    def test_chat_records_token_usage(self, backend_config):
+        """Prompt tokens should include cache reads and writes."""
+        mock_message = MagicMock()
+        mock_message.model = "claude-sonnet-4-20250514"
+        mock_message.content = [MagicMock(text="Answer")]
+        mock_message.usage = MagicMock(
+            input_tokens=20,
+            output_tokens=60,
+            cache_read_input_tokens=3000,
+            cache_creation_input_tokens=0,
+        )
+
+        with patch("anthropic.Anthropic") as mock_anthropic:
+            mock_client = MagicMock()
+            mock_client.messages.create.return_value = mock_message
+            mock_anthropic.return_value = mock_client
+
+            from api_usage import ApiCallUsage
+            from backends.anthropic import AnthropicBackend
+
+            backend = AnthropicBackend(backend_config)
+            usage = ApiCallUsage("anthropic", "ask")
+            backend._chat("Q", usage=usage)
+
+            assert usage.model == "claude-sonnet-4-20250514"
+            assert usage.prompt_tokens == 3020
+            assert usage.completion_tokens == 60
+            assert usage.cached_tokens == 3000
+            assert usage.cache_write_tokens == 0
+
+    def test_batch_job_results_map_outcomes(self, backend_config):
+        """Succeeded entries carry text; others carry an error."""
+        succeeded = MagicMock(custom_id="note-1")
+        succeeded.result.type = "succeeded"
+        succeeded.result.message.content = [MagicMock(text='{"action": "task"}')]
+        expired = MagicMock(custom_id="note-2")
+        expired.result.type = "expired"
+        expired.result.error = None
+
+        with (
+            patch("anthropic.Anthropic") as mock_anthropic,
+            patch("backends.anthropic.track_api_call"),
+        ):
+            mock_client = MagicMock()
+            mock_client.messages.batches.results.return_value = [succeeded, expired]
+            mock_anthropic.return_value = mock_client
+
+            from backends.anthropic import AnthropicBackend
+
+            backend = AnthropicBackend(backend_config)
+            first, second = backend.get_batch_job_results("msgbatch_1")
+
+            assert first.custom_id == "note-1"
+            assert first.text == '{"action": "task"}'
+            assert second.text is None
+            assert second.error == "expired"
+
+
+class TestAsyncBackends:
+    """Tests for the asyncio backend variants."""
+
+    async def test_openai_classify(self, backend_config):
+        """Async OpenAI backend should classify via httpx.AsyncClient."""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {
+            "choices": [
+                {
+                    "message": {
+                        "content": '{"action": "create", "path": "tech/a.md", "content": "# A", "reasoning": "Test"}'
+                    }
+                }
+            ]
+        }
+
+        with patch("httpx.AsyncClient") as mock_client_class:
+            mock_client = MagicMock()
+            mock_client.post = AsyncMock(return_value=mock_response)
+            mock_client.aclose = AsyncMock()
+            mock_client_class.return_value = mock_client
+
+            from backends.openai import AsyncOpenAIBackend
+
+            async with AsyncOpenAIBackend(backend_config) as backend:
+                result = await backend.classify("Note", "test.md", "Context")
+
+            assert result.path == "tech/a.md"
+            mock_client.aclose.assert_awaited_once()
+
+    async def test_anthropic_ask_runs_concurrently(self, backend_config):
+        """Several async asks should be in flight at the same time."""
+        import asyncio
+
+        in_flight = 0
+        peak = 0
+
+        async def create(**kwargs):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            message = MagicMock()
+            message.content = [MagicMock(text="Answer")]
+            return message
+
+        with patch("anthropic.AsyncAnthropic") as mock_anthropic:
+            mock_client = MagicMock()
+            mock_client.messages.create = create
+            mock_anthropic.return_value = mock_client
+
+            from backends.anthropic import AsyncAnthropicBackend
+
+            backend = AsyncAnthropicBackend(backend_config)
+            answers = await asyncio.gather(
+                *(backend.ask(f"Question {i}", "") for i in range(5))
+            )
+
+        assert answers == ["Answer"] * 5
+        assert peak == 5
+
+    async def test_openai_ask_stream_yields_deltas(self, backend_config):
+        """Streaming ask should yield each content delta from the SSE body."""
+        from backends.openai import AsyncOpenAIBackend
+        from tests.fixtures.fake_ai_server import FakeAIServer, FakeResponse
+
+        chunks = [
+            {"choices": [{"delta": {"role": "assistant"}}]},
+            {"choices": [{"delta": {"content": "Hello"}}]},
+            {"choices": [{"delta": {"content": " there"}}]},
+            {"choices": [], "usage": {"prompt_tokens": 12, "completion_tokens": 2}},
+        ]
+        body = "".join(f"data: {json.dumps(c)}\n\n" for c in chunks)
+        body += "data: [DONE]\n\n"
+
+        with FakeAIServer(lambda *_: FakeResponse(body=body)) as server:
+            backend_config.base_url = server.url
+            async with AsyncOpenAIBackend(backend_config) as backend:
+                tokens = [t async for t in backend.ask_stream("Hi?", "")]
+
+        assert tokens == ["Hello", " there"]
+        request = server.requests[0]["body"]
+        assert request["stream"] is True
+        assert request["stream_options"] == {"include_usage": True}
+
 
 class TestBackendFactory:
     """Tests for backend factory function."""
@@ -346,6 +721,24 @@ class TestBackendFactory:
             # If no API key in env, config.api_key will be empty
             assert config.api_key == ""
 
+    def test_structured_output_defaults_off_for_compatible_servers(self):
+        """json_schema is only sent to api.openai.com unless asked for."""
+        from backends import get_backend_config
+
+        def structured(base_url: str, setting: str | None = None) -> bool:
+            with patch.dict(
+                "os.environ", {"GARDENER_BACKEND": "openai", "AI_BASE_URL": base_url}
+            ):
+                os.environ.pop("AI_STRUCTURED_OUTPUT", None)
+                if setting is not None:
+                    os.environ["AI_STRUCTURED_OUTPUT"] = setting
+                return get_backend_config()[1].structured_output
+
+        assert structured("")
+        assert structured("https://api.openai.com/v1")
+        assert not structured("http://localhost:11434/v1")
+        assert structured("http://localhost:11434/v1", "true")
+
     def test_get_backend_selects_openai(self):
         """Should select OpenAI backend when configured."""
         with patch("anthropic.Anthropic"):
@@ -0,0 +1,158 @@
+"""Tests for the offline backlog worker against a stand-in Batch API."""
+
+import json
+from unittest.mock import patch
+
+import pytest
+
+from backends.base import BackendConfig
+from tests.fixtures.fake_ai_server import FakeAIServer, FakeBatchAPI
+
+
+def _reply(request: dict) -> str | None:
+    """Classify each uploaded note into journal/<filename>; 'broken' fails."""
+    note = request["body"]["messages"][-1]["content"]
+    if "broken" in note:
+        return "not json at all"
+    filename = note.split("**Filename:** ", 1)[1].split("\n", 1)[0]
+    return json.dumps(
+        {
+            "action": "create",
+            "path": f"journal/{filename}",
+            "content": note.rsplit("**Content:**\n", 1)[1].split("\n\n")[0],
+            "reasoning": "batch",
+        }
+    )
+
+
+@pytest.fixture
+def backlog_env(tmp_path):
+    """Temp data dirs, state DB and an OpenAI backend on a fake Batch API."""
+    inbox_dir = tmp_path / "inbox"
+    archive_dir = inbox_dir / "archive"
+    atlas_dir = tmp_path / "atlas"
+    archive_dir.mkdir(parents=True)
+    atlas_dir.mkdir()
+    api = FakeBatchAPI(_reply, polls_until_done=1)
+
+    with (
+        FakeAIServer(api) as server,
+        patch("config.STATE_DIR", tmp_path / ".gardener"),
+        patch("config.STATE_DB", tmp_path / ".gardener" / "state.db"),
+        patch("workers.gardener.DATA_DIR", tmp_path),
+        patch("workers.gardener.INBOX_DIR", inbox_dir),
+        patch("workers.gardener.ARCHIVE_DIR", archive_dir),
+        patch("workers.gardener.ATLAS_DIR", atlas_dir),
+        patch("workers.gardener.TASKS_FILE", tmp_path / "tasks.md"),
+        patch("workers.gardener.ensure_git_repo", return_value=False),
+        patch("workers.gardener.git_commit", return_value=False),
+        patch("workers.backlog.INBOX_DIR", inbox_dir),
+    ):
+        from backends.openai import OpenAIBackend
+
+        backend = OpenAIBackend(
+            BackendConfig(
+                api_key="test-key",
+                base_url=server.url,
+                model_thinking="fake-thinking",
+                model_fast="fake-fast",
+            )
+        )
+        try:
+            yield {
+                "backend": backend,
+                "api": api,
+                "inbox": inbox_dir,
+                "atlas": atlas_dir,
+            }
+        finally:
+            backend.close()
+
+
+class TestBacklog:
+    """Batch submission, polling, apply and resume."""
+
+    def test_classifies_inbox_through_batch_api(self, backlog_env):
+        """All notes go out in one batch job and are applied when it ends."""
+        from workers.backlog import get_backlog_status, run_backlog
+
+        for i in range(3):
+            (backlog_env["inbox"] / f"note-{i}.md").write_text(f"Note {i}")
+
+        results = run_backlog(backlog_env["backend"], wait=True, poll_interval=0)
+
+        assert [r["file"] for r in results] == [f"note-{i}.md" for i in range(3)]
+        assert all(r["success"] for r in results)
+        assert len(backlog_env["api"].batches) == 1
+        assert (backlog_env["atlas"] / "journal" / "note-1.md").read_text() == "Note 1"
+        assert not list(backlog_env["inbox"].glob("*.md"))
+        assert get_backlog_status() == {"pending_batches": 0, "items": {"applied": 3}}
+
+    def test_resumes_pending_batch_after_restart(self, backlog_env):
+        """A batch submitted by an earlier run is applied by the next one."""
+        from workers.backlog import get_pending_backlog_files, run_backlog
+        from workers.gardener import process_inbox
+
+        (backlog_env["inbox"] / "note-a.md").write_text("Note A")
+        assert run_backlog(backlog_env["backend"], wait=False) == []
+        assert get_pending_backlog_files() == {"note-a.md"}
+
+        # The interactive gardener leaves notes owned by a batch alone
+        assert process_inbox(backend=object()) == []
+
+        results = run_backlog(backlog_env["backend"], wait=False)
+        assert [r["file"] for r in results] == ["note-a.md"]
+        assert len(backlog_env["api"].batches) == 1
+
+    def test_unparseable_result_stays_in_inbox(self, backlog_env):
+        """Failed items are released for the interactive gardener."""
+        from workers.backlog import get_pending_backlog_files, run_backlog
+
+        (backlog_env["inbox"] / "good.md").write_text("Fine note")
+        (backlog_env["inbox"] / "bad.md").write_text("broken note")
+
+        results = run_backlog(backlog_env["backend"], wait=True, poll_interval=0)
+
+        by_file = {r["file"]: r for r in results}
+        assert by_file["good.md"]["success"]
+        assert not by_file["bad.md"]["success"]
+        assert (backlog_env["inbox"] / "bad.md").exists()
+        assert get_pending_backlog_files() == set()
+
+    def test_batch_results_finish_note_jobs(self, backlog_env):
+        """Applied notes close their jobs; notes already classified stay out."""
+        from backends.base import GardenerAction
+        from job_queue import get_job_counts, mark_classified, sync_inbox_jobs
+        from workers.backlog import get_backlog_status, run_backlog
+
+        inbox = backlog_env["inbox"]
+        (inbox / "a.md").write_text("Note A")
+        (inbox / "b.md").write_text("Note B")
+        (job_b,) = sync_inbox_jobs(inbox, [inbox / "b.md"])
+        mark_classified(
+            job_b.id,
+            GardenerAction(
+                action="create", path="journal/b.md", content="B", reasoning="x"
+            ),
+        )
+
+        results = run_backlog(backlog_env["backend"], wait=True, poll_interval=0)
+
+        assert [r["file"] for r in results] == ["a.md"]
+        assert get_backlog_status()["items"] == {"applied": 1}
+        assert get_job_counts() == {"archived": 1, "classified": 1}
+        assert (inbox / "b.md").exists()
+
+    def test_backend_without_batch_api_is_skipped(self, backlog_env):
+        """Nothing is submitted through a backend that has no batch API."""
+        from unittest.mock import MagicMock
+
+        from workers.backlog import get_pending_backlog_files, run_backlog
+
+        backend = MagicMock(has_batch_api=False)
+        (backlog_env["inbox"] / "note-a.md").write_text("Note A")
+
+        assert run_backlog(backend, wait=False) == []
+        backend.submit_batch_job.assert_not_called()
+        assert get_pending_backlog_files() == set()
+        assert (backlog_env["inbox"] / "note-a.md").exists()
@@ -0,0 +1,132 @@
+"""Tests for the cached classification context loader."""
+
+import os
+from unittest.mock import patch
+
+import pytest
+
+
+@pytest.fixture
+def context_files(tmp_path):
+    """Create AGENTS.md and GARDENER.md in a temporary data dir."""
+    agents = tmp_path / "AGENTS.md"
+    gardener = tmp_path / "GARDENER.md"
+    agents.write_text("Be helpful.")
+    gardener.write_text("Recipes go in home/.")
+    return agents, gardener
+
+
+class TestContextLoader:
+    """Context is assembled once and rebuilt only when the files change."""
+
+    def test_assembles_both_files(self, context_files):
+        """Both files appear under their section headings."""
+        from context_loader import ContextLoader
+
+        agents, gardener = context_files
+        context = ContextLoader().get(
+            (("System Context", agents), ("Classification Rules", gardener))
+        )
+
+        assert "# System Context\nBe helpful." in context.text
+        assert "# Classification Rules\nRecipes go in home/." in context.text
+        assert context.token_estimate > 0
+
+    def test_reuses_cached_context(self, context_files):
+        """Unchanged files are not read again."""
+        from pathlib import Path
+
+        from context_loader import ContextLoader
+
+        agents, gardener = context_files
+        sources = (("System Context", agents), ("Classification Rules", gardener))
+        loader = ContextLoader()
+        first = loader.get(sources)
+
+        with patch.object(Path, "read_text", side_effect=AssertionError("re-read")):
+            assert loader.get(sources) is first
+
+    def test_rebuilds_when_file_changes(self, context_files):
+        """Editing a context file yields a new text and version."""
+        from context_loader import ContextLoader
+
+        agents, gardener = context_files
+        sources = (("System Context", agents), ("Classification Rules", gardener))
+        loader = ContextLoader()
+        first = loader.get(sources)
+
+        gardener.write_text("Recipes go in home/cooking/.")
+        stat = gardener.stat()
+        os.utime(gardener, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000))
+        second = loader.get(sources)
+
+        assert "home/cooking/" in second.text
+        assert second.version != first.version
+
+    def test_missing_files_give_empty_context(self, tmp_path):
+        """Without context files the context is empty, not an error."""
+        from context_loader import load_classification_context
+
+        context = load_classification_context(
+            tmp_path / "AGENTS.md", tmp_path / "GARDENER.md"
+        )
+        assert context.text == ""
+        assert context.token_estimate == 0
+
+
+class TestContextBudget:
+    """Over budget, low-priority sections are collapsed before the rules."""
+
+    @pytest.fixture
+    def long_context(self, tmp_path):
+        agents = tmp_path / "AGENTS.md"
+        gardener = tmp_path / "GARDENER.md"
+        agents.write_text(
+            "Be helpful.\n\n## Style\n"
+            + "Write in plain English.\n" * 40
+            + "\n## History\n"
+            + "Long project history.\n" * 40
+        )
+        gardener.write_text("## Recipes\nRecipes go in home/cooking/.\n")
+        return (("System Context", agents), ("Classification Rules", gardener))
+
+    def test_no_trimming_within_budget(self, long_context):
+        """A context that fits is sent unchanged."""
+        from context_loader import ContextLoader
+
+        full = ContextLoader().get(long_context)
+        context = ContextLoader().get(long_context, budget=full.token_estimate)
+
+        assert context.text == full.text
+        assert context.trimmed_sections == 0
+        assert context.full_token_estimate == full.token_estimate
+
+    def test_trims_system_context_before_rules(self, long_context):
+        """Later AGENTS.md sections go first; GARDENER.md rules survive."""
+        from context_loader import SECTION_TRIMMED, ContextLoader
+
+        full = ContextLoader().get(long_context)
+        context = ContextLoader().get(long_context, budget=full.token_estimate - 100)
+
+        assert context.token_estimate <= full.token_estimate - 100
+        assert context.trimmed_sections == 1
+        assert f"## History\n{SECTION_TRIMMED}" in context.text
+        assert "Write in plain English." in context.text
+        assert "Recipes go in home/cooking/." in context.text
+
+    def test_truncates_when_sections_are_not_enough(self, long_context):
+        """A tiny budget still bounds the context."""
+        from context_loader import ContextLoader
+
+        context = ContextLoader().get(long_context, budget=20)
+
+        assert context.token_estimate <= 20
+        assert context.text.endswith("[Context truncated to fit the context budget]")
+
+    def test_headings_in_code_fences_do_not_split(self):
+        """A '#' comment inside a fenced block is not a section heading."""
+        from context_loader import split_sections
+
+        sections = split_sections("Intro\n```\n# comment\n```\n## Next\ntext\n")
+
+        assert sections == ["Intro\n```\n# comment\n```\n", "## Next\ntext\n"]
@@ -1,5 +1,6 @@
 """Integration tests for API endpoints."""
 
+import json
 from contextlib import asynccontextmanager
 from unittest.mock import AsyncMock, MagicMock, patch
 
@@ -152,6 +153,121 @@ class TestInboxEndpoint:
         assert filename[10] == "_"
         assert filename[-3:] == ".md"
 
+    def test_inbox_flags_near_duplicate(self, client):
+        """A second, lightly edited capture names the first one."""
+        test_client, _ = client
+        note = (
+            "Call the plumber on Monday about the leaking kitchen tap and ask "
+            "whether they can also look at the bathroom radiator valve."
+        )
+        first = test_client.post("/api/inbox", json={"content": note}).json()
+        second = test_client.post(
+            "/api/inbox", json={"content": note.replace("valve", "valves")}
+        ).json()
+
+        assert first["near_duplicate_of"] is None
+        assert second["near_duplicate_of"] == first["filename"]
+        assert second["similarity"] >= 0.8
+
+
+class TestBulkInboxEndpoint:
+    """Tests for POST /api/inbox/bulk."""
+
+    def test_ndjson_import(self, client):
+        """Each line is saved or reported; duplicates are skipped."""
+        test_client, dirs = client
+        body = "\n".join(
+            [
+                '"First imported note"',
+                '{"content": "Dated note", "created": "2021-05-01T10:30:00"}',
+                '"First imported note"',
+                "{broken",
+            ]
+        )
+        with patch("main.schedule_notes") as schedule:
+            response = test_client.post(
+                "/api/inbox/bulk",
+                content=body,
+                headers={"Content-Type": "application/x-ndjson"},
+            )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert (data["saved"], data["duplicates"], data["failed"]) == (2, 1, 1)
+        assert data["items"][1]["filename"].startswith("2021-05-01_1030-")
+        assert len(list(dirs["inbox_dir"].glob("*.md"))) == 2
+        schedule.assert_called_once()
+        assert len(schedule.call_args.args[0]) == 2
+
+    def test_zip_upload(self, client):
+        """Notes in an uploaded zip are imported."""
+        import io
+        import zipfile
+
+        test_client, dirs = client
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as bundle:
+            bundle.writestr("a.md", "# A")
+            bundle.writestr("b.md", "# B")
+
+        with patch("main.schedule_notes"):
+            response = test_client.post(
+                "/api/inbox/bulk",
+                files={"file": ("notes.zip", data.getvalue(), "application/zip")},
+            )
+
+        assert response.status_code == 200
+        assert [item["source"] for item in response.json()["items"]] == [
+            "a.md",
+            "b.md",
+        ]
+        assert len(list(dirs["inbox_dir"].glob("*.md"))) == 2
+
+    def test_rejects_empty_and_oversized_requests(self, client):
+        """An empty body or too many notes is rejected as a whole."""
+        test_client, _ = client
+        assert test_client.post("/api/inbox/bulk", content="").status_code == 400
+        with patch("main.MAX_BULK_NOTES", 2):
+            response = test_client.post("/api/inbox/bulk", content='"a"\n"b"\n"c"\n')
+        assert response.status_code == 413
+
+    def test_rejects_oversized_body_and_lines(self, client):
+        """Bodies and single lines past the size caps get 413."""
+        test_client, _ = client
+        with patch("main.MAX_CONTENT_SIZE", 10):
+            line = test_client.post("/api/inbox/bulk", content='"' + "x" * 2000)
+            body = test_client.post(
+                "/api/inbox/bulk", content="\n".join(['"note"'] * 3000)
+            )
+        assert line.status_code == 413
+        assert "Line too large" in line.json()["detail"]
+        assert body.status_code == 413
+
+    def test_zip_upload_stops_reading_past_the_limit(self, client):
+        """Only MAX_BULK_NOTES + 1 archive members are read."""
+        import io
+        import zipfile
+
+        test_client, _ = client
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as bundle:
+            for i in range(10):
+                bundle.writestr(f"{i}.md", f"# {i}")
+
+        with (
+            patch("main.MAX_BULK_NOTES", 2),
+            patch(
+                "zipfile.ZipFile.read", autospec=True, wraps=zipfile.ZipFile.read
+            ) as read,
+        ):
+            response = test_client.post(
+                "/api/inbox/bulk",
+                files={"file": ("notes.zip", data.getvalue(), "application/zip")},
+            )
+
+        assert response.status_code == 413
+        assert read.call_count == 3
+
 
 class TestBrowseEndpoint:
     """Tests for GET /api/browse."""
@@ -220,6 +336,50 @@ class TestArchiveEndpoint:
         assert data["is_file"] is True
         assert "# Old Note" in data["content"]
 
+    def test_archive_pages_shards_newest_first(self, client):
+        """Shards list newest first and directories are paged."""
+        test_client, dirs = client
+        shard = dirs["archive_dir"] / "2026" / "03"
+        shard.mkdir(parents=True)
+        (dirs["archive_dir"] / "2025" / "12").mkdir(parents=True)
+        for day in range(1, 6):
+            (shard / f"2026-03-0{day}_0900-abcd1234.md").write_text("# Note")
+
+        root = test_client.get("/api/archive").json()
+        assert [item["name"] for item in root["items"]][:2] == ["2026", "2025"]
+
+        page = test_client.get("/api/archive/2026/03?limit=2&offset=2").json()
+        assert [item["name"] for item in page["items"]] == [
+            "2026-03-03_0900-abcd1234.md",
+            "2026-03-02_0900-abcd1234.md",
+        ]
+        assert page["total"] == 5
+        assert page["next_offset"] == 4
+
+    def test_archive_reads_packed_shards(self, client):
+        """Packed shards browse like directories and their notes are indexed."""
+        import zipfile
+
+        test_client, dirs = client
+        (dirs["archive_dir"] / "2024").mkdir()
+        with zipfile.ZipFile(dirs["archive_dir"] / "2024" / "11.zip", "w") as bundle:
+            bundle.writestr("2024-11-02_0900-aaaa1111.md", "# Cold Note\n\nFrom 2024.")
+
+        year = test_client.get("/api/archive/2024").json()
+        assert year["items"] == [{"name": "11", "type": "directory", "path": "2024/11"}]
+        month = test_client.get("/api/archive/2024/11").json()
+        assert [item["path"] for item in month["items"]] == [
+            "2024/11/2024-11-02_0900-aaaa1111.md"
+        ]
+        note = test_client.get("/api/archive/2024/11/2024-11-02_0900-aaaa1111.md")
+        assert note.json()["is_file"] is True
+        assert "# Cold Note" in note.json()["content"]
+
+        index = test_client.get("/api/search/index").json()
+        assert "2024/11/2024-11-02_0900-aaaa1111.md" in [
+            n["path"] for n in index["notes"]
+        ]
+
     def test_archive_nonexistent_returns_404(self, client):
         """Should return 404 for nonexistent path."""
         test_client, _ = client
@@ -250,7 +410,7 @@ class TestRefineEndpoint:
     def test_refine_works_without_backend(self, client):
         """Should return graceful message when no backend configured."""
         test_client, _ = client
-        with patch("main.get_backend", return_value=None):
+        with patch("main.get_shared_async_backend", return_value=None):
             response = test_client.post(
                 "/api/refine",
                 json={"content": "Test content about Python"},
@@ -263,17 +423,16 @@ class TestRefineEndpoint:
         test_client, _ = client
 
         mock_backend = MagicMock()
-        mock_backend.refine.return_value = (
-            "TAGS: python, testing\n"
-            "CATEGORY: tech\n"
-            "RELATED: projects/test-project.md\n"
-            "MISSING: None"
+        mock_backend.refine = AsyncMock(
+            return_value=(
+                "TAGS: python, testing\n"
+                "CATEGORY: tech\n"
+                "RELATED: projects/test-project.md\n"
+                "MISSING: None"
+            )
         )
-        # Mock context manager behavior
-        mock_backend.__enter__ = MagicMock(return_value=mock_backend)
-        mock_backend.__exit__ = MagicMock(return_value=False)
 
-        with patch("main.get_backend", return_value=mock_backend):
+        with patch("main.get_shared_async_backend", return_value=mock_backend):
             response = test_client.post(
                 "/api/refine",
                 json={"content": "Test content about Python programming"},
@@ -300,7 +459,7 @@ class TestAskEndpoint:
     def test_ask_works_without_backend(self, client):
         """Should return graceful message when no backend configured."""
         test_client, _ = client
-        with patch("main.get_backend", return_value=None):
+        with patch("main.get_shared_async_backend", return_value=None):
             response = test_client.post(
                 "/api/ask",
                 json={"question": "What projects am I working on?"},
@@ -312,14 +471,13 @@ class TestAskEndpoint:
         test_client, _ = client
 
         mock_backend = MagicMock()
-        mock_backend.ask.return_value = (
-            "Based on your notes, you're working on a test project about Python."
+        mock_backend.ask = AsyncMock(
+            return_value=(
+                "Based on your notes, you're working on a test project about Python."
+            )
         )
-        # Mock context manager behavior
-        mock_backend.__enter__ = MagicMock(return_value=mock_backend)
-        mock_backend.__exit__ = MagicMock(return_value=False)
 
-        with patch("main.get_backend", return_value=mock_backend):
+        with patch("main.get_shared_async_backend", return_value=mock_backend):
             response = test_client.post(
                 "/api/ask",
                 json={"question": "What projects am I working on?"},
@@ -327,6 +485,52 @@ class TestAskEndpoint:
             assert response.status_code == 200
             assert "test project" in response.text.lower()
 
+    def test_ask_stream_sends_tokens_then_done(self, client):
+        """stream=true should return SSE token events and a final HTML event."""
+        test_client, _ = client
+
+        async def ask_stream(question, related_context):
+            for text in ("Python ", "project"):
+                yield text
+
+        mock_backend = MagicMock()
+        mock_backend.ask_stream = ask_stream
+
+        with patch("main.get_shared_async_backend", return_value=mock_backend):
+            response = test_client.post(
+                "/api/ask",
+                json={"question": "What projects am I working on?", "stream": True},
+            )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = [
+            (block.split("\n")[0].removeprefix("event: "), block.split("data: ")[1])
+            for block in response.text.strip().split("\n\n")
+        ]
+        assert [name for name, _ in events] == ["token", "token", "done"]
+        assert json.loads(events[0][1]) == {"text": "Python "}
+        done = json.loads(events[-1][1])
+        assert "Python project" in done["html"]
+        assert isinstance(done["related"], list)
+
+
+class TestSchedulerEndpoint:
+    """Tests for GET /api/scheduler."""
+
+    def test_reports_each_priority_queue(self, client):
+        """Should list interactive, automated and maintenance queues."""
+        test_client, _ = client
+        response = test_client.get("/api/scheduler")
+        assert response.status_code == 200
+        queues = response.json()["queues"]
+        assert [q["name"] for q in queues] == [
+            "interactive",
+            "automated",
+            "maintenance",
+        ]
+        assert all(q["depth"] == 0 for q in queues)
+
 
 class TestTriggerGardenerEndpoint:
     """Tests for POST /api/trigger-gardener."""
@@ -335,10 +539,7 @@ class TestTriggerGardenerEndpoint:
         """Should accept trigger request."""
         test_client, _ = client
 
-        with patch(
-            "workers.gardener.process_inbox", new_callable=AsyncMock
-        ) as mock_process:
-            mock_process.return_value = []
+        with patch("workers.gardener.process_inbox", return_value=[]):
             response = test_client.post("/api/trigger-gardener")
             assert response.status_code == 200
             data = response.json()
@@ -351,10 +552,9 @@ class TestTriggerGardenerEndpoint:
         # Create a test inbox file
         (dirs["inbox_dir"] / "2024-01-15_1200-abc12345.md").write_text("Test note")
 
-        with patch(
-            "workers.gardener.process_inbox", new_callable=AsyncMock
-        ) as mock_process:
-            mock_process.return_value = [{"file": "test.md", "status": "processed"}]
+        with patch("workers.gardener.process_inbox", return_value=[]) as mock_process:
             response = test_client.post("/api/trigger-gardener")
             assert response.status_code == 200
-            mock_process.assert_called_once()
+        mock_process.assert_called_once_with(
+            files=[dirs["inbox_dir"] / "2024-01-15_1200-abc12345.md"]
+        )
@@ -0,0 +1,92 @@
+"""Tests for append-only and atomic file writes."""
+
+import threading
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+
+class TestAppendText:
+    """Appends add to the end of the file without rewriting it."""
+
+    def test_creates_and_appends(self, tmp_path):
+        """A missing file is created; later appends go after it."""
+        from file_io import append_text
+
+        target = tmp_path / "journal.md"
+        append_text(target, "first\n")
+        append_text(target, "second\n")
+
+        assert target.read_text() == "first\nsecond\n"
+
+    def test_does_not_read_existing_content(self, tmp_path):
+        """An append costs the new text, not the size of the note."""
+        from file_io import append_text
+
+        target = tmp_path / "journal.md"
+        target.write_text("existing\n")
+        with patch.object(Path, "read_text", side_effect=AssertionError("read")):
+            append_text(target, "more\n")
+
+        assert target.read_text() == "existing\nmore\n"
+
+    def test_concurrent_appends_do_not_interleave(self, tmp_path):
+        """Every entry lands whole when several threads append at once."""
+        from file_io import append_text
+
+        target = tmp_path / "tasks.md"
+        entries = [f"entry {i}: " + "x" * 2000 + "\n" for i in range(40)]
+        threads = [
+            threading.Thread(target=append_text, args=(target, entry))
+            for entry in entries
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert sorted(target.read_text().splitlines(keepends=True)) == sorted(entries)
+
+
+class TestWriteTextAtomic:
+    """Replacements are all-or-nothing."""
+
+    def test_replaces_content_and_keeps_mode(self, tmp_path):
+        """The new content is in place and the file mode is unchanged."""
+        from file_io import write_text_atomic
+
+        target = tmp_path / "note.md"
+        target.write_text("old")
+        target.chmod(0o600)
+
+        write_text_atomic(target, "new")
+
+        assert target.read_text() == "new"
+        assert target.stat().st_mode & 0o777 == 0o600
+        assert [p.name for p in tmp_path.iterdir()] == ["note.md"]
+
+    def test_failed_write_keeps_old_content(self, tmp_path):
+        """A write that fails midway leaves the old file and no temp file."""
+        from file_io import write_text_atomic
+
+        target = tmp_path / "note.md"
+        target.write_text("old")
+
+        with (
+            patch("file_io._write_all", side_effect=OSError("disk full")),
+            pytest.raises(OSError),
+        ):
+            write_text_atomic(target, "new")
+
+        assert target.read_text() == "old"
+        assert [p.name for p in tmp_path.iterdir()] == ["note.md"]
+
+
+def test_path_locks_are_per_file(tmp_path):
+    """Writes to different files do not share a lock."""
+    from file_io import path_lock
+
+    a, b = tmp_path / "a.md", tmp_path / "b.md"
+    assert path_lock(a) is path_lock(tmp_path / "." / "a.md")
+    assert path_lock(a) is not path_lock(b)
@@ -266,3 +266,424 @@ class TestClassifyNote:
             assert args[0][0] == "Note content"
             assert args[0][1] == "test.md"
             assert result.action == "create"
+
+    def test_oversized_note_is_excerpted_but_written_in_full(self, mock_backend):
+        """The model sees the head and tail; the action keeps the whole note."""
+        note = "Start of the note.\n" + "filler line\n" * 200 + "Closing tag: #travel"
+        with (
+            patch("workers.gardener.AGENTS_FILE") as mock_agents,
+            patch("workers.gardener.GARDENER_FILE") as mock_gardener,
+            patch("workers.gardener.GARDENER_NOTE_TOKENS", 100),
+        ):
+            mock_agents.exists.return_value = False
+            mock_gardener.exists.return_value = False
+
+            from workers.gardener import classify_note
+
+            result = classify_note(mock_backend, note, "long.md")
+
+        sent = mock_backend.classify.call_args[0][0]
+        assert sent.startswith("Start of the note.")
+        assert sent.endswith("#travel")
+        assert "characters omitted" in sent
+        assert len(sent) < len(note)
+        assert result.path == "test.md"
+        assert result.content == note
+
+
+class TestProcessInboxPipeline:
+    """Test concurrent classification with serialized apply."""
+
+    @pytest.fixture
+    def temp_data(self, tmp_path):
+        """Create an inbox/atlas layout and point the worker at it."""
+        inbox_dir = tmp_path / "inbox"
+        archive_dir = inbox_dir / "archive"
+        atlas_dir = tmp_path / "atlas"
+        archive_dir.mkdir(parents=True)
+        atlas_dir.mkdir()
+
+        with (
+            patch("config.STATE_DIR", tmp_path / ".gardener"),
+            patch("config.STATE_DB", tmp_path / ".gardener" / "state.db"),
+            patch("workers.gardener.DATA_DIR", tmp_path),
+            patch("workers.gardener.INBOX_DIR", inbox_dir),
+            patch("workers.gardener.ARCHIVE_DIR", archive_dir),
+            patch("workers.gardener.ATLAS_DIR", atlas_dir),
+            patch("workers.gardener.TASKS_FILE", tmp_path / "tasks.md"),
+            patch("workers.gardener.ensure_git_repo", return_value=False),
+            patch("workers.gardener.git_commit", return_value=False),
+            patch("workers.gardener.get_call_headroom", return_value=None),
+        ):
+            yield {"inbox": inbox_dir, "archive": archive_dir, "atlas": atlas_dir}
+
+    @staticmethod
+    def _slow_backend(delays: dict[str, float]):
+        """Backend whose classify sleeps per note and tracks parallelism."""
+        import threading
+        import time
+        from unittest.mock import MagicMock
+
+        state = {"active": 0, "peak": 0}
+        lock = threading.Lock()
+
+        def classify(note_content, filename, context):
+            with lock:
+                state["active"] += 1
+                state["peak"] = max(state["peak"], state["active"])
+            time.sleep(delays.get(filename, 0.01))
+            with lock:
+                state["active"] -= 1
+            return GardenerAction(
+                action="append",
+                path="journal/daily.md",
+                content=note_content,
+                reasoning="test",
+            )
+
+        backend = MagicMock()
+        backend.classify.side_effect = classify
+        return backend, state
+
+    def test_classifies_concurrently(self, temp_data):
+        """Classification should overlap across worker threads."""
+        from workers.gardener import process_inbox
+
+        for i in range(6):
+            (temp_data["inbox"] / f"note-{i}.md").write_text(f"Note {i}")
+
+        backend, state = self._slow_backend({})
+        results = process_inbox(backend=backend, concurrency=3)
+
+        assert len(results) == 6
+        assert all(r["success"] for r in results)
+        assert state["peak"] > 1
+        assert state["peak"] <= 3
+        assert not list(temp_data["inbox"].glob("*.md"))
+
+    def test_same_path_applied_in_inbox_order(self, temp_data):
+        """A slow early note must still be appended before later ones."""
+        from workers.gardener import process_inbox
+
+        for i in range(4):
+            (temp_data["inbox"] / f"note-{i}.md").write_text(f"Entry {i}")
+
+        backend, _ = self._slow_backend({"note-0.md": 0.2})
+        results = process_inbox(backend=backend, concurrency=4)
+
+        assert [r["file"] for r in results] == [f"note-{i}.md" for i in range(4)]
+        content = (temp_data["atlas"] / "journal" / "daily.md").read_text()
+        positions = [content.index(f"Entry {i}") for i in range(4)]
+        assert positions == sorted(positions)
+
+    def test_rate_limit_stops_submitting(self, temp_data):
+        """Once the rate limiter trips, remaining notes stay in the inbox."""
+        from unittest.mock import MagicMock
+
+        from api_usage import RateLimitError
+        from workers.gardener import process_inbox
+
+        for i in range(10):
+            (temp_data["inbox"] / f"note-{i}.md").write_text(f"Note {i}")
+
+        backend = MagicMock()
+        backend.classify.side_effect = RateLimitError("Hourly API limit reached")
+        results = process_inbox(backend=backend, concurrency=1)
+
+        assert all(not r["success"] for r in results)
+        assert len(results) < 10
+        assert len(list(temp_data["inbox"].glob("*.md"))) == 10
+
+    def test_batches_short_notes(self, temp_data):
+        """With a batch size, notes are classified in groups and still applied."""
+        from unittest.mock import MagicMock
+
+        from workers.gardener import process_inbox
+
+        for i in range(5):
+            (temp_data["inbox"] / f"note-{i}.md").write_text(f"Note {i}")
+
+        def classify_batch(notes, context, token_budget, max_batch_size):
+            return [
+                GardenerAction(
+                    action="create",
+                    path=f"journal/{filename}",
+                    content=content,
+                    reasoning="batch",
+                )
+                for content, filename in notes
+            ]
+
+        backend = MagicMock()
+        backend.classify_batch.side_effect = classify_batch
+        backend.classify.return_value = GardenerAction(
+            action="create", path="journal/single.md", content="x", reasoning="r"
+        )
+        results = process_inbox(backend=backend, concurrency=2, batch_size=2)
+
+        assert [r["file"] for r in results] == [f"note-{i}.md" for i in range(5)]
+        assert all(r["success"] for r in results)
+        # Groups of 2, 2 and a single note classified on its own
+        assert backend.classify_batch.call_count == 2
+        assert backend.classify.call_count == 1
+
+
+class TestClassificationCache:
+    """Repeated notes reuse earlier decisions or are skipped as duplicates."""
+
+    @pytest.fixture
+    def temp_data(self, tmp_path):
+        """Inbox/atlas layout, private state DB and an empty context."""
+        inbox_dir = tmp_path / "inbox"
+        archive_dir = inbox_dir / "archive"
+        atlas_dir = tmp_path / "atlas"
+        archive_dir.mkdir(parents=True)
+        atlas_dir.mkdir()
+
+        with (
+            patch("config.STATE_DIR", tmp_path / ".gardener"),
+            patch("config.STATE_DB", tmp_path / ".gardener" / "state.db"),
+            patch("workers.gardener.DATA_DIR", tmp_path),
+            patch("workers.gardener.INBOX_DIR", inbox_dir),
+            patch("workers.gardener.ARCHIVE_DIR", archive_dir),
+            patch("workers.gardener.ATLAS_DIR", atlas_dir),
+            patch("workers.gardener.TASKS_FILE", tmp_path / "tasks.md"),
+            patch("workers.gardener.AGENTS_FILE", tmp_path / "AGENTS.md"),
+            patch("workers.gardener.GARDENER_FILE", tmp_path / "GARDENER.md"),
+            patch("workers.gardener.ensure_git_repo", return_value=False),
+            patch("workers.gardener.git_commit", return_value=False),
+            patch("workers.gardener.get_call_headroom", return_value=None),
+        ):
+            yield {"inbox": inbox_dir, "atlas": atlas_dir}
+
+    @staticmethod
+    def _backend():
+        from unittest.mock import MagicMock
+
+        backend = MagicMock()
+        backend.config.model_thinking = "test-model"
+        backend.classify.return_value = GardenerAction(
+            action="append",
+            path="journal/daily.md",
+            content="Took a walk",
+            reasoning="journal",
+        )
+        return backend
+
+    def test_reuse_mode_skips_ai_call(self, temp_data):
+        """A note seen before is classified from the cache."""
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        with patch("classification_cache.GARDENER_DEDUP_MODE", "reuse"):
+            (temp_data["inbox"] / "a.md").write_text("Took a walk")
+            process_inbox(backend=backend)
+            (temp_data["inbox"] / "b.md").write_text("Took  a walk\n")
+            results = process_inbox(backend=backend)
+
+        assert results[0]["action"] == "append"
+        assert backend.classify.call_count == 1
+        content = (temp_data["atlas"] / "journal" / "daily.md").read_text()
+        assert content.count("Took a walk") == 2
+
+    def test_skip_mode_archives_recent_duplicate(self, temp_data):
+        """A double submit is archived without a second write."""
+        from classification_cache import get_classification_cache_stats
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        (temp_data["inbox"] / "a.md").write_text("Took a walk")
+        (temp_data["inbox"] / "b.md").write_text("Took a walk")
+        with patch("classification_cache.GARDENER_DEDUP_MODE", "skip"):
+            results = process_inbox(backend=backend, concurrency=1)
+
+        assert [r["action"] for r in results] == ["append", "duplicate"]
+        assert not list(temp_data["inbox"].glob("*.md"))
+        content = (temp_data["atlas"] / "journal" / "daily.md").read_text()
+        assert content.count("Took a walk") == 1
+
+        stats = get_classification_cache_stats()
+        assert stats.duplicates_skipped == 1
+        assert stats.entries == 1
+
+    def test_identical_notes_in_one_run_share_a_call(self, temp_data):
+        """Copies queued together wait for the first decision; both are written."""
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        for name in ("a.md", "b.md", "c.md"):
+            (temp_data["inbox"] / name).write_text("Took a walk")
+        results = process_inbox(backend=backend, concurrency=3, batch_size=1)
+
+        assert [r["action"] for r in results] == ["append"] * 3
+        assert backend.classify.call_count == 1
+        content = (temp_data["atlas"] / "journal" / "daily.md").read_text()
+        assert content.count("Took a walk") == 3
+
+    def test_reused_create_does_not_replace_page(self, temp_data):
+        """Repeated notes append to the page their first copy created."""
+        from workers.gardener import process_inbox
+
+        def create(path, content):
+            return GardenerAction(
+                action="create", path=path, content=content, reasoning="project"
+            )
+
+        backend = self._backend()
+        backend.classify.side_effect = [
+            create("projects/x.md", "# X\nkickoff"),
+            GardenerAction(
+                action="append",
+                path="projects/x.md",
+                content="LATER APPEND",
+                reasoning="project",
+            ),
+            create("projects/y.md", "# Y\nfresh idea"),
+        ]
+        for name, content in (
+            ("a.md", "kickoff"),
+            ("b.md", "later"),
+            ("c.md", "kickoff"),
+        ):
+            (temp_data["inbox"] / name).write_text(content)
+            process_inbox(backend=backend)
+        (temp_data["inbox"] / "d.md").write_text("fresh idea")
+        (temp_data["inbox"] / "e.md").write_text("fresh idea")
+        process_inbox(backend=backend, batch_size=1)
+
+        assert backend.classify.call_count == 3
+        x = (temp_data["atlas"] / "projects" / "x.md").read_text()
+        assert x.startswith("# X\nkickoff")
+        assert "LATER APPEND" in x
+        assert x.count("kickoff") == 2
+        y = (temp_data["atlas"] / "projects" / "y.md").read_text()
+        assert y.count("fresh idea") == 2
+
+    def test_context_change_invalidates_cache(self, temp_data, tmp_path):
+        """Editing GARDENER.md means earlier decisions are not reused."""
+        from workers.gardener import classify_note
+
+        backend = self._backend()
+        classify_note(backend, "Took a walk", "a.md")
+        (tmp_path / "GARDENER.md").write_text("Walks go in wellness/.")
+        classify_note(backend, "Took a walk", "b.md")
+
+        assert backend.classify.call_count == 2
+
+
+class TestJobQueue:
+    """Per-note job state survives crashes and avoids repeat AI calls."""
+
+    @pytest.fixture
+    def temp_data(self, tmp_path):
+        """Inbox/atlas layout, private state DB, classification cache off."""
+        inbox_dir = tmp_path / "inbox"
+        archive_dir = inbox_dir / "archive"
+        atlas_dir = tmp_path / "atlas"
+        archive_dir.mkdir(parents=True)
+        atlas_dir.mkdir()
+
+        with (
+            patch("config.STATE_DIR", tmp_path / ".gardener"),
+            patch("config.STATE_DB", tmp_path / ".gardener" / "state.db"),
+            patch("classification_cache.GARDENER_DEDUP_MODE", "off"),
+            patch("workers.gardener.DATA_DIR", tmp_path),
+            patch("workers.gardener.INBOX_DIR", inbox_dir),
+            patch("workers.gardener.ARCHIVE_DIR", archive_dir),
+            patch("workers.gardener.ATLAS_DIR", atlas_dir),
+            patch("workers.gardener.TASKS_FILE", tmp_path / "tasks.md"),
+            patch("workers.gardener.ensure_git_repo", return_value=False),
+            patch("workers.gardener.git_commit", return_value=False),
+            patch("workers.gardener.get_call_headroom", return_value=None),
+        ):
+            yield {"inbox": inbox_dir, "atlas": atlas_dir}
+
+    @staticmethod
+    def _backend():
+        from unittest.mock import MagicMock
+
+        backend = MagicMock()
+        backend.classify.return_value = GardenerAction(
+            action="append",
+            path="journal/daily.md",
+            content="Took a walk",
+            reasoning="journal",
+        )
+        return backend
+
+    def test_stored_classification_is_applied_after_crash(self, temp_data):
+        """A note classified before a failed write is not classified again."""
+        from job_queue import get_job_counts
+        from workers.gardener import execute_action, process_inbox
+
+        backend = self._backend()
+        (temp_data["inbox"] / "a.md").write_text("Took a walk")
+        with patch("workers.gardener.execute_action", side_effect=OSError("disk full")):
+            results = process_inbox(backend=backend)
+        assert not results[0]["success"]
+        assert get_job_counts() == {"classified": 1}
+
+        with patch("workers.gardener.execute_action", wraps=execute_action):
+            results = process_inbox(backend=backend)
+
+        assert results[0]["success"]
+        assert backend.classify.call_count == 1
+        assert get_job_counts() == {"archived": 1}
+        assert not list(temp_data["inbox"].glob("*.md"))
+
+    def test_applied_note_is_only_archived_on_resume(self, temp_data):
+        """A crash between the write and the archive does not write twice."""
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        (temp_data["inbox"] / "a.md").write_text("Took a walk")
+        with patch("workers.gardener._archive_processed", side_effect=OSError("crash")):
+            process_inbox(backend=backend)
+
+        results = process_inbox(backend=backend)
+
+        assert results[0]["success"]
+        assert backend.classify.call_count == 1
+        content = (temp_data["atlas"] / "journal" / "daily.md").read_text()
+        assert content.count("Took a walk") == 1
+        assert not list(temp_data["inbox"].glob("*.md"))
+
+    def test_failing_note_is_skipped_until_edited(self, temp_data):
+        """After the attempt limit a note costs nothing until it changes."""
+        from job_queue import get_job_counts
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        backend.classify.side_effect = ValueError("bad response")
+        note = temp_data["inbox"] / "a.md"
+        note.write_text("Took a walk")
+
+        with patch("job_queue.GARDENER_JOB_MAX_ATTEMPTS", 2):
+            for _ in range(3):
+                process_inbox(backend=backend)
+            assert backend.classify.call_count == 2
+            assert get_job_counts() == {"failed": 1}
+
+            note.write_text("Took a long walk")
+            process_inbox(backend=backend)
+
+        assert backend.classify.call_count == 3
+
+    def test_note_that_cannot_be_written_ends_failed(self, temp_data):
+        """Write failures count as attempts; the classification is kept."""
+        from job_queue import get_job_counts
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        (temp_data["inbox"] / "a.md").write_text("Took a walk")
+
+        with (
+            patch("job_queue.GARDENER_JOB_MAX_ATTEMPTS", 2),
+            patch("workers.gardener.execute_action", side_effect=OSError("read-only")),
+        ):
+            for _ in range(3):
+                process_inbox(backend=backend)
+
+        assert backend.classify.call_count == 1
+        assert get_job_counts() == {"failed": 1}
+        assert (temp_data["inbox"] / "a.md").exists()
@@ -0,0 +1,110 @@
+"""Tests for bulk inbox imports."""
+
+import io
+import tarfile
+import zipfile
+from datetime import datetime
+from unittest.mock import patch
+
+
+class TestParseNdjsonLine:
+    """NDJSON lines hold a string or an object with content."""
+
+    def test_string_and_object_lines(self):
+        """Both forms parse; 'created' is read as an ISO time."""
+        from inbox import parse_ndjson_line
+
+        assert parse_ndjson_line('"Just text"').content == "Just text"
+        item = parse_ndjson_line(
+            b'{"content": "Dated", "created": "2021-05-01T10:30:00"}'
+        )
+        assert item.content == "Dated"
+        assert item.created == datetime(2021, 5, 1, 10, 30)
+
+    def test_bad_lines_carry_an_error(self):
+        """Unparseable lines become items with an error, not exceptions."""
+        from inbox import parse_ndjson_line
+
+        assert parse_ndjson_line("{not json").error.startswith("Invalid JSON")
+        assert parse_ndjson_line('{"text": "x"}').error
+        assert parse_ndjson_line('{"content": "x", "created": "soon"}').error
+
+
+class TestReadNoteBundle:
+    """Uploaded archives are read member by member."""
+
+    def test_zip_members(self):
+        """Notes come out in name order; other files are skipped."""
+        from inbox import read_note_bundle
+
+        data = io.BytesIO()
+        with zipfile.ZipFile(data, "w") as bundle:
+            bundle.writestr("notes/b.md", "Second")
+            bundle.writestr("notes/a.txt", "First")
+            bundle.writestr("notes/image.png", b"\x89PNG")
+            bundle.writestr("__MACOSX/notes/._a.txt", "junk")
+
+        items = list(read_note_bundle(data.getvalue()))
+
+        assert [(i.source, i.content) for i in items] == [
+            ("notes/a.txt", "First"),
+            ("notes/b.md", "Second"),
+        ]
+
+    def test_tar_members_keep_mtime(self):
+        """A compressed tar works too; member mtimes become creation times."""
+        from inbox import read_note_bundle
+
+        data = io.BytesIO()
+        with tarfile.open(fileobj=data, mode="w:gz") as bundle:
+            payload = b"Old note"
+            info = tarfile.TarInfo("old.md")
+            info.size = len(payload)
+            info.mtime = datetime(2020, 2, 3, 4, 5).timestamp()
+            bundle.addfile(info, io.BytesIO(payload))
+
+        (item,) = read_note_bundle(data.getvalue())
+
+        assert item.content == "Old note"
+        assert item.created == datetime(2020, 2, 3, 4, 5)
+
+    def test_rejects_other_uploads(self):
+        """Anything but a zip or tar is an error."""
+        import pytest
+
+        from inbox import read_note_bundle
+
+        with pytest.raises(ValueError):
+            list(read_note_bundle(b"plain text"))
+
+
+def test_write_inbox_notes_validates_dedupes_and_syncs_once(tmp_path):
+    """Each note gets a result; duplicates are skipped; one directory sync."""
+    from inbox import InboxItem, write_inbox_notes
+
+    (tmp_path / "2026-01-01_0000-existing.md").write_text("Already here")
+    items = [
+        InboxItem(content="  New note \n"),
+        InboxItem(content="Already here"),
+        InboxItem(content="New note"),
+        InboxItem(content="   "),
+        InboxItem(content="Dated", created=datetime(2021, 5, 1, 10, 30)),
+        InboxItem(error="Invalid JSON"),
+    ]
+
+    with patch("inbox.fsync_dir") as fsync_dir:
+        results = write_inbox_notes(items, tmp_path)
+
+    assert [r.status for r in results] == [
+        "saved",
+        "duplicate",
+        "duplicate",
+        "invalid",
+        "saved",
+        "invalid",
+    ]
+    assert results[1].filename == "2026-01-01_0000-existing.md"
+    assert results[2].filename == results[0].filename
+    assert (tmp_path / results[0].filename).read_text() == "New note"
+    assert results[4].filename.startswith("2021-05-01_1030-")
+    fsync_dir.assert_called_once_with(tmp_path)
@@ -6,7 +6,9 @@ from backends.base import (
     GardenerAction,
     ParseError,
     extract_json_from_response,
+    pack_note_batches,
     parse_gardener_action,
+    parse_gardener_actions,
 )
 
 
@@ -128,6 +130,63 @@ class TestParseGardenerAction:
         assert "Line 1" in result.content
 
 
+class TestParseGardenerActions:
+    """Test per-item parsing of batch classification responses."""
+
+    def test_parses_indexed_array(self):
+        """Items are placed by their index, not their array position."""
+        response = """```json
+[
+  {"index": 2, "action": "task", "path": "t", "content": "B", "reasoning": "r"},
+  {"index": 1, "action": "create", "path": "a.md", "content": "A", "reasoning": "r"}
+]
+```"""
+        first, second = parse_gardener_actions(response, 2)
+        assert first.content == "A"
+        assert second.content == "B"
+
+    def test_invalid_items_are_none(self):
+        """One malformed item does not discard the others."""
+        response = """[
+  {"index": 1, "action": "create", "path": "a.md", "content": "A", "reasoning": "r"},
+  {"index": 2, "action": "delete", "path": "b.md"}
+]"""
+        first, second, third = parse_gardener_actions(response, 3)
+        assert first.path == "a.md"
+        assert second is None
+        assert third is None
+
+    def test_unparseable_response_is_all_none(self):
+        """A response that is not JSON yields no actions."""
+        assert parse_gardener_actions("Sorry, I can't.", 2) == [None, None]
+
+
+class TestPackNoteBatches:
+    """Test greedy packing of notes under a token budget."""
+
+    def test_packs_under_budget(self):
+        """Short notes share batches; the budget and size cap split them."""
+        notes = [("x" * 40, "n.md")] * 5  # ~12 tokens each
+        assert pack_note_batches(notes, token_budget=30, max_batch_size=10) == [
+            [0, 1],
+            [2, 3],
+            [4],
+        ]
+        assert pack_note_batches(notes, token_budget=1000, max_batch_size=3) == [
+            [0, 1, 2],
+            [3, 4],
+        ]
+
+    def test_oversized_note_gets_own_batch(self):
+        """A note larger than the budget is isolated."""
+        notes = [("short", "a.md"), ("x" * 4000, "big.md"), ("short", "c.md")]
+        assert pack_note_batches(notes, token_budget=100, max_batch_size=10) == [
+            [0],
+            [1],
+            [2],
+        ]
+
+
 class TestParseErrorDetails:
     """Test that ParseError contains useful debugging information."""
 
@@ -1,4 +1,4 @@
-"""Tests for MCP tools (read_notes, add_note)."""
+"""Tests for MCP tools (read_notes, add_note, add_notes)."""
 
 from unittest.mock import patch
 
@@ -301,3 +301,27 @@ class TestMCPToolRegistration:
         from mcp_tools import add_note
 
         assert callable(add_note)
+
+
+class TestAddNotes:
+    """Tests for add_notes MCP tool."""
+
+    def test_add_notes_saves_each_note_once(self, temp_inbox):
+        """Saves every distinct note and reports duplicates and errors."""
+        with (
+            patch("config.INBOX_DIR", temp_inbox),
+            patch("mcp_tools.INBOX_DIR", temp_inbox),
+            patch("mcp_tools.schedule_notes") as schedule,
+        ):
+            from mcp_tools import add_notes
+
+            result = add_notes(notes=["First note", "Second note", "First note", ""])
+
+        assert "Saved 2 of 4" in result
+        assert "2: duplicate of" in result
+        assert "3: error:" in result
+        assert sorted(f.read_text() for f in temp_inbox.glob("*.md")) == [
+            "First note",
+            "Second note",
+        ]
+        assert len(schedule.call_args.args[0]) == 2
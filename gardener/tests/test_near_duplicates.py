@@ -0,0 +1,243 @@
+"""Tests for MinHash/LSH near-duplicate detection."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backends.base import GardenerAction
+
+NOTE = (
+    "Met with Sam about the garden shed. We agreed to paint it green next "
+    "weekend, buy two new hinges for the door and move the compost bin "
+    "closer to the vegetable beds before the first frost arrives."
+)
+EDITED = NOTE.replace("two new hinges", "two hinges").replace("arrives", "comes")
+UNRELATED = (
+    "Reading list for the winter: a history of the printing press, a book "
+    "about sourdough baking and the collected letters of a lighthouse keeper."
+)
+
+
+@pytest.fixture
+def state_db(tmp_path):
+    """Private state DB, near-duplicates flagged."""
+    with (
+        patch("config.STATE_DIR", tmp_path / ".gardener"),
+        patch("config.STATE_DB", tmp_path / ".gardener" / "state.db"),
+        patch("near_duplicates.GARDENER_NEAR_DUP_MODE", "flag"),
+    ):
+        yield tmp_path
+
+
+class TestSignatures:
+    """Signature agreement estimates word-shingle overlap."""
+
+    def test_small_edit_is_similar(self):
+        """A lightly edited note stays above the default threshold."""
+        from near_duplicates import minhash_signature, similarity
+
+        score = similarity(minhash_signature(NOTE), minhash_signature(EDITED))
+        assert score >= 0.8
+
+    def test_unrelated_notes_differ(self):
+        """Notes with no shared phrases are not similar."""
+        from near_duplicates import minhash_signature, similarity
+
+        score = similarity(minhash_signature(NOTE), minhash_signature(UNRELATED))
+        assert score < 0.2
+
+    def test_case_and_punctuation_ignored(self):
+        """Signatures are taken over lowercased words."""
+        from near_duplicates import minhash_signature
+
+        assert minhash_signature(NOTE) == minhash_signature(NOTE.upper() + "!!")
+        assert minhash_signature("  \n# ") is None
+
+
+class TestIndex:
+    """Indexed notes are found through their LSH buckets."""
+
+    def test_finds_similar_note(self, state_db):
+        """A near-duplicate is found with its stored decision."""
+        from near_duplicates import SOURCE_APPLIED, find_near_duplicate, index_note
+
+        action = GardenerAction(
+            action="append", path="home/garden.md", content=NOTE, reasoning="garden"
+        )
+        index_note("a.md", NOTE, SOURCE_APPLIED, action)
+
+        match = find_near_duplicate(EDITED)
+        assert match.key == "a.md"
+        assert match.source == SOURCE_APPLIED
+        assert match.similarity >= 0.8
+        assert match.action.path == "home/garden.md"
+        assert find_near_duplicate(UNRELATED) is None
+
+    def test_exclude_and_sources(self, state_db):
+        """A note does not match itself, and sources filter candidates."""
+        from near_duplicates import (
+            SOURCE_APPLIED,
+            SOURCE_INBOX,
+            find_near_duplicate,
+            index_note,
+        )
+
+        index_note("a.md", NOTE, SOURCE_INBOX)
+
+        assert find_near_duplicate(NOTE, exclude="a.md") is None
+        assert find_near_duplicate(NOTE, (SOURCE_APPLIED,)) is None
+        assert find_near_duplicate(NOTE, (SOURCE_INBOX,)).key == "a.md"
+
+    def test_forget_note(self, state_db):
+        """Forgotten notes are no longer matched."""
+        from near_duplicates import (
+            SOURCE_INBOX,
+            find_near_duplicate,
+            forget_note,
+            index_note,
+        )
+
+        index_note("a.md", NOTE, SOURCE_INBOX)
+        forget_note("a.md")
+
+        assert find_near_duplicate(NOTE) is None
+
+    def test_check_capture_flags_and_counts(self, state_db):
+        """A second, edited capture is flagged against the first."""
+        from near_duplicates import check_capture, get_near_duplicate_stats
+
+        assert check_capture("a.md", NOTE) is None
+        assert check_capture("b.md", EDITED).key == "a.md"
+
+        stats = get_near_duplicate_stats()
+        assert stats.indexed == 2
+        assert stats.flagged == 1
+
+    def test_off_mode_indexes_nothing(self, state_db):
+        """With GARDENER_NEAR_DUP=off nothing is stored or matched."""
+        from near_duplicates import check_capture, get_near_duplicate_stats
+
+        with patch("near_duplicates.GARDENER_NEAR_DUP_MODE", "off"):
+            check_capture("a.md", NOTE)
+            assert check_capture("b.md", NOTE) is None
+        assert get_near_duplicate_stats().indexed == 0
+
+
+class TestGardenerNearDuplicates:
+    """The gardener reuses or skips near-duplicates of written notes."""
+
+    @pytest.fixture
+    def temp_data(self, state_db):
+        """Inbox/atlas layout with the classification cache off."""
+        inbox_dir = state_db / "inbox"
+        archive_dir = inbox_dir / "archive"
+        atlas_dir = state_db / "atlas"
+        archive_dir.mkdir(parents=True)
+        atlas_dir.mkdir()
+
+        with (
+            patch("classification_cache.GARDENER_DEDUP_MODE", "off"),
+            patch("workers.gardener.DATA_DIR", state_db),
+            patch("workers.gardener.INBOX_DIR", inbox_dir),
+            patch("workers.gardener.ARCHIVE_DIR", archive_dir),
+            patch("workers.gardener.ATLAS_DIR", atlas_dir),
+            patch("workers.gardener.TASKS_FILE", state_db / "tasks.md"),
+            patch("workers.gardener.AGENTS_FILE", state_db / "AGENTS.md"),
+            patch("workers.gardener.GARDENER_FILE", state_db / "GARDENER.md"),
+            patch("workers.gardener.ensure_git_repo", return_value=False),
+            patch("workers.gardener.git_commit", return_value=False),
+            patch("workers.gardener.get_call_headroom", return_value=None),
+        ):
+            yield {"inbox": inbox_dir, "atlas": atlas_dir}
+
+    @staticmethod
+    def _backend():
+        backend = MagicMock()
+        backend.config.model_thinking = "test-model"
+        backend.classify.return_value = GardenerAction(
+            action="append",
+            path="home/garden.md",
+            content=NOTE,
+            reasoning="garden",
+        )
+        return backend
+
+    def _process_twice(self, temp_data, mode):
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        with patch("workers.gardener.GARDENER_NEAR_DUP_MODE", mode):
+            (temp_data["inbox"] / "a.md").write_text(NOTE)
+            process_inbox(backend=backend)
+            (temp_data["inbox"] / "b.md").write_text(EDITED)
+            results = process_inbox(backend=backend)
+        return backend, results
+
+    def test_flag_mode_classifies_and_writes(self, temp_data):
+        """By default a near-duplicate is still classified and written."""
+        backend, results = self._process_twice(temp_data, "flag")
+
+        assert results[0]["action"] == "append"
+        assert backend.classify.call_count == 2
+
+    def test_reuse_mode_skips_ai_call(self, temp_data):
+        """The earlier decision is reused, with the new note's content."""
+        from near_duplicates import get_near_duplicate_stats
+
+        backend, results = self._process_twice(temp_data, "reuse")
+
+        assert results[0]["action"] == "append"
+        assert backend.classify.call_count == 1
+        content = (temp_data["atlas"] / "home" / "garden.md").read_text()
+        assert "two hinges" in content
+        assert get_near_duplicate_stats().reused == 1
+
+    def test_reuse_mode_appends_to_created_page(self, temp_data):
+        """A reused "create" never replaces the page or later appends."""
+        from workers.gardener import process_inbox
+
+        backend = self._backend()
+        backend.classify.side_effect = [
+            GardenerAction(
+                action="create",
+                path="home/shed.md",
+                content="# Shed\n\nPaint it green.",
+                reasoning="garden",
+            ),
+            GardenerAction(
+                action="append",
+                path="home/shed.md",
+                content="LATER APPEND",
+                reasoning="garden",
+            ),
+        ]
+        with patch("workers.gardener.GARDENER_NEAR_DUP_MODE", "reuse"):
+            for name, content in (
+                ("a.md", NOTE),
+                ("b.md", UNRELATED),
+                ("c.md", EDITED),
+            ):
+                (temp_data["inbox"] / name).write_text(content)
+                process_inbox(backend=backend)
+
+        assert backend.classify.call_count == 2
+        content = (temp_data["atlas"] / "home" / "shed.md").read_text()
+        assert content.startswith("# Shed\n\nPaint it green.")
+        assert "LATER APPEND" in content
+        assert content.endswith(EDITED)
+
+    def test_skip_mode_archives_without_writing(self, temp_data):
+        """A near-duplicate is archived and the atlas is left alone."""
+        from near_duplicates import get_near_duplicate_stats
+
+        backend, results = self._process_twice(temp_data, "skip")
+
+        assert results[0]["action"] == "near_duplicate"
+        assert not list(temp_data["inbox"].glob("*.md"))
+        content = (temp_data["atlas"] / "home" / "garden.md").read_text()
+        assert "two hinges" not in content
+        stats = get_near_duplicate_stats()
+        assert stats.skipped == 1
+        assert stats.reused == 0
+        assert stats.indexed == 1
+        assert backend.classify.call_count == 1
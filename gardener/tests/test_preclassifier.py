@@ -0,0 +1,140 @@
+"""Tests for the local naive Bayes pre-classifier."""
+
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from backends.base import GardenerAction
+
+ALICE_NOTES = [
+    "Alice called about the garden project and her new job",
+    "Lunch with Alice, she is moving to Lisbon in spring",
+    "Alice birthday is in March, she likes jazz records",
+    "Alice recommended a dentist near her office",
+]
+JOURNAL_NOTES = [
+    "Today I felt tired after a long day of meetings",
+    "Today was calm, I slept well and went for a walk",
+    "Today I felt anxious about the trip but it went fine",
+    "Today the weather was grey and I stayed in reading",
+]
+
+
+def _decision(action: str, path: str) -> GardenerAction:
+    return GardenerAction(action=action, path=path, content="x", reasoning="model")
+
+
+@pytest.fixture
+def trained(tmp_path):
+    """A pre-classifier trained on a handful of past decisions."""
+    atlas_dir = tmp_path / "atlas"
+    (atlas_dir / "people").mkdir(parents=True)
+    (atlas_dir / "people" / "alice.md").write_text("# Alice\n")
+    with (
+        patch("config.STATE_DIR", tmp_path / ".gardener"),
+        patch("config.STATE_DB", tmp_path / ".gardener" / "state.db"),
+        patch("config.ATLAS_DIR", atlas_dir),
+        patch("config.ARCHIVE_DIR", tmp_path / "archive"),
+        patch("preclassifier.GARDENER_PRECLASSIFY_MIN_EXAMPLES", 5),
+    ):
+        from preclassifier import learn
+
+        for note in ALICE_NOTES:
+            learn(note, _decision("append", "people/alice.md"))
+        for i, note in enumerate(JOURNAL_NOTES):
+            learn(note, _decision("create", f"journal/2024-01-0{i + 1}.md"))
+        yield {"atlas": atlas_dir, "archive": tmp_path / "archive"}
+
+
+class TestPredict:
+    """Labels, target paths and confidence."""
+
+    def test_predicts_existing_page_and_new_file_directory(self, trained):
+        from preclassifier import predict
+
+        alice = predict("Alice said her new job in Lisbon starts soon")
+        assert alice.label == "append:people/alice.md"
+        assert (alice.category, alice.path) == ("people", "people/alice.md")
+        assert alice.confidence > 0.9
+
+        journal = predict("Today I felt better after a walk")
+        assert journal.label == "create:journal"
+        assert journal.path == "journal/today-i-felt-better-after-a-walk.md"
+
+    def test_no_prediction_before_min_examples(self, trained):
+        from preclassifier import predict
+
+        with patch("preclassifier.GARDENER_PRECLASSIFY_MIN_EXAMPLES", 100):
+            assert predict("Alice called again") is None
+
+    def test_learning_updates_loaded_model_in_place(self, trained):
+        """A new decision does not reload the counts from the database."""
+        import preclassifier
+        from preclassifier import NaiveBayesModel, learn, predict
+
+        predict("warm up the model")
+        with patch.object(NaiveBayesModel, "load", wraps=NaiveBayesModel.load) as load:
+            learn("Bob fixed the bike", _decision("append", "people/bob.md"))
+            predict("Bob again")
+            assert load.call_count == 0
+
+        fresh = NaiveBayesModel.load()
+        model = preclassifier._model
+        assert model.label_docs == fresh.label_docs
+        assert model.label_tokens == fresh.label_tokens
+        assert model.token_counts == fresh.token_counts
+
+    def test_trains_from_archived_jobs(self, trained, tmp_path):
+        """Offline training rebuilds counts from finished jobs."""
+        from job_queue import mark_archived, mark_classified, sync_inbox_jobs
+        from preclassifier import get_preclassifier_stats, train_from_history
+
+        inbox = tmp_path / "inbox"
+        inbox.mkdir()
+        (inbox / "a.md").write_text(ALICE_NOTES[0])
+        (job,) = sync_inbox_jobs(inbox, [inbox / "a.md"])
+        mark_classified(job.id, _decision("append", "people/alice.md"))
+        mark_archived(job.id)
+        trained["archive"].mkdir()
+        (inbox / "a.md").rename(trained["archive"] / "a.md")
+
+        assert train_from_history() == 1
+        assert get_preclassifier_stats()["examples"] == 1
+
+
+class TestGardenerIntegration:
+    """Confident notes skip the thinking model."""
+
+    def test_template_mode_files_note_without_ai(self, trained):
+        from workers.gardener import classify_note
+
+        backend = MagicMock()
+        with (
+            patch("preclassifier.GARDENER_PRECLASSIFY_MODE", "template"),
+            patch("workers.gardener.GARDENER_PRECLASSIFY_MODE", "template"),
+            patch("workers.gardener._cache_model", return_value=None),
+        ):
+            action = classify_note(
+                backend, "Alice moved to Lisbon with her job", "n.md"
+            )
+
+        backend.classify.assert_not_called()
+        assert (action.action, action.path) == ("append", "people/alice.md")
+        assert action.content == "Alice moved to Lisbon with her job"
+
+    def test_fast_mode_passes_suggestion_to_fast_model(self, trained):
+        from workers.gardener import classify_note
+
+        backend = MagicMock()
+        backend.classify.return_value = _decision("append", "people/alice.md")
+        with (
+            patch("preclassifier.GARDENER_PRECLASSIFY_MODE", "fast"),
+            patch("workers.gardener.GARDENER_PRECLASSIFY_MODE", "fast"),
+            patch("workers.gardener._cache_model", return_value=None),
+        ):
+            classify_note(backend, "Alice moved to Lisbon with her job", "n.md")
+            classify_note(backend, "Bought a new bike chain", "m.md")
+
+        first, second = backend.classify.call_args_list
+        assert first.kwargs == {"fast": True, "suggestion": "append people/alice.md"}
+        assert second.kwargs == {}
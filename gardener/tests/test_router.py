@@ -0,0 +1,144 @@
+"""Tests for model routing and failover between backends."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import httpx
+import pytest
+
+from backends.base import BackendConfig, GardenerAction
+from backends.router import (
+    AsyncRoutingBackend,
+    RoutingBackend,
+    RoutingPolicy,
+    _record,
+    get_routing_status,
+)
+
+
+def _backend(name: str, fast: str, thinking: str) -> MagicMock:
+    backend = MagicMock()
+    backend.name = name
+    backend.config = BackendConfig(
+        api_key="k", model_thinking=thinking, model_fast=fast
+    )
+    return backend
+
+
+@pytest.fixture
+def pair():
+    """An OpenAI primary and an Anthropic fallback."""
+    return (
+        _backend("openai", "gpt-mini", "gpt-big"),
+        _backend("anthropic", "haiku", "sonnet"),
+    )
+
+
+class TestRoutingBackend:
+    """Tier selection, SLO-based ordering and failover."""
+
+    def test_transient_error_fails_over(self, pair):
+        primary, fallback = pair
+        primary.ask.side_effect = httpx.ConnectError("down")
+        fallback.ask.return_value = "from fallback"
+
+        router = RoutingBackend(primary, fallback)
+
+        assert router.ask("What did Alice say?", "") == "from fallback"
+        status = get_routing_status()
+        assert status["openai:gpt-big"]["failures"] == 1
+        assert status["anthropic:sonnet"]["calls"] == 1
+
+    def test_client_errors_are_not_failed_over(self, pair):
+        primary, fallback = pair
+        primary.ask.side_effect = ValueError("API key not configured")
+
+        with pytest.raises(ValueError):
+            RoutingBackend(primary, fallback).ask("q", "")
+        fallback.ask.assert_not_called()
+
+    def test_slow_primary_is_skipped_until_recovery(self, pair):
+        """A model over the latency SLO goes behind the fallback."""
+        primary, fallback = pair
+        primary.ask.return_value = "primary"
+        fallback.ask.return_value = "fallback"
+        _record("openai:gpt-big", 45.0, ok=True, alpha=0.3)
+
+        slow = RoutingBackend(primary, fallback, RoutingPolicy(latency_slo=20))
+        assert slow.ask("q", "") == "fallback"
+
+        recovered = RoutingBackend(
+            primary, fallback, RoutingPolicy(latency_slo=20, recovery=0)
+        )
+        assert recovered.ask("q", "") == "primary"
+
+    def test_simple_notes_use_fast_model(self, pair):
+        primary, _ = pair
+        primary.classify.return_value = GardenerAction(
+            action="create", path="a.md", content="x", reasoning="r"
+        )
+        router = RoutingBackend(primary, policy=RoutingPolicy(difficulty_routing=True))
+
+        router.classify("Buy milk", "a.md", "ctx")
+        router.classify("word " * 200, "b.md", "ctx")
+
+        short, long = primary.classify.call_args_list
+        assert short.kwargs == {"fast": True, "suggestion": None}
+        assert long.kwargs == {}
+
+
+class TestAsyncRoutingBackend:
+    """Streams fail over only before the first chunk."""
+
+    async def test_stream_fails_over_before_first_token(self, pair):
+        primary, fallback = pair
+
+        async def broken(*args, **kwargs):
+            raise httpx.ReadTimeout("slow")
+            yield  # pragma: no cover
+
+        async def works(*args, **kwargs):
+            for text in ("Hel", "lo"):
+                yield text
+
+        primary.ask_stream = broken
+        fallback.ask_stream = works
+        primary.aclose = AsyncMock()
+        fallback.aclose = AsyncMock()
+
+        router = AsyncRoutingBackend(primary, fallback)
+        chunks = [text async for text in router.ask_stream("q", "")]
+
+        assert chunks == ["Hel", "lo"]
+        await router.aclose()
+        fallback.aclose.assert_awaited_once()
+
+    async def test_abandoned_streams_are_closed(self, pair):
+        """A failed-over stream and one the client stops reading are closed."""
+        primary, fallback = pair
+        closed = []
+
+        class Broken:
+            def __aiter__(self):
+                return self
+
+            async def __anext__(self):
+                raise httpx.ReadTimeout("slow")
+
+            async def aclose(self):
+                closed.append("primary")
+
+        async def works(*args, **kwargs):
+            try:
+                for text in ("Hel", "lo"):
+                    yield text
+            finally:
+                closed.append("fallback")
+
+        primary.ask_stream = lambda *args, **kwargs: Broken()
+        fallback.ask_stream = works
+
+        stream = AsyncRoutingBackend(primary, fallback).ask_stream("q", "")
+        assert await anext(stream) == "Hel"
+        await stream.aclose()
+
+        assert closed == ["primary", "fallback"]
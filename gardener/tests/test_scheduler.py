@@ -0,0 +1,129 @@
+"""Tests for the priority-aware gardener scheduler."""
+
+import threading
+
+import pytest
+
+from scheduler import (
+    PRIORITY_AUTOMATED,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_MAINTENANCE,
+    GardenerScheduler,
+)
+
+
+class Recorder:
+    """Fake process_inbox that records each unit and can hold the first one."""
+
+    def __init__(self, hold_first: bool = False):
+        self.calls: list[list[str]] = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        if not hold_first:
+            self.release.set()
+
+    def __call__(self, files):
+        self.calls.append([f.name for f in files])
+        self.started.set()
+        self.release.wait(timeout=5)
+
+
+@pytest.fixture
+def make_scheduler():
+    """Build schedulers with a fixed inbox listing and stop them afterwards."""
+    schedulers = []
+
+    def _make(process, inbox, **kwargs):
+        scheduler = GardenerScheduler(
+            process=process, list_inbox=lambda: list(inbox), **kwargs
+        )
+        schedulers.append(scheduler)
+        return scheduler
+
+    yield _make
+    for scheduler in schedulers:
+        scheduler.stop()
+
+
+class TestGardenerScheduler:
+    """Interactive work first, with a fair share for the backlog."""
+
+    def test_capture_preempts_backlog_between_slices(self, make_scheduler):
+        """A new capture runs right after the slice in progress."""
+        process = Recorder(hold_first=True)
+        backlog = [f"old-{i:02d}.md" for i in range(12)]
+        scheduler = make_scheduler(process, backlog, slice_size=4)
+
+        done = scheduler.request_sweep()
+        assert process.started.wait(timeout=5)
+        scheduler.enqueue_capture("new.md")
+        process.release.set()
+        done.result(timeout=5)
+
+        assert process.calls[0] == backlog[:4]
+        assert process.calls[1] == ["new.md"]
+        assert sorted(sum(process.calls, [])) == sorted(backlog + ["new.md"])
+
+    def test_backlog_keeps_a_fair_share(self, make_scheduler):
+        """A steady stream of captures does not starve the backlog."""
+        process = Recorder(hold_first=True)
+        backlog = [f"old-{i:02d}.md" for i in range(10)]
+        scheduler = make_scheduler(process, backlog, slice_size=1)
+
+        done = scheduler.request_sweep()
+        assert process.started.wait(timeout=5)
+        for i in range(20):
+            scheduler.enqueue_capture(f"new-{i:02d}.md")
+        process.release.set()
+        done.result(timeout=5)
+
+        first = [names[0] for names in process.calls[1:11]]
+        old = sum(name.startswith("old-") for name in first)
+        assert 1 <= old < len(first) - old
+
+    def test_maintenance_and_queue_stats(self, make_scheduler):
+        """Maintenance tasks return results; served counts are reported."""
+        scheduler = make_scheduler(Recorder(), ["a.md", "b.md"])
+
+        scheduler.request_sweep().result(timeout=5)
+        assert scheduler.submit_maintenance(lambda: 42).result(timeout=5) == 42
+
+        stats = {q.name: q for q in scheduler.stats()}
+        assert [q.name for q in scheduler.stats()] == [
+            PRIORITY_INTERACTIVE,
+            PRIORITY_AUTOMATED,
+            PRIORITY_MAINTENANCE,
+        ]
+        assert stats[PRIORITY_AUTOMATED].served == 2
+        assert stats[PRIORITY_MAINTENANCE].served == 1
+        assert all(q.depth == 0 for q in stats.values())
+
+    def test_enqueue_notes_queues_only_given_files(self, make_scheduler):
+        """Watcher batches process just the notes that changed."""
+        process = Recorder()
+        scheduler = make_scheduler(process, ["a.md", "b.md", "c.md"])
+
+        scheduler.enqueue_notes(["c.md", "a.md"]).result(timeout=5)
+
+        assert process.calls == [["c.md", "a.md"]]
+
+    def test_stop_fails_queued_work(self, make_scheduler):
+        """Waiters on work that never ran are released on shutdown."""
+        process = Recorder(hold_first=True)
+        scheduler = make_scheduler(process, ["a.md", "b.md"], slice_size=1)
+
+        sweep = scheduler.request_sweep()
+        assert process.started.wait(timeout=5)
+        task = scheduler.submit_maintenance(lambda: 42)
+        stopper = threading.Thread(target=scheduler.stop)
+        stopper.start()
+
+        with pytest.raises(RuntimeError, match="scheduler stopped"):
+            sweep.result(timeout=5)
+        with pytest.raises(RuntimeError, match="scheduler stopped"):
+            task.result(timeout=5)
+        process.release.set()
+        stopper.join(timeout=5)
+
+        assert process.calls == [["a.md"]]
+        assert all(q.depth == 0 for q in scheduler.stats())
@@ -112,6 +112,21 @@ class TestSearchAtlas:
             results = search_atlas(["test"])
             assert results == []
 
+    def test_segments_match_as_their_note(self, temp_atlas):
+        """A hit in an earlier segment is reported once, as the note itself."""
+        from main import search_atlas
+
+        atlas_dir = temp_atlas["atlas_dir"]
+        segments = atlas_dir / "projects" / ".segments" / "ml-project"
+        segments.mkdir(parents=True)
+        (segments / "2026-01.md").write_text("Early notes on Python notebooks.")
+
+        results = search_atlas(["python"], max_files=10)
+
+        paths = [r["path"] for r in results]
+        assert paths.count("projects/ml-project.md") == 1
+        assert not any(".segments" in path for path in paths)
+
 
 class TestFileContentCache:
     """Test the file content cache."""
@@ -0,0 +1,101 @@
+"""Tests for rolling long append targets over into segments."""
+
+import os
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import patch
+
+import pytest
+
+from backends.base import GardenerAction
+
+
+class TestRollOver:
+    """Notes past the size or period limit start a new segment."""
+
+    def test_small_note_is_left_alone(self, tmp_path):
+        from segments import roll_over
+
+        note = tmp_path / "daily.md"
+        note.write_text("# Daily\n\nshort entry\n")
+
+        assert roll_over(note, max_kb=1, period="none") is None
+        assert not (tmp_path / ".segments").exists()
+
+    def test_size_rollover_keeps_title_and_links_segments(self, tmp_path):
+        """The old content moves to a segment; the note links to it."""
+        from segments import list_segments, roll_over
+
+        note = tmp_path / "daily.md"
+        old = "---\ntags: [journal]\n---\n# Daily\n\n" + "entry\n" * 300
+        note.write_text(old)
+
+        first = roll_over(note, now=datetime(2026, 3, 5), max_kb=1, period="none")
+        note.write_text(note.read_text() + "entry\n" * 300)
+        second = roll_over(note, now=datetime(2026, 3, 5), max_kb=1, period="none")
+
+        assert first.read_text() == old
+        assert [first.name, second.name] == ["2026-03-05.md", "2026-03-05_2.md"]
+        assert list_segments(note) == [second, first]
+        content = note.read_text()
+        assert content.startswith("---\ntags: [journal]\n---\n# Daily\n")
+        assert "[2026-03-05_2](.segments/daily/2026-03-05_2.md)" in content
+        assert "entry" not in content
+
+    def test_month_rollover(self, tmp_path):
+        """With period=month, the first write of a new month rolls over."""
+        from segments import roll_over
+
+        note = tmp_path / "daily.md"
+        note.write_text("# Daily\n\nFebruary entry\n")
+        february = datetime(2026, 2, 20).timestamp()
+        os.utime(note, (february, february))
+
+        segment = roll_over(note, now=datetime(2026, 3, 1), max_kb=0, period="month")
+
+        assert segment.name == "2026-02.md"
+        assert "February entry" in segment.read_text()
+
+    @pytest.mark.parametrize(
+        ("path", "expected"),
+        [
+            ("journal/.segments/daily/2026-02.md", "journal/daily.md"),
+            (".segments/inbox-log/2026-02_3.md", "inbox-log.md"),
+            ("journal/daily.md", "journal/daily.md"),
+        ],
+    )
+    def test_logical_note_path(self, path, expected):
+        from segments import logical_note_path
+
+        assert logical_note_path(Path(path)) == Path(expected)
+
+
+def test_append_action_rolls_over_large_note(tmp_path):
+    """execute_action appends to a fresh segment once the note is too big."""
+    atlas = tmp_path / "atlas"
+    journal = atlas / "journal"
+    journal.mkdir(parents=True)
+    note = journal / "daily.md"
+    note.write_text("# Daily\n\n" + "old entry\n" * 200)
+
+    with (
+        patch("workers.gardener.ATLAS_DIR", atlas),
+        patch("segments.GARDENER_SEGMENT_KB", 1),
+        patch("segments.GARDENER_SEGMENT_PERIOD", "none"),
+    ):
+        from workers.gardener import execute_action
+
+        result = execute_action(
+            GardenerAction(
+                action="append",
+                path="journal/.segments/daily/2026-01.md",
+                content="new entry",
+                reasoning="journal",
+            )
+        )
+
+    assert result == note.resolve()
+    content = note.read_text()
+    assert "new entry" in content
+    assert "old entry" not in content
+    assert "Earlier entries" in content
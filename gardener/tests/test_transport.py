@@ -0,0 +1,221 @@
+"""Tests for retries, circuit breaking and hedging against a faulty server."""
+
+import threading
+import time
+from unittest.mock import patch
+
+import httpx
+import pytest
+
+from backends.base import BackendConfig
+from backends.transport import (
+    CIRCUIT_CLOSED,
+    CIRCUIT_HALF_OPEN,
+    CIRCUIT_OPEN,
+    CircuitOpenError,
+    get_transport_status,
+    parse_retry_after,
+)
+from tests.fixtures.fake_ai_server import FakeAIServer, FakeResponse, chat_completion
+
+
+@pytest.fixture
+def no_tracking():
+    """Skip API usage bookkeeping for transport-level tests."""
+    with patch("backends.openai.track_api_call") as track:
+        track.return_value.__enter__.return_value = None
+        yield
+
+
+def _config(url: str, **overrides) -> BackendConfig:
+    settings = {
+        "retry_attempts": 3,
+        "retry_base_delay": 0.01,
+        "retry_max_delay": 1.0,
+        "circuit_failure_threshold": 5,
+        "circuit_reset_timeout": 30.0,
+        **overrides,
+    }
+    return BackendConfig(
+        api_key="test-key",
+        base_url=url,
+        model_thinking="fake-thinking",
+        model_fast="fake-fast",
+        **settings,
+    )
+
+
+def _scripted(*replies: FakeResponse):
+    """Handler returning ``replies`` in order, then a normal completion."""
+    queue = list(replies)
+    lock = threading.Lock()
+
+    def handler(method, path, body):
+        with lock:
+            if queue:
+                return queue.pop(0)
+        return FakeResponse(body=chat_completion("ok"))
+
+    return handler
+
+
+class TestRetries:
+    """Transient failures are retried with backoff."""
+
+    def test_retries_server_errors_then_succeeds(self, no_tracking):
+        """Two 503s followed by a success return the success."""
+        from backends.openai import OpenAIBackend
+
+        handler = _scripted(FakeResponse(status=503), FakeResponse(status=502))
+        with FakeAIServer(handler) as server:
+            backend = OpenAIBackend(_config(server.url))
+            try:
+                assert backend.ask("Q?", "") == "ok"
+            finally:
+                backend.close()
+
+        assert len(server.requests) == 3
+        assert get_transport_status()["openai"]["retries"] == 2
+
+    def test_honors_retry_after(self, no_tracking):
+        """A 429 with Retry-After waits at least that long before retrying."""
+        from backends.openai import OpenAIBackend
+
+        handler = _scripted(FakeResponse(status=429, headers={"Retry-After": "0.3"}))
+        with FakeAIServer(handler) as server:
+            backend = OpenAIBackend(_config(server.url))
+            try:
+                start = time.monotonic()
+                assert backend.ask("Q?", "") == "ok"
+                elapsed = time.monotonic() - start
+            finally:
+                backend.close()
+
+        assert elapsed >= 0.3
+        assert len(server.requests) == 2
+
+    def test_client_errors_are_not_retried(self, no_tracking):
+        """A 400 fails immediately and does not count against the provider."""
+        from backends.openai import OpenAIBackend
+
+        with FakeAIServer(lambda *_: FakeResponse(status=400)) as server:
+            backend = OpenAIBackend(_config(server.url))
+            try:
+                with pytest.raises(httpx.HTTPStatusError):
+                    backend.ask("Q?", "")
+            finally:
+                backend.close()
+
+        assert len(server.requests) == 1
+        assert get_transport_status()["openai"]["consecutive_failures"] == 0
+
+    def test_parse_retry_after_http_date(self):
+        """HTTP-date Retry-After values become seconds from now."""
+        assert parse_retry_after("5") == 5.0
+        assert parse_retry_after("Wed, 21 Oct 2015 07:28:00 GMT") == 0.0
+        assert parse_retry_after("soon") is None
+
+
+class TestCircuitBreaker:
+    """A failing provider stops receiving requests for a while."""
+
+    def test_opens_after_repeated_failures_and_recovers(self, no_tracking):
+        """Calls fail fast while open; a trial after the reset closes it."""
+        from backends.openai import OpenAIBackend
+
+        healthy = False
+
+        def handler(method, path, body):
+            if healthy:
+                return FakeResponse(body=chat_completion("back"))
+            return FakeResponse(status=500)
+
+        config = _config(
+            "", retry_attempts=2, circuit_failure_threshold=4, circuit_reset_timeout=0.2
+        )
+        with FakeAIServer(handler) as server:
+            config.base_url = server.url
+            backend = OpenAIBackend(config)
+            try:
+                for _ in range(2):
+                    with pytest.raises(httpx.HTTPStatusError):
+                        backend.ask("Q?", "")
+                assert get_transport_status()["openai"]["state"] == CIRCUIT_OPEN
+
+                with pytest.raises(CircuitOpenError):
+                    backend.ask("Q?", "")
+                assert len(server.requests) == 4
+
+                healthy = True
+                time.sleep(0.25)
+                assert backend.ask("Q?", "") == "back"
+                assert get_transport_status()["openai"]["state"] == CIRCUIT_CLOSED
+            finally:
+                backend.close()
+
+    def test_client_error_does_not_close_half_open_circuit(self):
+        """A non-transient error during the trial call is neutral."""
+        from backends.transport import CircuitBreaker
+
+        breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0.0)
+        breaker.record_failure()
+        breaker.before_call()
+        breaker.record_outcome(ValueError("bad request"))
+
+        assert breaker.state == CIRCUIT_HALF_OPEN
+        assert breaker.snapshot()["consecutive_failures"] == 1
+
+
+class TestHedging:
+    """Slow async ask/refine calls are raced against a backup request."""
+
+    async def test_hedge_wins_when_first_request_stalls(self, no_tracking):
+        """The backup answers while the first request is still stuck."""
+        from backends.openai import AsyncOpenAIBackend
+
+        calls = 0
+        lock = threading.Lock()
+
+        def handler(method, path, body):
+            nonlocal calls
+            with lock:
+                calls += 1
+                first = calls == 1
+            if first:
+                time.sleep(1.0)
+                return FakeResponse(body=chat_completion("slow"))
+            return FakeResponse(body=chat_completion("fast"))
+
+        with FakeAIServer(handler) as server:
+            backend = AsyncOpenAIBackend(_config(server.url, hedge_delay=0.05))
+            try:
+                start = time.monotonic()
+                assert await backend.ask("Q?", "") == "fast"
+                assert time.monotonic() - start < 0.9
+            finally:
+                await backend.aclose()
+
+        status = get_transport_status()["openai"]
+        assert status["hedged_requests"] == 1
+        assert status["hedge_wins"] == 1
+
+    async def test_losing_request_usage_is_reported(self):
+        """The slower request finishes in the background and is reported."""
+        import asyncio
+
+        from backends.transport import CircuitBreaker, RetryPolicy, Transport
+
+        transport = Transport(
+            "test", RetryPolicy(), CircuitBreaker("test", 5, 30.0), hedge_delay=0.02
+        )
+        delays = [0.2, 0.0]
+        losers = []
+
+        async def send():
+            delay = delays.pop(0)
+            await asyncio.sleep(delay)
+            return f"slept {delay}"
+
+        assert await transport.ahedged(send, losers.append) == "slept 0.0"
+        await asyncio.sleep(0.3)
+        assert losers == ["slept 0.2"]
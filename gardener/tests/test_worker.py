@@ -0,0 +1,134 @@
+"""Tests for the leader lock and the API -> worker request queue."""
+
+import asyncio
+from concurrent.futures import Future
+from unittest.mock import patch
+
+import pytest
+
+from worker_queue import (
+    REQUEST_BACKLOG,
+    REQUEST_CAPTURE,
+    REQUEST_RECONCILE,
+    LeaderLock,
+    claim_worker_requests,
+    get_worker_request_counts,
+    leader_running,
+    submit_worker_request,
+    wait_for_worker_request,
+)
+
+
+@pytest.fixture
+def state_dir(tmp_path):
+    """Point the state DB and leader lock at a temp directory."""
+    state = tmp_path / ".gardener"
+    with (
+        patch("config.STATE_DIR", state),
+        patch("config.STATE_DB", state / "state.db"),
+    ):
+        yield state
+
+
+class FakeScheduler:
+    """Records captures; runs maintenance tasks as fixed results."""
+
+    def __init__(self):
+        self.captures: list[str] = []
+
+    def enqueue_capture(self, filename: str) -> None:
+        self.captures.append(filename)
+
+    def submit_maintenance(self, task) -> Future:
+        future: Future = Future()
+        future.set_result({"id": 7, "files_changed": 2})
+        return future
+
+
+class TestLeaderLock:
+    """Only one process gardens at a time."""
+
+    def test_second_holder_is_refused_until_release(self, state_dir):
+        first, second = LeaderLock(), LeaderLock()
+
+        assert not leader_running()
+        assert first.acquire()
+        assert leader_running()
+        assert not second.acquire()
+
+        first.release()
+        assert second.acquire()
+        second.release()
+
+    def test_probe_keeps_recorded_pid(self, state_dir):
+        """Checking for a leader does not claim the lock file."""
+        from worker_queue import leader_pid
+
+        LeaderLock.path().parent.mkdir(parents=True)
+        LeaderLock.path().write_text("4242")
+
+        assert not leader_running()
+        assert leader_pid() is None
+        assert LeaderLock.path().read_text() == "4242"
+
+
+class TestWorkerRequests:
+    """Dispatch from non-leader processes through the request queue."""
+
+    def test_capture_is_queued_when_another_process_leads(self, state_dir):
+        """An API process without the lock hands captures to the leader."""
+        from worker import schedule_capture
+
+        leader = LeaderLock()
+        assert leader.acquire()
+        try:
+            with patch("worker.GARDENER_AUTO", True):
+                schedule_capture("note.md")
+        finally:
+            leader.release()
+
+        (request,) = claim_worker_requests()
+        assert (request.kind, request.filename) == (REQUEST_CAPTURE, "note.md")
+        assert get_worker_request_counts() == {"running": 1}
+
+    def test_backlog_is_queued_when_another_process_leads(self, state_dir):
+        """Backlog runs are left to the leader, even in embedded mode."""
+        from worker import request_backlog
+
+        leader = LeaderLock()
+        assert leader.acquire()
+        try:
+            with patch("workers.backlog.run_backlog") as run_backlog:
+                request_backlog()
+        finally:
+            leader.release()
+
+        run_backlog.assert_not_called()
+        (request,) = claim_worker_requests()
+        assert request.kind == REQUEST_BACKLOG
+
+    async def test_worker_answers_queued_requests(self, state_dir):
+        """The leader consumes captures and returns reconcile results."""
+        from worker import GardenerWorker
+
+        scheduler = FakeScheduler()
+        submit_worker_request(REQUEST_CAPTURE, "a.md")
+        request_id = submit_worker_request(REQUEST_RECONCILE)
+        with patch("worker.get_scheduler", return_value=scheduler):
+            worker = asyncio.create_task(GardenerWorker(poll_interval=0.01).run())
+            try:
+                result = await wait_for_worker_request(request_id, timeout=5)
+            finally:
+                worker.cancel()
+                with pytest.raises(asyncio.CancelledError):
+                    await worker
+
+        assert result == {"id": 7, "files_changed": 2}
+        assert scheduler.captures == ["a.md"]
+        assert get_worker_request_counts() == {"done": 2}
+        assert not leader_running()
+
+    async def test_wait_times_out_without_worker(self, state_dir):
+        request_id = submit_worker_request(REQUEST_CAPTURE, "a.md")
+        with pytest.raises(TimeoutError):
+            await wait_for_worker_request(request_id, timeout=0.05, poll_interval=0.01)
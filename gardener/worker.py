@@ -0,0 +1,190 @@
+"""Gardener worker runtime and dispatch of gardening work.
+
+The worker owns everything that gardens: the scheduler thread, the inbox
+watcher/poller and the request queue consumer. It only runs while holding
+the leader lock, so several uvicorn workers (or an API process next to a
+standalone worker) never garden concurrently.
+
+API code calls the dispatch functions below instead of the scheduler. They
+run work locally when this process is the leader and hand it to the leader
+through the request queue otherwise.
+"""
+
+import asyncio
+import logging
+from concurrent.futures import Future
+
+from automation import start_automation
+from config import (
+    GARDENER_AUTO,
+    GARDENER_WORKER_MODE,
+    GARDENER_WORKER_POLL,
+    GARDENER_WORKER_TIMEOUT,
+)
+from scheduler import get_scheduler
+from worker_queue import (
+    REQUEST_BACKLOG,
+    REQUEST_CAPTURE,
+    REQUEST_RECONCILE,
+    REQUEST_SWEEP,
+    LeaderLock,
+    WorkerRequest,
+    claim_worker_requests,
+    finish_worker_request,
+    leader_running,
+    recover_worker_requests,
+    submit_worker_request,
+    wait_for_worker_request,
+)
+
+logger = logging.getLogger(__name__)
+
+_leader_lock = LeaderLock()
+
+
+def is_worker_leader() -> bool:
+    """Whether this process is the one gardening."""
+    return _leader_lock.held
+
+
+def _run_locally() -> bool:
+    if is_worker_leader():
+        return True
+    # Embedded mode without any leader (e.g. lifespan not run): garden here
+    return GARDENER_WORKER_MODE != "external" and not leader_running()
+
+
+def _run_reconcile():
+    from archive import pack_cold_shards
+    from file_state import run_reconcile
+
+    try:
+        pack_cold_shards()
+    except Exception as e:
+        logger.warning(f"Could not pack cold archive shards: {e}")
+    return run_reconcile()
+
+
+def _run_backlog() -> list[dict]:
+    from workers.backlog import run_backlog
+
+    return run_backlog(wait=False)
+
+
+def _finish_when_done(request: WorkerRequest, future: Future) -> None:
+    def _done(f: Future) -> None:
+        error = f.exception()
+        if error is not None:
+            finish_worker_request(request.id, error=str(error))
+        else:
+            finish_worker_request(request.id, result=f.result())
+
+    future.add_done_callback(_done)
+
+
+class GardenerWorker:
+    """Leader-elected gardener: automation plus the request queue consumer."""
+
+    def __init__(self, poll_interval: float = GARDENER_WORKER_POLL):
+        self.poll_interval = poll_interval
+
+    def _dispatch(self, request: WorkerRequest) -> None:
+        scheduler = get_scheduler()
+        if request.kind == REQUEST_CAPTURE:
+            scheduler.enqueue_capture(request.filename)
+            finish_worker_request(request.id)
+        elif request.kind == REQUEST_SWEEP:
+            _finish_when_done(request, scheduler.request_sweep())
+        elif request.kind == REQUEST_RECONCILE:
+            _finish_when_done(request, scheduler.submit_maintenance(_run_reconcile))
+        elif request.kind == REQUEST_BACKLOG:
+            _finish_when_done(request, scheduler.submit_maintenance(_run_backlog))
+        else:
+            finish_worker_request(
+                request.id, error=f"Unknown request kind: {request.kind}"
+            )
+
+    async def run(self) -> None:
+        """Wait for the leader lock, then garden until cancelled."""
+        logged_wait = False
+        while not _leader_lock.acquire():
+            if not logged_wait:
+                logger.info("Another gardener worker is running; standing by")
+                logged_wait = True
+            await asyncio.sleep(self.poll_interval)
+        logger.info("Gardener worker is the leader")
+
+        automation = asyncio.create_task(start_automation())
+        try:
+            await asyncio.to_thread(recover_worker_requests)
+            while True:
+                for request in await asyncio.to_thread(claim_worker_requests):
+                    try:
+                        self._dispatch(request)
+                    except Exception as e:
+                        logger.error(f"Worker request {request.id} failed: {e}")
+                        finish_worker_request(request.id, error=str(e))
+                await asyncio.sleep(self.poll_interval)
+        finally:
+            automation.cancel()
+            try:
+                await automation
+            except asyncio.CancelledError:
+                pass
+            _leader_lock.release()
+
+
+# --- Dispatch (used by the API and MCP tools) ---
+
+
+def schedule_capture(filename: str) -> None:
+    """Give a newly captured note interactive priority.
+
+    Only applies with GARDENER_AUTO; otherwise notes wait for a manual
+    trigger as before.
+    """
+    if not GARDENER_AUTO:
+        return
+    if _run_locally():
+        get_scheduler().enqueue_capture(filename)
+    else:
+        submit_worker_request(REQUEST_CAPTURE, filename)
+
+
+def schedule_notes(filenames: list[str]) -> None:
+    """Queue a batch of imported notes as one background run.
+
+    Only applies with GARDENER_AUTO, like schedule_capture.
+    """
+    if not GARDENER_AUTO or not filenames:
+        return
+    if _run_locally():
+        get_scheduler().enqueue_notes(filenames)
+    else:
+        submit_worker_request(REQUEST_SWEEP)
+
+
+def request_sweep() -> None:
+    """Process the whole inbox; blocks until done when gardening locally."""
+    if _run_locally():
+        get_scheduler().request_sweep().result()
+    else:
+        submit_worker_request(REQUEST_SWEEP)
+
+
+def request_backlog() -> None:
+    """Submit/apply provider batch jobs; blocks until done when gardening locally."""
+    if _run_locally():
+        get_scheduler().submit_maintenance(_run_backlog).result()
+    else:
+        submit_worker_request(REQUEST_BACKLOG)
+
+
+async def reconcile() -> dict:
+    """Run reconcile at maintenance priority and return its result."""
+    if _run_locally():
+        return await asyncio.wrap_future(
+            get_scheduler().submit_maintenance(_run_reconcile)
+        )
+    request_id = submit_worker_request(REQUEST_RECONCILE)
+    return await wait_for_worker_request(request_id, GARDENER_WORKER_TIMEOUT)
@@ -0,0 +1,275 @@
+"""Local request queue between API processes and the gardener worker.
+
+Only one process gardens at a time: whichever holds the leader lock (an
+flock on ``STATE_DIR/worker.lock``). That is either the standalone worker
+(``python -m workers.gardener --serve``) or, in embedded mode, one of the
+API processes. Every other process hands work to the leader through the
+``worker_requests`` table in the state DB:
+
+- ``capture``: a note just saved to the inbox (interactive priority)
+- ``sweep``: process the whole inbox (/api/trigger-gardener)
+- ``reconcile``: run reconcile and return its result
+- ``backlog``: submit the inbox to the provider batch API and apply
+  finished batches (/api/trigger-backlog)
+
+Requests a leader claimed but did not finish before exiting are picked up
+again by the next leader.
+"""
+
+import asyncio
+import fcntl
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass
+from typing import Any
+
+import config
+from db import get_db_connection
+
+logger = logging.getLogger(__name__)
+
+_WORKER_DB_PATH: str | None = None
+
+REQUEST_CAPTURE = "capture"
+REQUEST_SWEEP = "sweep"
+REQUEST_RECONCILE = "reconcile"
+REQUEST_BACKLOG = "backlog"
+
+REQUEST_PENDING = "pending"
+REQUEST_RUNNING = "running"
+REQUEST_DONE = "done"
+REQUEST_FAILED = "failed"
+
+WORKER_QUEUE_SCHEMA = """
+-- Work handed from API processes to the gardener worker
+CREATE TABLE IF NOT EXISTS worker_requests (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,  -- 'capture', 'sweep', 'reconcile' or 'backlog'
+    filename TEXT,  -- Inbox note for captures
+    state TEXT NOT NULL DEFAULT 'pending',  -- pending/running/done/failed
+    result_json TEXT,
+    error TEXT,
+    created_at TEXT DEFAULT (datetime('now')),
+    updated_at TEXT DEFAULT (datetime('now'))
+);
+
+CREATE INDEX IF NOT EXISTS idx_worker_requests_state ON worker_requests(state);
+"""
+
+
+@dataclass
+class WorkerRequest:
+    """One queued request for the gardener worker."""
+
+    id: int
+    kind: str
+    filename: str | None = None
+
+
+class LeaderLock:
+    """Non-blocking exclusive flock marking the one gardening process."""
+
+    def __init__(self):
+        self._fd: int | None = None
+
+    @staticmethod
+    def path():
+        return config.STATE_DIR / "worker.lock"
+
+    @property
+    def held(self) -> bool:
+        return self._fd is not None
+
+    def acquire(self) -> bool:
+        """Take the lock if no other process holds it."""
+        if self._fd is not None:
+            return True
+        config.STATE_DIR.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path(), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._fd = fd
+        return True
+
+    def release(self) -> None:
+        if self._fd is None:
+            return
+        fcntl.flock(self._fd, fcntl.LOCK_UN)
+        os.close(self._fd)
+        self._fd = None
+
+
+def leader_running() -> bool:
+    """Whether some process currently holds the leader lock.
+
+    Probes with a non-blocking flock and leaves the recorded PID alone.
+    """
+    try:
+        fd = os.open(LeaderLock.path(), os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        return True
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return False
+    finally:
+        os.close(fd)
+
+
+def leader_pid() -> int | None:
+    """PID recorded by the current leader, if one is running."""
+    if not leader_running():
+        return None
+    try:
+        return int(LeaderLock.path().read_text().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def init_worker_queue_db() -> None:
+    """Initialize worker request tables."""
+    conn = get_db_connection()
+    try:
+        conn.executescript(WORKER_QUEUE_SCHEMA)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_worker_db() -> None:
+    global _WORKER_DB_PATH
+    current_path = str(config.STATE_DB)
+    if _WORKER_DB_PATH == current_path:
+        return
+    init_worker_queue_db()
+    _WORKER_DB_PATH = current_path
+
+
+def submit_worker_request(kind: str, filename: str | None = None) -> int:
+    """Queue a request for the leader; returns its id."""
+    _ensure_worker_db()
+    conn = get_db_connection()
+    try:
+        request_id = conn.execute(
+            "INSERT INTO worker_requests (kind, filename) VALUES (?, ?)",
+            (kind, filename),
+        ).lastrowid
+        conn.commit()
+    finally:
+        conn.close()
+    return request_id
+
+
+def claim_worker_requests() -> list[WorkerRequest]:
+    """Mark all pending requests running and return them, oldest first."""
+    _ensure_worker_db()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            """UPDATE worker_requests
+               SET state = 'running', updated_at = datetime('now')
+               WHERE state = 'pending'
+               RETURNING id, kind, filename"""
+        ).fetchall()
+        conn.commit()
+    finally:
+        conn.close()
+    return sorted(
+        (WorkerRequest(row["id"], row["kind"], row["filename"]) for row in rows),
+        key=lambda r: r.id,
+    )
+
+
+def recover_worker_requests() -> int:
+    """Requeue requests left running by a leader that exited."""
+    _ensure_worker_db()
+    conn = get_db_connection()
+    try:
+        count = conn.execute(
+            """UPDATE worker_requests
+               SET state = 'pending', updated_at = datetime('now')
+               WHERE state = 'running'"""
+        ).rowcount
+        conn.commit()
+    finally:
+        conn.close()
+    if count:
+        logger.info(f"Requeued {count} unfinished worker request(s)")
+    return count
+
+
+def finish_worker_request(
+    request_id: int, result: Any = None, error: str | None = None
+) -> None:
+    """Record a request's result, or its error."""
+    _ensure_worker_db()
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """UPDATE worker_requests
+               SET state = ?, result_json = ?, error = ?, updated_at = datetime('now')
+               WHERE id = ?""",
+            (
+                REQUEST_FAILED if error else REQUEST_DONE,
+                json.dumps(result) if result is not None else None,
+                error,
+                request_id,
+            ),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+async def wait_for_worker_request(
+    request_id: int, timeout: float, poll_interval: float = 0.2
+) -> Any:
+    """Wait for the leader to finish a request and return its result.
+
+    Raises:
+        RuntimeError: If the worker reported an error
+        TimeoutError: If the request is not finished within ``timeout``
+    """
+    _ensure_worker_db()
+    deadline = time.monotonic() + timeout
+    while True:
+        conn = get_db_connection()
+        try:
+            row = conn.execute(
+                "SELECT state, result_json, error FROM worker_requests WHERE id = ?",
+                (request_id,),
+            ).fetchone()
+        finally:
+            conn.close()
+        if row["state"] == REQUEST_DONE:
+            return json.loads(row["result_json"]) if row["result_json"] else None
+        if row["state"] == REQUEST_FAILED:
+            raise RuntimeError(row["error"])
+        if time.monotonic() >= deadline:
+            raise TimeoutError(
+                f"Gardener worker did not finish request {request_id} in {timeout:.0f}s"
+            )
+        await asyncio.sleep(poll_interval)
+
+
+def get_worker_request_counts() -> dict[str, int]:
+    """Number of worker requests in each state."""
+    _ensure_worker_db()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT state, COUNT(*) AS count FROM worker_requests GROUP BY state"
+        ).fetchall()
+    finally:
+        conn.close()
+    return {row["state"]: row["count"] for row in rows}
@@ -0,0 +1,424 @@
+"""Offline backlog mode: classify inbox notes through provider batch APIs.
+
+Large imports are submitted to the provider's asynchronous batch endpoint
+(OpenAI Batch / Anthropic Message Batches) instead of one interactive call
+per note. Submitted batches and their notes are tracked in the state
+database, so a restarted process resumes polling where it left off. Once a
+batch ends, each result is applied through the same write/commit/archive
+path as the interactive gardener.
+
+Each submitted note's job in ``gardener_jobs`` (see job_queue) is claimed
+before the batch goes out and finished when its result is applied. Notes
+that belong to a pending batch are skipped by process_inbox(). Notes whose
+result fails or cannot be parsed stay in the inbox for the next
+interactive run, with the failure counted as a job attempt.
+
+Usage:
+    python -m workers.backlog             # submit, then wait for results
+    python -m workers.backlog --no-wait   # submit/apply once and exit
+"""
+
+import argparse
+import json
+import logging
+import time
+from uuid import uuid4
+
+import config
+from backends import GardenerBackend, get_shared_backend
+from backends.base import BATCH_JOB_ENDED, excerpt_note, parse_gardener_action
+from classification_cache import store_classification
+from config import (
+    GARDENER_BACKLOG_BATCH_SIZE,
+    GARDENER_BACKLOG_POLL_INTERVAL,
+    GARDENER_NOTE_TOKENS,
+    INBOX_DIR,
+)
+from context_loader import load_classification_context
+from db import get_db_connection
+from job_queue import (
+    JOB_QUEUED,
+    mark_classified,
+    mark_classifying,
+    record_apply_failure,
+    record_job_failure,
+    requeue_job,
+    sync_inbox_jobs,
+)
+from workers.gardener import (
+    _PROCESSING_LOCK,
+    AGENTS_FILE,
+    GARDENER_FILE,
+    _cache_model,
+    _error_result,
+    _learn,
+    _restore_content,
+    _reused_action,
+    apply_inbox_action,
+)
+
+logger = logging.getLogger(__name__)
+
+_BACKLOG_DB_PATH: str | None = None
+
+BACKLOG_SCHEMA = """
+-- Provider batch jobs submitted by the backlog worker
+CREATE TABLE IF NOT EXISTS backlog_batches (
+    id TEXT PRIMARY KEY,  -- Provider batch id
+    backend TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',  -- 'pending', 'applied'
+    note_count INTEGER NOT NULL,
+    submitted_at TEXT DEFAULT (datetime('now')),
+    completed_at TEXT
+);
+
+-- Inbox notes included in a batch job
+CREATE TABLE IF NOT EXISTS backlog_items (
+    custom_id TEXT PRIMARY KEY,
+    batch_id TEXT NOT NULL REFERENCES backlog_batches(id),
+    filename TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'submitted',  -- 'submitted', 'applied', 'failed', 'skipped'
+    error TEXT
+);
+
+CREATE INDEX IF NOT EXISTS idx_backlog_items_batch ON backlog_items(batch_id);
+CREATE INDEX IF NOT EXISTS idx_backlog_items_status ON backlog_items(status);
+"""
+
+# Columns added after the initial schema: (table, name, SQL type)
+BACKLOG_MIGRATIONS = [
+    ("backlog_batches", "context_version", "TEXT"),  # Rules the batch saw
+    ("backlog_items", "job_id", "INTEGER"),  # gardener_jobs row claimed
+]
+
+
+def init_backlog_db() -> None:
+    """Initialize backlog tracking tables."""
+    conn = get_db_connection()
+    try:
+        conn.executescript(BACKLOG_SCHEMA)
+        for table, column, column_type in BACKLOG_MIGRATIONS:
+            existing = {
+                row["name"] for row in conn.execute(f"PRAGMA table_info({table})")
+            }
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _ensure_backlog_db() -> None:
+    global _BACKLOG_DB_PATH
+    current_path = str(config.STATE_DB)
+    if _BACKLOG_DB_PATH == current_path:
+        return
+    init_backlog_db()
+    _BACKLOG_DB_PATH = current_path
+
+
+def get_pending_backlog_files() -> set[str]:
+    """Return inbox filenames that are waiting on a submitted batch."""
+    _ensure_backlog_db()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT filename FROM backlog_items WHERE status = 'submitted'"
+        ).fetchall()
+        return {row["filename"] for row in rows}
+    finally:
+        conn.close()
+
+
+def get_backlog_status() -> dict:
+    """Summarize pending batches and item outcomes."""
+    _ensure_backlog_db()
+    conn = get_db_connection()
+    try:
+        pending = conn.execute(
+            "SELECT COUNT(*) FROM backlog_batches WHERE status = 'pending'"
+        ).fetchone()[0]
+        items = conn.execute(
+            "SELECT status, COUNT(*) AS count FROM backlog_items GROUP BY status"
+        ).fetchall()
+        return {
+            "pending_batches": pending,
+            "items": {row["status"]: row["count"] for row in items},
+        }
+    finally:
+        conn.close()
+
+
+def submit_backlog(
+    backend: GardenerBackend, batch_size: int | None = None
+) -> tuple[list[str], list[dict]]:
+    """Submit every inbox note not already in a pending batch.
+
+    Notes are claimed in gardener_jobs first; ones the interactive gardener
+    has started, classified or given up on are left to it. A note the
+    classification cache or a written near-duplicate can answer is applied
+    right away instead of being submitted. Like interactive calls, batch
+    requests carry an excerpt of long notes.
+
+    Each chunk is recorded right after the provider accepts it. If the
+    process dies in between, that chunk's jobs go back to ``queued`` and
+    the notes are simply submitted again on the next run.
+
+    Returns:
+        (provider batch ids created, results of notes applied without a batch)
+    """
+    batch_size = batch_size or GARDENER_BACKLOG_BATCH_SIZE
+    if not INBOX_DIR.exists():
+        return [], []
+
+    context = load_classification_context(AGENTS_FILE, GARDENER_FILE)
+    model = _cache_model(backend)
+    batch_ids = []
+    results = []
+    with _PROCESSING_LOCK:
+        pending = get_pending_backlog_files()
+        inbox_files = [
+            f for f in sorted(INBOX_DIR.glob("*.md")) if f.name not in pending
+        ]
+        if not inbox_files:
+            return [], []
+
+        claimed = []
+        for inbox_file, job in zip(
+            inbox_files, sync_inbox_jobs(INBOX_DIR, inbox_files)
+        ):
+            if job.state != JOB_QUEUED:
+                continue
+            note_content = inbox_file.read_text()
+            action = _reused_action(
+                note_content, inbox_file.name, context.version, model
+            )
+            if action is None:
+                mark_classifying(job.id)
+                claimed.append((inbox_file, job, note_content))
+                continue
+            mark_classified(job.id, action)
+            try:
+                results.append(apply_inbox_action(inbox_file, action, job.id))
+            except Exception as e:
+                record_apply_failure(job.id, str(e))
+                results.append(_error_result(inbox_file, e))
+
+        for start in range(0, len(claimed), batch_size):
+            chunk = claimed[start : start + batch_size]
+            notes = [
+                (
+                    f"note-{uuid4().hex[:16]}",
+                    excerpt_note(note_content, GARDENER_NOTE_TOKENS),
+                    inbox_file.name,
+                )
+                for inbox_file, _, note_content in chunk
+            ]
+            try:
+                batch_id = backend.submit_batch_job(notes, context.text)
+            except Exception as e:
+                for _, job, _ in claimed[start:]:
+                    requeue_job(job.id, str(e))
+                raise
+            conn = get_db_connection()
+            try:
+                conn.execute(
+                    """INSERT INTO backlog_batches
+                       (id, backend, note_count, context_version)
+                       VALUES (?, ?, ?, ?)""",
+                    (batch_id, backend.name, len(notes), context.version),
+                )
+                conn.executemany(
+                    """INSERT INTO backlog_items (custom_id, batch_id, filename, job_id)
+                       VALUES (?, ?, ?, ?)""",
+                    [
+                        (custom_id, batch_id, filename, job.id)
+                        for (custom_id, _, filename), (_, job, _) in zip(notes, chunk)
+                    ],
+                )
+                conn.commit()
+            finally:
+                conn.close()
+            logger.info(f"Submitted backlog batch {batch_id} ({len(notes)} notes)")
+            batch_ids.append(batch_id)
+    return batch_ids, results
+
+
+def _set_item_status(custom_id: str, status: str, error: str | None = None) -> None:
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            "UPDATE backlog_items SET status = ?, error = ? WHERE custom_id = ?",
+            (status, error, custom_id),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def _apply_batch(backend: GardenerBackend, batch_id: str) -> list[dict]:
+    """Apply the results of an ended batch in inbox order.
+
+    Results go through the same steps as an interactive classification:
+    the full note replaces the excerpt the model saw, and the decision is
+    learned, cached and stored with the note's job before it is written.
+    """
+    outcomes = {r.custom_id: r for r in backend.get_batch_job_results(batch_id)}
+    model = _cache_model(backend)
+
+    conn = get_db_connection()
+    try:
+        context_version = conn.execute(
+            "SELECT context_version FROM backlog_batches WHERE id = ?", (batch_id,)
+        ).fetchone()["context_version"]
+        items = conn.execute(
+            """SELECT custom_id, filename, job_id FROM backlog_items
+               WHERE batch_id = ? AND status = 'submitted'
+               ORDER BY filename""",
+            (batch_id,),
+        ).fetchall()
+    finally:
+        conn.close()
+
+    results = []
+    with _PROCESSING_LOCK:
+        for item in items:
+            inbox_file = INBOX_DIR / item["filename"]
+            job_id = item["job_id"]
+            outcome = outcomes.get(item["custom_id"])
+            if not inbox_file.exists():
+                _set_item_status(item["custom_id"], "skipped", "no longer in inbox")
+                continue
+            try:
+                if outcome is None or outcome.text is None:
+                    raise RuntimeError(
+                        outcome.error if outcome else "missing from batch results"
+                    )
+                note_content = inbox_file.read_text()
+                action = _restore_content(
+                    parse_gardener_action(outcome.text),
+                    note_content,
+                    excerpt_note(note_content, GARDENER_NOTE_TOKENS),
+                )
+            except Exception as e:
+                if job_id is not None:
+                    record_job_failure(job_id, str(e))
+                _set_item_status(item["custom_id"], "failed", str(e))
+                results.append(_error_result(inbox_file, e))
+                continue
+
+            _learn(note_content, action)
+            if model and context_version:
+                store_classification(note_content, context_version, model, action)
+            if job_id is not None:
+                mark_classified(job_id, action)
+            try:
+                results.append(apply_inbox_action(inbox_file, action, job_id))
+                _set_item_status(item["custom_id"], "applied")
+            except Exception as e:
+                if job_id is not None:
+                    record_apply_failure(job_id, str(e))
+                _set_item_status(item["custom_id"], "failed", str(e))
+                results.append(_error_result(inbox_file, e))
+
+    conn = get_db_connection()
+    try:
+        conn.execute(
+            """UPDATE backlog_batches
+               SET status = 'applied', completed_at = datetime('now')
+               WHERE id = ?""",
+            (batch_id,),
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return results
+
+
+def poll_backlog(backend: GardenerBackend) -> tuple[list[dict], int]:
+    """Apply every pending batch that has ended.
+
+    Returns:
+        (results of applied notes, number of batches still pending)
+    """
+    _ensure_backlog_db()
+    conn = get_db_connection()
+    try:
+        rows = conn.execute(
+            "SELECT id, backend FROM backlog_batches WHERE status = 'pending' "
+            "ORDER BY submitted_at"
+        ).fetchall()
+    finally:
+        conn.close()
+
+    results = []
+    still_pending = 0
+    for row in rows:
+        if row["backend"] != backend.name:
+            logger.warning(
+                f"Backlog batch {row['id']} was submitted via {row['backend']}; "
+                f"skipping while running with {backend.name}"
+            )
+            still_pending += 1
+            continue
+        if backend.get_batch_job_status(row["id"]) != BATCH_JOB_ENDED:
+            still_pending += 1
+            continue
+        logger.info(f"Backlog batch {row['id']} ended; applying results")
+        results.extend(_apply_batch(backend, row["id"]))
+    return results, still_pending
+
+
+def run_backlog(
+    backend: GardenerBackend | None = None,
+    wait: bool = True,
+    poll_interval: float | None = None,
+) -> list[dict]:
+    """Submit the inbox as batch jobs and apply finished results.
+
+    Pending batches from earlier runs are resumed first.
+
+    Args:
+        backend: Optional backend instance. If not provided, uses the pooled
+            process-wide backend.
+        wait: Keep polling until every pending batch has been applied
+        poll_interval: Seconds between polls (default: GARDENER_BACKLOG_POLL_INTERVAL)
+    """
+    if backend is None:
+        backend = get_shared_backend()
+    if not backend.has_batch_api:
+        logger.warning(f"{backend.name} backend has no batch API; backlog skipped")
+        return []
+    poll_interval = (
+        GARDENER_BACKLOG_POLL_INTERVAL if poll_interval is None else poll_interval
+    )
+
+    _ensure_backlog_db()
+    results, _ = poll_backlog(backend)
+    _, applied = submit_backlog(backend)
+    results.extend(applied)
+
+    while True:
+        applied, pending = poll_backlog(backend)
+        results.extend(applied)
+        if not wait or pending == 0:
+            return results
+        logger.info(
+            f"{pending} backlog batch(es) pending; next poll in {poll_interval}s"
+        )
+        time.sleep(poll_interval)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--no-wait",
+        action="store_true",
+        help="Submit and apply finished batches once, without waiting",
+    )
+    parser.add_argument("--poll-interval", type=float, default=None)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = run_backlog(wait=not args.no_wait, poll_interval=args.poll_interval)
+    print(json.dumps({"results": results, "status": get_backlog_status()}, indent=2))
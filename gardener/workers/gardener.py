@@ -1,22 +1,75 @@
 """The Gardener - AI-powered inbox processor for Athena PKMS."""
 
+import argparse
+import asyncio
 import json
 import logging
+import signal
 import subprocess
 import threading
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
-from backends import GardenerAction, GardenerBackend, get_backend
+from api_usage import RateLimitError, get_call_headroom
+from archive import archive_shard
+from backends import (
+    CircuitOpenError,
+    GardenerAction,
+    GardenerBackend,
+    get_shared_backend,
+)
+from backends.base import estimate_tokens, excerpt_note
+from classification_cache import (
+    cache_enabled,
+    is_recent_duplicate,
+    lookup_classification,
+    note_content_hash,
+    record_applied_note,
+    store_classification,
+)
 from config import (
     AGENTS_FILE,
     ARCHIVE_DIR,
     ATLAS_DIR,
     DATA_DIR,
+    GARDENER_BATCH_SIZE,
+    GARDENER_BATCH_TOKENS,
+    GARDENER_CONCURRENCY,
     GARDENER_FILE,
+    GARDENER_NEAR_DUP_MODE,
+    GARDENER_NOTE_TOKENS,
+    GARDENER_PRECLASSIFY_MODE,
     INBOX_DIR,
     TASKS_FILE,
 )
+from context_loader import load_classification_context
+from file_io import append_text, path_lock, write_text_atomic
+from job_queue import (
+    JOB_APPLIED,
+    JOB_CLASSIFIED,
+    JOB_FAILED,
+    Job,
+    mark_applied,
+    mark_archived,
+    mark_classified,
+    mark_classifying,
+    record_apply_failure,
+    record_job_failure,
+    requeue_job,
+    sync_inbox_jobs,
+)
+from near_duplicates import (
+    SOURCE_APPLIED,
+    NearDuplicate,
+    count_near_duplicate,
+    find_near_duplicate,
+    forget_note,
+    index_note,
+)
+from preclassifier import confident_prediction, learn, template_action
+from segments import is_segment, logical_note_path, roll_over, segments_dir
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -25,37 +78,189 @@ _PROCESSING_LOCK = threading.Lock()
 
 
 def archive_inbox_file(inbox_file: Path) -> Path:
-    """Move an inbox file into the archive directory and return its new path."""
-    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
-    archive_path = ARCHIVE_DIR / inbox_file.name
+    """Move an inbox file into its archive shard and return its new path."""
+    shard = ARCHIVE_DIR / archive_shard(inbox_file.name)
+    shard.mkdir(parents=True, exist_ok=True)
+    archive_path = shard / inbox_file.name
     if archive_path.exists():
         timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
         archive_path = (
-            ARCHIVE_DIR / f"{inbox_file.stem}--archived-{timestamp}{inbox_file.suffix}"
+            shard / f"{inbox_file.stem}--archived-{timestamp}{inbox_file.suffix}"
         )
     inbox_file.replace(archive_path)
     return archive_path
 
 
 def read_context_files() -> str:
-    """Read AGENTS.md and GARDENER.md for context."""
-    context_parts = []
+    """Return AGENTS.md and GARDENER.md content for context.
 
-    if AGENTS_FILE.exists():
-        context_parts.append(f"# System Context\n{AGENTS_FILE.read_text()}")
+    The files are only re-read when they change on disk.
+    """
+    return load_classification_context(AGENTS_FILE, GARDENER_FILE).text
 
-    if GARDENER_FILE.exists():
-        context_parts.append(f"# Classification Rules\n{GARDENER_FILE.read_text()}")
 
-    return "\n\n---\n\n".join(context_parts)
+def _cache_model(backend: GardenerBackend) -> str | None:
+    """Model name for classification cache keys (None disables the cache)."""
+    model = getattr(getattr(backend, "config", None), "model_thinking", None)
+    return model if isinstance(model, str) else None
 
 
 def classify_note(
     backend: GardenerBackend, note_content: str, filename: str
 ) -> GardenerAction:
-    """Send note to AI backend for classification."""
-    context = read_context_files()
-    return backend.classify(note_content, filename, context)
+    """Send note to AI backend for classification.
+
+    Decisions are cached by note content, context version and model, so a
+    repeated capture reuses the earlier action without an AI call.
+    """
+    context = load_classification_context(AGENTS_FILE, GARDENER_FILE)
+    model = _cache_model(backend)
+    action = _reused_action(note_content, filename, context.version, model)
+    if action is not None:
+        return action
+
+    action = _preclassified(backend, note_content, filename, context.text)
+    if action is None:
+        prompt_note = _prompt_note(note_content, filename, context.text)
+        action = _restore_content(
+            backend.classify(prompt_note, filename, context.text),
+            note_content,
+            prompt_note,
+        )
+        _learn(note_content, action)
+    if model:
+        store_classification(note_content, context.version, model, action)
+    return action
+
+
+def _reused_action(
+    note_content: str, filename: str, context_version: str, model: str | None
+) -> GardenerAction | None:
+    """A decision that needs no AI call: cached, or a near-duplicate's."""
+    if model:
+        cached = lookup_classification(note_content, context_version, model)
+        if cached is not None:
+            logger.info(f"Reusing cached classification for {filename}")
+            return _replayable(cached)
+    action = _near_duplicate_action(note_content, filename)
+    if action is not None and model:
+        store_classification(note_content, context_version, model, action)
+    return action
+
+
+def _written_near_duplicate(note_content: str, filename: str) -> NearDuplicate | None:
+    """A recently written note this one nearly duplicates, if any."""
+    try:
+        return find_near_duplicate(note_content, (SOURCE_APPLIED,), exclude=filename)
+    except Exception as e:
+        logger.warning(f"Near-duplicate lookup failed for {filename}: {e}")
+        return None
+
+
+def _near_duplicate_action(note_content: str, filename: str) -> GardenerAction | None:
+    """Reuse the decision made for a recently written near-duplicate.
+
+    Only with GARDENER_NEAR_DUP=reuse or skip. Returns None when the note
+    needs classifying. In skip mode the decision only spares the AI call;
+    apply_inbox_action archives the note and counts it as skipped.
+    """
+    if GARDENER_NEAR_DUP_MODE not in ("reuse", "skip"):
+        return None
+    match = _written_near_duplicate(note_content, filename)
+    if match is None or match.action is None:
+        return None
+    logger.info(
+        f"Reusing the classification of near-duplicate {match.key} for {filename} "
+        f"(similarity {match.similarity:.2f})"
+    )
+    if GARDENER_NEAR_DUP_MODE == "reuse":
+        count_near_duplicate("reused")
+    if match.action.action == "task":
+        return match.action
+    return _replayable(match.action.model_copy(update={"content": note_content}))
+
+
+def _replayable(action: GardenerAction) -> GardenerAction:
+    """Turn a reused "create" into an append once its page exists.
+
+    Replaying the create would replace the page, along with everything
+    appended to it since, with this note.
+    """
+    if action.action != "create":
+        return action
+    try:
+        exists = (ATLAS_DIR / action.path.strip()).is_file()
+    except (OSError, ValueError):
+        return action
+    if not exists:
+        return action
+    return action.model_copy(update={"action": "append"})
+
+
+def _preclassified(
+    backend: GardenerBackend, note_content: str, filename: str, context: str
+) -> GardenerAction | None:
+    """Handle a note the local pre-classifier is confident about.
+
+    Returns None when the note needs the thinking model.
+    """
+    prediction = confident_prediction(note_content)
+    if prediction is None:
+        return None
+    logger.info(
+        f"Pre-classified {filename} as {prediction.label} ({prediction.confidence:.2f})"
+    )
+    if GARDENER_PRECLASSIFY_MODE == "template":
+        return template_action(note_content, prediction)
+    prompt_note = _prompt_note(note_content, filename, context)
+    action = backend.classify(
+        prompt_note,
+        filename,
+        context,
+        fast=True,
+        suggestion=prediction.suggestion(),
+    )
+    return _restore_content(action, note_content, prompt_note)
+
+
+def _prompt_note(note_content: str, filename: str, context: str) -> str:
+    """Return the note text to classify, within GARDENER_NOTE_TOKENS.
+
+    Also logs the estimated prompt size of the call.
+    """
+    prompt_note = excerpt_note(note_content, GARDENER_NOTE_TOKENS)
+    if prompt_note is not note_content:
+        logger.info(
+            f"{filename} is ~{estimate_tokens(note_content)} tokens; "
+            "classifying an excerpt"
+        )
+    context_tokens = estimate_tokens(context)
+    note_tokens = estimate_tokens(prompt_note)
+    logger.info(
+        f"Classify prompt for {filename}: ~{context_tokens + note_tokens} tokens "
+        f"(context {context_tokens}, note {note_tokens})"
+    )
+    return prompt_note
+
+
+def _restore_content(
+    action: GardenerAction, note_content: str, prompt_note: str
+) -> GardenerAction:
+    """Write the full note when the model only saw an excerpt of it.
+
+    Task actions keep the model's task text.
+    """
+    if prompt_note is note_content or action.action == "task":
+        return action
+    return action.model_copy(update={"content": note_content})
+
+
+def _learn(note_content: str, action: GardenerAction) -> None:
+    """Train the pre-classifier on a thinking-model decision."""
+    try:
+        learn(note_content, action)
+    except Exception as e:
+        logger.warning(f"Pre-classifier update failed: {e}")
 
 
 def execute_action(action: GardenerAction) -> Path:
@@ -63,12 +268,11 @@ def execute_action(action: GardenerAction) -> Path:
 
     def append_to_tasks(content: str, reasoning: str) -> Path:
         TASKS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(TASKS_FILE, "a") as f:
-            f.write(
-                f"\n\n## Unsorted Note {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
-            )
-            f.write(content)
-            f.write(f"\n\n> Gardener Query: {reasoning}\n")
+        append_text(
+            TASKS_FILE,
+            f"\n\n## Unsorted Note {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
+            f"{content}\n\n> Gardener Query: {reasoning}\n",
+        )
         return TASKS_FILE
 
     def validate_action_path(action_path: str) -> Path:
@@ -102,16 +306,21 @@ def execute_action(action: GardenerAction) -> Path:
             action.content, f"Invalid path '{action.path}': {action.reasoning}"
         )
 
+    if action.action == "append" and is_segment(target_path):
+        # Earlier segments are closed; new entries go to the active note
+        target_path = logical_note_path(target_path)
+
     target_path.parent.mkdir(parents=True, exist_ok=True)
 
     if action.action == "create":
-        target_path.write_text(action.content)
+        write_text_atomic(target_path, action.content)
     elif action.action == "append":
-        existing = target_path.read_text() if target_path.exists() else ""
         timestamp_header = (
             f"\n\n---\n## Update {datetime.now().strftime('%Y-%m-%d %H:%M')}\n"
         )
-        target_path.write_text(existing + timestamp_header + action.content)
+        with path_lock(target_path):
+            roll_over(target_path)
+            append_text(target_path, timestamp_header + action.content)
 
     return target_path
 
@@ -201,7 +410,7 @@ def git_commit(file_paths: Path | list[Path], message: str) -> bool:
                     record_processed_commit(head, branch, message)
                 # Update file state tracking
                 for path in paths:
-                    if path.exists():
+                    if path.is_file():
                         update_file_state(path)
                         # Record provenance
                         record_provenance(path, PROVENANCE_GARDENER, head)
@@ -214,11 +423,256 @@ def git_commit(file_paths: Path | list[Path], message: str) -> bool:
         return False
 
 
-def process_inbox(backend: GardenerBackend | None = None) -> list[dict]:
-    """Process all files in the inbox.
+def classify_inbox_file(backend: GardenerBackend, inbox_file: Path) -> GardenerAction:
+    """Read an inbox note and classify it (the parallel pipeline stage)."""
+    note_content = inbox_file.read_text()
+    return classify_note(backend, note_content, inbox_file.name)
+
+
+def classify_inbox_batch(
+    backend: GardenerBackend, inbox_files: list[Path]
+) -> list[GardenerAction | Exception]:
+    """Classify a group of inbox notes, sharing requests where they fit.
+
+    Cached decisions are reused; only the remaining notes are sent to the
+    backend. Returns one GardenerAction or exception per file, in order.
+    """
+    if len(inbox_files) == 1:
+        try:
+            return [classify_inbox_file(backend, inbox_files[0])]
+        except Exception as e:
+            return [e]
+
+    context = load_classification_context(AGENTS_FILE, GARDENER_FILE)
+    model = _cache_model(backend)
+    outcomes: list[GardenerAction | Exception | None] = [None] * len(inbox_files)
+    positions: list[int] = []
+    notes: list[tuple[str, str]] = []
+    for i, inbox_file in enumerate(inbox_files):
+        try:
+            note_content = inbox_file.read_text()
+        except OSError as e:
+            outcomes[i] = e
+            continue
+        try:
+            action = _reused_action(
+                note_content, inbox_file.name, context.version, model
+            )
+            if action is not None:
+                outcomes[i] = action
+                continue
+            action = _preclassified(
+                backend, note_content, inbox_file.name, context.text
+            )
+        except Exception as e:
+            outcomes[i] = e
+            continue
+        if action is not None:
+            outcomes[i] = action
+            if model:
+                store_classification(note_content, context.version, model, action)
+        else:
+            positions.append(i)
+            notes.append((note_content, inbox_file.name))
+
+    if notes:
+        prompt_notes = [
+            (excerpt_note(note_content, GARDENER_NOTE_TOKENS), filename)
+            for note_content, filename in notes
+        ]
+        logger.info(
+            f"Classifying {len(notes)} notes in batches: context "
+            f"{context.token_estimate} tokens per request, notes "
+            f"{sum(estimate_tokens(note) for note, _ in prompt_notes)} tokens"
+        )
+        fresh = backend.classify_batch(
+            prompt_notes,
+            context.text,
+            token_budget=GARDENER_BATCH_TOKENS,
+            max_batch_size=len(notes),
+        )
+        for i, (note_content, _), (prompt_note, _), outcome in zip(
+            positions, notes, prompt_notes, fresh
+        ):
+            if isinstance(outcome, GardenerAction):
+                outcome = _restore_content(outcome, note_content, prompt_note)
+                _learn(note_content, outcome)
+                if model:
+                    store_classification(note_content, context.version, model, outcome)
+            outcomes[i] = outcome
+    return outcomes
+
+
+def _archive_processed(inbox_file: Path) -> None:
+    """Archive a processed note, update state tracking and commit the move."""
+    archive_path = archive_inbox_file(inbox_file)
+    try:
+        from file_state import remove_file_state, update_file_state
+
+        remove_file_state(inbox_file)
+        update_file_state(archive_path)
+    except (ImportError, OSError) as e:
+        logger.debug(f"State tracking unavailable for {inbox_file}: {e}")
+    except Exception as e:
+        logger.warning(f"State tracking failed for {inbox_file}: {e}")
+
+    # Commit archive move (add + delete)
+    git_commit(
+        [archive_path, inbox_file],
+        f"Gardener: Archived {inbox_file.name} from inbox",
+    )
+
+
+def apply_inbox_action(
+    inbox_file: Path, action: GardenerAction, job_id: int | None = None
+) -> dict:
+    """Write, commit and archive a classified note (the serialized stage).
+
+    In GARDENER_DEDUP=skip mode, a note whose content was already written
+    within the dedup window is archived without writing it again. With a
+    ``job_id``, the job is marked applied once the write lands and archived
+    at the end, so a crash in between never writes the note twice.
+    """
+    note_content = inbox_file.read_text()
+    if is_recent_duplicate(note_content):
+        return _archive_duplicate(inbox_file, job_id, "duplicate")
+
+    near = _written_near_duplicate(note_content, inbox_file.name)
+    if near is not None:
+        logger.info(
+            f"{inbox_file.name} is a near-duplicate of {near.key} "
+            f"(similarity {near.similarity:.2f})"
+        )
+        if GARDENER_NEAR_DUP_MODE == "skip":
+            count_near_duplicate("skipped")
+            return _archive_duplicate(inbox_file, job_id, "near_duplicate")
+
+    logger.info(f"Action: {action.action} -> {action.path}")
+    logger.info(f"Reasoning: {action.reasoning}")
+
+    target_path = execute_action(action)
+    if job_id is not None:
+        mark_applied(job_id, target_path)
+    record_applied_note(note_content, inbox_file.name)
+    index_note(inbox_file.name, note_content, SOURCE_APPLIED, action)
+
+    # Git commit
+    git_commit(_commit_paths(target_path), f"Gardener: Processed {inbox_file.name}")
+
+    # Archive original and update state tracking
+    _archive_processed(inbox_file)
+    if job_id is not None:
+        mark_archived(job_id)
+
+    return {
+        "file": inbox_file.name,
+        "action": action.action,
+        "path": str(action.path),
+        "success": True,
+    }
+
+
+def _archive_duplicate(inbox_file: Path, job_id: int | None, kind: str) -> dict:
+    """Archive a note without writing it, as a duplicate of a written one."""
+    forget_note(inbox_file.name)
+    _archive_processed(inbox_file)
+    if job_id is not None:
+        mark_archived(job_id)
+    return {
+        "file": inbox_file.name,
+        "action": kind,
+        "path": None,
+        "success": True,
+    }
+
+
+def _commit_paths(target_path: Path) -> list[Path]:
+    """The written note plus its segments, in case the write rolled it over."""
+    directory = segments_dir(target_path)
+    return [target_path, directory] if directory.is_dir() else [target_path]
+
+
+def _finish_applied_job(inbox_file: Path, job: Job) -> dict:
+    """Commit and archive a note whose action was written before a crash."""
+    logger.info(f"Resuming {inbox_file.name}: already applied, archiving")
+    if job.target_path:
+        git_commit(
+            _commit_paths(Path(job.target_path)),
+            f"Gardener: Processed {inbox_file.name}",
+        )
+    _archive_processed(inbox_file)
+    mark_archived(job.id)
+    return {
+        "file": inbox_file.name,
+        "action": job.action.action if job.action else "resumed",
+        "path": job.action.path if job.action else job.target_path,
+        "success": True,
+    }
+
+
+def _error_result(inbox_file: Path, error: Exception) -> dict:
+    logger.error(f"Failed to process {inbox_file.name}: {error}")
+    return {
+        "file": inbox_file.name,
+        "action": "error",
+        "error": str(error),
+        "success": False,
+    }
+
+
+def _content_key(inbox_file: Path) -> str | None:
+    """Cache key of a note's content, or None if it cannot be shared."""
+    if not cache_enabled():
+        return None
+    try:
+        return note_content_hash(inbox_file.read_text())
+    except OSError:
+        return None
+
+
+def _pipeline_width(concurrency: int, pending: int) -> int:
+    """Number of classification workers, bounded by the rate limiter."""
+    width = min(concurrency, pending)
+    try:
+        headroom = get_call_headroom()
+    except Exception as e:
+        logger.debug(f"Could not read API call headroom: {e}")
+        headroom = None
+    if headroom is not None:
+        width = min(width, headroom)
+    return max(width, 1)
+
+
+def process_inbox(
+    backend: GardenerBackend | None = None,
+    concurrency: int | None = None,
+    batch_size: int | None = None,
+    files: list[Path] | None = None,
+) -> list[dict]:
+    """Process all files in the inbox, or just ``files``.
+
+    Classification runs on up to ``concurrency`` worker threads while file
+    writes, git commits and archiving happen one note at a time on the calling
+    thread. With a batch size above 1, each worker classifies a group of
+    short notes per request. Results are applied in inbox (filename) order, so
+    notes that end up targeting the same atlas path are written in the order
+    they were captured. Notes with identical content are classified once.
+
+    Each note's progress is persisted in the job queue (see job_queue). Notes
+    classified or applied before a crash are finished first without another
+    AI call; notes that keep failing are skipped after
+    GARDENER_JOB_MAX_ATTEMPTS until they are edited.
 
     Args:
-        backend: Optional backend instance. If not provided, creates one from env.
+        backend: Optional backend instance. If not provided, uses the pooled
+            process-wide backend.
+        concurrency: Parallel classifications (default: GARDENER_CONCURRENCY),
+            further limited by the remaining API call quota.
+        batch_size: Notes per classification group (default:
+            GARDENER_BATCH_SIZE); groups are split further by token budget.
+        files: Only process these inbox notes (used by the scheduler to
+            work through the inbox in priority order); missing ones are
+            ignored.
     """
     if _PROCESSING_LOCK.locked():
         logger.info("Gardener processing already in progress; waiting for lock")
@@ -228,78 +682,201 @@ def process_inbox(backend: GardenerBackend | None = None) -> list[dict]:
             logger.info("Inbox directory does not exist")
             return []
 
+        inbox_files = sorted(INBOX_DIR.glob("*.md"))
+        if files is not None:
+            wanted = {f.name for f in files}
+            inbox_files = [f for f in inbox_files if f.name in wanted]
+        # Notes submitted to a provider batch job are applied by the backlog
+        # worker when the job ends
+        try:
+            from workers.backlog import get_pending_backlog_files
+
+            pending = get_pending_backlog_files()
+        except Exception as e:
+            logger.warning(f"Could not read backlog state: {e}")
+            pending = set()
+        inbox_files = [f for f in inbox_files if f.name not in pending]
+        if not inbox_files:
+            return []
+
         # Ensure git repo exists for version control
         ensure_git_repo()
 
         results = []
-        own_backend = backend is None
-
-        if own_backend:
-            backend = get_backend()
-
-        try:
-            for inbox_file in INBOX_DIR.glob("*.md"):
-                logger.info(f"Processing: {inbox_file.name}")
-
-                try:
-                    note_content = inbox_file.read_text()
-                    action = classify_note(backend, note_content, inbox_file.name)
-
-                    logger.info(f"Action: {action.action} -> {action.path}")
-                    logger.info(f"Reasoning: {action.reasoning}")
-
-                    target_path = execute_action(action)
-
-                    # Git commit
-                    git_commit(target_path, f"Gardener: Processed {inbox_file.name}")
-
-                    # Archive original and update state tracking
-                    archive_path = archive_inbox_file(inbox_file)
+        pending_jobs: list[tuple[Path, Job]] = []
+        for inbox_file, job in zip(
+            inbox_files, sync_inbox_jobs(INBOX_DIR, inbox_files)
+        ):
+            try:
+                if job.state == JOB_APPLIED:
+                    results.append(_finish_applied_job(inbox_file, job))
+                elif job.state == JOB_CLASSIFIED and job.action is not None:
+                    logger.info(
+                        f"Resuming {inbox_file.name} with stored classification"
+                    )
                     try:
-                        from file_state import remove_file_state, update_file_state
-
-                        remove_file_state(inbox_file)
-                        update_file_state(archive_path)
-                    except (ImportError, OSError) as e:
-                        logger.debug(
-                            f"State tracking unavailable for {inbox_file}: {e}"
+                        results.append(
+                            apply_inbox_action(inbox_file, job.action, job.id)
                         )
                     except Exception as e:
-                        logger.warning(f"State tracking failed for {inbox_file}: {e}")
-
-                    # Commit archive move (add + delete)
-                    git_commit(
-                        [archive_path, inbox_file],
-                        f"Gardener: Archived {inbox_file.name} from inbox",
+                        record_apply_failure(job.id, str(e))
+                        raise
+                elif job.state == JOB_FAILED:
+                    logger.info(
+                        f"Skipping {inbox_file.name}: failed {job.attempts} time(s) "
+                        f"({job.error}); edit the note to retry"
                     )
-
-                    results.append(
-                        {
-                            "file": inbox_file.name,
-                            "action": action.action,
-                            "path": str(action.path),
-                            "success": True,
-                        }
-                    )
-
+                else:
+                    pending_jobs.append((inbox_file, job))
+            except Exception as e:
+                results.append(_error_result(inbox_file, e))
+        if not pending_jobs:
+            return results
+
+        if backend is None:
+            backend = get_shared_backend()
+
+        # Notes with identical content are classified once: later copies wait
+        # for the first one's decision instead of making their own AI call
+        keys = {job.id: _content_key(inbox_file) for inbox_file, job in pending_jobs}
+        leaders: set[str] = set()
+        copies: set[int] = set()
+        for _, job in pending_jobs:
+            key = keys[job.id]
+            if key is None:
+                continue
+            if key in leaders:
+                copies.add(job.id)
+            leaders.add(key)
+        decided: dict[str, tuple[str, GardenerAction | Exception]] = {}
+
+        batch_size = max(1, batch_size or GARDENER_BATCH_SIZE)
+        batches = deque(
+            pending_jobs[i : i + batch_size]
+            for i in range(0, len(pending_jobs), batch_size)
+        )
+        width = _pipeline_width(concurrency or GARDENER_CONCURRENCY, len(batches))
+        # Keep a small read-ahead so a rate limit stops the run quickly and a
+        # large import is not read into memory all at once.
+        window = width * 2
+        in_flight: deque[tuple[list[tuple[Path, Job]], Future]] = deque()
+        rate_limited = False
+
+        with ThreadPoolExecutor(
+            max_workers=width, thread_name_prefix="gardener-classify"
+        ) as executor:
+            while batches or in_flight:
+                while batches and len(in_flight) < window and not rate_limited:
+                    batch = batches.popleft()
+                    for inbox_file, job in batch:
+                        logger.info(f"Processing: {inbox_file.name}")
+                        mark_classifying(job.id)
+                    batch_files = [f for f, job in batch if job.id not in copies]
+                    future = executor.submit(classify_inbox_batch, backend, batch_files)
+                    in_flight.append((batch, future))
+                if not in_flight:
+                    break
+
+                batch, future = in_flight.popleft()
+                classified = len(batch) - sum(job.id in copies for _, job in batch)
+                try:
+                    fresh = iter(future.result())
                 except Exception as e:
-                    logger.error(f"Failed to process {inbox_file.name}: {e}")
-                    results.append(
-                        {
-                            "file": inbox_file.name,
-                            "action": "error",
-                            "error": str(e),
-                            "success": False,
-                        }
-                    )
-        finally:
-            if own_backend:
-                backend.close()
+                    fresh = iter([e] * classified)
+
+                for inbox_file, job in batch:
+                    key = keys[job.id]
+                    if job.id in copies:
+                        original, outcome = decided[key]
+                        logger.info(
+                            f"Reusing the classification of {original} "
+                            f"for identical {inbox_file.name}"
+                        )
+                        if isinstance(outcome, GardenerAction):
+                            outcome = _replayable(outcome)
+                    else:
+                        outcome = next(fresh)
+                        if key is not None:
+                            decided[key] = (inbox_file.name, outcome)
+                    try:
+                        if isinstance(outcome, Exception):
+                            raise outcome
+                        mark_classified(job.id, outcome)
+                        results.append(apply_inbox_action(inbox_file, outcome, job.id))
+                    except (RateLimitError, CircuitOpenError) as e:
+                        # Not the note's fault: retry next run without an attempt
+                        requeue_job(job.id, str(e))
+                        if not rate_limited:
+                            remaining = sum(len(b) for b in batches)
+                            logger.warning(
+                                f"Stopping inbox run: {e}. "
+                                f"{remaining} note(s) left for the next run."
+                            )
+                        rate_limited = True
+                        results.append(_error_result(inbox_file, e))
+                    except Exception as e:
+                        if isinstance(outcome, Exception):
+                            record_job_failure(job.id, str(e))
+                        else:
+                            record_apply_failure(job.id, str(e))
+                        results.append(_error_result(inbox_file, e))
 
         return results
 
 
+async def serve() -> None:
+    """Run as the standalone gardener worker until SIGINT/SIGTERM.
+
+    Takes over automation and the API's queued requests once it holds the
+    leader lock; run the API with GARDENER_WORKER_MODE=external alongside.
+    """
+    from backends.registry import close_backend_registry, init_backend_registry
+    from scheduler import shutdown_scheduler
+    from worker import GardenerWorker
+
+    init_backend_registry()
+    task = asyncio.create_task(GardenerWorker().run())
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, task.cancel)
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+    finally:
+        await asyncio.to_thread(shutdown_scheduler)
+        await close_backend_registry()
+
+
 if __name__ == "__main__":
-    results = process_inbox()
-    for r in results:
-        print(json.dumps(r))
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument(
+        "--once",
+        action="store_true",
+        help="Process the inbox once and print the results (default)",
+    )
+    mode.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as the long-lived gardener worker",
+    )
+    args = parser.parse_args()
+
+    from config import setup_logging
+
+    setup_logging()
+    if args.serve:
+        asyncio.run(serve())
+    else:
+        from worker_queue import LeaderLock
+
+        lock = LeaderLock()
+        if not lock.acquire():
+            raise SystemExit("Another gardener worker is running")
+        try:
+            results = process_inbox()
+        finally:
+            lock.release()
+        for r in results:
+            print(json.dumps(r))
@@ -12,11 +12,12 @@ const authHeaders = AUTH_TOKEN
   ? { Authorization: `Bearer ${AUTH_TOKEN}`, 'X-Auth-Token': AUTH_TOKEN }
   : {};
 
-export const GET: APIRoute = async ({ params }) => {
+export const GET: APIRoute = async ({ params, url: requestUrl }) => {
   const path = params.path || '';
-  const url = path
+  const base = path
     ? `${GARDENER_URL}/api/archive/${path}`
     : `${GARDENER_URL}/api/archive`;
+  const url = `${base}${requestUrl.search}`;
 
   try {
     const response = await fetch(url, { headers: authHeaders });
@@ -24,16 +24,26 @@ export const POST: APIRoute = async ({ request }) => {
       );
     }
 
+    // Clients that accept an event stream get tokens as they are generated
+    const stream = (request.headers.get('accept') || '').includes('text/event-stream');
+
     const response = await fetch(`${GARDENER_URL}/api/refine`, {
       method: 'POST',
       headers: { 'Content-Type': 'application/json', ...authHeaders },
-      body: JSON.stringify({ content }),
+      body: JSON.stringify({ content, stream }),
     });
 
     if (!response.ok) {
       throw new Error(`Gardener responded with ${response.status}`);
     }
 
+    if (stream && response.body) {
+      return new Response(response.body, {
+        status: 200,
+        headers: { 'Content-Type': 'text/event-stream', 'Cache-Control': 'no-cache' },
+      });
+    }
+
     const html = await response.text();
     return new Response(html, {
       status: 200,